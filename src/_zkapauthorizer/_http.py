@@ -0,0 +1,175 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A shared HTTP client for the issuer and Tahoe-LAFS HTTP APIs which re-uses
+connections between requests.
+"""
+
+__all__ = [
+    "ConnectionStats",
+    "ConnectionPoolCollector",
+    "MeasuredConnectionPool",
+    "get_connection_pool",
+    "get_http_client",
+]
+
+from typing import Any, Iterator
+
+from attrs import frozen
+from prometheus_client import CollectorRegistry
+from prometheus_client.core import CounterMetricFamily, Metric
+from treq.client import HTTPClient
+from twisted.web.client import Agent, HTTPConnectionPool
+
+from .config import Config, read_integer
+
+
+@frozen
+class ConnectionStats:
+    """
+    Counts of how a connection pool has satisfied requests for connections.
+
+    :ivar requests: The number of connections requested from the pool.
+
+    :ivar new_connections: The number of those requests satisfied by opening
+        a new connection.
+    """
+
+    requests: int
+    new_connections: int
+
+    @property
+    def reused_connections(self) -> int:
+        """
+        The number of requests satisfied by a connection which was already
+        open.
+        """
+        return self.requests - self.new_connections
+
+
+class MeasuredConnectionPool(HTTPConnectionPool):
+    """
+    A persistent ``HTTPConnectionPool`` which counts how often it re-uses a
+    connection.
+    """
+
+    def __init__(self, reactor: Any) -> None:
+        super().__init__(reactor, persistent=True)
+        self._requests = 0
+        self._new_connections = 0
+
+    def getConnection(self, key, endpoint):
+        self._requests += 1
+        return super().getConnection(key, endpoint)
+
+    def _newConnection(self, key, endpoint):
+        self._new_connections += 1
+        return super()._newConnection(key, endpoint)
+
+    def stats(self) -> ConnectionStats:
+        """
+        Get the connection re-use counts for this pool so far.
+        """
+        return ConnectionStats(self._requests, self._new_connections)
+
+    def register_metrics(self, registry: CollectorRegistry) -> None:
+        """
+        Report the connection re-use counts for this pool as Prometheus
+        counters in the given registry.
+        """
+        registry.register(ConnectionPoolCollector(self))
+
+
+@frozen
+class ConnectionPoolCollector:
+    """
+    A Prometheus collector which reports the connection re-use counts of a
+    ``MeasuredConnectionPool`` as they are when the metrics are collected.
+
+    :ivar pool: The pool to report on.
+    """
+
+    pool: MeasuredConnectionPool
+
+    def collect(self) -> Iterator[Metric]:
+        stats = self.pool.stats()
+        for (name, documentation, value) in [
+            (
+                "requests",
+                "HTTP connections requested from the connection pool",
+                stats.requests,
+            ),
+            (
+                "new",
+                "HTTP connection requests satisfied by a new connection",
+                stats.new_connections,
+            ),
+            (
+                "reused",
+                "HTTP connection requests satisfied by an open connection",
+                stats.reused_connections,
+            ),
+        ]:
+            yield CounterMetricFamily(
+                f"zkapauthorizer_client_http_connections_{name}",
+                documentation,
+                value=value,
+            )
+
+
+# The connection pool of the node running in this process, by reactor.  A
+# pool is removed when its reactor shuts down.
+_pools: dict[Any, MeasuredConnectionPool] = {}
+
+
+def get_connection_pool(reactor: Any, node_config: Config) -> MeasuredConnectionPool:
+    """
+    Get the connection pool shared by all HTTP clients using the given
+    reactor, creating it the first time.
+
+    The pool is configured from the node configuration the first time.  When
+    the reactor shuts down its cached connections are closed and it is
+    forgotten.
+    """
+    try:
+        return _pools[reactor]
+    except KeyError:
+        pass
+    pool = _pools[reactor] = MeasuredConnectionPool(reactor)
+    pool.maxPersistentPerHost = read_integer(
+        node_config,
+        "http.max-persistent-per-host",
+        pool.maxPersistentPerHost,
+    )
+    pool.cachedConnectionTimeout = read_integer(
+        node_config,
+        "http.cached-connection-timeout",
+        pool.cachedConnectionTimeout,
+    )
+
+    def close():
+        del _pools[reactor]
+        return pool.closeCachedConnections()
+
+    reactor.addSystemEventTrigger("before", "shutdown", close)
+    return pool
+
+
+def get_http_client(reactor: Any, node_config: Config) -> HTTPClient:
+    """
+    Get an HTTP client which uses the connection pool shared by all HTTP
+    clients using the given reactor.
+    """
+    return HTTPClient(Agent(reactor, pool=get_connection_pool(reactor, node_config)))
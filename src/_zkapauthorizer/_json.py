@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import re
+from codecs import getincrementaldecoder
+from json import JSONDecodeError, JSONDecoder
 from json import dumps as _dumps
-from typing import Any
+from typing import Any, Callable, Optional
 
 
 def dumps_utf8(o: Any) -> bytes:
@@ -21,3 +24,172 @@ def dumps_utf8(o: Any) -> bytes:
     Serialize an object to a UTF-8-encoded JSON byte string.
     """
     return _dumps(o).encode("utf-8")
+
+
+# JSON insignificant whitespace.
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class StreamingObjectDecoder:
+    """
+    Decode a JSON object as it arrives, in pieces, handing the elements of
+    some of its array-valued properties to a callback in batches instead of
+    keeping them.
+
+    This keeps only one batch of the elements of those arrays in memory at a
+    time, however large the arrays are.
+    """
+
+    def __init__(
+        self,
+        streamed: dict[str, Callable[[list[Any]], None]],
+        batch_size: int,
+    ) -> None:
+        """
+        :param streamed: For each property whose elements are to be streamed,
+            the function to call with each batch of them.
+
+        :param batch_size: The largest number of elements to pass to a
+            streamed property's function at once.
+        """
+        self._streamed = streamed
+        self._batch_size = batch_size
+        self._text = getincrementaldecoder("utf-8")()
+        self._decoder = JSONDecoder()
+        self._buffer = ""
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._batch: list[Any] = []
+        self._result: dict[str, Any] = {}
+
+    def feed(self, data: bytes) -> None:
+        """
+        Decode some more of the object.
+
+        :raise ValueError: If the data so far cannot be the start of a JSON
+            object.
+        """
+        self._buffer += self._text.decode(data)
+        self._decode(final=False)
+
+    def close(self) -> dict[str, Any]:
+        """
+        Finish decoding the object.
+
+        :return: The object's properties other than the streamed ones which
+            were arrays.
+
+        :raise ValueError: If the data was not a complete JSON object.
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        self._decode(final=True)
+        if self._state != "done" or self._buffer.strip():
+            raise ValueError("Incomplete or trailing data after JSON object")
+        return self._result
+
+    def _value(self, pos: int, final: bool) -> tuple[Any, int]:
+        """
+        Decode one complete JSON value at ``pos``.
+
+        :return: The value and the position after it, or ``None`` and
+            ``pos`` if it is not all here yet.
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except JSONDecodeError:
+            if final:
+                raise
+            return None, pos
+        # A number might continue in data which has not arrived yet.  Every
+        # other kind of value has a closing delimiter or a fixed length.
+        if (
+            not final
+            and end == len(self._buffer)
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+        ):
+            return None, pos
+        return value, end
+
+    def _flush(self) -> None:
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._streamed[self._key](batch)
+
+    def _decode(self, final: bool) -> None:
+        buf = self._buffer
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            char = buf[pos]
+            state = self._state
+            if state == "start":
+                if char != "{":
+                    raise ValueError("Expected a JSON object")
+                pos += 1
+                self._state = "first-key"
+            elif state in ("first-key", "key"):
+                if state == "first-key" and char == "}":
+                    pos += 1
+                    self._state = "done"
+                    continue
+                if char != '"':
+                    raise ValueError("Expected a property name")
+                key, end = self._value(pos, final)
+                if end == pos:
+                    break
+                self._key, pos = key, end
+                self._state = "colon"
+            elif state == "colon":
+                if char != ":":
+                    raise ValueError("Expected ':'")
+                pos += 1
+                self._state = "value"
+            elif state == "value":
+                if char == "[" and self._key in self._streamed:
+                    pos += 1
+                    self._state = "first-element"
+                    continue
+                value, end = self._value(pos, final)
+                if end == pos:
+                    break
+                self._result[self._key] = value
+                pos = end
+                self._state = "after-value"
+            elif state == "after-value":
+                if char == ",":
+                    self._state = "key"
+                elif char == "}":
+                    self._state = "done"
+                else:
+                    raise ValueError("Expected ',' or '}'")
+                pos += 1
+            elif state in ("first-element", "element"):
+                if state == "first-element" and char == "]":
+                    pos += 1
+                    self._state = "after-value"
+                    continue
+                value, end = self._value(pos, final)
+                if end == pos:
+                    break
+                self._batch.append(value)
+                if len(self._batch) >= self._batch_size:
+                    self._flush()
+                pos = end
+                self._state = "after-element"
+            elif state == "after-element":
+                if char == ",":
+                    self._state = "element"
+                elif char == "]":
+                    self._flush()
+                    self._state = "after-value"
+                else:
+                    raise ValueError("Expected ',' or ']'")
+                pos += 1
+            else:
+                # Trailing data after the object is left for ``close`` to
+                # complain about.
+                break
+        self._buffer = buf[pos:]
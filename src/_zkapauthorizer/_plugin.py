@@ -43,27 +43,36 @@ from twisted.python.filepath import FilePath
 from zope.interface import implementer
 
 from . import NAME
+from ._http import get_connection_pool
 from ._types import Connect, GetTime
 from .api import ZKAPAuthorizerStorageClient, ZKAPAuthorizerStorageServer
-from .config import CONFIG_DB_NAME, Config
+from .config import CONFIG_DB_NAME, REPLICA_RWCAP_BASENAME, Config, read_integer
 from .controller import get_redeemer
+from .lease_maintenance import RENEWAL_SERVICE_NAME
 from .lease_maintenance import SERVICE_NAME as MAINTENANCE_SERVICE_NAME
 from .lease_maintenance import (
+    CrawlCheckpointer,
     LeaseMaintenanceConfig,
+    ListingCache,
+    RenewalMetrics,
     lease_maintenance_service,
+    lease_renewal_service,
     maintain_leases_from_root,
+    request_pacing,
 )
 from .model import VoucherStore
 from .model import open_database as _open_database
 from .recover import make_fail_downloader
 from .replicate import (
+    ReplicationConfig,
+    TahoeLAFSReplica,
     is_replication_setup,
     replication_service,
     setup_tahoe_lafs_replication,
 )
 from .resource import from_configuration as resource_from_configuration
 from .server.spending import get_spender
-from .spending import SpendingController
+from .spending import SpendingController, UnblindedTokenReserve
 from .storage_common import BYTES_PER_PASS, get_configured_pass_value
 from .tahoe import ITahoeClient, get_tahoe_client
 
@@ -110,6 +119,13 @@ class ZKAPAuthorizer(object):
         WeakValueDictionary; if it were just a weakref the same would be true)
         probably reflects an error in the interface which forces different
         methods to use instance state to share a database connection.
+
+    :ivar _token_reserves: A mapping from node directories to the reserve of
+        unblinded tokens shared by all of the storage clients for that node.
+
+    :ivar _replication_services: A mapping from node directories to the
+        replication service for that node's database, if replication has been
+        set up.
     """
 
     name: str
@@ -117,6 +133,10 @@ class ZKAPAuthorizer(object):
     _get_tahoe_client: Callable[[Any, Config], ITahoeClient] = field()
 
     _stores: WeakValueDictionary = field(default=Factory(WeakValueDictionary))
+    _token_reserves: WeakValueDictionary = field(default=Factory(WeakValueDictionary))
+    _replication_services: WeakValueDictionary = field(
+        default=Factory(WeakValueDictionary)
+    )
     _service: IServiceCollection = field()
 
     @_service.default
@@ -147,16 +167,47 @@ class ZKAPAuthorizer(object):
         except KeyError:
             s = open_store(datetime.now, _connect, node_config)
             if is_replication_setup(node_config):
-                self._add_replication_service(s)
+                self._add_replication_service(s, node_config)
             self._stores[key] = s
         return s
 
-    def _add_replication_service(self, store: VoucherStore) -> None:
+    def _get_token_reserve(self, node_config):
+        """
+        :return UnblindedTokenReserve: The reserve of unblinded tokens for the
+            given node.
+        """
+        key = node_config.get_config_path()
+        try:
+            r = self._token_reserves[key]
+        except KeyError:
+            r = UnblindedTokenReserve(
+                self._get_store(node_config).get_unblinded_tokens,
+                read_integer(node_config, "pass-batch-size", 16),
+            )
+            self._token_reserves[key] = r
+        return r
+
+    def _add_replication_service(
+        self, store: VoucherStore, node_config: Config
+    ) -> None:
         """
         Create a replication service for the given database and arrange for it to
         start and stop when the reactor starts and stops.
         """
-        replication_service(store._connection).setServiceParent(self._service)
+        tahoe = self._get_tahoe_client(self.reactor, node_config)
+        rwcap = (
+            FilePath(node_config.get_private_path(REPLICA_RWCAP_BASENAME))
+            .getContent()
+            .decode("ascii")
+        )
+        svc = replication_service(
+            store,
+            TahoeLAFSReplica(tahoe, rwcap),
+            self.reactor,
+            ReplicationConfig.from_node_config(node_config),
+        )
+        svc.setServiceParent(self._service)
+        self._replication_services[node_config.get_config_path()] = svc
 
     def _get_redeemer(self, node_config, announcement):
         """
@@ -174,10 +225,9 @@ class ZKAPAuthorizer(object):
         metrics_interval = kwargs.pop("prometheus-metrics-interval", None)
         metrics_path = kwargs.pop("prometheus-metrics-path", None)
         if metrics_interval is not None and metrics_path is not None:
-            FilePath(metrics_path).parent().makedirs(ignoreExistingDirectory=True)
-            t = task.LoopingCall(make_safe_writer(metrics_path, registry))
-            t.clock = self.reactor
-            t.start(int(metrics_interval))
+            schedule_metrics_writes(
+                self.reactor, metrics_path, int(metrics_interval), registry
+            )
 
         root_url = kwargs.pop("ristretto-issuer-root-url")
         pass_value = int(kwargs.pop("pass-value", BYTES_PER_PASS))
@@ -224,6 +274,7 @@ class ZKAPAuthorizer(object):
         controller = SpendingController.for_store(
             tokens_to_passes=redeemer.tokens_to_passes,
             store=store,
+            reserve=self._get_token_reserve(node_config),
         )
         return ZKAPAuthorizerStorageClient(
             get_configured_pass_value(node_config),
@@ -253,7 +304,13 @@ class ZKAPAuthorizer(object):
             await setup_tahoe_lafs_replication(tahoe)
             # And then turn replication on for the database connection already
             # in use.
-            self._add_replication_service(store)
+            self._add_replication_service(store, node_config)
+
+        def get_replication_lag():
+            svc = self._replication_services.get(node_config.get_config_path())
+            if svc is None:
+                return None
+            return svc.get_lag()
 
         return resource_from_configuration(
             node_config,
@@ -262,6 +319,7 @@ class ZKAPAuthorizer(object):
             setup_replication=setup_replication,
             redeemer=self._get_redeemer(node_config, None),
             clock=self.reactor,
+            get_replication_lag=get_replication_lag,
         )
 
 
@@ -287,6 +345,19 @@ def make_safe_writer(
     return safe_writer
 
 
+def schedule_metrics_writes(
+    reactor, metrics_path: str, metrics_interval: int, registry: CollectorRegistry
+) -> None:
+    """
+    Write metrics from the given registry to the given path every
+    ``metrics_interval`` seconds.
+    """
+    FilePath(metrics_path).parent().makedirs(ignoreExistingDirectory=True)
+    t = task.LoopingCall(make_safe_writer(metrics_path, registry))
+    t.clock = reactor
+    t.start(metrics_interval)
+
+
 _init_storage = _Client.__dict__["init_storage"]
 
 
@@ -367,6 +438,32 @@ def _create_maintenance_service(reactor, client_node, store: VoucherStore) -> IS
 
     maint_config = LeaseMaintenanceConfig.from_node_config(node_config)
 
+    # If metrics are desired, record lease renewals and the re-use of HTTP
+    # connections and schedule writing them to disk.
+    section_name = "storageclient.plugins." + NAME
+    metrics_interval = node_config.get_config(
+        section_name, "prometheus-metrics-interval", default=None
+    )
+    metrics_path = node_config.get_config(
+        section_name, "prometheus-metrics-path", default=None
+    )
+    if metrics_interval is not None and metrics_path is not None:
+        registry = CollectorRegistry()
+        metrics = RenewalMetrics.create(registry)
+        get_connection_pool(reactor, node_config).register_metrics(registry)
+        schedule_metrics_writes(reactor, metrics_path, int(metrics_interval), registry)
+    else:
+        metrics = None
+
+    # Save the progress of each crawl so an interrupted one can be continued.
+    checkpoint = store.get_lease_crawl_checkpoint()
+    crawl = CrawlCheckpointer(
+        checkpoint,
+        client_node.create_node_from_uri,
+        reactor,
+        maint_config.checkpoint_interval,
+    )
+
     # Create the operation which performs the lease maintenance job when
     # called.
     maintain_leases = maintain_leases_from_root(
@@ -374,8 +471,21 @@ def _create_maintenance_service(reactor, client_node, store: VoucherStore) -> IS
         storage_broker=client_node.get_storage_broker(),
         secret_holder=client_node._secret_holder,
         min_lease_remaining=maint_config.min_lease_remaining,
-        progress=store.start_lease_maintenance,
+        progress=partial(store.start_lease_maintenance, reactor),
         get_now=get_now,
+        server_concurrency=maint_config.server_concurrency,
+        stat_chunk_size=maint_config.stat_chunk_size,
+        stat_chunks_in_flight=maint_config.stat_chunks_in_flight,
+        renewals_in_flight=maint_config.renewals_in_flight,
+        crawl=crawl,
+        list_concurrency=maint_config.list_concurrency,
+        listing_cache=ListingCache(
+            store.get_directory_listings(),
+            client_node.create_node_from_uri,
+        ),
+        expirations=store.get_lease_expirations(),
+        pacing=request_pacing(reactor, maint_config),
+        metrics=metrics,
     )
     last_run_path = FilePath(node_config.get_private_path("last-lease-maintenance-run"))
     # Create the service to periodically run the lease maintenance operation.
@@ -385,6 +495,24 @@ def _create_maintenance_service(reactor, client_node, store: VoucherStore) -> IS
         last_run_path,
         random,
         lease_maint_config=maint_config,
+        crawl_in_progress=checkpoint.in_progress(),
+    )
+
+
+def _create_renewal_service(reactor, client_node, store: VoucherStore) -> IService:
+    """
+    Create a lease renewal service to be attached to the given client node.
+
+    :param allmydata.client._Client client_node: The client node the lease
+        renewal service will be attached to.
+    """
+    return lease_renewal_service(
+        store.get_lease_expirations(),
+        client_node.get_storage_broker(),
+        client_node._secret_holder,
+        partial(store.start_lease_maintenance, reactor),
+        reactor,
+        LeaseMaintenanceConfig.from_node_config(client_node.config),
     )
 
 
@@ -402,6 +530,8 @@ def _is_client_plugin_enabled(node_config: Config) -> bool:
 _SERVICES = [
     # Run the lease maintenance service on client nodes.
     (MAINTENANCE_SERVICE_NAME, _is_client_plugin_enabled, _create_maintenance_service),
+    # Renew leases found by the lease maintenance service when they need it.
+    (RENEWAL_SERVICE_NAME, _is_client_plugin_enabled, _create_renewal_service),
 ]
 
 
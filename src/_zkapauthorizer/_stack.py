@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from contextlib import contextmanager
+from threading import Thread, stack_size
 
 try:
     from resource import RLIMIT_STACK, getrlimit, setrlimit
@@ -45,3 +46,24 @@ def less_limited_stack():
     else:
         yield
         setrlimit(RLIMIT_STACK, (soft, hard))
+
+
+class LargeStackThread(Thread):
+    """
+    A thread with a larger stack than the platform default.
+
+    Changing the stack resource limit has no effect on threads other than the
+    main thread so work which needs ``less_limited_stack`` on the main thread
+    needs one of these elsewhere.
+
+    :ivar int STACK_SIZE: The size, in bytes, of the stack of each thread.
+    """
+
+    STACK_SIZE = 256 * 1024 * 1024
+
+    def start(self) -> None:
+        previous = stack_size(self.STACK_SIZE)
+        try:
+            super().start()
+        finally:
+            stack_size(previous)
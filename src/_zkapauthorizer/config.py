@@ -21,6 +21,7 @@ __all__ = [
     "EmptyConfig",
     "empty_config",
     "read_duration",
+    "read_integer",
     "read_node_url",
 ]
 
@@ -100,3 +101,24 @@ def read_duration(cfg: Config, option: str, default: _T) -> Union[timedelta, _T]
     if value_str is None:
         return default
     return timedelta(seconds=int(value_str))
+
+
+def read_integer(cfg: Config, option: str, default: _T) -> Union[int, _T]:
+    """
+    Read an integer from the ZKAPAuthorizer section of a Tahoe-LAFS config.
+
+    :param cfg: The Tahoe-LAFS config object to consult.
+    :param option: The name of the option to read.
+
+    :return: ``default`` if the option is missing, otherwise the parsed
+        integer.
+    """
+    section_name = "storageclient.plugins." + NAME
+    value_str = cfg.get_config(
+        section=section_name,
+        option=option,
+        default=None,
+    )
+    if value_str is None:
+        return default
+    return int(value_str)
@@ -18,27 +18,41 @@ for the client side of the storage plugin.
 """
 
 from base64 import b64decode, b64encode
+from collections import OrderedDict, deque
 from datetime import timedelta
 from functools import partial
+from gzip import compress
 from hashlib import sha256
-from json import loads
-from operator import delitem, setitem
+from itertools import chain
+from math import nextafter
+from random import Random
+from time import perf_counter
 
 import attr
 import challenge_bypass_ristretto
-from treq import content
-from treq.client import HTTPClient
-from twisted.internet.defer import Deferred, fail, inlineCallbacks, returnValue, succeed
-from twisted.internet.task import LoopingCall
+from treq import collect
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    DeferredSemaphore,
+    fail,
+    gatherResults,
+    inlineCallbacks,
+    maybeDeferred,
+    returnValue,
+    succeed,
+)
+from twisted.internet.threads import deferToThreadPool
 from twisted.logger import Logger
 from twisted.python.reflect import namedAny
+from twisted.python.threadpool import ThreadPool
 from twisted.python.url import URL
-from twisted.web.client import Agent
 from zope.interface import Interface, implementer
 
 from ._base64 import urlsafe_b64decode
-from ._json import dumps_utf8
-from ._stack import less_limited_stack
+from ._http import get_http_client
+from ._json import StreamingObjectDecoder, dumps_utf8
+from ._stack import LargeStackThread, less_limited_stack
 from .model import Error as model_Error
 from .model import Pass
 from .model import Pending as model_Pending
@@ -47,8 +61,20 @@ from .model import Redeeming as model_Redeeming
 from .model import UnblindedToken
 from .model import Unpaid as model_Unpaid
 from .model import Voucher
+from .validators import greater_than
 
+# How long to wait before trying again after a redemption attempt for a
+# voucher does not succeed.  This doubles with each further unsuccessful
+# attempt up to MAX_RETRY_INTERVAL.
 RETRY_INTERVAL = timedelta(milliseconds=1000)
+MAX_RETRY_INTERVAL = timedelta(minutes=5)
+
+# The number of random tokens to keep ready for new redemption attempts.  This
+# is enough for the first group of a voucher of the default size.
+RANDOM_TOKEN_POOL_SIZE = 2048
+
+# The most bytes of a malformed issuer response to keep for reporting.
+UNEXPECTED_RESPONSE_LIMIT = 64 * 1024
 
 
 # It would be nice to have frozen exception types but Failure.cleanFailure
@@ -127,7 +153,8 @@ class IRedeemer(Interface):
 
         :param int count: The number of random tokens to generate.
 
-        :return list[RandomToken]: The generated tokens.  Random tokens must
+        :return list[RandomToken] | Deferred[list[RandomToken]]: The generated
+            tokens, or a ``Deferred`` that fires with them.  Random tokens must
             be unique over the lifetime of the Tahoe-LAFS node where this
             plugin is being used but the same tokens *may* be generated for
             the same voucher.  The tokens must be kept secret to preserve the
@@ -455,6 +482,251 @@ class IssuerConfigurationMismatch(Exception):
         )
 
 
+def _create_random_tokens(count):
+    """
+    Create some new random tokens.
+
+    :param int count: The number of tokens to create.
+
+    :return list[RandomToken]: The new tokens.
+    """
+    return list(
+        RandomToken(
+            challenge_bypass_ristretto.RandomToken.create().encode_base64(),
+        )
+        for n in range(count)
+    )
+
+
+@attr.s
+class RandomTokenPool(object):
+    """
+    A ``RandomTokenPool`` keeps a supply of new random tokens ready so that
+    starting a redemption does not have to wait for them to be created.
+
+    Each token is handed out at most once.  If the pool runs dry then the
+    shortfall is created on demand.
+
+    :ivar _run_in_worker: A function like ``maybeDeferred`` used to create
+        tokens to refill the pool and to make up any shortfall.
+
+    :ivar int capacity: The largest number of tokens to keep ready.
+
+    :ivar int batch_size: The number of tokens to create in one call to
+        ``_run_in_worker``.
+    """
+
+    _log = Logger()
+
+    _run_in_worker = attr.ib(default=maybeDeferred)
+    capacity = attr.ib(default=0, validator=greater_than(-1))
+    batch_size = attr.ib(default=256, validator=greater_than(0))
+
+    _tokens = attr.ib(init=False, default=attr.Factory(deque))
+    _refilling = attr.ib(init=False, default=False)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def take(self, count):
+        """
+        Take some tokens out of the pool and start refilling it.
+
+        :param int count: The number of tokens to take.
+
+        :return Deferred[list[RandomToken]]: The tokens.  Any which the pool
+            cannot supply are created with ``_run_in_worker``.
+        """
+        taken = list(
+            self._tokens.popleft() for n in range(min(count, len(self._tokens)))
+        )
+        shortfall = count - len(taken)
+        if shortfall == 0:
+            d = succeed(taken)
+        else:
+            # Ask for the shortfall before refilling so it is created first.
+            d = self._run_in_worker(_create_random_tokens, shortfall)
+            d.addCallback(lambda created: taken + created)
+        self.refill()
+        return d
+
+    def refill(self):
+        """
+        Create tokens in the background until the pool is full, if it is not
+        already full and being refilled.
+        """
+        if self._refilling or len(self._tokens) >= self.capacity:
+            return
+        self._refilling = True
+
+        def refilled(tokens):
+            self._tokens.extend(tokens)
+            self._refilling = False
+            self.refill()
+
+        def failed(reason):
+            self._refilling = False
+            self._log.failure("Creating random tokens failed", reason)
+
+        d = self._run_in_worker(
+            _create_random_tokens,
+            min(self.batch_size, self.capacity - len(self._tokens)),
+        )
+        d.addCallbacks(refilled, failed)
+
+
+def _run_in_reactor_thread(f, *args, **kwargs):
+    """
+    Run a function in the reactor thread like ``maybeDeferred`` but with as
+    large a stack as the resource limits allow.  Proof verification can
+    recurse deeply for large batches.
+    """
+    with less_limited_stack():
+        return maybeDeferred(f, *args, **kwargs)
+
+
+# The threads which do CPU-heavy redemption work, by reactor.  A pool is
+# removed when its reactor shuts down.
+_redemption_pools = {}
+
+
+def _get_redemption_worker(reactor):
+    """
+    Get a function which runs a function in a thread pool dedicated to
+    redemption work and returns a ``Deferred`` with its result.
+
+    The thread pool is created the first time it is needed for a reactor and
+    is stopped and forgotten when the reactor shuts down.
+    """
+    try:
+        pool = _redemption_pools[reactor]
+    except KeyError:
+        pool = _redemption_pools[reactor] = ThreadPool(
+            minthreads=0,
+            maxthreads=4,
+            name="zkapauthorizer-redemption",
+        )
+        # Proof verification can recurse deeply for large batches.  The
+        # resource limit which ``less_limited_stack`` raises does not apply
+        # to these threads so give them a large stack instead.
+        pool.threadFactory = LargeStackThread
+        pool.start()
+
+        def stop():
+            del _redemption_pools[reactor]
+            pool.stop()
+
+        reactor.addSystemEventTrigger("during", "shutdown", stop)
+    return partial(deferToThreadPool, reactor, pool)
+
+
+def _chunked(values, size):
+    """
+    Split a list into consecutive lists of no more than ``size`` elements.
+    """
+    return list(values[n : n + size] for n in range(0, len(values), size))
+
+
+def _blind_tokens(encoded_random_tokens):
+    """
+    Decode and blind some random tokens.
+
+    :param list[RandomToken] encoded_random_tokens: The tokens to blind.
+
+    :return: A three-tuple of the decoded random tokens, the blinded tokens,
+        and the base64-encoded blinded tokens as ``str``.
+    """
+    random_tokens = list(
+        challenge_bypass_ristretto.RandomToken.decode_base64(token.token_value)
+        for token in encoded_random_tokens
+    )
+    blinded_tokens = list(token.blind() for token in random_tokens)
+    encoded_blinded_tokens = list(
+        token.encode_base64().decode("ascii") for token in blinded_tokens
+    )
+    return random_tokens, blinded_tokens, encoded_blinded_tokens
+
+
+def _decode_signed_tokens(marshaled_signed_tokens):
+    """
+    Decode some signed tokens from an issuer response.
+
+    :param list[str] marshaled_signed_tokens: The base64-encoded tokens.
+
+    :return list[challenge_bypass_ristretto.SignedToken]: The decoded tokens.
+    """
+    return list(
+        challenge_bypass_ristretto.SignedToken.decode_base64(
+            marshaled_signed_token.encode("ascii"),
+        )
+        for marshaled_signed_token in marshaled_signed_tokens
+    )
+
+
+def _unblind_tokens(
+    marshaled_proof,
+    marshaled_public_key,
+    random_tokens,
+    blinded_tokens,
+    signed_tokens,
+):
+    """
+    Check the issuer's proof for a batch of signed tokens and unblind them.
+
+    :return list[UnblindedToken]: The unblinded tokens.
+
+    :raise: If the proof is not valid for the tokens and public key.
+    """
+    public_key = challenge_bypass_ristretto.PublicKey.decode_base64(
+        marshaled_public_key.encode("ascii"),
+    )
+    proof = challenge_bypass_ristretto.BatchDLEQProof.decode_base64(
+        marshaled_proof.encode("ascii"),
+    )
+    clients_unblinded_tokens = proof.invalid_or_unblind(
+        random_tokens,
+        blinded_tokens,
+        signed_tokens,
+        public_key,
+    )
+    return list(
+        UnblindedToken(token.encode_base64()) for token in clients_unblinded_tokens
+    )
+
+
+@attr.s
+class _PhaseTimer(object):
+    """
+    Log how long each phase of one redemption attempt takes.
+    """
+
+    _log = attr.ib()
+    voucher = attr.ib()
+    counter = attr.ib()
+
+    def measure(self, phase, d):
+        """
+        Log the time until ``d`` fires.
+
+        :param str phase: The name of the phase ``d`` represents.
+
+        :return: ``d``
+        """
+        start = perf_counter()
+
+        def finished(result):
+            self._log.info(
+                "Redemption of {voucher}[{counter}] spent {elapsed} seconds in {phase}.",
+                voucher=self.voucher,
+                counter=self.counter,
+                phase=phase,
+                elapsed=perf_counter() - start,
+            )
+            return result
+
+        return d.addBoth(finished)
+
+
 @implementer(IRedeemer)
 @attr.s
 class RistrettoRedeemer(object):
@@ -467,12 +739,30 @@ class RistrettoRedeemer(object):
         the issuer.
 
     :ivar URL _api_root: The root of the issuer HTTP API.
+
+    :ivar _run_in_worker: A function like ``maybeDeferred`` used to run the
+        CPU-heavy parts of redemption (blinding, decoding, and proof
+        verification).  It may run them somewhere other than the reactor
+        thread.
+
+    :ivar int _chunk_size: The largest number of tokens to hand to
+        ``_run_in_worker`` in one call where the work can be divided.
+
+    :ivar RandomTokenPool _random_tokens: The source of random tokens for new
+        redemption attempts.
+
+    :ivar bool _compress_requests: Whether to gzip-compress request bodies.
+        The issuer must support this so it is off unless configured.
     """
 
     _log = Logger()
 
     _treq = attr.ib()
     _api_root = attr.ib(validator=attr.validators.instance_of(URL))
+    _run_in_worker = attr.ib(default=_run_in_reactor_thread)
+    _chunk_size = attr.ib(default=1024, validator=greater_than(0))
+    _random_tokens = attr.ib(default=attr.Factory(RandomTokenPool))
+    _compress_requests = attr.ib(default=False)
 
     @classmethod
     def make(cls, section_name, node_config, announcement, reactor):
@@ -497,49 +787,76 @@ class RistrettoRedeemer(object):
             if announced_issuer != configured_issuer:
                 raise IssuerConfigurationMismatch(announced_issuer, configured_issuer)
 
+        compress_requests = node_config.get_config(
+            section=section_name,
+            option="ristretto-compress-requests",
+            default=False,
+            boolean=True,
+        )
+        run_in_worker = _get_redemption_worker(reactor)
+        random_tokens = RandomTokenPool(run_in_worker, RANDOM_TOKEN_POOL_SIZE)
+        random_tokens.refill()
         return cls(
-            HTTPClient(Agent(reactor)),
+            get_http_client(reactor, node_config),
             URL.from_text(configured_issuer),
+            run_in_worker,
+            random_tokens=random_tokens,
+            compress_requests=compress_requests,
         )
 
     def random_tokens_for_voucher(self, voucher, counter, count):
-        return list(
-            RandomToken(
-                challenge_bypass_ristretto.RandomToken.create().encode_base64(),
-            )
-            for n in range(count)
-        )
+        return self._random_tokens.take(count)
 
     @inlineCallbacks
     def redeemWithCounter(self, voucher, counter, encoded_random_tokens):
-        random_tokens = list(
-            challenge_bypass_ristretto.RandomToken.decode_base64(token.token_value)
-            for token in encoded_random_tokens
-        )
-        blinded_tokens = list(token.blind() for token in random_tokens)
-        response = yield self._treq.post(
-            self._api_root.child("v1", "redeem").to_text(),
-            dumps_utf8(
-                {
-                    "redeemVoucher": voucher.number.decode("ascii"),
-                    "redeemCounter": counter,
-                    "redeemTokens": list(
-                        token.encode_base64().decode("ascii")
-                        for token in blinded_tokens
-                    ),
-                }
+        timer = _PhaseTimer(self._log, voucher.number, counter)
+
+        # Blinding is independent for each token so it can be spread across
+        # several workers.
+        chunks = yield timer.measure(
+            "blind",
+            gatherResults(
+                list(
+                    self._run_in_worker(_blind_tokens, chunk)
+                    for chunk in _chunked(encoded_random_tokens, self._chunk_size)
+                ),
+                consumeErrors=True,
             ),
-            headers={b"content-type": b"application/json"},
         )
-        response_body = yield content(response)
+        random_tokens = list(chain.from_iterable(chunk[0] for chunk in chunks))
+        blinded_tokens = list(chain.from_iterable(chunk[1] for chunk in chunks))
+        encoded_blinded_tokens = list(chain.from_iterable(chunk[2] for chunk in chunks))
+
+        # Decode the signatures as they arrive rather than after the whole
+        # response has been received and parsed.
+        decoding = []
+        signature_count = 0
+
+        def decode_signatures(marshaled_signed_tokens):
+            nonlocal signature_count
+            signature_count += len(marshaled_signed_tokens)
+            decoding.append(
+                self._run_in_worker(_decode_signed_tokens, marshaled_signed_tokens)
+            )
 
-        try:
-            result = loads(response_body)
-        except ValueError:
-            raise UnexpectedResponse(response.code, response_body)
+        result = yield timer.measure(
+            "issue",
+            self._request_signatures(
+                voucher,
+                counter,
+                encoded_blinded_tokens,
+                StreamingObjectDecoder(
+                    {"signatures": decode_signatures},
+                    self._chunk_size,
+                ),
+            ),
+        )
+        decoded = gatherResults(decoding, consumeErrors=True)
 
         success = result.get("success", False)
         if not success:
+            # Whatever was decoded is of no use.
+            decoded.addErrback(lambda reason: None)
             reason = result.get("reason", None)
             if reason == "double-spend":
                 raise AlreadySpent(voucher)
@@ -552,39 +869,29 @@ class RistrettoRedeemer(object):
             "Redeemed: {public_key} {proof} {count}",
             public_key=result["public-key"],
             proof=result["proof"],
-            count=len(result["signatures"]),
+            count=signature_count,
         )
 
-        marshaled_signed_tokens = result["signatures"]
         marshaled_proof = result["proof"]
         marshaled_public_key = result["public-key"]
 
-        public_key = challenge_bypass_ristretto.PublicKey.decode_base64(
-            marshaled_public_key.encode("ascii"),
-        )
-        self._log.info("Decoded public key")
-        clients_signed_tokens = list(
-            challenge_bypass_ristretto.SignedToken.decode_base64(
-                marshaled_signed_token.encode("ascii"),
-            )
-            for marshaled_signed_token in marshaled_signed_tokens
-        )
+        chunks = yield timer.measure("decode", decoded)
+        clients_signed_tokens = list(chain.from_iterable(chunks))
         self._log.info("Decoded signed tokens")
-        clients_proof = challenge_bypass_ristretto.BatchDLEQProof.decode_base64(
-            marshaled_proof.encode("ascii"),
-        )
-        with less_limited_stack():
-            self._log.info("Decoded batch proof")
-            clients_unblinded_tokens = clients_proof.invalid_or_unblind(
+
+        # The proof covers the whole batch so it must be checked all at once.
+        unblinded_tokens = yield timer.measure(
+            "unblind",
+            self._run_in_worker(
+                _unblind_tokens,
+                marshaled_proof,
+                marshaled_public_key,
                 random_tokens,
                 blinded_tokens,
                 clients_signed_tokens,
-                public_key,
-            )
-        self._log.info("Validated proof")
-        unblinded_tokens = list(
-            UnblindedToken(token.encode_base64()) for token in clients_unblinded_tokens
+            ),
         )
+        self._log.info("Validated proof")
         returnValue(
             RedemptionResult(
                 unblinded_tokens,
@@ -592,6 +899,60 @@ class RistrettoRedeemer(object):
             )
         )
 
+    @inlineCallbacks
+    def _request_signatures(self, voucher, counter, encoded_blinded_tokens, decoder):
+        """
+        Ask the issuer to sign some blinded tokens.
+
+        :param StreamingObjectDecoder decoder: The decoder to feed the
+            response body to as it arrives.
+
+        :raise UnexpectedResponse: If the response body is not a JSON object.
+            At most ``UNEXPECTED_RESPONSE_LIMIT`` bytes of the body are kept
+            for this.
+
+        :return: A ``Deferred`` that fires with the properties of the response
+            object which the decoder did not stream.
+        """
+        body = dumps_utf8(
+            {
+                "redeemVoucher": voucher.number.decode("ascii"),
+                "redeemCounter": counter,
+                "redeemTokens": encoded_blinded_tokens,
+            }
+        )
+        headers = {b"content-type": b"application/json"}
+        if self._compress_requests:
+            body = compress(body)
+            headers[b"content-encoding"] = b"gzip"
+        response = yield self._treq.post(
+            self._api_root.child("v1", "redeem").to_text(),
+            body,
+            headers=headers,
+        )
+
+        prefix = bytearray()
+        errors = []
+
+        def received(data):
+            if len(prefix) < UNEXPECTED_RESPONSE_LIMIT:
+                prefix.extend(data[: UNEXPECTED_RESPONSE_LIMIT - len(prefix)])
+            if not errors:
+                try:
+                    decoder.feed(data)
+                except ValueError as e:
+                    # Keep reading so the connection can be re-used.
+                    errors.append(e)
+
+        yield collect(response, received)
+        try:
+            if errors:
+                raise errors[0]
+            result = decoder.close()
+        except ValueError:
+            raise UnexpectedResponse(response.code, bytes(prefix))
+        returnValue(result)
+
     def tokens_to_passes(self, message, unblinded_tokens):
         assert isinstance(message, bytes)
         assert isinstance(unblinded_tokens, list)
@@ -655,6 +1016,77 @@ def token_count_for_group(num_groups, total_tokens, group_number):
     return group_size
 
 
+@attr.s
+class RoundRobinSemaphore(object):
+    """
+    A ``RoundRobinSemaphore`` limits how many operations run at once.  Unlike
+    ``DeferredSemaphore`` it hands out free slots to the owners of waiting
+    operations in turn rather than in the order the operations began to wait,
+    so one owner with many operations cannot starve the others.
+
+    :ivar int limit: The largest number of operations to run at once.
+
+    :ivar int _running: The number of operations running now.
+
+    :ivar OrderedDict[object, deque[Deferred]] _waiting: The waiting
+        operations of each owner, with the owner to be served next first.
+    """
+
+    limit = attr.ib(validator=greater_than(0))
+
+    _running = attr.ib(init=False, default=0)
+    _waiting = attr.ib(init=False, default=attr.Factory(OrderedDict))
+
+    def acquire(self, owner):
+        """
+        Wait for a slot.
+
+        :param owner: The owner of the operation which will use the slot.
+
+        :return Deferred[None]: A ``Deferred`` which fires when the slot is
+            free.
+        """
+        if self._running < self.limit:
+            self._running += 1
+            return succeed(None)
+        d = Deferred()
+        self._waiting.setdefault(owner, deque()).append(d)
+        return d
+
+    def release(self):
+        """
+        Give up a slot, handing it to the next owner in turn if any are
+        waiting.
+        """
+        if not self._waiting:
+            self._running -= 1
+            return
+        owner, waiting = self._waiting.popitem(last=False)
+        d = waiting.popleft()
+        if waiting:
+            # Go to the back of the line.
+            self._waiting[owner] = waiting
+        d.callback(None)
+
+    def run(self, owner, f, *args, **kwargs):
+        """
+        Call a function in a slot and give the slot up when its result is
+        ready.
+
+        :return Deferred: A ``Deferred`` which fires with the result of
+            ``f``.
+        """
+        d = self.acquire(owner)
+        d.addCallback(lambda ignored: maybeDeferred(f, *args, **kwargs))
+
+        def release(result):
+            self.release()
+            return result
+
+        d.addBoth(release)
+        return d
+
+
 @attr.s
 class PaymentController(object):
     """
@@ -705,8 +1137,25 @@ class PaymentController(object):
         ZKAPAuthorizer configuration instead of just hard-coding a duplicate
         value in this implementation.
 
+    :ivar int redemption_concurrency: The number of redemption groups of one
+        voucher to redeem at the same time.  While that many are in flight,
+        the random tokens for the next group are generated and persisted so
+        its redemption can start as soon as one of them finishes.
+
+    :ivar int issuer_concurrency: The largest number of redemption groups,
+        across all vouchers, to have outstanding with the issuer at once.
+        When more are waiting, vouchers take turns.
+
     :ivar IReactorTime _clock: The reactor to use for scheduling redemption
         retries.
+
+    :ivar Random _random: The source of jitter for retry delays.
+
+    :ivar IDelayedCall _wakeup: The call which will start redemption of the
+        next voucher to become due, if there is one.
+
+    :ivar int _transient_changes: The number of changes made to ``_active``,
+        ``_error``, and ``_unpaid``.
     """
 
     _log = Logger()
@@ -718,65 +1167,131 @@ class PaymentController(object):
     allowed_public_keys = attr.ib(validator=attr.validators.instance_of(set))
 
     num_redemption_groups = attr.ib(default=16)
+    redemption_concurrency = attr.ib(default=1, validator=greater_than(0))
+    issuer_concurrency = attr.ib(default=8, validator=greater_than(0))
 
     _clock = attr.ib(default=None)
+    _random = attr.ib(default=attr.Factory(Random))
 
     _error = attr.ib(default=attr.Factory(dict))
     _unpaid = attr.ib(default=attr.Factory(dict))
     _active = attr.ib(default=attr.Factory(dict))
 
+    _issuer_slots = attr.ib(init=False, default=None)
+    _wakeup = attr.ib(init=False, default=None)
+    _transient_changes = attr.ib(init=False, default=0)
+
     def __attrs_post_init__(self):
         """
-        Check the voucher store for any vouchers in need of redemption.
+        Resume redemption of any vouchers in the voucher store which are due
+        for it.
 
         This is an initialization-time hook called by attrs.
         """
         if self._clock is None:
             self._clock = namedAny("twisted.internet.reactor")
 
-        self._check_pending_vouchers()
-        # Also start a time-based polling loop to retry redemption of vouchers
-        # in retryable error states.
-        self._schedule_retries()
-
-    def _schedule_retries(self):
-        # TODO: should not eagerly schedule calls.  If there are no vouchers
-        # in an error state we shouldn't wake up at all.
-        #
-        # TODO: should schedule retries on a bounded exponential backoff
-        # instead, perhaps on a per-voucher basis.
-        self._retry_task = LoopingCall(self._retry_redemption)
-        self._retry_task.clock = self._clock
-        self._retry_task.start(
-            RETRY_INTERVAL.total_seconds(),
-            now=False,
-        )
+        self._issuer_slots = RoundRobinSemaphore(self.issuer_concurrency)
+        self._run_due_jobs()
 
-    def _retry_redemption(self):
-        for voucher in list(self._error.keys()) + list(self._unpaid.keys()):
-            if voucher in self._active:
+    def _run_due_jobs(self, due_by=None):
+        """
+        Start redemption of every voucher which is due for it and arrange to be
+        called again when the next one becomes due.
+
+        :param float due_by: The time this call was scheduled for, if it was.
+            Every job due by then is started even if the clock reads a little
+            earlier because of rounding.
+        """
+        self._wakeup = None
+        now = self._clock.seconds()
+        if due_by is not None:
+            now = max(now, due_by)
+        for job in self.store.get_redemption_jobs(due_by=now):
+            if job.voucher in self._active:
                 continue
-            if self.get_voucher(voucher).state.should_start_redemption():
-                self.redeem(voucher)
+            try:
+                voucher = self.store.get(job.voucher)
+            except KeyError:
+                # Redemption was interrupted before anything about the
+                # voucher was persisted.  Start again from the beginning.
+                pass
+            else:
+                if not voucher.state.should_start_redemption():
+                    self.store.remove_redemption_job(job.voucher)
+                    continue
+            self._log.info(
+                "Controller resuming redemption of voucher ({voucher}) after {attempts} unsuccessful attempts.",
+                voucher=job.voucher,
+                attempts=job.attempts,
+            )
+            self.redeem(job.voucher).addErrback(
+                partial(self._final_redeem_error, job.voucher),
+            )
+        self._schedule_wakeup()
 
-    def _check_pending_vouchers(self):
+    def _schedule_wakeup(self):
         """
-        Find vouchers in the voucher store that need to be redeemed and try to
-        redeem them.
+        Arrange for ``_run_due_jobs`` to be called when the next voucher which
+        is not already being redeemed becomes due.
         """
-        vouchers = self.store.list()
-        for voucher in vouchers:
-            if voucher.state.should_start_redemption():
-                self._log.info(
-                    "Controller found voucher ({voucher}) at startup that needs redemption.",
-                    voucher=voucher.number,
-                )
-                self.redeem(voucher.number)
-            else:
-                self._log.info(
-                    "Controller found voucher ({voucher}) at startup that does not need redemption.",
-                    voucher=voucher.number,
-                )
+        if self._wakeup is not None and self._wakeup.active():
+            self._wakeup.cancel()
+        self._wakeup = None
+        job = self.store.get_next_redemption_job(excluding=self._active.keys())
+        if job is not None:
+            now = self._clock.seconds()
+            delay = max(0.0, job.due - now)
+            if now + delay > job.due:
+                # Rounding would make the call a little late.  A little early
+                # is fine because ``_run_due_jobs`` is told the due time.
+                delay = nextafter(delay, 0.0)
+            self._wakeup = self._clock.callLater(delay, self._run_due_jobs, job.due)
+
+    def _retry_delay(self, attempts):
+        """
+        Choose how long to wait before the next redemption attempt for a
+        voucher.
+
+        :param int attempts: The number of consecutive attempts which have not
+            succeeded.
+
+        :return float: A number of seconds.
+        """
+        delay = min(
+            RETRY_INTERVAL.total_seconds() * 2 ** min(attempts - 1, 32),
+            MAX_RETRY_INTERVAL.total_seconds(),
+        )
+        # Spread out retries so vouchers which failed together do not all try
+        # again together.
+        return self._random.uniform(delay / 2, delay)
+
+    def _attempt_finished(self, voucher, result):
+        """
+        Update the redemption job for a voucher after an attempt to redeem it
+        ends, one way or another.
+
+        :return: ``result``
+        """
+        try:
+            state = self.store.get(voucher).state
+        except KeyError:
+            done = False
+        else:
+            done = not state.should_start_redemption()
+
+        if done:
+            self.store.remove_redemption_job(voucher)
+        else:
+            job = self.store.get_redemption_job(voucher)
+            attempts = 1 if job is None else job.attempts + 1
+            self.store.reschedule_redemption_job(
+                voucher,
+                attempts,
+                self._clock.seconds() + self._retry_delay(attempts),
+            )
+        self._schedule_wakeup()
+        return result
 
     def _get_random_tokens_for_voucher(
         self, voucher, counter, num_tokens, total_tokens
@@ -788,6 +1303,8 @@ class PaymentController(object):
 
         :param int total_tokens: The total number of tokens for which this
             voucher is expected to be redeemed.
+
+        :return Deferred[list[RandomToken]]: The tokens, once persisted.
         """
 
         def get_tokens():
@@ -795,7 +1312,8 @@ class PaymentController(object):
                 "Generating random tokens for a voucher ({voucher}).",
                 voucher=voucher,
             )
-            return self.redeemer.random_tokens_for_voucher(
+            return maybeDeferred(
+                self.redeemer.random_tokens_for_voucher,
                 Voucher(
                     number=voucher,
                     # Unclear whether this information is useful to redeemers
@@ -807,13 +1325,40 @@ class PaymentController(object):
                 num_tokens,
             )
 
-        return self.store.add(
-            voucher,
-            total_tokens,
-            counter,
-            get_tokens,
+        # If tokens were already persisted for this group then they must be
+        # used again.  Otherwise create them before asking the store to
+        # persist them so the database is not locked while that happens.
+        tokens = self.store.get_random_tokens(voucher, counter)
+        if len(tokens) == 0:
+            d = get_tokens()
+        else:
+            d = succeed(tokens)
+
+        return d.addCallback(
+            lambda tokens: self.store.add(
+                voucher,
+                total_tokens,
+                counter,
+                lambda: tokens,
+            )
         )
 
+    def redeem_batch(self, vouchers, num_tokens=None):
+        """
+        Accept many vouchers for redemption at once.
+
+        The vouchers are persisted together and then redeemed as issuer
+        capacity allows.  Vouchers which are already known are left alone.
+
+        :param list[bytes] vouchers: The vouchers to redeem.
+
+        :param int num_tokens: A number of tokens to redeem each voucher for.
+        """
+        if num_tokens is None:
+            num_tokens = self.default_token_count
+        self.store.add_vouchers(vouchers, num_tokens, self._clock.seconds())
+        self._run_due_jobs()
+
     @inlineCallbacks
     def redeem(self, voucher, num_tokens=None):
         """
@@ -848,44 +1393,117 @@ class PaymentController(object):
             end=self.num_redemption_groups,
             num_tokens=num_tokens,
         )
-        for counter in range(counter_start, self.num_redemption_groups):
-            # Pre-generate the random tokens to use when redeeming the voucher.
-            # These are persisted with the voucher so the redemption can be made
-            # idempotent.  We don't want to lose the value if we fail after the
-            # server deems the voucher redeemed but before we persist the result.
-            # With a stable set of tokens, we can re-submit them and the server
-            # can re-sign them without fear of issuing excess passes.  Whether the
-            # server signs a given set of random tokens once or many times, the
-            # number of passes that can be constructed is still only the size of
-            # the set of random tokens.
-            token_count = token_count_for_group(
-                self.num_redemption_groups, num_tokens, counter
-            )
-            tokens = self._get_random_tokens_for_voucher(
+        # Groups beyond the voucher's counter may already be done if groups
+        # were redeemed concurrently before an interruption.
+        redeemed = self.store.get_redeemed_counters(voucher)
+        outstanding = set(range(counter_start, self.num_redemption_groups)) - redeemed
+
+        # Remember the voucher needs redemption so it is resumed even if this
+        # process is interrupted.
+        self.store.add_redemption_job(voucher, self._clock.seconds())
+
+        d = bracket(
+            lambda: self._set_transient(
+                self._active,
                 voucher,
-                counter,
-                num_tokens=token_count,
-                total_tokens=num_tokens,
-            )
+                model_Redeeming(
+                    started=self.store.now(),
+                    counter=counter_start,
+                ),
+            ),
+            lambda: self._set_transient(self._active, voucher, None),
+            lambda: self._redeem_groups(voucher, num_tokens, sorted(outstanding)),
+        )
+        d.addBoth(partial(self._attempt_finished, voucher))
+        yield d
 
-            # Reload state before each iteration.  We expect it to change each time.
-            voucher_obj = self.store.get(voucher)
+    @inlineCallbacks
+    def _redeem_groups(self, voucher, num_tokens, counters):
+        """
+        Redeem some groups of a voucher, up to ``redemption_concurrency`` at a
+        time, stopping early if any group does not succeed.
+
+        :param list[int] counters: The counters of the groups to redeem, in
+            the order to redeem them.
+        """
+        outstanding = set(counters)
+        slots = DeferredSemaphore(self.redemption_concurrency)
+        in_flight = []
+        stopped = []
 
-            succeeded = yield self._perform_redeem(voucher_obj, counter, tokens)
+        def finished(succeeded):
+            slots.release()
             if not succeeded:
-                self._log.info(
-                    "Temporarily suspending redemption of {voucher} after non-success result.",
-                    voucher=voucher,
+                stopped.append(True)
+
+        try:
+            for counter in counters:
+                # Pre-generate the random tokens to use when redeeming the
+                # voucher.  These are persisted with the voucher so the
+                # redemption can be made idempotent.  We don't want to lose
+                # the value if we fail after the server deems the voucher
+                # redeemed but before we persist the result.  With a stable
+                # set of tokens, we can re-submit them and the server can
+                # re-sign them without fear of issuing excess passes.  Whether
+                # the server signs a given set of random tokens once or many
+                # times, the number of passes that can be constructed is still
+                # only the size of the set of random tokens.
+                #
+                # This happens before waiting for a free slot so that the
+                # tokens for the next group are ready as soon as one is free.
+                token_count = token_count_for_group(
+                    self.num_redemption_groups, num_tokens, counter
+                )
+                tokens = yield self._get_random_tokens_for_voucher(
+                    voucher,
+                    counter,
+                    num_tokens=token_count,
+                    total_tokens=num_tokens,
                 )
-                break
 
-    def _perform_redeem(self, voucher, counter, random_tokens):
+                yield slots.acquire()
+                if stopped:
+                    slots.release()
+                    break
+
+                # Reload state before each group.  We expect it to change each
+                # time.
+                voucher_obj = self.store.get(voucher)
+
+                d = self._perform_redeem(voucher_obj, counter, tokens, outstanding)
+                d.addCallback(finished)
+                in_flight.append(d)
+        except BaseException:
+            # Starting the next group failed, for example because its random
+            # tokens could not be made.  Let the groups already started
+            # finish so none of them is left running and none of their
+            # failures goes unnoticed.
+            results = yield DeferredList(in_flight, consumeErrors=True)
+            for (ok, result) in results:
+                if not ok:
+                    self._log.failure(
+                        "Redeeming a group of {voucher} failed", result, voucher=voucher
+                    )
+            raise
+
+        yield gatherResults(in_flight, consumeErrors=True)
+        if stopped:
+            self._log.info(
+                "Temporarily suspending redemption of {voucher} after non-success result.",
+                voucher=voucher,
+            )
+
+    def _perform_redeem(self, voucher, counter, random_tokens, outstanding):
         """
         Use the redeemer to redeem the given voucher and random tokens.
 
         This will not persist the voucher or random tokens but it will persist
         the result.
 
+        :param set[int] outstanding: The counters of the groups of this
+            voucher not yet redeemed, including this one.  This group is
+            removed from the set if it is redeemed.
+
         :return Deferred[bool]: A ``Deferred`` firing with ``True`` if and
             only if redemption succeeds.
         """
@@ -900,26 +1518,21 @@ class PaymentController(object):
         self._log.info(
             "Redeeming random tokens for a voucher ({voucher}).", voucher=voucher
         )
-        d = bracket(
-            lambda: setitem(
-                self._active,
-                voucher.number,
-                model_Redeeming(
-                    started=self.store.now(),
-                    counter=voucher.state.counter,
-                ),
-            ),
-            lambda: delitem(self._active, voucher.number),
-            lambda: self.redeemer.redeemWithCounter(voucher, counter, random_tokens),
+        d = self._issuer_slots.run(
+            voucher.number,
+            self.redeemer.redeemWithCounter,
+            voucher,
+            counter,
+            random_tokens,
         )
         d.addCallbacks(
-            partial(self._redeem_success, voucher.number, counter),
+            partial(self._redeem_success, voucher.number, counter, outstanding),
             partial(self._redeem_failure, voucher.number),
         )
         d.addErrback(partial(self._final_redeem_error, voucher.number))
         return d
 
-    def _redeem_success(self, voucher, counter, result):
+    def _redeem_success(self, voucher, counter, outstanding, result):
         """
         Update the database state to reflect that a voucher was redeemed and to
         store the resulting unblinded tokens (which can be used to construct
@@ -933,9 +1546,23 @@ class PaymentController(object):
             voucher,
             result.public_key,
             result.unblinded_tokens,
-            completed=(counter + 1 == self.num_redemption_groups),
+            completed=(outstanding == {counter}),
             spendable=result.public_key in self.allowed_public_keys,
+            counter=counter,
         )
+        outstanding.discard(counter)
+
+        # Keep the reported progress up to date while other groups are still
+        # being redeemed.
+        redeeming = self._active.get(voucher)
+        if redeeming is not None:
+            state = self.store.get(voucher).state
+            if isinstance(state, model_Pending):
+                self._set_transient(
+                    self._active,
+                    voucher,
+                    attr.evolve(redeeming, counter=state.counter),
+                )
         return True
 
     def _redeem_failure(self, voucher, reason):
@@ -950,16 +1577,20 @@ class PaymentController(object):
                 "Voucher {voucher} reported as not paid for during redemption.",
                 voucher=voucher,
             )
-            self._unpaid[voucher] = self.store.now()
+            self._set_transient(self._unpaid, voucher, self.store.now())
         else:
             self._log.error(
                 "Redeeming random tokens for a voucher ({voucher}) failed: {reason!r}",
                 reason=reason.value,
                 voucher=voucher,
             )
-            self._error[voucher] = model_Error(
-                finished=self.store.now(),
-                details=reason.getErrorMessage(),
+            self._set_transient(
+                self._error,
+                voucher,
+                model_Error(
+                    finished=self.store.now(),
+                    details=reason.getErrorMessage(),
+                ),
             )
         return False
 
@@ -971,6 +1602,29 @@ class PaymentController(object):
         )
         return False
 
+    def _set_transient(self, states, voucher, state):
+        """
+        Change the transient state of a voucher.
+
+        :param dict states: One of ``_active``, ``_error``, or ``_unpaid``.
+
+        :param state: The new state or ``None`` to forget the voucher.
+        """
+        if state is None:
+            del states[voucher]
+        else:
+            states[voucher] = state
+        self._transient_changes += 1
+
+    def generation(self):
+        """
+        Get a value which changes whenever the state of any voucher may have
+        changed, either in the store or only in this controller.
+
+        :return tuple[int, int]: The generation.
+        """
+        return (self.store.generation(), self._transient_changes)
+
     def get_voucher(self, number):
         return self.incorporate_transient_state(
             self.store.get(number),
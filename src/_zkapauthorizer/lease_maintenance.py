@@ -19,13 +19,17 @@ refresh leases on all shares reachable from a root.
 
 from __future__ import annotations
 
+from collections import deque
 from datetime import datetime, timedelta
 from errno import ENOENT
 from functools import partial
-from typing import Any, Callable, Iterable
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional
 
 import attr
 from allmydata.interfaces import IDirectoryNode, IFilesystemNode
+from allmydata.mutable.common import MODE_READ
+from allmydata.util.base32 import b2a
 from allmydata.util.hashutil import (
     bucket_cancel_secret_hash,
     bucket_renewal_secret_hash,
@@ -33,30 +37,92 @@ from allmydata.util.hashutil import (
     file_renewal_secret_hash,
 )
 from aniso8601 import parse_datetime
+from prometheus_client import CollectorRegistry, Histogram
 from twisted.application.service import Service
-from twisted.internet.defer import inlineCallbacks, maybeDeferred
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    DeferredSemaphore,
+    gatherResults,
+    inlineCallbacks,
+    maybeDeferred,
+    succeed,
+)
+from twisted.logger import Logger
 from twisted.python.log import err
 from zope.interface import implementer
 
-from .config import Config, read_duration
+from .config import Config, read_duration, read_integer
 from .controller import bracket
 from .foolscap import ShareStat
 from .model import ILeaseMaintenanceObserver
 
 SERVICE_NAME = "lease maintenance service"
+RENEWAL_SERVICE_NAME = "lease renewal service"
+
+# The length of the lease a Tahoe-LAFS storage server grants or renews.  See
+# lots of places in Tahoe-LAFS, eg src/allmydata/storage/server.py
+LEASE_PERIOD = timedelta(days=31)
+
+_log = Logger()
+
+
+def list_children(directory):
+    """
+    List a directory.
+
+    :param IDirectoryNode directory: The directory to list.
+
+    :return Deferred[list[IFilesystemNode]]: A Deferred that fires with the
+        directory's children, in order by name.
+    """
+    d = directory.list()
+    # Produce consistent results by forcing some consistent ordering here.
+    # This will sort by name.
+    d.addCallback(
+        lambda children: list(
+            child_node
+            for (name, (child_node, child_metadata)) in sorted(children.items())
+        )
+    )
+    return d
 
 
 @inlineCallbacks
-def visit_storage_indexes(root_nodes, visit):
+def visit_storage_indexes(
+    root_nodes, visit, step=None, concurrency=1, list_children=list_children
+):
     """
     Call a visitor with the storage index of ``root_node`` and that of all
     nodes reachable from it.
 
+    Nodes are visited breadth-first.  Up to ``concurrency`` of the directories
+    at one depth are listed at once but nodes are always visited in the same
+    order: by depth, then in the order of their parents, then by name.  A
+    directory reachable by more than one path (including by a cycle) is
+    visited and listed only once.  Any other node reachable by more than one
+    path is visited once for each path so the visitor must tolerate
+    duplicates.  Nodes without a storage index (literal nodes) have no shares
+    and so are not passed to the visitor.
+
+    After each depth the number of directories listed, how quickly they were
+    listed, and the number of nodes found at the next depth are logged.
+
     :param IFilesystemNode root_node: The node from which to start.
 
     :param visit: A one-argument callable.  It will be called with the storage
         index of all visited nodes.
 
+    :param step: ``None`` or a one-argument callable.  It will be called after
+        each directory is listed with a no-argument callable which returns
+        the list of nodes which remain to be visited or listed.
+
+    :param int concurrency: The largest number of directories to be listing
+        at once.
+
+    :param list_children: A one-argument callable like ``list_children``
+        which is used to find the children of each directory.
+
     :return Deferred: A Deferred which fires after all nodes have been
         visited.
     """
@@ -74,17 +140,159 @@ def visit_storage_indexes(root_nodes, visit):
                 )
             )
 
-    stack = root_nodes[:]
-    while stack:
-        elem = stack.pop()
-        visit(elem.get_storage_index())
-        if IDirectoryNode.providedBy(elem):
-            children = yield elem.list()
-            # Produce consistent results by forcing some consistent ordering
-            # here.  This will sort by name.
-            stable_children = sorted(children.items())
-            for (name, (child_node, child_metadata)) in stable_children:
-                stack.append(child_node)
+    semaphore = DeferredSemaphore(concurrency)
+    # Only directories are remembered.  There are usually far fewer of them
+    # than files and they are the only nodes which could make the traversal
+    # repeat itself.
+    seen = set()
+    level = root_nodes[:]
+    depth = 0
+    while level:
+        directories = []
+        for node in level:
+            storage_index = node.get_storage_index()
+            if IDirectoryNode.providedBy(node):
+                if storage_index is not None:
+                    if storage_index in seen:
+                        continue
+                    seen.add(storage_index)
+                directories.append(node)
+            if storage_index is not None:
+                visit(storage_index)
+
+        # The children of each directory, once it has been listed, in an
+        # order which does not depend on which listing finishes first.
+        listings = [None] * len(directories)
+
+        def frontier():
+            remaining = []
+            for (directory, children) in zip(directories, listings):
+                if children is None:
+                    # It has not been listed yet.
+                    remaining.append(directory)
+                else:
+                    remaining.extend(children)
+            return remaining
+
+        @inlineCallbacks
+        def expand(index, directory):
+            listings[index] = yield list_children(directory)
+            if step is not None:
+                step(frontier)
+
+        started = perf_counter()
+        yield _wait_for_all(
+            list(
+                semaphore.run(expand, index, directory)
+                for (index, directory) in enumerate(directories)
+            )
+        )
+        elapsed = perf_counter() - started
+
+        level = list(child for children in listings for child in children)
+        _log.info(
+            "Listed {directories} directories at depth {depth} in {elapsed} "
+            "seconds ({rate} per second) and found {frontier} nodes below them.",
+            directories=len(directories),
+            depth=depth,
+            elapsed=elapsed,
+            rate=len(directories) / elapsed if elapsed else None,
+            frontier=len(level),
+        )
+        depth += 1
+
+
+class StorageIndexSet(object):
+    """
+    A collection of storage indexes kept in contiguous buffers of fixed-width
+    records rather than as one Python object each.
+
+    Storage indexes are added in any order, possibly more than once.  Then
+    ``sort`` puts them in order, removes duplicates, and packs them into a
+    single buffer.  After that they can be counted, iterated over, and
+    sliced but no more can be added.
+
+    Storage indexes are grouped by their first byte as they are added.  They
+    are hashes so the groups are about the same size and each one can be
+    sorted with only a small, temporary list of ``bytes``.
+
+    :ivar int WIDTH: The length of every storage index.
+    """
+
+    WIDTH = 16
+
+    def __init__(self):
+        self._groups = list(bytearray() for _ in range(256))
+        self._buffer = None
+
+    def add(self, storage_index: bytes) -> None:
+        """
+        Add a storage index.
+
+        :raise ValueError: If the storage index is not ``WIDTH`` bytes long or
+            the set has already been sorted.
+        """
+        if len(storage_index) != self.WIDTH:
+            raise ValueError(
+                f"Storage index {storage_index!r} is not {self.WIDTH} bytes long"
+            )
+        if self._groups is None:
+            raise ValueError("Cannot add to a sorted StorageIndexSet")
+        self._groups[storage_index[0]] += storage_index
+
+    def sort(self) -> None:
+        """
+        Order the storage indexes, discard duplicates, and pack them into one
+        buffer.
+        """
+        if self._groups is None:
+            return
+        width = self.WIDTH
+        buffer = bytearray()
+        for n, group in enumerate(self._groups):
+            records = {
+                bytes(group[offset : offset + width])
+                for offset in range(0, len(group), width)
+            }
+            # Let go of each group as soon as it is packed so there is never
+            # much more than one copy of the storage indexes.
+            self._groups[n] = None
+            buffer += b"".join(sorted(records))
+        self._groups = None
+        self._buffer = buffer
+
+    def _sorted(self) -> bytearray:
+        if self._buffer is None:
+            raise ValueError("StorageIndexSet must be sorted first")
+        return self._buffer
+
+    def __len__(self) -> int:
+        return len(self._sorted()) // self.WIDTH
+
+    def __iter__(self):
+        buffer = self._sorted()
+        width = self.WIDTH
+        for offset in range(0, len(buffer), width):
+            yield bytes(buffer[offset : offset + width])
+
+    def __getitem__(self, index):
+        """
+        Get one storage index by position or a ``list`` of a range of them by
+        slice.
+        """
+        width = self.WIDTH
+        buffer = self._sorted()
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return list(
+                bytes(buffer[n * width : (n + 1) * width])
+                for n in range(start, stop, step)
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return bytes(buffer[index * width : (index + 1) * width])
 
 
 def iter_storage_indexes(visit_assets):
@@ -95,19 +303,60 @@ def iter_storage_indexes(visit_assets):
     :param visit_assets: A one-argument function which takes a visit function
         and calls it with all nodes to visit.
 
-    :return Deferred[list[bytes]]: A Deferred that fires with a list of
-        storage indexes from the visited nodes.  The list is in an arbitrary
-        order and does not include duplicates if any nodes were visited more
-        than once.
+    :return Deferred[StorageIndexSet]: A Deferred that fires with the sorted
+        storage indexes from the visited nodes.  There are no duplicates if
+        any nodes were visited more than once.
     """
-    storage_indexes = set()
-    visit = storage_indexes.add
-    d = visit_assets(visit)
-    # Create some order now that we've ensured they're unique.
-    d.addCallback(lambda ignored: list(storage_indexes))
+    storage_indexes = StorageIndexSet()
+    d = visit_assets(storage_indexes.add)
+
+    def sort(ignored):
+        # Create some order now.  It is the same order each time the same
+        # nodes are visited so that chunks of the storage indexes can be
+        # recognized by their position in a resumed crawl.
+        storage_indexes.sort()
+        return storage_indexes
+
+    d.addCallback(sort)
     return d
 
 
+@attr.s(frozen=True)
+class RenewalMetrics(object):
+    """
+    Prometheus metrics describing the leases renewed by lease maintenance
+    crawls.
+
+    :ivar latency: The seconds each lease renewal took, labelled with the
+        storage server it was renewed on.  The count of this histogram is the
+        number of leases renewed on each server so its rate is the renewal
+        throughput.
+    """
+
+    latency: Histogram = attr.ib()
+
+    @classmethod
+    def create(cls, registry: CollectorRegistry) -> RenewalMetrics:
+        """
+        Create the metrics in the given registry.
+        """
+        return cls(
+            latency=Histogram(
+                "zkapauthorizer_client_lease_renewal_seconds",
+                "Seconds taken to renew one lease on a storage server",
+                ["server"],
+                registry=registry,
+            ),
+        )
+
+    def observer(self, server_id: bytes) -> Callable[[float], None]:
+        """
+        :return: A one-argument callable which records the latency of one
+            lease renewal on the storage server with the given id.
+        """
+        return self.latency.labels(server=server_id.decode("ascii")).observe
+
+
 @inlineCallbacks
 def renew_leases(
     visit_assets,
@@ -116,11 +365,22 @@ def renew_leases(
     min_lease_remaining,
     get_activity_observer,
     now,
+    server_concurrency=1,
+    stat_chunk_size=1000,
+    stat_chunks_in_flight=1,
+    renewals_in_flight=1,
+    crawl=None,
+    expirations=None,
+    pacing=None,
+    metrics=None,
 ):
     """
     Check the leases on a group of nodes for those which are expired or close
     to expiring and renew such leases.
 
+    Servers are checked concurrently.  If checking one of them fails the
+    failure is logged and the others are still checked.
+
     :param visit_assets: A one-argument callable which takes a visitor
         function and calls it with the storage index of every node to check.
 
@@ -139,8 +399,35 @@ def renew_leases(
     :param now: A no-argument function returning the current time, as a
         datetime instance, for comparison against lease expiration time.
 
+    :param int server_concurrency: The largest number of servers to check at
+        once.
+
+    :param int stat_chunk_size: See ``renew_leases_on_server``.
+
+    :param int stat_chunks_in_flight: See ``renew_leases_on_server``.
+
+    :param int renewals_in_flight: See ``renew_leases_on_server``.
+
+    :param CrawlCheckpointer crawl: ``None`` or the object which saves the
+        progress of the crawl.  If given, chunks of storage indexes it has
+        already finished on a server are skipped and it is told as each of
+        the others is finished.
+
+    :param LeaseExpirations expirations: ``None`` or the catalog of lease
+        expiration times.  If given, storage indexes already in it for a
+        server are not checked on that server because
+        ``lease_renewal_service`` renews them when they need it.  The times
+        found for the others are added to it and storage indexes which were
+        not visited are removed from it.
+
+    :param RequestPacing pacing: ``None`` or the limit on how fast requests
+        are sent to each storage server.
+
+    :param RenewalMetrics metrics: ``None`` or the metrics which record the
+        latency of each lease renewed on each storage server.
+
     :return Deferred: A Deferred which fires when all visitable nodes have
-        been checked and any leases renewed which required it.
+        been checked on all servers and any leases renewed which required it.
     """
     activity = get_activity_observer()
 
@@ -148,23 +435,80 @@ def renew_leases(
 
     renewal_secret = secret_holder.get_renewal_secret()
     cancel_secret = secret_holder.get_cancel_secret()
-    servers = list(
-        server.get_storage_server() for server in storage_broker.get_connected_servers()
-    )
-
-    for server in servers:
-        # Consider parallelizing this.
-        yield renew_leases_on_server(
-            min_lease_remaining,
-            renewal_secret,
-            cancel_secret,
-            storage_indexes,
-            server,
-            activity,
-            now(),
+    servers = storage_broker.get_connected_servers()
+
+    semaphore = DeferredSemaphore(server_concurrency)
+
+    # The servers are worked on in rounds of ``server_concurrency``.  If
+    # every lease needs renewal, each server gets one request per chunk and
+    # one per storage index.
+    rounds = -(-len(servers) // server_concurrency)
+    most_requests = -(-len(storage_indexes) // stat_chunk_size) + len(storage_indexes)
+
+    def renew_on_server(server):
+        server_id = server.get_serverid()
+        if crawl is None:
+            chunks_done, chunk_done = frozenset(), None
+        else:
+            chunks_done = crawl.chunks_done(server_id)
+            chunk_done = partial(crawl.chunk_done, server_id)
+        if expirations is None:
+            known, record = None, None
+        else:
+            known = partial(expirations.known, server_id)
+            record = partial(expirations.observe, server_id)
+        if pacing is None:
+            pace = None
+        else:
+            pace = pacing.bucket(most_requests, rounds).take
+        if metrics is None:
+            observe_latency = None
+        else:
+            observe_latency = metrics.observer(server_id)
+
+        storage_server = server.get_storage_server()
+        d = semaphore.run(
+            lambda: renew_leases_on_server(
+                min_lease_remaining,
+                renewal_secret,
+                cancel_secret,
+                storage_indexes,
+                storage_server,
+                activity,
+                now(),
+                stat_chunk_size,
+                stat_chunks_in_flight,
+                renewals_in_flight,
+                chunks_done,
+                chunk_done,
+                known,
+                record,
+                pace,
+                observe_latency,
+            )
+        )
+        d.addErrback(
+            lambda reason: _log.failure(
+                "Renewing leases on a storage server ({server})",
+                reason,
+                server=storage_server,
+            )
         )
+        return d
+
+    try:
+        yield gatherResults(list(renew_on_server(server) for server in servers))
+    except Exception:
+        # Keep what was observed before the crawl failed or was cancelled.
+        # The run will not be finished so it would be lost otherwise.
+        activity.flush()
+        raise
 
     activity.finish()
+    if expirations is not None:
+        expirations.retain(storage_indexes)
+    if crawl is not None:
+        crawl.finish()
 
 
 @inlineCallbacks
@@ -176,12 +520,28 @@ def renew_leases_on_server(
     server,
     activity,
     now,
+    chunk_size=1000,
+    chunks_in_flight=1,
+    renewals_in_flight=1,
+    chunks_done=frozenset(),
+    chunk_done=None,
+    known=None,
+    record=None,
+    pace=None,
+    observe_latency=None,
 ):
     """
     Check leases on the shares for the given storage indexes on the given
     storage server for those which are expired or close to expiring and renew
     such leases.
 
+    The storage indexes are checked a chunk at a time so neither side has to
+    hold the metadata for all of them at once.  Leases found by one chunk are
+    renewed while the following chunks are being checked.
+
+    When it is done, the number of leases renewed, the time it took, and the
+    mean time each renewal took are logged.
+
     :param timedelta min_lease_remaining: The minimum amount of time remaining
         to allow on a lease without renewing it.
 
@@ -189,7 +549,9 @@ def renew_leases_on_server(
 
     :param cancel_secret: See ``renew_lease``.
 
-    :param list[bytes] storage_indexes: The storage indexes to check.
+    :param storage_indexes: The storage indexes to check.  This is a
+        ``StorageIndexSet`` or a ``list[bytes]``; chunks are sliced from it
+        one at a time as they are needed.
 
     :param StorageServer server: The storage server on which to check.
 
@@ -199,29 +561,305 @@ def renew_leases_on_server(
     :param datetime now: The current time for comparison against the least
         expiration time.
 
+    :param int chunk_size: The largest number of storage indexes to check
+        with one request.
+
+    :param int chunks_in_flight: The largest number of chunks to be checking
+        or renewing leases for at once.
+
+    :param int renewals_in_flight: The largest number of leases to be
+        renewing at once.
+
+    :param frozenset[int] chunks_done: The positions of chunks which were
+        already finished by an earlier, interrupted attempt.  These are
+        skipped.
+
+    :param chunk_done: ``None`` or a one-argument callable.  It will be
+        called with the position of each chunk after its leases have been
+        checked and any which need it renewed.
+
+    :param known: ``None`` or a one-argument callable like
+        ``LeaseExpirations.known`` bound to this server.  It will be called
+        with each chunk of storage indexes and the ones it returns are not
+        checked because their leases are renewed by some other means.
+
+    :param record: ``None`` or a one-argument callable like
+        ``LeaseExpirations.observe`` bound to this server.  It will be called
+        once for each chunk with the lease expiration times found on the
+        server and the new expiration times of the leases renewed.
+
+    :param pace: ``None`` or a no-argument callable like
+        ``TokenBucket.take``.  Each request to the server waits for the
+        ``Deferred`` it returns to fire.
+
+    :param observe_latency: ``None`` or a one-argument callable.  It will be
+        called with the number of seconds each lease renewal took.
+
     :return Deferred: A Deferred which fires after all storage indexes have
         been checked and any leases that need renewal have been renewed.
     """
-    stats = yield server.stat_shares(storage_indexes)
-    for storage_index, stat_dict in zip(storage_indexes, stats):
-        if not stat_dict:
-            # The server has no shares for this storage index.
-            continue
+    started = perf_counter()
+    renewals = DeferredSemaphore(renewals_in_flight)
+    latencies = []
+
+    # Renewal replaces the lease with one which lasts a full period from
+    # about now.
+    renewed_until = _posix_time(now + LEASE_PERIOD)
+
+    def paced():
+        if pace is None:
+            return succeed(None)
+        return pace()
+
+    def renewed(start):
+        latency = perf_counter() - start
+        latencies.append(latency)
+        if observe_latency is not None:
+            observe_latency(latency)
+
+    def renew_now(storage_index):
+        start = perf_counter()
+        d = maybeDeferred(
+            renew_lease, renewal_secret, cancel_secret, storage_index, server
+        )
+        d.addCallback(lambda ignored: renewed(start))
+        return d
+
+    def renew(storage_index, sizes, observed):
+        d = paced()
+        d.addCallback(lambda ignored: renew_now(storage_index))
+        d.addCallback(
+            lambda ignored: observed.append((storage_index, renewed_until, sizes))
+        )
+        return d
+
+    # All of the workers take their next chunk from here.
+    chunks = (
+        (position, storage_indexes[start : start + chunk_size])
+        for (position, start) in enumerate(range(0, len(storage_indexes), chunk_size))
+        if position not in chunks_done
+    )
+
+    @inlineCallbacks
+    def check_chunks():
+        for (position, chunk) in chunks:
+            chunk = list(chunk)
+            if known is not None:
+                skipped = known(chunk)
+                chunk = list(
+                    storage_index
+                    for storage_index in chunk
+                    if storage_index not in skipped
+                )
+            if chunk:
+                yield paced()
+                stats = yield server.stat_shares(chunk)
+            else:
+                stats = []
+            renewing = []
+            observed = []
+            for storage_index, stat_dict in zip(chunk, stats):
+                if not stat_dict:
+                    # The server has no shares for this storage index.
+                    continue
+
+                # Keep track of what's been seen.
+                sizes = [stat.size for stat in stat_dict.values()]
+                activity.observe(sizes)
+
+                # Each share has its own leases and each lease has its own
+                # expiration time.  For each share the server only returns
+                # the lease with the expiration time farthest in the future.
+                #
+                # There is no API for renewing leases on just *some* shares!
+                # It is all or nothing.  So from the server's response we
+                # find the share that will have no active lease soonest and
+                # make our decision about whether to renew leases at this
+                # storage index or not based on that.
+                most_endangered = soonest_expiration(stat_dict.values())
+                if needs_lease_renew(min_lease_remaining, most_endangered, now):
+                    renewing.append(renewals.run(renew, storage_index, sizes, observed))
+                else:
+                    observed.append(
+                        (storage_index, most_endangered.lease_expiration, sizes)
+                    )
+            try:
+                yield _wait_for_all(renewing)
+            finally:
+                # Record everything learned about the chunk at once, even
+                # the leases which were renewed if some others were not.
+                if record is not None and observed:
+                    record(observed)
+            if chunk_done is not None:
+                chunk_done(position)
+
+    yield _wait_for_all(list(check_chunks() for _ in range(chunks_in_flight)))
+
+    _log.info(
+        "Renewed {renewed} leases on a storage server ({server}) "
+        "in {elapsed} seconds.",
+        server=server,
+        renewed=len(latencies),
+        elapsed=perf_counter() - started,
+        mean_latency=sum(latencies) / len(latencies) if latencies else None,
+    )
+
+
+@inlineCallbacks
+def _wait_for_all(ds):
+    """
+    Wait for all of some Deferreds to fire.
+
+    :return Deferred: A Deferred which fires after all of them have, failing
+        with the first failure among them if there is one.
+    """
+    results = yield DeferredList(ds, consumeErrors=True)
+    for (success, result) in results:
+        if not success:
+            result.raiseException()
+
+
+@attr.s
+class TokenBucket(object):
+    """
+    Limit how often something happens to an average rate while still allowing
+    short bursts.
+
+    Each ``take`` uses up one token.  Tokens are added at ``rate`` per second
+    up to ``capacity``.  When there are none left ``take`` waits until there
+    is one.
+
+    :ivar clock: An ``IReactorTime`` provider to use for waiting.
+
+    :ivar float rate: The number of tokens added each second.
+
+    :ivar float capacity: The most tokens which can be saved up.
+    """
+
+    clock = attr.ib()
+    rate: float = attr.ib()
+    capacity: float = attr.ib()
+
+    _tokens: float = attr.ib(init=False, default=None)
+    _updated: float = attr.ib(init=False, default=None)
+    _waiting: deque = attr.ib(init=False, default=attr.Factory(deque))
+    _wakeup = attr.ib(init=False, default=None)
+
+    def __attrs_post_init__(self):
+        """
+        Start out full so the first requests do not wait.
+        """
+        self._tokens = self.capacity
+        self._updated = self.clock.seconds()
+
+    def take(self) -> Deferred:
+        """
+        Use up a token.
+
+        :return: A ``Deferred`` which fires when a token is available.
+            Tokens are given out in the order they are asked for.
+        """
+        d = Deferred()
+        self._waiting.append(d)
+        self._give_tokens()
+        return d
+
+    def _give_tokens(self) -> None:
+        """
+        Add the tokens earned since the last time, give them to whoever is
+        waiting, and arrange to be called again when the next one is earned
+        if anyone is still waiting.
+        """
+        now = self.clock.seconds()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        while self._waiting and self._tokens >= 1:
+            self._tokens -= 1
+            self._waiting.popleft().callback(None)
+        if self._waiting and self._wakeup is None:
+            self._wakeup = self.clock.callLater(
+                (1 - self._tokens) / self.rate, self._wake
+            )
+
+    def _wake(self) -> None:
+        self._wakeup = None
+        self._give_tokens()
+
+
+@attr.s(frozen=True)
+class RequestPacing(object):
+    """
+    A limit on how fast a lease maintenance crawl sends requests to each
+    storage server.
 
-        # Keep track of what's been seen.
-        activity.observe([stat.size for stat in stat_dict.values()])
+    Without it a crawl sends requests as fast as the servers answer them.
+    Many clients which start their crawls at about the same time can then
+    overwhelm the servers.
 
-        # Each share has its own leases and each lease has its own expiration
-        # time.  For each share the server only returns the lease with the
-        # expiration time farthest in the future.
-        #
-        # There is no API for renewing leases on just *some* shares!  It is
-        # all or nothing.  So from the server's response we find the share
-        # that will have no active lease soonest and make our decision about
-        # whether to renew leases at this storage index or not based on that.
-        most_endangered = soonest_expiration(stat_dict.values())
-        if needs_lease_renew(min_lease_remaining, most_endangered, now):
-            yield renew_lease(renewal_secret, cancel_secret, storage_index, server)
+    :ivar clock: An ``IReactorTime`` provider to use for waiting.
+
+    :ivar float rate: The target number of requests per second to send to
+        each storage server.
+
+    :ivar timedelta window: The longest a crawl may spend waiting to send
+        requests.  If ``rate`` is too low for every request a crawl might send
+        to fit in this time then a higher rate is used.
+    """
+
+    clock = attr.ib()
+    rate: float = attr.ib()
+    window: timedelta = attr.ib()
+
+    def bucket(self, requests: int, rounds: int) -> TokenBucket:
+        """
+        Get a token bucket for the requests to one storage server.
+
+        :param requests: The most requests the crawl might send to the server.
+
+        :param rounds: The number of groups of servers which are worked on
+            one after another.  Each group gets an equal share of the window.
+
+        :return: A token bucket which will give out ``requests`` tokens within
+            that share of the window.
+        """
+        seconds = self.window.total_seconds() / rounds
+        rate = max(self.rate, requests / seconds)
+        return TokenBucket(self.clock, rate, max(1.0, rate))
+
+
+def request_pacing(clock, lease_maint_config) -> Optional[RequestPacing]:
+    """
+    Get the request pacing for lease maintenance crawls.
+
+    The pacing window is cut down to half of the minimum lease time remaining.
+    That way a crawl reaches every lease it needs to renew long before the
+    lease expires.  If there is no minimum lease time remaining then leases
+    are only renewed once they have expired and a crawl is not paced at all
+    so that it does not leave them expired for any longer.
+
+    :param clock: An ``IReactorTime`` provider to use for waiting.
+
+    :param LeaseMaintenanceConfig lease_maint_config: The configuration to use.
+
+    :return: ``None`` if the configuration does not allow any pacing, or the
+        pacing to use.
+    """
+    window = min(
+        lease_maint_config.pacing_window,
+        lease_maint_config.min_lease_remaining / 2,
+    )
+    if lease_maint_config.request_rate <= 0 or window <= timedelta(0):
+        return None
+    return RequestPacing(clock, lease_maint_config.request_rate, window)
+
+
+def _posix_time(when: datetime) -> float:
+    """
+    :return: The POSIX timestamp for a naive UTC datetime.
+    """
+    return (when - datetime.utcfromtimestamp(0)).total_seconds()
 
 
 def soonest_expiration(stats: Iterable[ShareStat]) -> ShareStat:
@@ -362,6 +1000,7 @@ def lease_maintenance_service(
     last_run_path,
     random,
     lease_maint_config,
+    crawl_in_progress=False,
 ):
     """
     Get an ``IService`` which will maintain leases on ``root_node`` and any
@@ -385,6 +1024,10 @@ def lease_maintenance_service(
 
     :param maintain_leases: A no-argument callable which performs a round of
         lease-maintenance.  The resulting service calls this periodically.
+
+    :param bool crawl_in_progress: Whether an earlier round of lease
+        maintenance was interrupted and saved its progress.  If so, the first
+        run happens right away to finish it.
     """
     interval_mean = lease_maint_config.crawl_interval_mean
     interval_range = lease_maint_config.crawl_interval_range
@@ -398,14 +1041,14 @@ def lease_maintenance_service(
             ),
         )
 
-    # Rather than an all-or-nothing last-run time we probably eventually want
-    # to have a more comprehensive record of the state when we were last
-    # interrupted.  This would remove the unfortunate behavior of restarting
-    # from the beginning if we shut down during a lease scan.  Shutting down
-    # during a lease scan becomes increasingly likely the more shares there
-    # are to check.
+    # The last-run time is only written when a run completes.  A run which
+    # was interrupted is continued from its saved progress (see
+    # ``CrawlCheckpointer``) as soon as we start rather than waiting for
+    # another interval to pass.
     last_run = read_time_from_path(last_run_path)
-    if last_run is None:
+    if crawl_in_progress:
+        initial_interval = timedelta(0)
+    elif last_run is None:
         initial_interval = sample_interval_distribution()
     else:
         initial_interval = calculate_initial_interval(
@@ -438,6 +1081,263 @@ def lease_maintenance_service(
     )
 
 
+@attr.s
+class _LeaseRenewalService(Service):
+    """
+    A service which renews leases shortly before they would have only
+    ``min_lease_remaining`` left on them.  It finds them in a catalog of
+    lease expiration times instead of asking storage servers about them.
+
+    :ivar expirations: The ``LeaseExpirations`` catalog.
+
+    :ivar storage_broker: The storage broker which supplies the connected
+        storage servers on which to renew leases.
+
+    :ivar SecretHolder secret_holder: The source of the lease renewal
+        secrets.
+
+    :ivar timedelta min_lease_remaining: The minimum amount of time remaining
+        to allow on a lease without renewing it.
+
+    :ivar timedelta lead_time: How much earlier than strictly necessary to
+        renew leases.  This leaves time to try again if a storage server is
+        unavailable.  A lease which fails to be renewed is tried again after
+        ``poll_interval``, then after twice that, and so on, but never more
+        than ``lead_time`` later.  The leases after it are renewed meanwhile.
+
+    :ivar get_activity_observer: A no-argument callable which returns an
+        ``ILeaseMaintenanceObserver`` for each batch of renewals.
+
+    :ivar int renewals_in_flight: The largest number of leases to be renewing
+        on one storage server at once.
+
+    :ivar int batch_size: The largest number of leases to renew in one batch.
+
+    :ivar timedelta poll_interval: The longest time to wait before looking
+        for leases to renew again.  Crawls add leases to the catalog and
+        storage servers connect and disconnect so the soonest lease which can
+        be renewed may change at any time.
+
+    :ivar IReactorTime reactor: A Twisted reactor to use to schedule renewals.
+    """
+
+    name = attr.ib()
+    expirations = attr.ib()
+    storage_broker = attr.ib()
+    secret_holder = attr.ib()
+    min_lease_remaining: timedelta = attr.ib()
+    lead_time: timedelta = attr.ib()
+    get_activity_observer = attr.ib()
+    renewals_in_flight: int = attr.ib()
+    batch_size: int = attr.ib()
+    poll_interval: timedelta = attr.ib()
+    reactor = attr.ib()
+    _call = attr.ib(init=False, default=None)
+
+    def startService(self):
+        Service.startService(self)
+        self._schedule(0)
+
+    def stopService(self):
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        return Service.stopService(self)
+
+    def _schedule(self, delay):
+        """
+        Look for leases to renew again after some seconds.
+        """
+        if self.running:
+            self._call = self.reactor.callLater(delay, self._iterate)
+
+    def _iterate(self):
+        """
+        Renew one batch of leases and then schedule the next.
+        """
+        d = maybeDeferred(self.renew_due)
+
+        def failed(reason):
+            _log.failure("Renewing leases which are due", reason)
+            return self.poll_interval.total_seconds()
+
+        d.addErrback(failed)
+        d.addCallback(self._schedule)
+
+    @inlineCallbacks
+    def renew_due(self):
+        """
+        Renew one batch of the leases on connected storage servers which are due
+        for renewal.
+
+        :return Deferred[float]: A Deferred which fires with the number of
+            seconds to wait before looking for more leases to renew.
+        """
+        servers = {
+            server.get_serverid(): server
+            for server in self.storage_broker.get_connected_servers()
+        }
+        threshold = (self.min_lease_remaining + self.lead_time).total_seconds()
+        poll = self.poll_interval.total_seconds()
+
+        now = self.reactor.seconds()
+        due = self.expirations.due(
+            now + threshold,
+            sorted(servers),
+            self.batch_size,
+            now,
+        )
+        if due:
+            yield self._renew(servers, due)
+            if len(due) == self.batch_size:
+                # There may be more.
+                return 0
+
+        earliest = self.expirations.earliest(sorted(servers), threshold)
+        if earliest is None:
+            return poll
+        return max(0, min(poll, earliest - self.reactor.seconds()))
+
+    def _retry_after(self, lease):
+        """
+        :return: The POSIX time before which renewing a lease which just failed
+            to be renewed should not be tried again.
+        """
+        # The delay is capped anyway so there is no use in letting the
+        # exponent grow without bound.
+        delay = self.poll_interval.total_seconds() * 2 ** min(lease.failures, 32)
+        return self.reactor.seconds() + min(delay, self.lead_time.total_seconds())
+
+    @inlineCallbacks
+    def _renew(self, servers, due):
+        """
+        Renew some leases and record their new expiration times.
+
+        :param dict[bytes, IServer] servers: The connected storage servers by
+            their identifiers.
+
+        :param list[LeaseExpiration] due: The leases to renew.  Those which
+            fail to be renewed are not tried again for a while.
+
+        :return Deferred[int]: A Deferred which fires with the number of
+            leases successfully renewed.
+        """
+        activity = self.get_activity_observer()
+        renewal_secret = self.secret_holder.get_renewal_secret()
+        cancel_secret = self.secret_holder.get_cancel_secret()
+        renewed_until = _posix_time(
+            datetime.utcfromtimestamp(self.reactor.seconds()) + LEASE_PERIOD
+        )
+
+        by_server = {}
+        for lease in due:
+            by_server.setdefault(lease.server, []).append(lease)
+
+        @inlineCallbacks
+        def renew_on_server(server_id, leases):
+            server = servers[server_id].get_storage_server()
+            semaphore = DeferredSemaphore(self.renewals_in_flight)
+            renewed = []
+            failed = []
+
+            def failed_renewal(reason, lease):
+                _log.failure(
+                    "Renewing a lease on a storage server ({server})",
+                    reason,
+                    server=server,
+                )
+                failed.append(lease)
+
+            def renew(lease):
+                d = maybeDeferred(
+                    renew_lease,
+                    renewal_secret,
+                    cancel_secret,
+                    lease.storage_index,
+                    server,
+                )
+                d.addCallback(lambda ignored: renewed.append(lease))
+                d.addErrback(failed_renewal, lease)
+                return d
+
+            yield gatherResults(list(semaphore.run(renew, lease) for lease in leases))
+            for lease in renewed:
+                activity.observe(lease.sizes)
+            self.expirations.observe(
+                server_id,
+                list(
+                    (lease.storage_index, renewed_until, lease.sizes)
+                    for lease in renewed
+                ),
+            )
+            self.expirations.postpone(
+                server_id,
+                list(
+                    (lease.storage_index, self._retry_after(lease)) for lease in failed
+                ),
+            )
+            return len(renewed)
+
+        counts = yield gatherResults(
+            list(
+                renew_on_server(server_id, leases)
+                for (server_id, leases) in by_server.items()
+            )
+        )
+        activity.finish()
+        return sum(counts)
+
+
+def lease_renewal_service(
+    expirations,
+    storage_broker,
+    secret_holder,
+    get_activity_observer,
+    reactor,
+    lease_maint_config,
+):
+    """
+    Get an ``IService`` which renews leases when they need it according to a
+    catalog of lease expiration times.
+
+    The catalog is filled in by lease maintenance crawls (see the
+    ``expirations`` parameter of ``renew_leases``).  Once a lease is in the
+    catalog crawls no longer ask the storage server about it and this service
+    renews it instead, shortly before it would have only the configured
+    minimum time remaining.
+
+    :param LeaseExpirations expirations: The catalog.
+
+    :param StorageFarmBroker storage_broker: The storage broker which supplies
+        the storage servers on which to renew leases.
+
+    :param SecretHolder secret_holder: The source of the lease renewal
+        secrets.
+
+    :param get_activity_observer: A no-argument callable which returns an
+        ``ILeaseMaintenanceObserver`` for each batch of renewals.
+
+    :param IReactorTime reactor: A Twisted reactor to use to schedule
+        renewals.
+
+    :param LeaseMaintenanceConfig lease_maint_config: Configuration for the
+        tweakable lease maintenance parameters.
+    """
+    return _LeaseRenewalService(
+        RENEWAL_SERVICE_NAME,
+        expirations,
+        storage_broker,
+        secret_holder,
+        lease_maint_config.min_lease_remaining,
+        lease_maint_config.renewal_lead_time,
+        get_activity_observer,
+        lease_maint_config.renewals_in_flight,
+        batch_size=1000,
+        poll_interval=timedelta(hours=1),
+        reactor=reactor,
+    )
+
+
 @attr.s(frozen=True)
 class LeaseMaintenanceConfig(object):
     """
@@ -450,11 +1350,49 @@ class LeaseMaintenanceConfig(object):
 
     :ivar min_lease_remaining: The minimum amount of time remaining to allow
         on a lease without renewing it.
+
+    :ivar server_concurrency: The largest number of storage servers on which
+        to check leases at once.
+
+    :ivar stat_chunk_size: The largest number of storage indexes to check on
+        a storage server with one request.
+
+    :ivar stat_chunks_in_flight: The largest number of chunks of storage
+        indexes to be checking or renewing leases for on one storage server at
+        once.
+
+    :ivar renewals_in_flight: The largest number of leases to be renewing on
+        one storage server at once.
+
+    :ivar checkpoint_interval: The least time between saves of the progress
+        of the filesystem traversal done by each crawl.
+
+    :ivar list_concurrency: The largest number of directories to be listing
+        at once while looking for storage indexes.
+
+    :ivar renewal_lead_time: How much earlier than ``min_lease_remaining``
+        to renew leases found in the catalog of lease expiration times.
+
+    :ivar request_rate: The target number of requests per second for a crawl
+        to send to each storage server, or 0 to send them as fast as they are
+        answered.
+
+    :ivar pacing_window: The longest a crawl may take because of
+        ``request_rate``.  See ``request_pacing``.
     """
 
     crawl_interval_mean: timedelta = attr.ib()
     crawl_interval_range: timedelta = attr.ib()
     min_lease_remaining: timedelta = attr.ib()
+    server_concurrency: int = attr.ib(default=8)
+    stat_chunk_size: int = attr.ib(default=1000)
+    stat_chunks_in_flight: int = attr.ib(default=2)
+    renewals_in_flight: int = attr.ib(default=4)
+    checkpoint_interval: timedelta = attr.ib(default=timedelta(minutes=1))
+    list_concurrency: int = attr.ib(default=8)
+    renewal_lead_time: timedelta = attr.ib(default=timedelta(days=1))
+    request_rate: int = attr.ib(default=10)
+    pacing_window: timedelta = attr.ib(default=timedelta(days=1))
 
     @classmethod
     def from_node_config(cls, node_config: Config) -> LeaseMaintenanceConfig:
@@ -495,6 +1433,51 @@ class LeaseMaintenanceConfig(object):
                 "lease.min-time-remaining",
                 timedelta(days=0),
             ),
+            server_concurrency=read_integer(
+                node_config,
+                "lease.server-concurrency",
+                8,
+            ),
+            stat_chunk_size=read_integer(
+                node_config,
+                "lease.stat-chunk-size",
+                1000,
+            ),
+            stat_chunks_in_flight=read_integer(
+                node_config,
+                "lease.stat-chunks-in-flight",
+                2,
+            ),
+            renewals_in_flight=read_integer(
+                node_config,
+                "lease.renewals-in-flight",
+                4,
+            ),
+            checkpoint_interval=read_duration(
+                node_config,
+                "lease.checkpoint-interval",
+                timedelta(minutes=1),
+            ),
+            list_concurrency=read_integer(
+                node_config,
+                "lease.list-concurrency",
+                8,
+            ),
+            renewal_lead_time=read_duration(
+                node_config,
+                "lease.renewal-lead-time",
+                timedelta(days=1),
+            ),
+            request_rate=read_integer(
+                node_config,
+                "lease.request-rate",
+                10,
+            ),
+            pacing_window=read_duration(
+                node_config,
+                "lease.pacing-window",
+                timedelta(days=1),
+            ),
         )
 
     def get_lease_duration(self):
@@ -524,8 +1507,7 @@ class LeaseMaintenanceConfig(object):
         :return int: The minimum number of seconds for which a newly acquired
             lease will be valid.
         """
-        # See lots of places in Tahoe-LAFS, eg src/allmydata/storage/server.py
-        upper_bound = 31 * 24 * 60 * 60
+        upper_bound = LEASE_PERIOD.total_seconds()
         min_time_remaining = self.min_lease_remaining.total_seconds()
         return int(upper_bound - min_time_remaining)
 
@@ -543,6 +1525,21 @@ def lease_maintenance_config_to_dict(
         "lease.min-time-remaining": _format_duration(
             lease_maint_config.min_lease_remaining,
         ),
+        "lease.server-concurrency": str(lease_maint_config.server_concurrency),
+        "lease.stat-chunk-size": str(lease_maint_config.stat_chunk_size),
+        "lease.stat-chunks-in-flight": str(lease_maint_config.stat_chunks_in_flight),
+        "lease.renewals-in-flight": str(lease_maint_config.renewals_in_flight),
+        "lease.checkpoint-interval": _format_duration(
+            lease_maint_config.checkpoint_interval,
+        ),
+        "lease.list-concurrency": str(lease_maint_config.list_concurrency),
+        "lease.renewal-lead-time": _format_duration(
+            lease_maint_config.renewal_lead_time,
+        ),
+        "lease.request-rate": str(lease_maint_config.request_rate),
+        "lease.pacing-window": _format_duration(
+            lease_maint_config.pacing_window,
+        ),
     }
 
 
@@ -559,6 +1556,15 @@ def lease_maintenance_config_from_dict(d: dict[str, str]) -> LeaseMaintenanceCon
         crawl_interval_mean=_parse_duration(d["lease.crawl-interval.mean"]),
         crawl_interval_range=_parse_duration(d["lease.crawl-interval.range"]),
         min_lease_remaining=_parse_duration(d["lease.min-time-remaining"]),
+        server_concurrency=int(d["lease.server-concurrency"]),
+        stat_chunk_size=int(d["lease.stat-chunk-size"]),
+        stat_chunks_in_flight=int(d["lease.stat-chunks-in-flight"]),
+        renewals_in_flight=int(d["lease.renewals-in-flight"]),
+        checkpoint_interval=_parse_duration(d["lease.checkpoint-interval"]),
+        list_concurrency=int(d["lease.list-concurrency"]),
+        renewal_lead_time=_parse_duration(d["lease.renewal-lead-time"]),
+        request_rate=int(d["lease.request-rate"]),
+        pacing_window=_parse_duration(d["lease.pacing-window"]),
     )
 
 
@@ -593,7 +1599,9 @@ def read_time_from_path(path):
         return parse_datetime(when.decode("ascii"))
 
 
-def visit_storage_indexes_from_root(visitor, get_root_nodes):
+def visit_storage_indexes_from_root(
+    visitor, get_root_nodes, crawl=None, list_concurrency=1, listing_cache=None
+):
     """
     An operation for ``lease_maintenance_service`` which applies the given
     visitor to ``root_node`` and all its children.
@@ -604,16 +1612,291 @@ def visit_storage_indexes_from_root(visitor, get_root_nodes):
     :param get_root_nodes: A no-argument callable which returns a list of
         filesystem nodes (``IFilesystemNode``) at which traversal will begin.
 
+    :param CrawlCheckpointer crawl: ``None`` or the object which saves the
+        progress of the traversal.  If given, an interrupted traversal is
+        continued rather than started again from the roots.
+
+    :param int list_concurrency: The largest number of directories to be
+        listing at once.
+
+    :param ListingCache listing_cache: ``None`` or the cache to use to avoid
+        listing directories which have not changed since an earlier visit.
+
     :return: A no-argument callable to perform the visits.
     """
-    return lambda: visitor(
-        partial(
-            visit_storage_indexes,
-            # Make sure we call get_root_nodes each time to give us a chance
-            # to notice when it changes.
-            get_root_nodes(),
-        ),
+
+    def visit():
+        # Make sure we call get_root_nodes each time to give us a chance to
+        # notice when it changes.
+        root_nodes = get_root_nodes()
+        if listing_cache is None:
+            list_dir = list_children
+        else:
+            list_dir = listing_cache.list_children
+
+        if crawl is None:
+            visit_assets = partial(
+                visit_storage_indexes,
+                root_nodes,
+                concurrency=list_concurrency,
+                list_children=list_dir,
+            )
+        else:
+            visit_assets = crawl.resume(root_nodes, list_concurrency, list_dir)
+
+        if listing_cache is not None:
+            visit_assets = listing_cache.measure(visit_assets)
+        return visitor(visit_assets)
+
+    return visit
+
+
+def probe_directory_version(create_node, directory):
+    """
+    Find out which version of a directory is current without retrieving and
+    decoding its contents.
+
+    :param create_node: A one-argument callable which makes an
+        ``IFilesystemNode`` from a capability string.  It makes the mutable
+        file which holds the directory's entries.
+
+    :param IDirectoryNode directory: The directory to probe.
+
+    :return Deferred[Optional[bytes]]: A Deferred that fires with a string
+        identifying the directory's current version: its sequence number and
+        root hash.  An immutable directory only ever has one version.
+        ``None`` if no recoverable version is found.
+    """
+    if not directory.is_mutable():
+        return succeed(b"immutable")
+    # The directory's capability contains the capability of the mutable file
+    # holding its entries.  The server map of that file only reads the share
+    # headers which is much cheaper than retrieving the whole directory.
+    filenode = create_node(directory.get_cap().get_filenode_cap().to_string())
+    d = filenode.get_servermap(MODE_READ)
+    d.addCallback(lambda servermap: servermap.best_recoverable_version())
+    d.addCallback(
+        lambda verinfo: None
+        if verinfo is None
+        else b"%d:%s" % (verinfo[0], b2a(verinfo[1]))
     )
+    return d
+
+
+@attr.s
+class ListingCache(object):
+    """
+    List directories for lease maintenance crawls, remembering the children
+    found so that a directory which has not changed since an earlier crawl is
+    not retrieved and decoded again.
+
+    Whether a directory has changed is determined by probing for its current
+    version.  A directory is only listed if the probe finds a version other
+    than the one its remembered children came from.
+
+    :ivar listings: The ``DirectoryListings`` in which to remember children.
+
+    :ivar create_node: A one-argument callable which makes an
+        ``IFilesystemNode`` from a capability string.  It re-creates the
+        remembered children.
+
+    :ivar probe_version: A one-argument callable like
+        ``probe_directory_version`` with ``create_node`` already given which
+        finds the current version of a directory.
+
+    :ivar int hits: The number of directories whose children were remembered
+        during the current crawl.
+
+    :ivar int misses: The number of directories which had to be listed during
+        the current crawl.
+    """
+
+    listings = attr.ib()
+    create_node = attr.ib()
+    probe_version = attr.ib()
+    hits: int = attr.ib(init=False, default=0)
+    misses: int = attr.ib(init=False, default=0)
+
+    @probe_version.default
+    def _make_probe_version(self):
+        return partial(probe_directory_version, self.create_node)
+
+    @inlineCallbacks
+    def list_children(self, directory):
+        """
+        Find the children of a directory, listing it only if it has changed.
+
+        :see: ``list_children``
+        """
+        storage_index = directory.get_storage_index()
+        version = yield self.probe_version(directory)
+        if version is not None:
+            uris = self.listings.get(storage_index, version)
+            if uris is not None:
+                self.hits += 1
+                return list(self.create_node(uri) for uri in uris)
+
+        self.misses += 1
+        children = yield list_children(directory)
+        uris = list(child.get_uri() for child in children)
+        # An unknown kind of node may not have a capability string and so
+        # could not be re-created.
+        if version is not None and None not in uris:
+            self.listings.put(storage_index, version, uris)
+        return children
+
+    def measure(self, visit_assets):
+        """
+        Count the hits and misses of one crawl.
+
+        :param visit_assets: A ``visit_assets`` function for ``renew_leases``
+            which uses this cache.
+
+        :return: A ``visit_assets`` function which counts hits and misses from
+            zero and logs the counts after visiting everything.
+        """
+
+        def measured(visit):
+            self.hits = 0
+            self.misses = 0
+            d = visit_assets(visit)
+
+            def report(result):
+                _log.info(
+                    "Found the children of {hits} directories in the listing "
+                    "cache and listed {misses} directories.",
+                    hits=self.hits,
+                    misses=self.misses,
+                )
+                return result
+
+            d.addCallback(report)
+            return d
+
+        return measured
+
+
+@attr.s
+class CrawlCheckpointer(object):
+    """
+    Save the progress of lease maintenance crawls as they go so that a crawl
+    interrupted by a restart continues from where it left off.  Otherwise
+    the whole filesystem would be traversed and every storage server checked
+    again.
+
+    The traversal frontier and the storage indexes found are saved at most
+    once every ``interval`` while the traversal runs and once more when it
+    is complete.  After that, each chunk of storage indexes is saved as it
+    is finished on each storage server.
+
+    :ivar checkpoint: The ``LeaseCrawlCheckpoint`` in which to save progress.
+
+    :ivar create_node: A one-argument callable which makes an
+        ``IFilesystemNode`` from a capability string.  It re-creates the nodes
+        on a saved traversal frontier.
+
+    :ivar IReactorTime clock: The source of the time used to space out saves
+        of the traversal's progress.
+
+    :ivar timedelta interval: The least time between saves of the traversal's
+        progress.
+    """
+
+    checkpoint = attr.ib()
+    create_node = attr.ib()
+    clock = attr.ib()
+    interval: timedelta = attr.ib(default=timedelta(minutes=1))
+    _chunks_done: dict[bytes, frozenset[int]] = attr.ib(
+        init=False, default=attr.Factory(dict)
+    )
+
+    def resume(self, root_nodes, list_concurrency=1, list_dir=list_children):
+        """
+        Begin a crawl from some roots or continue the crawl which was
+        interrupted, if there was one.
+
+        :param list[IFilesystemNode] root_nodes: The nodes at which a new
+            crawl's traversal begins.
+
+        :param int list_concurrency: See ``visit_storage_indexes``.
+
+        :param list_dir: See the ``list_children`` parameter of
+            ``visit_storage_indexes``.
+
+        :return: A ``visit_assets`` function for ``renew_leases`` which
+            visits all of the crawl's storage indexes.
+        """
+        progress = self.checkpoint.load()
+        if progress is None:
+            frontier = root_nodes
+            traversed = False
+            self._chunks_done = {}
+        else:
+            frontier = list(self.create_node(uri) for uri in progress.frontier)
+            traversed = progress.traversed
+            self._chunks_done = progress.chunks_done
+
+        @inlineCallbacks
+        def visit_assets(visit):
+            if progress is not None:
+                # Pass the storage indexes found before the interruption
+                # straight from the database to the visitor.
+                self.checkpoint.visit_storage_indexes(visit)
+            if traversed:
+                return
+
+            unsaved = []
+            last_saved = self.clock.seconds()
+
+            def record(storage_index):
+                unsaved.append(storage_index)
+                visit(storage_index)
+
+            def save(remaining, done):
+                self.checkpoint.save_traversal(
+                    list(node.get_uri() for node in remaining),
+                    unsaved,
+                    done,
+                )
+                del unsaved[:]
+
+            def step(get_frontier):
+                nonlocal last_saved
+                now = self.clock.seconds()
+                if now - last_saved >= self.interval.total_seconds():
+                    save(get_frontier(), False)
+                    last_saved = now
+
+            if progress is None:
+                # Record that a crawl is in progress.
+                save(frontier, False)
+            yield visit_storage_indexes(
+                frontier, record, step, list_concurrency, list_dir
+            )
+            save([], True)
+
+        return visit_assets
+
+    def chunks_done(self, server_id: bytes) -> frozenset[int]:
+        """
+        :return: The positions of the chunks of storage indexes the crawl has
+            already finished on the identified storage server.
+        """
+        return self._chunks_done.get(server_id, frozenset())
+
+    def chunk_done(self, server_id: bytes, position: int) -> None:
+        """
+        Save the fact that the crawl has finished a chunk of storage indexes on
+        the identified storage server.
+        """
+        self.checkpoint.chunk_done(server_id, position)
+
+    def finish(self) -> None:
+        """
+        Forget the progress of the crawl because it is complete.
+        """
+        self.checkpoint.clear()
+        self._chunks_done = {}
 
 
 @implementer(ILeaseMaintenanceObserver)
@@ -625,6 +1908,9 @@ class NoopMaintenanceObserver(object):
     def observe(self, sizes):
         pass
 
+    def flush(self):
+        pass
+
     def finish(self):
         pass
 
@@ -637,11 +1923,15 @@ class MemoryMaintenanceObserver(object):
     """
 
     observed = attr.ib(default=attr.Factory(list))
+    flushed = attr.ib(default=False)
     finished = attr.ib(default=False)
 
     def observe(self, sizes):
         self.observed.append(sizes)
 
+    def flush(self):
+        self.flushed = True
+
     def finish(self):
         self.finished = True
 
@@ -653,6 +1943,16 @@ def maintain_leases_from_root(
     min_lease_remaining,
     progress,
     get_now,
+    server_concurrency=1,
+    stat_chunk_size=1000,
+    stat_chunks_in_flight=1,
+    renewals_in_flight=1,
+    crawl=None,
+    list_concurrency=1,
+    listing_cache=None,
+    expirations=None,
+    pacing=None,
+    metrics=None,
 ):
     """
     An operation for ``lease_maintenance_service`` which visits ``root_node``
@@ -677,6 +1977,27 @@ def maintain_leases_from_root(
     :param get_now: A no-argument callable that returns the current time as a
         ``datetime`` instance.
 
+    :param int server_concurrency: See ``renew_leases``.
+
+    :param int stat_chunk_size: See ``renew_leases``.
+
+    :param int stat_chunks_in_flight: See ``renew_leases``.
+
+    :param int renewals_in_flight: See ``renew_leases``.
+
+    :param CrawlCheckpointer crawl: See ``renew_leases``.
+
+    :param int list_concurrency: See ``visit_storage_indexes_from_root``.
+
+    :param ListingCache listing_cache: See
+        ``visit_storage_indexes_from_root``.
+
+    :param LeaseExpirations expirations: See ``renew_leases``.
+
+    :param RequestPacing pacing: See ``renew_leases``.
+
+    :param RenewalMetrics metrics: See ``renew_leases``.
+
     :return: A no-argument callable to perform the maintenance.
     """
 
@@ -688,11 +2009,22 @@ def maintain_leases_from_root(
             min_lease_remaining,
             progress,
             get_now,
+            server_concurrency,
+            stat_chunk_size,
+            stat_chunks_in_flight,
+            renewals_in_flight,
+            crawl,
+            expirations,
+            pacing,
+            metrics,
         )
 
     return visit_storage_indexes_from_root(
         visitor,
         get_root_nodes,
+        crawl,
+        list_concurrency,
+        listing_cache,
     )
 
 
@@ -20,14 +20,16 @@ the storage plugin.
 from __future__ import annotations
 
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
 from json import loads
+from math import inf
 from sqlite3 import Connection, Cursor, OperationalError
 from sqlite3 import connect as _connect
-from typing import Awaitable, Callable, TypeVar
+from typing import Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
 
 import attr
+import cbor2
 from aniso8601 import parse_datetime
 from attr import define, frozen
 from hyperlink import DecodedURL
@@ -38,13 +40,23 @@ from zope.interface import Interface, implementer
 from ._base64 import urlsafe_b64decode
 from ._json import dumps_utf8
 from ._types import Connect, GetTime
-from .replicate import Change, EventStream, with_replication
-from .schema import get_schema_upgrades, get_schema_version, run_schema_upgrades
+from .replicate import Change, EventStream, EventStreamSummary, with_replication
+from .schema import (
+    UNREPLICATED_TABLES,
+    get_schema_upgrades,
+    get_schema_version,
+    run_schema_upgrades,
+)
 from .storage_common import pass_value_attribute, required_passes
 from .validators import greater_than, has_length, is_base64_encoded
 
 _T = TypeVar("_T")
 
+# The most values to bind to one ``IN (...)`` expression.  This keeps the
+# number of parameters per statement below the historical SQLite3 limit of
+# 999.
+_IN_BATCH = 500
+
 
 class NotEmpty(Exception):
     """
@@ -66,6 +78,12 @@ class ILeaseMaintenanceObserver(Interface):
         :param list[int] sizes: The sizes of the shares encountered.
         """
 
+    def flush():
+        """
+        Persist any observations which are not persisted yet.  This is used
+        when a run of lease maintenance fails and so will not be finished.
+        """
+
     def finish():
         """
         Observe that a run of lease maintenance has completed.
@@ -157,20 +175,21 @@ def initialize_database(conn: Connection) -> None:
         )
         cursor.execute(
             """
-            -- Track tokens that we want to remove from the database.  Mainly just
-            -- works around the awkward DB-API interface for dealing with deleting
+            -- Track tokens that we want to remove from the [in-use] set.  Mainly
+            -- just works around the awkward DB-API interface for dealing with
             -- many rows.
-            CREATE TEMPORARY TABLE [to-discard] (
+            CREATE TEMPORARY TABLE [to-reset] (
                 [unblinded-token] text
             )
             """,
         )
         cursor.execute(
             """
-            -- Track tokens that we want to remove from the [in-use] set.  Similar
-            -- to [to-discard].
-            CREATE TEMPORARY TABLE [to-reset] (
-                [unblinded-token] text
+            -- Track the storage indexes a lease maintenance crawl found so
+            -- that the lease expiration times of all others can be forgotten
+            -- without reading the whole catalog into memory.
+            CREATE TEMPORARY TABLE [retained-storage-indexes] (
+                [storage-index] blob PRIMARY KEY
             )
             """,
         )
@@ -287,7 +306,9 @@ class VoucherStore(object):
         # we're not doing replication yet because we might want to turn it on
         # later.  Also, if we're doing it, we need it to get involved in
         # database initialization which happens next.
-        replicating_conn = with_replication(conn, enable_replication)
+        replicating_conn = with_replication(
+            conn, enable_replication, UNREPLICATED_TABLES
+        )
         initialize_database(replicating_conn)
         return cls(pass_value=pass_value, now=now, connection=replicating_conn)
 
@@ -317,6 +338,13 @@ class VoucherStore(object):
         else:
             raise NotEmpty()
 
+    def generation(self) -> int:
+        """
+        Get a number which changes whenever a transaction which changes the
+        database commits.
+        """
+        return self._connection.generation
+
     @with_cursor
     def get(self, cursor, voucher):
         """
@@ -371,25 +399,14 @@ class VoucherStore(object):
 
         voucher_text = voucher.decode("ascii")
 
-        cursor.execute(
-            """
-            SELECT [text]
-            FROM [tokens]
-            WHERE [voucher] = ? AND [counter] = ?
-            """,
-            (voucher_text, counter),
-        )
-        rows = cursor.fetchall()
-        if len(rows) > 0:
+        tokens = _get_random_tokens(cursor, voucher_text, counter)
+        if len(tokens) > 0:
             self._log.info(
                 "Loaded {count} random tokens for a voucher ({voucher}[{counter}]).",
-                count=len(rows),
+                count=len(tokens),
                 voucher=voucher_text,
                 counter=counter,
             )
-            tokens = list(
-                RandomToken(token_value.encode("ascii")) for (token_value,) in rows
-            )
         else:
             tokens = get_tokens()
             self._log.info(
@@ -420,19 +437,222 @@ class VoucherStore(object):
         return tokens
 
     @with_cursor
-    def list(self, cursor):
+    def get_random_tokens(self, cursor, voucher, counter):
+        """
+        Get the random tokens already associated with one redemption group of
+        a voucher.
+
+        This lets callers avoid generating tokens which ``add`` would
+        discard in favor of these.
+
+        :param bytes voucher: The voucher the tokens are associated with.
+
+        :param int counter: The redemption counter of the group.
+
+        :return list[RandomToken]: The tokens, or an empty list if there are
+            none.
+        """
+        return _get_random_tokens(cursor, voucher.decode("ascii"), counter)
+
+    @with_cursor
+    def add_vouchers(self, cursor, vouchers, expected_tokens, due):
+        """
+        Add some vouchers to the database and remember that they need to be
+        redeemed.  Vouchers which are already present are left as they are.
+
+        :param list[bytes] vouchers: The text values of the vouchers.
+
+        :param int expected_tokens: The total number of tokens for which each
+            voucher is expected to be redeemed.
+
+        :param float due: The POSIX time at which to attempt redemption.
+        """
+        now = self.now()
+        for voucher in vouchers:
+            voucher_text = voucher.decode("ascii")
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO [vouchers] ([number], [expected-tokens], [created])
+                VALUES (?, ?, ?)
+                """,
+                (voucher_text, expected_tokens, now),
+            )
+            if cursor.rowcount == 0:
+                continue
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO [redemption-jobs] ([voucher], [attempts], [due])
+                VALUES (?, 0, ?)
+                """,
+                (voucher_text, due),
+            )
+
+    @with_cursor
+    def add_redemption_job(self, cursor, voucher, due):
+        """
+        Remember that a voucher needs to be redeemed, unless it is already
+        known to.
+
+        :param bytes voucher: The voucher to redeem.
+
+        :param float due: The POSIX time at which to attempt redemption.
+        """
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO [redemption-jobs] ([voucher], [attempts], [due])
+            VALUES (?, 0, ?)
+            """,
+            (voucher.decode("ascii"), due),
+        )
+
+    @with_cursor
+    def reschedule_redemption_job(self, cursor, voucher, attempts, due):
+        """
+        Change when redemption of a voucher will next be attempted.
+
+        :param bytes voucher: The voucher to redeem.
+
+        :param int attempts: The number of attempts which have not succeeded
+            so far.
+
+        :param float due: The POSIX time at which to next attempt redemption.
+        """
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO [redemption-jobs] ([voucher], [attempts], [due])
+            VALUES (?, ?, ?)
+            """,
+            (voucher.decode("ascii"), attempts, due),
+        )
+
+    @with_cursor
+    def remove_redemption_job(self, cursor, voucher):
+        """
+        Forget that a voucher needs to be redeemed.
+
+        :param bytes voucher: The voucher which no longer needs redemption.
+        """
+        cursor.execute(
+            """
+            DELETE FROM [redemption-jobs] WHERE [voucher] = ?
+            """,
+            (voucher.decode("ascii"),),
+        )
+
+    @with_cursor
+    def get_redemption_job(self, cursor, voucher):
+        """
+        Get the redemption job for one voucher.
+
+        :param bytes voucher: The voucher to look up.
+
+        :return Optional[RedemptionJob]: The job, or ``None`` if the voucher
+            does not need redemption.
+        """
+        cursor.execute(
+            """
+            SELECT [attempts], [due] FROM [redemption-jobs] WHERE [voucher] = ?
+            """,
+            (voucher.decode("ascii"),),
+        )
+        rows = cursor.fetchall()
+        if len(rows) == 0:
+            return None
+        [(attempts, due)] = rows
+        return RedemptionJob(voucher, attempts, due)
+
+    @with_cursor
+    def get_redemption_jobs(self, cursor, due_by=None):
         """
-        Get all known vouchers.
+        Get vouchers which need to be redeemed.
 
-        :return list[Voucher]: All vouchers known to the store.
+        :param float due_by: If not ``None``, only get the jobs due at or
+            before this POSIX time.
+
+        :return list[RedemptionJob]: The jobs, soonest due first.
         """
+        if due_by is None:
+            due_by = float("inf")
         cursor.execute(
             """
+            SELECT [voucher], [attempts], [due]
+            FROM [redemption-jobs]
+            WHERE [due] <= ?
+            ORDER BY [due], [voucher]
+            """,
+            (due_by,),
+        )
+        return list(
+            RedemptionJob(voucher.encode("ascii"), attempts, due)
+            for (voucher, attempts, due) in cursor.fetchall()
+        )
+
+    @with_cursor
+    def get_next_redemption_job(self, cursor, excluding=frozenset()):
+        """
+        Get the voucher which is due to be redeemed soonest.
+
+        :param Collection[bytes] excluding: Vouchers to skip over, for example
+            because they are already being redeemed.
+
+        :return Optional[RedemptionJob]: The job, or ``None`` if there is no
+            job for any voucher other than those excluded.
+        """
+        # At most all of the excluded vouchers come before the one wanted.
+        cursor.execute(
+            """
+            SELECT [voucher], [attempts], [due]
+            FROM [redemption-jobs]
+            ORDER BY [due], [voucher]
+            LIMIT ?
+            """,
+            (len(excluding) + 1,),
+        )
+        for (voucher, attempts, due) in cursor.fetchall():
+            voucher = voucher.encode("ascii")
+            if voucher not in excluding:
+                return RedemptionJob(voucher, attempts, due)
+        return None
+
+    @with_cursor
+    def list(self, cursor, state=None, after=None, limit=None):
+        """
+        Get known vouchers, ordered by number.
+
+        :param str state: If not ``None``, only get vouchers in this persisted
+            state: ``"pending"``, ``"redeemed"`` or ``"double-spend"``.
+
+        :param bytes after: If not ``None``, only get vouchers with numbers
+            which sort after this one.
+
+        :param int limit: If not ``None``, get no more than this many
+            vouchers.
+
+        :return list[Voucher]: The matching vouchers known to the store.
+        """
+        conditions = []
+        arguments = []
+        if state is not None:
+            conditions.append("[state] = ?")
+            arguments.append(state)
+        if after is not None:
+            conditions.append("[number] > ?")
+            arguments.append(after.decode("ascii"))
+        where = ""
+        if conditions:
+            where = "WHERE " + " AND ".join(conditions)
+        arguments.append(-1 if limit is None else limit)
+        cursor.execute(
+            f"""
             SELECT
                 [number], [created], [expected-tokens], [state], [finished], [token-count], [public-key], [counter]
             FROM
                 [vouchers]
+            {where}
+            ORDER BY [number]
+            LIMIT ?
             """,
+            tuple(arguments),
         )
         refs = cursor.fetchall()
 
@@ -440,7 +660,14 @@ class VoucherStore(object):
 
     @with_cursor
     def insert_unblinded_tokens_for_voucher(
-        self, cursor, voucher, public_key, unblinded_tokens, completed, spendable
+        self,
+        cursor,
+        voucher,
+        public_key,
+        unblinded_tokens,
+        completed,
+        spendable,
+        counter=None,
     ):
         """
         Store some unblinded tokens received from redemption of a voucher.
@@ -460,6 +687,12 @@ class VoucherStore(object):
 
         :param bool spendable: ``True`` if it should be possible to spend the
             inserted tokens, ``False`` otherwise.
+
+        :param Optional[int] counter: The redemption counter of the group the
+            tokens were redeemed for or ``None`` for the voucher's current
+            counter.  Groups may be inserted out of order.  The voucher's
+            counter only advances past groups once all earlier groups have
+            been inserted.
         """
         if completed:
             voucher_state = "redeemed"
@@ -477,9 +710,25 @@ class VoucherStore(object):
 
         cursor.execute(
             """
-            INSERT INTO [redemption-groups] ([voucher], [public-key], [spendable]) VALUES (?, ?, ?)
+            SELECT [counter] FROM [vouchers] WHERE [number] = ?
             """,
-            (voucher_text, public_key, spendable),
+            (voucher_text,),
+        )
+        rows = cursor.fetchall()
+        if len(rows) == 0:
+            raise ValueError(
+                "Cannot insert tokens for unknown voucher; add voucher first"
+            )
+        [(low_counter,)] = rows
+        if counter is None:
+            counter = low_counter
+
+        cursor.execute(
+            """
+            INSERT INTO [redemption-groups] ([voucher], [public-key], [spendable], [counter])
+            VALUES (?, ?, ?, ?)
+            """,
+            (voucher_text, public_key, spendable, counter),
         )
         group_id = cursor.lastrowid
 
@@ -490,6 +739,19 @@ class VoucherStore(object):
             public_key=public_key,
         )
 
+        # Advance the counter past every group which is now done.
+        cursor.execute(
+            """
+            SELECT [counter] FROM [redemption-groups]
+            WHERE [voucher] = ? AND [counter] >= ?
+            """,
+            (voucher_text, low_counter),
+        )
+        done = {done_counter for (done_counter,) in cursor.fetchall()}
+        new_counter = low_counter
+        while new_counter in done:
+            new_counter += 1
+
         cursor.execute(
             """
             UPDATE [vouchers]
@@ -497,7 +759,7 @@ class VoucherStore(object):
               , [token-count] = COALESCE([token-count], 0) + ?
               , [sequestered-count] = COALESCE([sequestered-count], 0) + ?
               , [finished] = ?
-              , [counter] = [counter] + 1
+              , [counter] = ?
             WHERE [number] = ?
             """,
             (
@@ -505,21 +767,10 @@ class VoucherStore(object):
                 token_count_increase,
                 sequestered_count_increase,
                 self.now(),
+                new_counter,
                 voucher_text,
             ),
         )
-        if cursor.rowcount == 0:
-            raise ValueError(
-                "Cannot insert tokens for unknown voucher; add voucher first"
-            )
-
-        cursor.execute(
-            """
-            SELECT [counter] FROM [vouchers] WHERE [number] = ?
-            """,
-            (voucher_text,),
-        )
-        (new_counter,) = cursor.fetchone()
 
         cursor.executemany(
             """
@@ -530,7 +781,35 @@ class VoucherStore(object):
                 for token in unblinded_tokens
             ),
         )
-        self._delete_corresponding_tokens(cursor, voucher_text, new_counter - 1)
+        self._delete_corresponding_tokens(cursor, voucher_text, counter)
+
+    @with_cursor
+    def get_redeemed_counters(self, cursor, voucher: bytes) -> frozenset[int]:
+        """
+        Get the redemption counters of the groups of a voucher which have been
+        redeemed, including those beyond the voucher's current counter.
+        """
+        voucher_text = voucher.decode("ascii")
+        cursor.execute(
+            """
+            SELECT [counter] FROM [vouchers] WHERE [number] = ?
+            """,
+            (voucher_text,),
+        )
+        rows = cursor.fetchall()
+        if len(rows) == 0:
+            return frozenset()
+        [(low_counter,)] = rows
+        cursor.execute(
+            """
+            SELECT [counter] FROM [redemption-groups]
+            WHERE [voucher] = ? AND [counter] >= ?
+            """,
+            (voucher_text, low_counter),
+        )
+        return frozenset(range(low_counter)) | frozenset(
+            done_counter for (done_counter,) in cursor.fetchall()
+        )
 
     def _delete_corresponding_tokens(self, cursor, voucher: str, counter: int) -> None:
         """
@@ -671,30 +950,25 @@ class VoucherStore(object):
 
         :return: ``None``
         """
-        cursor.executemany(
-            """
-            INSERT INTO [to-discard] VALUES (?)
-            """,
-            list(
-                (token.unblinded_token.decode("ascii"),) for token in unblinded_tokens
-            ),
+        tokens = list(
+            (token.unblinded_token.decode("ascii"),) for token in unblinded_tokens
         )
-        cursor.execute(
+        cursor.executemany(
             """
             DELETE FROM [in-use]
-            WHERE [unblinded-token] IN [to-discard]
+            WHERE [unblinded-token] = ?
             """,
+            tokens,
         )
-        cursor.execute(
+        # Don't go through a temporary table for this part.  This statement is
+        # recorded in the event stream and must make sense without any of
+        # this connection's temporary state.
+        cursor.executemany(
             """
             DELETE FROM [unblinded-tokens]
-            WHERE [token] IN [to-discard]
-            """,
-        )
-        cursor.execute(
-            """
-            DELETE FROM [to-discard]
+            WHERE [token] = ?
             """,
+            tokens,
         )
 
     @with_cursor
@@ -759,17 +1033,46 @@ class VoucherStore(object):
             """,
         )
 
-    def start_lease_maintenance(self):
+    def start_lease_maintenance(self, clock=None):
         """
         Get an object which can track a newly started round of lease maintenance
         activity.
 
+        :param clock: See ``LeaseMaintenance``.
+
         :return LeaseMaintenance: A new, started lease maintenance object.
         """
-        m = LeaseMaintenance(self.pass_value, self.now, self._connection)
+        m = LeaseMaintenance(self.pass_value, self.now, self._connection, clock=clock)
         m.start()
         return m
 
+    def get_lease_crawl_checkpoint(self):
+        """
+        Get an object which can save and load the progress of an interrupted
+        lease maintenance crawl.
+
+        :return LeaseCrawlCheckpoint: The checkpoint.
+        """
+        return LeaseCrawlCheckpoint(self._connection)
+
+    def get_lease_expirations(self):
+        """
+        Get an object which can remember when the leases on shares on storage
+        servers expire.
+
+        :return LeaseExpirations: The catalog of lease expirations.
+        """
+        return LeaseExpirations(self._connection)
+
+    def get_directory_listings(self):
+        """
+        Get an object which can remember the children of directories visited by
+        lease maintenance crawls.
+
+        :return DirectoryListings: The listings.
+        """
+        return DirectoryListings(self._connection)
+
     @with_cursor
     def get_latest_lease_maintenance_activity(self, cursor):
         """
@@ -811,19 +1114,125 @@ class VoucherStore(object):
         )
 
     @with_cursor
-    def get_events(self, cursor):
+    def prune_events(self, cursor, up_to_sequence: int) -> None:
         """
-        Return all events currently in our event-log.
+        Remove all events from the event-log with a sequence number less than or
+        equal to the one given.  This is useful once those events have been
+        replicated.
         """
         cursor.execute(
             """
-            SELECT [sequence-number], [statement]
-            FROM [event-stream]
+            DELETE FROM [event-stream]
+            WHERE [sequence-number] <= ?
+            """,
+            (up_to_sequence,),
+        )
+
+    def copy_with_sequence(self) -> tuple[Connection, int]:
+        """
+        Copy the database into a private, temporary database from which a
+        snapshot can be read a little at a time, along with the sequence
+        number of the last event-stream statement the copy reflects.  Every
+        change made by a statement with this or a lower sequence number is
+        contained in the copy.
+
+        The copy is deleted when the returned connection is closed.
+        """
+        copy = self._connection.temporary_copy()
+        # Read the sequence number from the copy itself so it cannot disagree
+        # with the copy's contents.
+        rows = copy.execute(
+            """
+            SELECT [seq] FROM [sqlite_sequence] WHERE [name] = 'event-stream'
+            """
+        ).fetchall()
+        sequence = rows[0][0] if rows else 0
+        return copy, sequence
+
+    @with_cursor
+    def get_events(
+        self, cursor, since_sequence: int = 0, limit: Optional[int] = None
+    ) -> EventStream:
+        """
+        Return events from our event-log in sequence order.
+
+        :param since_sequence: Return only events with a sequence number
+            greater than this.
+
+        :param limit: Return at most this many events or, if ``None``, all of
+            them.
+        """
+        cursor.execute(
             """
+            SELECT [sequence-number], [statement], [arguments]
+            FROM [event-stream]
+            WHERE [sequence-number] > ?
+            ORDER BY [sequence-number]
+            LIMIT ?
+            """,
+            (since_sequence, -1 if limit is None else limit),
         )
         rows = cursor.fetchall()
 
-        return EventStream(changes=tuple(Change(seq, stmt) for seq, stmt in rows))
+        return EventStream(
+            changes=tuple(
+                Change(
+                    seq,
+                    stmt,
+                    () if args is None else tuple(map(tuple, cbor2.loads(args))),
+                )
+                for seq, stmt, args in rows
+            )
+        )
+
+    def iter_events(
+        self,
+        since_sequence: int = 0,
+        up_to_sequence: Optional[int] = None,
+        page_size: int = 1000,
+    ) -> Iterator[Change]:
+        """
+        Lazily iterate over events from our event-log in sequence order, reading
+        at most ``page_size`` of them from the database at a time.
+
+        :param since_sequence: Iterate only over events with a sequence number
+            greater than this.
+
+        :param up_to_sequence: If not ``None``, iterate only over events with a
+            sequence number less than or equal to this.
+        """
+        while True:
+            changes = self.get_events(since_sequence, page_size).changes
+            for change in changes:
+                if up_to_sequence is not None and change.sequence > up_to_sequence:
+                    return
+                yield change
+            if len(changes) < page_size:
+                return
+            since_sequence = changes[-1].sequence
+
+    @with_cursor
+    def get_event_stream_summary(self, cursor) -> EventStreamSummary:
+        """
+        Describe the events currently in our event-log without reading them.
+        """
+        cursor.execute(
+            """
+            SELECT
+                count(*),
+                coalesce(
+                    sum(
+                        length(CAST([statement] AS BLOB))
+                        + coalesce(length([arguments]), 0)
+                    ),
+                    0
+                ),
+                max([sequence-number])
+            FROM [event-stream]
+            """
+        )
+        [(statements, size, highest_sequence)] = cursor.fetchall()
+        return EventStreamSummary(statements, size, highest_sequence)
 
 
 @implementer(ILeaseMaintenanceObserver)
@@ -837,6 +1246,13 @@ class LeaseMaintenance(object):
     the ``observe`` and ``finish`` methods to persist state about a lease
     maintenance run.
 
+    Observations are added up in memory and written to the database at most
+    once per flush interval and when the run finishes.  This keeps a crawl
+    from committing a transaction for every storage index on every server.
+    With a clock the observations are written when the flush interval has
+    passed even if no more are made.  Without one they are only written when
+    a later observation finds that it has passed.
+
     :ivar int _pass_value: The value of a single ZKAP in byte-months.
 
     :ivar _now: A no-argument callable which returns a datetime giving a time
@@ -848,12 +1264,33 @@ class LeaseMaintenance(object):
     :ivar _rowid: None for unstarted lease maintenance objects.  For started
         objects, the database row id that corresponds to the started run.
         This is used to make sure future updates go to the right row.
+
+    :ivar timedelta _flush_interval: The longest time observations are kept
+        in memory before they are written to the database.
+
+    :ivar int _pending: The number of passes required by observations which
+        have not been written to the database yet.
+
+    :ivar _last_flushed: None for unstarted lease maintenance objects.  For
+        started objects, the time observations were last written to the
+        database.
+
+    :ivar _clock: ``None`` or an ``IReactorTime`` provider used to schedule
+        writing observations once the flush interval has passed.
+
+    :ivar _delayed_flush: ``None`` or the ``IDelayedCall`` which will write
+        the observations held in memory.
     """
 
     _pass_value = pass_value_attribute()
     _now = attr.ib()
     _connection = attr.ib()
     _rowid = attr.ib(default=None)
+    _flush_interval = attr.ib(default=timedelta(seconds=10))
+    _clock = attr.ib(default=None)
+    _pending = attr.ib(default=0, init=False)
+    _last_flushed = attr.ib(default=None, init=False)
+    _delayed_flush = attr.ib(default=None, init=False)
 
     @with_cursor
     def start(self, cursor):
@@ -871,27 +1308,52 @@ class LeaseMaintenance(object):
             (self._now(), None, 0),
         )
         self._rowid = cursor.lastrowid
+        self._last_flushed = self._now()
 
-    @with_cursor
-    def observe(self, cursor, sizes):
+    def observe(self, sizes):
         """
         Record a storage shares of the given sizes.
         """
-        count = required_passes(self._pass_value, sizes)
-        cursor.execute(
-            """
-            UPDATE [lease-maintenance-spending]
-            SET [count] = [count] + ?
-            WHERE [id] = ?
-            """,
-            (count, self._rowid),
-        )
+        self._pending += required_passes(self._pass_value, sizes)
+        if self._clock is None:
+            if self._now() - self._last_flushed >= self._flush_interval:
+                self.flush()
+        elif self._delayed_flush is None:
+            self._delayed_flush = self._clock.callLater(
+                self._flush_interval.total_seconds(), self.flush
+            )
+
+    @with_cursor
+    def flush(self, cursor):
+        """
+        Write the observations held in memory to the database.
+        """
+        self._flush(cursor)
+
+    def _flush(self, cursor):
+        if self._delayed_flush is not None:
+            if self._delayed_flush.active():
+                self._delayed_flush.cancel()
+            self._delayed_flush = None
+        if self._pending:
+            cursor.execute(
+                """
+                UPDATE [lease-maintenance-spending]
+                SET [count] = [count] + ?
+                WHERE [id] = ?
+                """,
+                (self._pending, self._rowid),
+            )
+            self._pending = 0
+        self._last_flushed = self._now()
 
     @with_cursor
     def finish(self, cursor):
         """
-        Record the completion of this lease maintenance run.
+        Record the completion of this lease maintenance run, including any
+        observations not yet written to the database.
         """
+        self._flush(cursor)
         cursor.execute(
             """
             UPDATE [lease-maintenance-spending]
@@ -910,6 +1372,513 @@ class LeaseMaintenanceActivity(object):
     finished = attr.ib()
 
 
+@define
+class LeaseCrawlCheckpoint(object):
+    """
+    A state-updating helper for durably recording the progress of a lease
+    maintenance crawl so that a crawl interrupted by a restart can be
+    continued rather than started over.
+
+    Get one of these from ``VoucherStore.get_lease_crawl_checkpoint``.  While
+    the crawl traverses the filesystem use ``save_traversal`` to record the
+    nodes still to visit and the storage indexes found so far.  While it
+    checks leases use ``chunk_done`` to record each chunk of storage indexes
+    finished on each storage server.  Use ``clear`` when the crawl is done.
+
+    :ivar _connection: A SQLite3 connection object to use to persist the
+        crawl's progress.
+    """
+
+    _connection = attr.ib()
+
+    @with_cursor
+    def in_progress(self, cursor) -> bool:
+        """
+        :return: Whether a crawl has saved progress and not yet been cleared.
+        """
+        cursor.execute(
+            """
+            SELECT count(*) FROM [lease-crawl]
+            """,
+        )
+        [(count,)] = cursor.fetchall()
+        return count > 0
+
+    @with_cursor
+    def load(self, cursor) -> Optional[LeaseCrawlProgress]:
+        """
+        Load the progress of the crawl which is in progress.
+
+        :return: ``None`` if no crawl is in progress, otherwise an object
+            describing how far it got.
+        """
+        cursor.execute(
+            """
+            SELECT [traversed] FROM [lease-crawl]
+            """,
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        [(traversed,)] = rows
+
+        cursor.execute(
+            """
+            SELECT [uri] FROM [lease-crawl-frontier] ORDER BY [rowid]
+            """,
+        )
+        frontier = tuple(uri for (uri,) in cursor.fetchall())
+
+        cursor.execute(
+            """
+            SELECT [server], [chunk] FROM [lease-crawl-chunks]
+            """,
+        )
+        chunks_done: dict[bytes, set[int]] = {}
+        for (server, chunk) in cursor.fetchall():
+            chunks_done.setdefault(server, set()).add(chunk)
+
+        return LeaseCrawlProgress(
+            frontier=frontier,
+            traversed=bool(traversed),
+            chunks_done={
+                server: frozenset(chunks) for (server, chunks) in chunks_done.items()
+            },
+        )
+
+    @with_cursor
+    def visit_storage_indexes(self, cursor, visit: Callable[[bytes], None]) -> None:
+        """
+        Call a visitor with each storage index the crawl in progress has found,
+        in the order it found them.
+
+        The storage indexes are read a batch at a time so that they are never
+        all in memory at once, apart from whatever the visitor keeps.
+        """
+        cursor.execute(
+            """
+            SELECT [storage-index] FROM [lease-crawl-storage-indexes]
+            ORDER BY [position]
+            """,
+        )
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for (storage_index,) in rows:
+                visit(storage_index)
+
+    @with_cursor
+    def save_traversal(
+        self,
+        cursor,
+        frontier: list[bytes],
+        storage_indexes: list[bytes],
+        traversed: bool,
+    ) -> None:
+        """
+        Record the progress of the crawl's traversal, starting a new crawl if
+        none is in progress.
+
+        :param frontier: The capabilities of the nodes which remain to be
+            visited, replacing any previously saved.
+
+        :param storage_indexes: Storage indexes found since the last save.
+            These are added to those previously saved.
+
+        :param traversed: Whether the traversal is complete.
+        """
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO [lease-crawl] ([id], [traversed]) VALUES (0, ?)
+            """,
+            (traversed,),
+        )
+        cursor.execute(
+            """
+            DELETE FROM [lease-crawl-frontier]
+            """,
+        )
+        cursor.executemany(
+            """
+            INSERT INTO [lease-crawl-frontier] ([uri]) VALUES (?)
+            """,
+            list((uri,) for uri in frontier),
+        )
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO [lease-crawl-storage-indexes] ([storage-index])
+            VALUES (?)
+            """,
+            list((idx,) for idx in storage_indexes),
+        )
+
+    @with_cursor
+    def chunk_done(self, cursor, server: bytes, chunk: int) -> None:
+        """
+        Record that the crawl has finished with one chunk of storage indexes on
+        one storage server.
+
+        :param server: The storage server's identifier.
+
+        :param chunk: The chunk's position amongst all of the crawl's chunks.
+        """
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO [lease-crawl-chunks] ([server], [chunk])
+            VALUES (?, ?)
+            """,
+            (server, chunk),
+        )
+
+    @with_cursor
+    def clear(self, cursor) -> None:
+        """
+        Forget the crawl's progress because it is done.
+        """
+        cursor.execute(
+            """
+            DELETE FROM [lease-crawl]
+            """,
+        )
+        cursor.execute(
+            """
+            DELETE FROM [lease-crawl-frontier]
+            """,
+        )
+        cursor.execute(
+            """
+            DELETE FROM [lease-crawl-storage-indexes]
+            """,
+        )
+        cursor.execute(
+            """
+            DELETE FROM [lease-crawl-chunks]
+            """,
+        )
+
+
+@define
+class LeaseExpirations(object):
+    """
+    A state-updating helper for remembering when the leases on shares on
+    storage servers expire so that they can be renewed shortly before they
+    need it.
+
+    Get one of these from ``VoucherStore.get_lease_expirations``.
+
+    :ivar _connection: A SQLite3 connection object to use to persist the
+        expiration times.
+    """
+
+    _connection = attr.ib()
+
+    @with_cursor
+    def observe(
+        self, cursor, server: bytes, observations: list[tuple[bytes, float, list[int]]]
+    ) -> None:
+        """
+        Remember the lease expiration times of the shares of some storage
+        indexes on one storage server.
+
+        :param server: The storage server's identifier.
+
+        :param observations: Three-tuples of a storage index, the POSIX time
+            at which the soonest-expiring lease on its shares expires, and the
+            sizes of its shares.
+        """
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO [lease-expirations]
+                ([server], [storage-index], [expiration], [sizes])
+            VALUES (?, ?, ?, ?)
+            """,
+            list(
+                (server, storage_index, expiration, cbor2.dumps(sizes))
+                for (storage_index, expiration, sizes) in observations
+            ),
+        )
+
+    @with_cursor
+    def known(
+        self, cursor, server: bytes, storage_indexes: list[bytes]
+    ) -> frozenset[bytes]:
+        """
+        :param storage_indexes: The storage indexes to look for.
+
+        :return: Those of the given storage indexes with a remembered lease
+            expiration time on one storage server.
+        """
+        found: set[bytes] = set()
+        for start in range(0, len(storage_indexes), _IN_BATCH):
+            batch = storage_indexes[start : start + _IN_BATCH]
+            cursor.execute(
+                """
+                SELECT [storage-index] FROM [lease-expirations]
+                WHERE [server] = ? AND [storage-index] IN ({})
+                """.format(
+                    ", ".join("?" * len(batch))
+                ),
+                (server,) + tuple(batch),
+            )
+            found.update(storage_index for (storage_index,) in cursor.fetchall())
+        return frozenset(found)
+
+    @with_cursor
+    def earliest(
+        self, cursor, servers: list[bytes], lead: float = 0.0
+    ) -> Optional[float]:
+        """
+        :param lead: How many seconds before a lease expires to renew it.
+
+        :return: The soonest POSIX time at which a remembered lease on any of
+            the given storage servers should be renewed, or ``None`` if none
+            is remembered.  This is ``lead`` seconds before the lease expires
+            but not before a failed renewal may be tried again.
+        """
+        cursor.execute(
+            """
+            SELECT min(max([expiration] - ?, [retry-after]))
+            FROM [lease-expirations]
+            WHERE [server] IN ({})
+            """.format(
+                ", ".join("?" * len(servers))
+            ),
+            (lead,) + tuple(servers),
+        )
+        [(earliest,)] = cursor.fetchall()
+        return earliest
+
+    @with_cursor
+    def due(
+        self,
+        cursor,
+        before: float,
+        servers: list[bytes],
+        limit: int,
+        now: float = inf,
+    ) -> list[LeaseExpiration]:
+        """
+        Find leases which expire soon.
+
+        :param before: Find leases which expire no later than this POSIX
+            time.
+
+        :param servers: Find leases only on the storage servers with these
+            identifiers.
+
+        :param limit: Find at most this many leases.
+
+        :param now: Find only leases which may be tried again at this POSIX
+            time after failing to be renewed.
+
+        :return: The leases, in order by expiration time.
+        """
+        cursor.execute(
+            """
+            SELECT [server], [storage-index], [expiration], [sizes], [failures]
+            FROM [lease-expirations]
+            WHERE [expiration] <= ? AND [retry-after] <= ? AND [server] IN ({})
+            ORDER BY [expiration]
+            LIMIT ?
+            """.format(
+                ", ".join("?" * len(servers))
+            ),
+            (before, now) + tuple(servers) + (limit,),
+        )
+        return list(
+            LeaseExpiration(
+                server, storage_index, expiration, cbor2.loads(sizes), failures
+            )
+            for (
+                server,
+                storage_index,
+                expiration,
+                sizes,
+                failures,
+            ) in cursor.fetchall()
+        )
+
+    @with_cursor
+    def postpone(
+        self, cursor, server: bytes, retries: list[tuple[bytes, float]]
+    ) -> None:
+        """
+        Remember that renewing some leases on one storage server failed.
+
+        :param server: The storage server's identifier.
+
+        :param retries: Two-tuples of a storage index and the POSIX time
+            before which renewing its lease should not be tried again.
+        """
+        cursor.executemany(
+            """
+            UPDATE [lease-expirations]
+            SET [failures] = [failures] + 1, [retry-after] = ?
+            WHERE [server] = ? AND [storage-index] = ?
+            """,
+            list(
+                (retry_after, server, storage_index)
+                for (storage_index, retry_after) in retries
+            ),
+        )
+
+    @with_cursor
+    def retain(self, cursor, storage_indexes: Iterable[bytes]) -> None:
+        """
+        Forget the lease expiration times of all storage indexes except some.
+
+        :param storage_indexes: The storage indexes to remember.  Any others
+            are no longer reachable and need no more renewals.
+        """
+        # Neither the storage indexes nor the catalog are ever all in memory.
+        # SQLite3 reads the storage indexes from the iterator as it inserts
+        # them and compares them with the catalog itself.
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO [retained-storage-indexes] VALUES (?)
+            """,
+            ((storage_index,) for storage_index in storage_indexes),
+        )
+        cursor.execute(
+            """
+            DELETE FROM [lease-expirations]
+            WHERE [storage-index] NOT IN [retained-storage-indexes]
+            """,
+        )
+        cursor.execute(
+            """
+            DELETE FROM [retained-storage-indexes]
+            """,
+        )
+
+
+@frozen
+class LeaseExpiration(object):
+    """
+    The remembered lease expiration time for the shares of one storage index
+    on one storage server.
+
+    :ivar server: The storage server's identifier.
+
+    :ivar storage_index: The storage index of the shares.
+
+    :ivar expiration: The POSIX time at which the soonest-expiring lease on
+        any of the shares expires.
+
+    :ivar sizes: The sizes of the shares.
+
+    :ivar failures: The number of times in a row renewing the lease has
+        failed.
+    """
+
+    server: bytes = attr.ib()
+    storage_index: bytes = attr.ib()
+    expiration: float = attr.ib()
+    sizes: list[int] = attr.ib()
+    failures: int = attr.ib(default=0)
+
+
+@define
+class DirectoryListings(object):
+    """
+    A state-updating helper for remembering the children of directories so
+    that a directory which has not changed does not need to be listed again.
+
+    Get one of these from ``VoucherStore.get_directory_listings``.
+
+    :ivar _connection: A SQLite3 connection object to use to persist the
+        listings.
+    """
+
+    _connection = attr.ib()
+
+    @with_cursor
+    def get(self, cursor, directory: bytes, version: bytes) -> Optional[list[bytes]]:
+        """
+        Get the children of one version of a directory.
+
+        :param directory: The directory's storage index.
+
+        :param version: The version of the directory.
+
+        :return: ``None`` if no listing of this version of the directory is
+            known, otherwise the capability strings of its children.
+        """
+        cursor.execute(
+            """
+            SELECT [children] FROM [directory-listings]
+            WHERE [directory] = ? AND [version] = ?
+            """,
+            (directory, version),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        [(children,)] = rows
+        return cbor2.loads(children)
+
+    @with_cursor
+    def put(
+        self, cursor, directory: bytes, version: bytes, children: list[bytes]
+    ) -> None:
+        """
+        Remember the children of one version of a directory, replacing any
+        listing of another version of it.
+
+        :param directory: The directory's storage index.
+
+        :param version: The version of the directory.
+
+        :param children: The capability strings of its children.
+        """
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO [directory-listings]
+                ([directory], [version], [children])
+            VALUES (?, ?, ?)
+            """,
+            (directory, version, cbor2.dumps(children)),
+        )
+
+
+@frozen
+class LeaseCrawlProgress(object):
+    """
+    How far an interrupted lease maintenance crawl got.
+
+    :ivar frontier: The capabilities of the nodes the traversal had yet to
+        visit.
+
+    :ivar traversed: Whether the traversal was complete.
+
+    :ivar chunks_done: The positions of the chunks of storage indexes already
+        finished on each storage server, keyed by the server's identifier.
+    """
+
+    frontier: tuple[bytes, ...] = attr.ib()
+    traversed: bool = attr.ib()
+    chunks_done: dict[bytes, frozenset[int]] = attr.ib()
+
+
+@frozen
+class RedemptionJob(object):
+    """
+    A voucher which still needs to be redeemed.
+
+    :ivar bytes voucher: The voucher to redeem.
+
+    :ivar int attempts: The number of redemption attempts which have not
+        succeeded since the last one which did.
+
+    :ivar float due: The POSIX time at which to next attempt redemption.
+    """
+
+    voucher = attr.ib(validator=attr.validators.instance_of(bytes))
+    attempts = attr.ib(validator=attr.validators.instance_of(int))
+    due = attr.ib(validator=attr.validators.instance_of(float))
+
+
 # store = ...
 # x = store.start_lease_maintenance()
 # x.observe(size=123)
@@ -1001,6 +1970,29 @@ class RandomToken(object):
     )
 
 
+def _get_random_tokens(cursor, voucher_text, counter):
+    """
+    Load the random tokens associated with one redemption group of a voucher.
+
+    :param str voucher_text: The voucher the tokens are associated with.
+
+    :param int counter: The redemption counter of the group.
+
+    :return list[RandomToken]: The tokens, possibly none.
+    """
+    cursor.execute(
+        """
+        SELECT [text]
+        FROM [tokens]
+        WHERE [voucher] = ? AND [counter] = ?
+        """,
+        (voucher_text, counter),
+    )
+    return list(
+        RandomToken(token_value.encode("ascii")) for (token_value,) in cursor.fetchall()
+    )
+
+
 def _counter_attribute():
     return attr.ib(
         validator=attr.validators.and_(
@@ -197,7 +197,14 @@ def recover(snapshot: BinaryIO, cursor: Cursor) -> None:
     statements = statements_from_snapshot(snapshot)
 
     # Discard all existing data in the database.
-    cursor.execute("SELECT [name] FROM [sqlite_master] WHERE [type] = 'table'")
+    # SQLite3 maintains [sqlite_sequence] itself and does not allow it to be
+    # dropped.  The snapshot replaces its contents.
+    cursor.execute(
+        """
+        SELECT [name] FROM [sqlite_master]
+        WHERE [type] = 'table' AND [name] != 'sqlite_sequence'
+        """
+    )
     tables = cursor.fetchall()
     for (table_name,) in tables:
         cursor.execute(f"DROP TABLE {escape_identifier(table_name)}")
@@ -28,11 +28,16 @@ new type provides facilities for accomplishing two goals:
   application-facing interface meant to be used when the application is ready
   to discharge its responsibilities in the replication process.
 
-* It (can someday) expose the usual cursor interface wrapped around the usual
-  cursor behavior combined with extra logic to record statements which change
-  the underlying database (DDL and DML statements).  This recorded data then
+* It exposes the usual cursor interface wrapped around the usual cursor
+  behavior combined with extra logic to record statements which change the
+  underlying database (DDL and DML statements).  This recorded data then
   feeds into the above replication process once it is enabled.
 
+  Statements are collected as they are executed and written to the
+  ``[event-stream]`` table in a batch just before the transaction which
+  executed them commits.  If the transaction is rolled back the collected
+  statements are discarded along with it.
+
 An application's responsibilities in the replication process are to arrange
 for remote storage of "snapshots" and "event streams".  See the
 replication/recovery design document for details of these concepts.
@@ -51,29 +56,74 @@ system.
 
 __all__ = [
     "ReplicationAlreadySetup",
+    "ReplicationConfig",
+    "ReplicationLag",
+    "statement_mutates",
     "fail_setup_replication",
     "setup_tahoe_lafs_replication",
     "with_replication",
     "statements_to_snapshot",
     "connection_to_statements",
     "snapshot",
+    "replication_service",
+    "IReplica",
+    "TahoeLAFSReplica",
 ]
 
+import re
+import sys
+from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
-from sqlite3 import Connection, Cursor
-from typing import BinaryIO, Callable, Iterator, Optional
+from itertools import islice
+from sqlite3 import Connection, Cursor, connect
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+)
 
 import cbor2
 from attrs import define, field, frozen
-from compose import compose
 from twisted.application.service import IService, Service
 from twisted.internet.defer import CancelledError, Deferred, succeed
+from twisted.internet.error import ConnectError
+from twisted.internet.interfaces import IDelayedCall, IReactorTime
+from twisted.internet.task import deferLater
+from twisted.logger import Logger
 from twisted.python.failure import Failure
 from twisted.python.filepath import FilePath
 from twisted.python.lockfile import FilesystemLock
+from twisted.web.client import ResponseFailed, ResponseNeverReceived
+from zope.interface import Interface, implementer
+
+from .config import REPLICA_RWCAP_BASENAME, Config, read_duration, read_integer
+from .schema import UNREPLICATED_TABLES
+from .sql import SQLType, adapt_sql_value, bind_arguments
+from .storage_common import BYTES_PER_PASS, get_configured_pass_value
+from .tahoe import ITahoeClient, TahoeAPIError, attenuate_writecap
+
+if TYPE_CHECKING:
+    from .model import VoucherStore
+
+# The name of the table in which the event stream is recorded.  Changes to
+# this table are never themselves recorded in the event stream.
+EVENT_STREAM_TABLE = "event-stream"
 
-from .config import REPLICA_RWCAP_BASENAME, Config
-from .tahoe import ITahoeClient, attenuate_writecap
+# The number of event-stream rows to write with a single INSERT statement.
+# This keeps the number of parameters per statement (two per row) below the
+# historical SQLite3 limit of 999.
+_EVENT_STREAM_INSERT_BATCH = 499
+
+# The number of rows of arguments to an ``executemany`` statement to execute
+# and record at a time.  The rows of one batch are held in memory until they
+# are written to the event stream.
+_EXECUTEMANY_BATCH = 1000
 
 
 @frozen
@@ -85,11 +135,130 @@ class Change:
     sequence: int  # the sequence-number of this event
     statement: str  # the SQL statement string
 
+    # If the statement was executed once for each of a number of rows of
+    # arguments (as by ``executemany``) then those rows.  Otherwise, empty and
+    # the arguments are already bound into ``statement``.
+    arguments: tuple[tuple[SQLType, ...], ...] = ()
+
+
+# A callable which is notified of the number of statements and the number of
+# bytes newly committed to the event stream.
+MutationObserver = Callable[[int, int], None]
+
+
+def event_size(statement: str, encoded_arguments: Optional[bytes]) -> int:
+    """
+    Measure the contribution of one change to the size of the event stream.
+
+    :param encoded_arguments: The CBOR-encoded rows of arguments for a
+        statement executed with ``executemany`` or ``None``.
+    """
+    size = len(statement.encode("utf-8"))
+    if encoded_arguments is not None:
+        size += len(encoded_arguments)
+    return size
+
+
+# The beginning of an encoded event stream: a map with one key, "events",
+# whose value is an array of indefinite length so that events can be encoded
+# one at a time as they are read.
+_EVENT_STREAM_HEADER = b"\xa1" + cbor2.dumps("events") + b"\x9f"
+
+# The end of an encoded event stream: the "break" which ends the array.
+_EVENT_STREAM_TRAILER = b"\xff"
+
+
+def _encode_change(change: Change) -> bytes:
+    """
+    Encode one change as an element of the event stream array.
+    """
+    if change.arguments:
+        return cbor2.dumps(
+            (change.sequence, change.statement.encode("utf8"), change.arguments)
+        )
+    return cbor2.dumps((change.sequence, change.statement.encode("utf8")))
+
+
+def event_stream_chunks(changes: Iterable[Change]) -> Iterator[bytes]:
+    """
+    Encode changes as an event stream, lazily.
+
+    :param changes: The changes to encode, in sequence order.  These are
+        consumed only as the result is iterated.
+
+    :return: The pieces of the encoded event stream.  Joined together they
+        are understood by ``EventStream.from_bytes``.
+    """
+    yield _EVENT_STREAM_HEADER
+    for change in changes:
+        yield _encode_change(change)
+    yield _EVENT_STREAM_TRAILER
+
+
+@define
+class ChunkedReader:
+    """
+    A file-like object which reads bytes from an iterator of byte strings,
+    consuming it only as the bytes are read.
+
+    It has no ``seek`` or ``tell`` so that consumers which care (such as
+    ``twisted.web.client.FileBodyProducer``) know that its length is unknown.
+
+    :ivar position: The number of bytes read so far.
+    """
+
+    _chunks: Iterator[bytes]
+    _buffer: bytes = b""
+    position: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            result = self._buffer + b"".join(self._chunks)
+            self._buffer = b""
+        else:
+            # Chunks may be much smaller than a read so collect them and join
+            # them once rather than growing the buffer one chunk at a time.
+            pieces = [self._buffer]
+            available = len(self._buffer)
+            while available < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                pieces.append(chunk)
+                available += len(chunk)
+            data = b"".join(pieces)
+            result, self._buffer = data[:size], data[size:]
+        self.position += len(result)
+        return result
+
+    def close(self) -> None:
+        pass
+
+
+@frozen
+class EventStreamSummary:
+    """
+    Describe the local event stream without holding any of it.
+
+    :ivar statements: The number of statements in the event stream.
+
+    :ivar size: The total size of the statements, as measured by
+        ``event_size``.
+
+    :ivar highest_sequence: The highest sequence number in the event stream or
+        ``None`` if it is empty.
+    """
+
+    statements: int
+    size: int
+    highest_sequence: Optional[int]
+
 
 @frozen
 class EventStream:
     """
-    A series of database operations represented as `Change` instances.
+    A series of database operations represented as `Change` instances, in
+    sequence order.
     """
 
     changes: tuple[Change, ...]
@@ -101,23 +270,27 @@ class EventStream:
         """
         if not self.changes:
             return None
-        return max(change.sequence for change in self.changes)
+        return self.changes[-1].sequence
 
-    def to_bytes(self) -> BinaryIO:
+    def size(self) -> int:
         """
-        :returns BinaryIO: a producer of bytes representing this EventStream.
+        :returns: the total size of the changes in this EventStream, as measured
+            by ``event_size``.
         """
-        return BytesIO(
-            cbor2.dumps(
-                {
-                    "events": tuple(
-                        (event.sequence, event.statement.encode("utf8"))
-                        for event in self.changes
-                    )
-                }
+        return sum(
+            event_size(
+                change.statement,
+                cbor2.dumps(change.arguments) if change.arguments else None,
             )
+            for change in self.changes
         )
 
+    def to_bytes(self) -> BinaryIO:
+        """
+        :returns BinaryIO: a producer of bytes representing this EventStream.
+        """
+        return BytesIO(b"".join(event_stream_chunks(self.changes)))
+
     @classmethod
     def from_bytes(cls, stream: BinaryIO):
         """
@@ -128,12 +301,121 @@ class EventStream:
         data = cbor2.load(stream)
         return cls(
             changes=tuple(
-                Change(seq, statement.decode("utf8"))
-                for seq, statement in data["events"]
+                Change(
+                    seq,
+                    statement.decode("utf8"),
+                    tuple(tuple(row) for row in arguments[0]) if arguments else (),
+                )
+                for seq, statement, *arguments in data["events"]
             )
         )
 
 
+# An identifier, possibly quoted in any of the ways SQLite3 allows.
+_IDENTIFIER = r"""(?:\[[^\]]*\]|"(?:[^"]|"")*"|`[^`]*`|[^\s.(;]+)"""
+
+# Match the beginning of a statement which changes the database, capturing
+# the name of the table (or other schema object) it changes.  Leading
+# whitespace and comments are skipped.
+_MUTATION = re.compile(
+    rf"""
+    (?:\s+|--[^\n]*|/\*.*?\*/)*
+    (?:
+        (?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO
+      | UPDATE(?:\s+OR\s+\w+)?
+      | DELETE\s+FROM
+      | (?P<ddl>CREATE|DROP|ALTER)
+        (?P<temporary>\s+TEMP(?:ORARY)?)?
+        (?:\s+UNIQUE)?
+        \s+(?:TABLE|INDEX|VIEW|TRIGGER)
+        (?:\s+IF\s+(?:NOT\s+)?EXISTS)?
+    )
+    \s+(?:(?P<schema>{_IDENTIFIER})\s*\.\s*)?(?P<name>{_IDENTIFIER})
+    """,
+    re.IGNORECASE | re.VERBOSE | re.DOTALL,
+)
+
+
+def _unquote_identifier(identifier: str) -> str:
+    """
+    Remove the quoting, if any, from an identifier.
+    """
+    if identifier[:1] in ("[", '"', "`"):
+        return identifier[1:-1]
+    return identifier
+
+
+@frozen
+class _Mutation:
+    """
+    Describe the effect of a statement which changes the database.
+
+    :ivar name: The name of the table (or other schema object) changed.
+
+    :ivar temporary: ``True`` if the statement explicitly applies to temporary
+        schema, ``False`` otherwise.
+
+    :ivar ddl: ``True`` if the statement changes the schema, ``False`` if it
+        only changes data.
+    """
+
+    name: str
+    temporary: bool
+    ddl: bool
+
+
+@lru_cache(maxsize=256)
+def _parse_mutation(statement: str) -> Optional[_Mutation]:
+    """
+    :return: A description of the change a statement makes or ``None`` if it
+        makes no change.
+    """
+    match = _MUTATION.match(statement)
+    if match is None:
+        return None
+    schema = match.group("schema")
+    return _Mutation(
+        name=_unquote_identifier(match.group("name")),
+        temporary=bool(match.group("temporary"))
+        or (schema is not None and _unquote_identifier(schema).lower() == "temp"),
+        ddl=match.group("ddl") is not None,
+    )
+
+
+def statement_mutates(
+    statement: str, unreplicated_tables: frozenset[str] = frozenset()
+) -> bool:
+    """
+    Determine whether a statement can change the database state which is
+    replicated.
+
+    DDL and DML statements are considered to change the state unless they
+    explicitly apply to temporary schema, they apply to the event stream
+    itself, or they apply to SQLite3's own internal tables (such as the
+    ``sqlite_sequence`` table which tracks event stream sequence numbers).
+    DML statements which apply to one of ``unreplicated_tables`` are not
+    considered to change it either.
+    """
+    mutation = _parse_mutation(statement)
+    return (
+        mutation is not None
+        and not mutation.temporary
+        and mutation.name != EVENT_STREAM_TABLE
+        and not mutation.name.lower().startswith("sqlite_")
+        and not _is_unreplicated_data(mutation, unreplicated_tables)
+    )
+
+
+def _is_unreplicated_data(
+    mutation: _Mutation, unreplicated_tables: frozenset[str]
+) -> bool:
+    """
+    :return: ``True`` if the change is to the rows of one of
+        ``unreplicated_tables``, ``False`` otherwise.
+    """
+    return not mutation.ddl and mutation.name in unreplicated_tables
+
+
 class ReplicationAlreadySetup(Exception):
     """
     An attempt was made to setup of replication but it is already set up.
@@ -194,7 +476,9 @@ def is_replication_setup(config: Config) -> bool:
 
 
 def with_replication(
-    connection: Connection, enable_replication: bool
+    connection: Connection,
+    enable_replication: bool,
+    unreplicated_tables: frozenset[str] = frozenset(),
 ) -> _ReplicationCapableConnection:
     """
     Wrap the given connection in a layer which is capable of entering a
@@ -208,9 +492,15 @@ def with_replication(
         "replication mode" initially.  Otherwise it is not but it can be
         switched into that mode later.
 
+    :param unreplicated_tables: The names of tables whose rows are left out
+        of the event stream and of snapshots.  Changes to their schema are
+        still included.
+
     :return: The wrapper object.
     """
-    return _ReplicationCapableConnection(connection, enable_replication)
+    return _ReplicationCapableConnection(
+        connection, enable_replication, unreplicated_tables
+    )
 
 
 @define
@@ -226,10 +516,59 @@ class _ReplicationCapableConnection:
     :ivar _replicating: ``True`` if this connection is currently in
         replication mode and is recording all executed DDL and DML statements,
         ``False`` otherwise.
+
+    :ivar _unreplicated_tables: The names of tables whose rows are left out of
+        the event stream and of snapshots.
+
+    :ivar _changes: The statements recorded in the current transaction which
+        have not yet been written to the event stream.  Each is a statement
+        and, for statements executed with ``executemany``, the rows of
+        arguments it was executed with.
+
+    :ivar _temporary_tables: The names of the temporary tables known to
+        exist on this connection or ``None`` if they must be looked up again.
+
+    :ivar _observers: Callables to notify about changes added to the event
+        stream.
+
+    :ivar generation: The number of transactions which changed the database
+        and committed.  This never decreases while the connection is open so
+        anything derived from the database is still current as long as this
+        has not changed.
+
+    :ivar _total_changes: The value of ``sqlite3.Connection.total_changes``
+        when the current transaction began.
+
+    :ivar _written: The number of statements and their total size which were
+        already written to the event stream by the current transaction.  The
+        observers are told about them when it commits.
     """
 
     _conn: Connection
     _replicating: bool
+    _unreplicated_tables: frozenset[str] = frozenset()
+    _changes: list[tuple[str, tuple[tuple[SQLType, ...], ...]]] = field(
+        init=False, factory=list
+    )
+    _temporary_tables: Optional[frozenset[str]] = field(init=False, default=None)
+    _observers: list[MutationObserver] = field(init=False, factory=list)
+    generation: int = field(init=False, default=0)
+    _total_changes: int = field(init=False, default=0)
+    _written: tuple[int, int] = field(init=False, default=(0, 0))
+
+    def add_mutation_observer(self, observer: MutationObserver) -> None:
+        """
+        Arrange for a callable to be called with the number of statements and
+        the number of bytes added to the event stream each time a transaction
+        which added some of them commits.
+        """
+        self._observers.append(observer)
+
+    def remove_mutation_observer(self, observer: MutationObserver) -> None:
+        """
+        Stop calling a callable previously passed to ``add_mutation_observer``.
+        """
+        self._observers.remove(observer)
 
     def enable_replication(self) -> None:
         """
@@ -242,19 +581,165 @@ class _ReplicationCapableConnection:
         Create and return a byte string representing a consistent, self-contained
         snapshot of the wrapped database.
         """
-        return snapshot(self._conn)
+        return snapshot(self._conn, self._unreplicated_tables)
+
+    def temporary_copy(self) -> Connection:
+        """
+        Copy the wrapped database into a private, temporary on-disk database.
+
+        The copy does not change as the wrapped database changes so it can be
+        read a little at a time to make a consistent snapshot.  It is deleted
+        when the returned connection is closed.
+
+        This must not be called while a transaction which has written to the
+        wrapped database is open.
+        """
+        copy = connect("")
+        self._conn.backup(copy)
+        return copy
 
     def close(self):
         return self._conn.close()
 
     def __enter__(self):
+        self._total_changes = self._conn.total_changes
         return self._conn.__enter__()
 
     def __exit__(self, *args):
-        return self._conn.__exit__(*args)
+        result = self._exit(*args)
+        # We only get here if there was no commit or it succeeded.
+        if args[0] is None and self._conn.total_changes != self._total_changes:
+            self.generation += 1
+        return result
+
+    def _exit(self, *args):
+        """
+        Commit or roll back the current transaction, adding any changes it
+        made to the event stream if it commits.
+        """
+        if args[0] is not None:
+            self._changes = []
+            self._written = (0, 0)
+            return self._conn.__exit__(*args)
+
+        # Record the changes in the same transaction that made them so the
+        # event stream always agrees with the rest of the database.
+        try:
+            self._flush_changes()
+        except BaseException:
+            self._changes = []
+            self._written = (0, 0)
+            self._conn.__exit__(*sys.exc_info())
+            raise
+        (statements, size), self._written = self._written, (0, 0)
+        result = self._conn.__exit__(*args)
+
+        # The transaction has committed so the changes are really part of the
+        # event stream now.
+        if statements:
+            for observer in list(self._observers):
+                observer(statements, size)
+        return result
+
+    def _flush_changes(self) -> None:
+        """
+        Write the changes collected so far in the current transaction to the
+        event stream.  They are still discarded if the transaction is rolled
+        back.
+        """
+        changes, self._changes = self._changes, []
+        if not changes:
+            return
+        encoded = [
+            (statement, cbor2.dumps(arguments) if arguments else None)
+            for (statement, arguments) in changes
+        ]
+        self._record_changes(encoded)
+        statements, size = self._written
+        self._written = (
+            statements + len(encoded),
+            size
+            + sum(
+                event_size(statement, arguments) for (statement, arguments) in encoded
+            ),
+        )
 
     def cursor(self):
-        return _ReplicationCapableCursor(self._conn.cursor())
+        return _ReplicationCapableCursor(self._conn.cursor(), self)
+
+    def _is_replicated(self, statement: str) -> bool:
+        """
+        Determine whether a statement executed on this connection must be added
+        to the event stream.
+        """
+        if not self._replicating:
+            return False
+        mutation = _parse_mutation(statement)
+        if mutation is None:
+            return False
+        if mutation.ddl:
+            # The set of temporary tables may be about to change.
+            self._temporary_tables = None
+        return statement_mutates(statement, self._unreplicated_tables) and (
+            mutation.name not in self._get_temporary_tables()
+        )
+
+    def _observe_statement(
+        self, statement: str, arguments: tuple[tuple[SQLType, ...], ...]
+    ) -> None:
+        """
+        Note the execution of a statement so that it can be added to the event
+        stream if the current transaction commits.
+
+        :param arguments: Rows of arguments, for a statement which was executed
+            with ``executemany``, or empty for a statement with its arguments
+            already bound.
+        """
+        self._changes.append((statement, arguments))
+        if len(self._changes) >= _EVENT_STREAM_INSERT_BATCH:
+            # Write a full batch now rather than holding every change of a
+            # large transaction in memory until it commits.
+            self._flush_changes()
+
+    def _get_temporary_tables(self) -> frozenset[str]:
+        """
+        Get the names of the temporary tables which currently exist.  A
+        statement which changes a temporary table doesn't change replicated
+        state even if it doesn't explicitly name the ``temp`` schema.
+        """
+        if self._temporary_tables is None:
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT [name] FROM [sqlite_temp_master] WHERE [type] = 'table'"
+                )
+                self._temporary_tables = frozenset(
+                    name for (name,) in cursor.fetchall()
+                )
+            finally:
+                cursor.close()
+        return self._temporary_tables
+
+    def _record_changes(self, changes: list[tuple[str, Optional[bytes]]]) -> None:
+        """
+        Write some changes to the event stream using as few statements as
+        possible.
+
+        :param changes: Pairs of statements and their CBOR-encoded rows of
+            arguments (or ``None`` for statements with bound arguments).
+        """
+        cursor = self._conn.cursor()
+        try:
+            for offset in range(0, len(changes), _EVENT_STREAM_INSERT_BATCH):
+                batch = changes[offset : offset + _EVENT_STREAM_INSERT_BATCH]
+                values = ", ".join(["(?, ?)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO [{EVENT_STREAM_TABLE}] ([statement], [arguments]) "
+                    f"VALUES {values}",
+                    [value for change in batch for value in change],
+                )
+        finally:
+            cursor.close()
 
 
 @define
@@ -266,9 +751,14 @@ class _ReplicationCapableCursor:
     All of this type's attributes and methods are intended to behave the same
     way as ``sqlite3.Cursor``\ 's methods except they may also add some
     additional functionality to support replication.
+
+    :ivar _connection: The connection this cursor belongs to.  Statements
+        which change the database are reported to it while it is in
+        replication mode.
     """
 
     _cursor: Cursor
+    _connection: _ReplicationCapableConnection
 
     @property
     def lastrowid(self):
@@ -281,12 +771,17 @@ class _ReplicationCapableCursor:
     def close(self):
         return self._cursor.close()
 
-    def execute(self, statement, row=None):
+    def execute(self, statement: str, row: Optional[Sequence[Any]] = None):
         if row is None:
             args = (statement,)
         else:
             args = (statement, row)
+        replicated = self._connection._is_replicated(statement)
         self._cursor.execute(*args)
+        if replicated:
+            if row:
+                statement = bind_arguments(statement, row)
+            self._connection._observe_statement(statement, ())
 
     def fetchall(self):
         return self._cursor.fetchall()
@@ -297,8 +792,27 @@ class _ReplicationCapableCursor:
     def fetchone(self):
         return self._cursor.fetchone()
 
-    def executemany(self, statement, rows):
-        self._cursor.executemany(statement, rows)
+    def executemany(self, statement: str, rows: Iterable[Sequence[Any]]):
+        if not self._connection._is_replicated(statement):
+            self._cursor.executemany(statement, rows)
+            return
+
+        # Keep the rows so they can be recorded, too.  Recording them
+        # separately from the statement keeps the event stream compact when
+        # there are many of them.  They are executed and written to the event
+        # stream a batch at a time so that a large number of rows is never
+        # all in memory at once.
+        rows = iter(rows)
+        while True:
+            batch = tuple(
+                tuple(adapt_sql_value(v) for v in row)
+                for row in islice(rows, _EXECUTEMANY_BATCH)
+            )
+            if not batch:
+                break
+            self._cursor.executemany(statement, batch)
+            self._connection._observe_statement(statement, batch)
+            self._connection._flush_changes()
 
 
 def netstring(bs: bytes) -> bytes:
@@ -330,20 +844,33 @@ def statements_to_snapshot(statements: Iterator[str]) -> Iterator[bytes]:
         yield netstring(statement.strip().encode("utf-8"))
 
 
-def connection_to_statements(connection: Connection) -> Iterator[str]:
+def connection_to_statements(
+    connection: Connection, unreplicated_tables: frozenset[str] = frozenset()
+) -> Iterator[str]:
     """
     Create an iterator of SQL statements as strings representing a consistent,
     self-contained snapshot of the database reachable via the given
-    connection.
+    connection.  The rows of ``unreplicated_tables`` are left out.
     """
-    return connection.iterdump()
+    for statement in connection.iterdump():
+        mutation = _parse_mutation(statement)
+        if mutation is None or not _is_unreplicated_data(mutation, unreplicated_tables):
+            yield statement
 
 
-# Convenience API to dump statements, netstring-encoding them, and
-# concatenating them all into a single byte string.
-snapshot: Callable[[Connection], bytes] = compose(
-    b"".join, statements_to_snapshot, connection_to_statements
-)
+def snapshot(
+    connection: Connection, unreplicated_tables: frozenset[str] = frozenset()
+) -> bytes:
+    """
+    Dump the statements for a snapshot of the database reachable via the
+    given connection, netstring-encoding them and concatenating them all into
+    a single byte string.
+    """
+    return b"".join(
+        statements_to_snapshot(
+            connection_to_statements(connection, unreplicated_tables)
+        )
+    )
 
 
 async def tahoe_lafs_uploader(
@@ -384,23 +911,274 @@ def get_tahoe_lafs_direntry_uploader(
     return upload
 
 
+# The name of the snapshot in the replica directory.
+SNAPSHOT_ENTRY_NAME = "snapshot.sql"
+
+# The prefix of the names of event stream objects in the replica directory.
+# The rest of the name is the highest sequence number in the object.
+EVENT_STREAM_ENTRY_PREFIX = "event-stream-"
+
+
+def event_stream_entry_name(highest_sequence: int) -> str:
+    """
+    Get the name to give an event stream object in the replica directory.
+    """
+    return f"{EVENT_STREAM_ENTRY_PREFIX}{highest_sequence}"
+
+
+def event_stream_entry_sequence(entry_name: str) -> Optional[int]:
+    """
+    Get the highest sequence number in the event stream object with the given
+    name or ``None`` if the name does not belong to an event stream object.
+    """
+    if not entry_name.startswith(EVENT_STREAM_ENTRY_PREFIX):
+        return None
+    try:
+        return int(entry_name[len(EVENT_STREAM_ENTRY_PREFIX) :])
+    except ValueError:
+        return None
+
+
+class IReplica(Interface):
+    """
+    The remote storage holding a replica of the local database.
+    """
+
+    async def upload(
+        entry_name: str, get_data_provider: Callable[[], BinaryIO]
+    ) -> None:
+        """
+        Upload some data and link it into the replica under the given name,
+        replacing any existing entry with that name.
+
+        :param get_data_provider: A callable which returns the data to be
+            uploaded.  This may be called more than once in case a retry is
+            required.
+        """
+
+    async def list_entries() -> dict[str, int]:
+        """
+        Get the name and size of every object in the replica.
+        """
+
+    async def unlink(entry_name: str) -> None:
+        """
+        Remove an object from the replica.
+        """
+
+
+@implementer(IReplica)
+@frozen
+class TahoeLAFSReplica:
+    """
+    A replica kept in a Tahoe-LAFS mutable directory.
+
+    :ivar _client: The client to use to reach the Tahoe-LAFS grid.
+
+    :ivar _directory_mutable_cap: The write capability for the replica
+        directory.
+    """
+
+    _client: ITahoeClient
+    _directory_mutable_cap: str
+
+    async def upload(
+        self, entry_name: str, get_data_provider: Callable[[], BinaryIO]
+    ) -> None:
+        await tahoe_lafs_uploader(
+            self._client, self._directory_mutable_cap, get_data_provider, entry_name
+        )
+
+    async def list_entries(self) -> dict[str, int]:
+        children = await self._client.list_directory(self._directory_mutable_cap)
+        return {
+            name: details.get("size") or 0
+            for (name, (kind, details)) in children.items()
+            if kind == "filenode"
+        }
+
+    async def unlink(self, entry_name: str) -> None:
+        await self._client.unlink(self._directory_mutable_cap, entry_name)
+
+
+def efficient_event_stream_size(pass_value: int, needed: int, total: int) -> int:
+    """
+    Compute the size of an event stream object which makes efficient use of
+    the storage paid for by one ZKAP.
+
+    :see: The "large enough" footnote of the backup-recovery design.
+    """
+    return int(pass_value * 0.95 * needed / total)
+
+
+@frozen
+class ReplicationConfig:
+    """
+    Represent the configuration for a replication service.
+
+    :ivar upload_bytes: Upload the local event stream once it is at least this
+        large.
+
+    :ivar upload_statements: Upload the local event stream once it contains at
+        least this many statements.
+
+    :ivar max_age: Upload the local event stream once a statement has been
+        waiting in it for this long, regardless of its size.
+
+    :ivar backoff_initial: The time to wait before retrying a failed upload.
+        This doubles with each consecutive failure.
+
+    :ivar backoff_max: The longest time to wait before retrying a failed
+        upload.
+
+    :ivar snapshot_ratio: Upload a new snapshot, and remove the event stream
+        objects it supersedes, once the event stream objects in the replica
+        are more than this many times larger than the snapshot.  Recovery
+        downloads the snapshot and then replays the event stream so this
+        bounds the cost of recovery as well as the cost of storing the
+        replica.
+    """
+
+    upload_bytes: int = efficient_event_stream_size(BYTES_PER_PASS, 3, 10)
+    upload_statements: int = 10000
+    max_age: timedelta = timedelta(hours=1)
+    backoff_initial: timedelta = timedelta(seconds=10)
+    backoff_max: timedelta = timedelta(hours=1)
+    snapshot_ratio: int = 1
+
+    @classmethod
+    def from_node_config(cls, node_config: Config) -> ReplicationConfig:
+        """
+        Return a ``ReplicationConfig`` representing the values from the given
+        configuration object.
+        """
+        default = cls()
+        return cls(
+            upload_bytes=read_integer(
+                node_config,
+                "replication.upload-bytes",
+                efficient_event_stream_size(
+                    get_configured_pass_value(node_config),
+                    int(node_config.get_config("client", "shares.needed", 3)),
+                    int(node_config.get_config("client", "shares.total", 10)),
+                ),
+            ),
+            upload_statements=read_integer(
+                node_config,
+                "replication.upload-statements",
+                default.upload_statements,
+            ),
+            max_age=read_duration(
+                node_config,
+                "replication.max-age",
+                default.max_age,
+            ),
+            backoff_initial=read_duration(
+                node_config,
+                "replication.backoff-initial",
+                default.backoff_initial,
+            ),
+            backoff_max=read_duration(
+                node_config,
+                "replication.backoff-max",
+                default.backoff_max,
+            ),
+            snapshot_ratio=read_integer(
+                node_config,
+                "replication.snapshot-ratio",
+                default.snapshot_ratio,
+            ),
+        )
+
+
+@frozen
+class ReplicationLag:
+    """
+    Describe how far the replica is behind the local database.
+
+    :ivar unuploaded_statements: The number of statements in the local event
+        stream which have not been uploaded.
+
+    :ivar unuploaded_bytes: The size of those statements.
+
+    :ivar seconds_since_upload: The time since the last successful upload or
+        ``None`` if there has been no successful upload since the service
+        started.
+    """
+
+    unuploaded_statements: int
+    unuploaded_bytes: int
+    seconds_since_upload: Optional[float]
+
+
+# The ways an upload to the replica can fail which are worth retrying: the
+# Tahoe-LAFS node reports an error (for example, not enough storage servers are
+# connected) or it cannot be reached at all.
+_UPLOAD_FAILURES = (TahoeAPIError, ConnectError, ResponseFailed, ResponseNeverReceived)
+
+
 @define
 class _ReplicationService(Service):
     """
     Perform all activity related to maintaining a remote replica of the local
     ZKAPAuthorizer database.
 
+    The service watches the local event stream grow.  When it is large enough,
+    or when some of it has been waiting long enough, the service uploads it
+    to the replica directory and then removes the uploaded statements from
+    the local database.  Only one upload is in progress at a time.  Growth
+    while an upload is in progress is handled by another upload afterwards,
+    covering everything which accumulated in the meantime.  Failed uploads
+    (for example, because not enough storage servers are connected) are
+    retried with an exponentially increasing delay.
+
+    The first upload to a replica with no snapshot is a snapshot, since
+    recovery begins from one.  After that the service keeps the replica
+    compact.  Once the event stream objects in the replica are large enough
+    compared to the snapshot there, it uploads a new snapshot and removes the
+    event stream objects which the new snapshot makes redundant.
+
     :ivar _connection: A connection to the database being replicated.
 
-    :ivar _replicating: The long-running replication operation.  This is never
-        expected to complete but it will be cancelled when the service stops.
+    :ivar _store: The ``VoucherStore`` which reads and prunes the local event
+        stream.
+
+    :ivar _replica: The remote storage to which snapshots and event stream
+        objects are uploaded.
+
+    :ivar _inspected: Whether the sizes of the objects already in the
+        replica have been learned yet.
+
+    :ivar _snapshot_size: The size of the snapshot in the replica or ``None``
+        if there is none.
+
+    :ivar _replica_stream_bytes: The total size of the event stream objects
+        in the replica.
+
+    :ivar _replicating: The current upload operation, if any.  This will be
+        cancelled when the service stops.
     """
 
     name = "replication-service"  # type: ignore # Service assigns None, screws up type inference
+    _log = Logger()
 
     _connection: _ReplicationCapableConnection
+    _store: VoucherStore
+    _replica: IReplica
+    _clock: IReactorTime
+    _config: ReplicationConfig = field(factory=ReplicationConfig)
     _replicating: Optional[Deferred] = field(init=False, default=None)
 
+    _unuploaded_statements: int = field(init=False, default=0)
+    _unuploaded_bytes: int = field(init=False, default=0)
+    _oldest_unuploaded: Optional[float] = field(init=False, default=None)
+    _last_upload: Optional[float] = field(init=False, default=None)
+    _age_check: Optional[IDelayedCall] = field(init=False, default=None)
+    _failures: int = field(init=False, default=0)
+    _inspected: bool = field(init=False, default=False)
+    _snapshot_size: Optional[int] = field(init=False, default=None)
+    _replica_stream_bytes: int = field(init=False, default=0)
+
     def startService(self) -> None:
         super().startService()
         # Tell the store to initiate replication when appropriate.  The
@@ -408,13 +1186,21 @@ class _ReplicationService(Service):
         # turned on - so, make sure replication is turned on at the database
         # layer.
         self._connection.enable_replication()
-        self._replicating = succeed(None)
+        self._connection.add_mutation_observer(self._observe_mutations)
+
+        # There may be changes left over from a previous run.
+        summary = self._store.get_event_stream_summary()
+        self._observe_mutations(summary.statements, summary.size)
 
     def stopService(self) -> Deferred:
         """
         Cancel the replication operation and then wait for it to complete.
         """
         super().stopService()
+        self._connection.remove_mutation_observer(self._observe_mutations)
+        if self._age_check is not None:
+            self._age_check.cancel()
+            self._age_check = None
 
         replicating = self._replicating
         if replicating is None:
@@ -430,10 +1216,261 @@ class _ReplicationService(Service):
         replicating.cancel()
         return replicating
 
+    def get_lag(self) -> ReplicationLag:
+        """
+        Describe how far behind the local database the replica is.
+        """
+        return ReplicationLag(
+            unuploaded_statements=self._unuploaded_statements,
+            unuploaded_bytes=self._unuploaded_bytes,
+            seconds_since_upload=None
+            if self._last_upload is None
+            else self._clock.seconds() - self._last_upload,
+        )
+
+    def _observe_mutations(self, statements: int, size: int) -> None:
+        """
+        Account for some statements newly added to the local event stream and
+        upload if they push it over a threshold.
+        """
+        if statements == 0:
+            return
+        self._unuploaded_statements += statements
+        self._unuploaded_bytes += size
+        if self._oldest_unuploaded is None:
+            self._oldest_unuploaded = self._clock.seconds()
+        self._maybe_upload()
+
+    def _should_upload(self) -> bool:
+        """
+        Determine whether the local event stream has reached any of the
+        thresholds for upload.
+        """
+        if self._unuploaded_statements == 0:
+            return False
+        if self._unuploaded_statements >= self._config.upload_statements:
+            return True
+        if self._unuploaded_bytes >= self._config.upload_bytes:
+            return True
+        assert self._oldest_unuploaded is not None
+        age = self._clock.seconds() - self._oldest_unuploaded
+        return age >= self._config.max_age.total_seconds()
+
+    def _maybe_upload(self) -> None:
+        """
+        Start an upload if one is called for and none is already in progress.
+        Otherwise, make sure the age threshold will be checked when it might
+        next be reached.
+        """
+        if not self.running:
+            return
+        if self._replicating is not None and not self._replicating.called:
+            # The upload loop checks the thresholds again when the current
+            # upload finishes.
+            return
+        if self._should_upload() or self._should_snapshot():
+            self._replicating = Deferred.fromCoroutine(self._upload_until_caught_up())
+            self._replicating.addErrback(self._replication_failed)
+        else:
+            self._schedule_age_check()
+
+    def _replication_failed(self, reason: Failure) -> Optional[Failure]:
+        """
+        Log an unexpected failure of the upload loop.  Replication resumes the
+        next time the local database changes.
+        """
+        if reason.check(CancelledError):
+            return reason
+        self._log.failure("Replication failed unexpectedly", reason)
+        return None
+
+    def _schedule_age_check(self) -> None:
+        """
+        Arrange to check the thresholds again when the oldest statement not yet
+        uploaded reaches the maximum age.
+        """
+        if self._age_check is not None or self._oldest_unuploaded is None:
+            return
+        delay = max(
+            0.0,
+            self._oldest_unuploaded
+            + self._config.max_age.total_seconds()
+            - self._clock.seconds(),
+        )
+        self._age_check = self._clock.callLater(delay, self._age_reached)
+
+    def _age_reached(self) -> None:
+        self._age_check = None
+        self._maybe_upload()
+
+    def _should_snapshot(self) -> bool:
+        """
+        Determine whether replaying the event stream objects in the replica
+        would cost more than downloading a new snapshot, estimating the size
+        of a new snapshot by the size of the current one.
+        """
+        if self._snapshot_size is None:
+            return False
+        return (
+            self._replica_stream_bytes
+            > self._snapshot_size * self._config.snapshot_ratio
+        )
 
-def replication_service(connection) -> IService:
+    async def _upload_until_caught_up(self) -> None:
+        """
+        Upload the local event stream until it no longer exceeds any threshold
+        and compact the replica whenever it is due.
+        """
+        while self._should_upload() or self._should_snapshot():
+            try:
+                if not self._inspected:
+                    await self._inspect_replica()
+                if self._should_upload() and self._snapshot_size is not None:
+                    await self._upload_event_stream()
+                else:
+                    # Either compaction is due or there is no snapshot yet.
+                    # An event stream object is no use without a snapshot to
+                    # replay it onto and a new snapshot contains everything
+                    # in the local event stream anyway.
+                    await self._upload_snapshot()
+            except _UPLOAD_FAILURES:
+                self._failures += 1
+                self._log.failure("Uploading event stream")
+                await deferLater(self._clock, self._backoff_delay())
+            else:
+                self._failures = 0
+        self._schedule_age_check()
+
+    def _backoff_delay(self) -> float:
+        """
+        Compute the delay before retrying after the most recent failure.
+        """
+        return min(
+            self._config.backoff_initial.total_seconds() * 2 ** (self._failures - 1),
+            self._config.backoff_max.total_seconds(),
+        )
+
+    async def _upload_event_stream(self) -> None:
+        """
+        Upload everything currently in the local event stream to the replica
+        directory and remove it from the local event stream once it is linked.
+        """
+        # Upload only what is here now.  More may arrive during the upload.
+        summary = self._store.get_event_stream_summary()
+        highest_sequence = summary.highest_sequence
+        if highest_sequence is not None:
+            readers = []
+
+            def get_data() -> BinaryIO:
+                # Read and encode the events a page at a time as they are
+                # uploaded instead of holding the whole stream in memory.
+                reader = ChunkedReader(
+                    event_stream_chunks(
+                        self._store.iter_events(up_to_sequence=highest_sequence)
+                    )
+                )
+                readers.append(reader)
+                return reader  # type: ignore
+
+            await self._replica.upload(
+                event_stream_entry_name(highest_sequence), get_data
+            )
+            self._store.prune_events(highest_sequence)
+            self._replica_stream_bytes += readers[-1].position
+
+        # Anything added while the upload was in progress remains.
+        self._unuploaded_statements = max(
+            0, self._unuploaded_statements - summary.statements
+        )
+        self._unuploaded_bytes = max(0, self._unuploaded_bytes - summary.size)
+        now = self._clock.seconds()
+        self._last_upload = now
+        if self._unuploaded_statements == 0:
+            self._unuploaded_bytes = 0
+            self._oldest_unuploaded = None
+        else:
+            self._oldest_unuploaded = now
+
+    async def _inspect_replica(self) -> None:
+        """
+        Learn the sizes of the snapshot and event stream objects already in the
+        replica.
+        """
+        entries = await self._replica.list_entries()
+        self._snapshot_size = entries.get(SNAPSHOT_ENTRY_NAME)
+        self._inspected = True
+        self._replica_stream_bytes = sum(
+            size
+            for (name, size) in entries.items()
+            if event_stream_entry_sequence(name) is not None
+        )
+
+    async def _upload_snapshot(self) -> None:
+        """
+        Upload a new snapshot to the replica and then remove everything it
+        makes redundant from the replica and from the local event stream.
+        """
+        copy, sequence = self._store.copy_with_sequence()
+        try:
+            readers = []
+
+            def get_data() -> BinaryIO:
+                # Dump and encode the copy a little at a time as it is
+                # uploaded instead of holding the whole snapshot in memory.
+                reader = ChunkedReader(
+                    statements_to_snapshot(
+                        connection_to_statements(copy, UNREPLICATED_TABLES)
+                    )
+                )
+                readers.append(reader)
+                return reader  # type: ignore
+
+            await self._replica.upload(SNAPSHOT_ENTRY_NAME, get_data)
+        finally:
+            copy.close()
+        self._snapshot_size = readers[-1].position
+
+        # Statements not yet uploaded but contained in the snapshot need never
+        # be uploaded.
+        self._store.prune_events(sequence)
+        summary = self._store.get_event_stream_summary()
+        self._unuploaded_statements = summary.statements
+        self._unuploaded_bytes = summary.size
+        now = self._clock.seconds()
+        self._last_upload = now
+        if self._unuploaded_statements == 0:
+            self._oldest_unuploaded = None
+        else:
+            self._oldest_unuploaded = now
+
+        # Event stream objects which contain only statements the snapshot
+        # reflects are no longer needed for recovery.
+        entries = await self._replica.list_entries()
+        self._replica_stream_bytes = 0
+        for (name, size) in sorted(entries.items()):
+            entry_sequence = event_stream_entry_sequence(name)
+            if entry_sequence is None:
+                continue
+            if entry_sequence <= sequence:
+                await self._replica.unlink(name)
+            else:
+                self._replica_stream_bytes += size
+
+
+def replication_service(
+    store: VoucherStore,
+    replica: IReplica,
+    clock: IReactorTime,
+    config: ReplicationConfig = ReplicationConfig(),
+) -> IService:
     """
     Return a service which implements the replication process documented in
     the ``backup-recovery`` design document.
     """
-    return _ReplicationService(connection=connection)
+    return _ReplicationService(
+        connection=store._connection,
+        store=store,
+        replica=replica,
+        clock=clock,
+        config=config,
+    )
@@ -21,10 +21,12 @@ vouchers for fresh tokens.
 In the future it should also allow users to read statistics about token usage.
 """
 
+from collections import OrderedDict
 from collections.abc import Awaitable
 from functools import partial
 from json import loads
-from typing import Callable
+from os import urandom
+from typing import Callable, Optional
 
 from allmydata.uri import ReadonlyDirectoryURI, from_string
 from attr import Factory, define, field
@@ -33,9 +35,11 @@ from twisted.logger import Logger
 from twisted.web.http import (
     ACCEPTED,
     BAD_REQUEST,
+    CACHED,
     CONFLICT,
     CREATED,
     INTERNAL_SERVER_ERROR,
+    OK,
 )
 from twisted.web.iweb import IRequest
 from twisted.web.resource import ErrorPage, IResource, NoResource, Resource
@@ -46,13 +50,14 @@ from . import NAME
 from . import __version__ as _zkapauthorizer_version
 from ._base64 import urlsafe_b64decode
 from ._json import dumps_utf8
+from .config import read_integer
 from .controller import PaymentController, get_redeemer
 from .lease_maintenance import LeaseMaintenanceConfig
 from .model import NotEmpty, VoucherStore
 from .pricecalculator import PriceCalculator
 from .private import create_private_tree
 from .recover import Downloader, StatefulRecoverer
-from .replicate import ReplicationAlreadySetup
+from .replicate import ReplicationAlreadySetup, ReplicationLag
 from .storage_common import (
     get_configured_allowed_public_keys,
     get_configured_pass_value,
@@ -105,6 +110,7 @@ def from_configuration(
     setup_replication,
     redeemer=None,
     clock=None,
+    get_replication_lag=lambda: None,
 ):
     """
     Instantiate the plugin root resource using data from its configuration
@@ -124,6 +130,8 @@ def from_configuration(
 
     :param clock: See ``PaymentController._clock``.
 
+    :param get_replication_lag: See ``ReplicateResource._get_lag``.
+
     :return IZKAPRoot: The root of the resource hierarchy presented by the
         client side of the plugin.
     """
@@ -145,6 +153,10 @@ def from_configuration(
         default_token_count,
         allowed_public_keys=get_configured_allowed_public_keys(node_config),
         clock=clock,
+        redemption_concurrency=read_integer(node_config, "redemption-concurrency", 1),
+        issuer_concurrency=read_integer(
+            node_config, "redemption-issuer-concurrency", 8
+        ),
     )
 
     calculator = PriceCalculator(
@@ -165,6 +177,7 @@ def from_configuration(
             get_downloader,
             setup_replication,
             calculate_price,
+            get_replication_lag,
         ),
     )
     root.store = store
@@ -180,15 +193,36 @@ class ReplicateResource(Resource):
 
     :ivar _setup: The callable the resource will use to do the actual setup
         work.
+
+    :ivar _get_lag: A callable which describes how far behind the local
+        database the replica is, or returns ``None`` if replication is not
+        running.
     """
 
     _setup: Callable[[], Awaitable[str]]
+    _get_lag: Callable[[], Optional[ReplicationLag]] = lambda: None
 
     _log = Logger()
 
     def __attrs_post_init__(self):
         Resource.__init__(self)
 
+    def render_GET(self, request):
+        lag = self._get_lag()
+        application_json(request)
+        if lag is None:
+            return dumps_utf8({"replicating": False})
+        return dumps_utf8(
+            {
+                "replicating": True,
+                "lag": {
+                    "unuploaded-statements": lag.unuploaded_statements,
+                    "unuploaded-bytes": lag.unuploaded_bytes,
+                    "seconds-since-upload": lag.seconds_since_upload,
+                },
+            }
+        )
+
     def render_POST(self, request):
         self._setup_replication(request)
         return NOT_DONE_YET
@@ -326,6 +360,7 @@ def authorizationless_resource_tree(
     get_downloader: Callable[[str], Downloader],
     setup_replication: Callable[[], Awaitable[str]],
     calculate_price,
+    get_replication_lag: Callable[[], Optional[ReplicationLag]] = lambda: None,
 ):
     """
     Create the full ZKAPAuthorizer client plugin resource hierarchy with no
@@ -339,6 +374,8 @@ def authorizationless_resource_tree(
 
     :param IResource calculate_price: The resource for the price calculation endpoint.
 
+    :param get_replication_lag: See ``ReplicateResource._get_lag``.
+
     :return IResource: The root of the resource hierarchy.
     """
     root = Resource()
@@ -349,7 +386,7 @@ def authorizationless_resource_tree(
     )
     root.putChild(
         b"replicate",
-        ReplicateResource(setup_replication),
+        ReplicateResource(setup_replication, get_replication_lag),
     )
     root.putChild(
         b"voucher",
@@ -488,6 +525,73 @@ def application_json(request):
     request.responseHeaders.setRawHeaders("content-type", ["application/json"])
 
 
+@define
+class _RenderCache:
+    """
+    Remember the most recently rendered JSON responses for some resources
+    whose content depends only on the request URI and on a generation which
+    changes whenever the underlying state does.
+
+    Responses carry an ``ETag`` derived from the generation so a client which
+    already has the current response gets a **NOT MODIFIED** response without
+    the state being read at all.
+
+    :ivar _get_generation: A no-argument callable returning the current
+        generation as a tuple of ``int``.
+
+    :ivar _capacity: The largest number of responses to remember.
+
+    :ivar _prefix: A value included in every entity tag so that tags from a
+        previous run of the process, when the generation may have been the
+        same, do not match.
+
+    :ivar _responses: The remembered responses as two-tuples of generation and
+        body, keyed on request URI, least recently used first.
+    """
+
+    _get_generation: Callable[[], tuple[int, ...]]
+    _capacity: int = 32
+    _prefix: str = field(factory=lambda: urandom(8).hex())
+    _responses: OrderedDict[bytes, tuple[tuple[int, ...], bytes]] = field(
+        init=False, factory=OrderedDict
+    )
+
+    def render(self, request, render):
+        """
+        Respond to a **GET** from the cache if possible.
+
+        :param render: A callable which renders the response for the request
+            if it is not already cached.  Only a successful response is
+            remembered.
+
+        :return bytes: The response body.
+        """
+        generation = self._get_generation()
+        etag = '"{}-{}"'.format(
+            self._prefix, "-".join(str(n) for n in generation)
+        ).encode("ascii")
+        if request.setETag(etag) is CACHED:
+            return b""
+
+        uri = request.uri
+        cached = self._responses.get(uri)
+        if cached is not None and cached[0] == generation:
+            self._responses.move_to_end(uri)
+            application_json(request)
+            return cached[1]
+
+        body = render(request)
+        if request.code != OK or not isinstance(body, bytes):
+            # Don't let a client think it has a response it can revalidate.
+            request.etag = None
+            return body
+        self._responses[uri] = (generation, body)
+        self._responses.move_to_end(uri)
+        while len(self._responses) > self._capacity:
+            self._responses.popitem(last=False)
+        return body
+
+
 class _ProjectVersion(Resource):
     """
     This resource exposes the version of **ZKAPAuthorizer** itself.
@@ -513,12 +617,16 @@ class _LeaseMaintenanceResource(Resource):
     def __init__(self, store, controller):
         self._store = store
         self._controller = controller
+        self._cache = _RenderCache(controller.generation)
         Resource.__init__(self)
 
     def render_GET(self, request):
         """
         Retrieve the spending information.
         """
+        return self._cache.render(request, self._render_activity)
+
+    def _render_activity(self, request):
         application_json(request)
         return dumps_utf8(
             {
@@ -550,7 +658,9 @@ class _VoucherCollection(Resource):
     def __init__(self, store, controller):
         self._store = store
         self._controller = controller
+        self._cache = _RenderCache(controller.generation)
         Resource.__init__(self)
+        self.putChild(b"batch", _VoucherBatch(controller))
 
     def render_PUT(self, request):
         """
@@ -577,13 +687,49 @@ class _VoucherCollection(Resource):
         return b""
 
     def render_GET(self, request):
+        """
+        List vouchers, optionally only those in one persisted state and one
+        page at a time.
+        """
+        return self._cache.render(request, self._render_list)
+
+    def _render_list(self, request):
+        state = _get_argument(request, b"state")
+        if state is not None and state not in VOUCHER_STATES:
+            return bad_request(
+                "state must be one of {}".format(", ".join(sorted(VOUCHER_STATES)))
+            ).render(request)
+        after = _get_argument(request, b"after")
+        if after is not None and not is_syntactic_voucher(after):
+            return bad_request("after must be a voucher").render(request)
+        limit = _get_argument(request, b"limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return bad_request("limit must be a positive integer").render(request)
+
+        vouchers = self._store.list(
+            state=state,
+            after=None if after is None else after.encode("ascii"),
+            # Get one extra to learn whether there is another page.
+            limit=None if limit is None else limit + 1,
+        )
+        page = {}
+        if limit is not None and len(vouchers) > limit:
+            vouchers = vouchers[:limit]
+            page["next"] = vouchers[-1].number.decode("ascii")
+
         application_json(request)
         return dumps_utf8(
             {
                 "vouchers": list(
                     self._controller.incorporate_transient_state(voucher).marshal()
-                    for voucher in self._store.list()
+                    for voucher in vouchers
                 ),
+                **page,
             }
         )
 
@@ -591,11 +737,71 @@ class _VoucherCollection(Resource):
         voucher = segment.decode("utf-8")
         if not is_syntactic_voucher(voucher):
             return bad_request()
+        return VoucherView(
+            self._cache, self._store, self._controller, voucher.encode("ascii")
+        )
+
+
+class _VoucherBatch(Resource):
+    """
+    This class implements redemption of many vouchers at once.  Users
+    **POST** a list of voucher numbers to this resource.  They are all
+    persisted before any is redeemed and the redemption controller then
+    redeems them, sharing the issuer between them.
+    """
+
+    _log = Logger()
+
+    def __init__(self, controller):
+        self._controller = controller
+        Resource.__init__(self)
+
+    def render_POST(self, request):
+        """
+        Record some vouchers and begin attempting to redeem them.
+        """
         try:
-            voucher = self._store.get(voucher.encode("ascii"))
-        except KeyError:
-            return NoResource()
-        return VoucherView(self._controller.incorporate_transient_state(voucher))
+            payload = loads(request.content.read())
+        except Exception:
+            return bad_request("json request body required").render(request)
+        if not isinstance(payload, dict) or payload.keys() != {"vouchers"}:
+            return bad_request(
+                "request object must have exactly one key: 'vouchers'"
+            ).render(request)
+        vouchers = payload["vouchers"]
+        if not isinstance(vouchers, list) or not all(
+            is_syntactic_voucher(voucher) for voucher in vouchers
+        ):
+            return bad_request(
+                "submitted vouchers must be a list of syntactically valid vouchers"
+            ).render(request)
+
+        self._log.info(
+            "Accepting {count} vouchers for redemption.", count=len(vouchers)
+        )
+        self._controller.redeem_batch(
+            list(voucher.encode("ascii") for voucher in vouchers)
+        )
+        return b""
+
+
+# The persisted voucher states by which the voucher collection can be
+# filtered.  Vouchers being redeemed or which failed with a transient error
+# are "pending" here.
+VOUCHER_STATES = {"pending", "redeemed", "double-spend"}
+
+
+def _get_argument(request, name):
+    """
+    Get the value of a query argument, the last one if it is given more than
+    once.
+
+    :return Optional[str]: The value or ``None`` if it is not given.
+    """
+    values = request.args.get(name, [])
+    if len(values) == 0:
+        return None
+    return values[-1].decode("utf-8", "replace")
 
 
 def is_syntactic_voucher(voucher):
@@ -622,20 +828,33 @@ def is_syntactic_voucher(voucher):
 
 class VoucherView(Resource):
     """
-    This class implements a view for a ``Voucher`` instance.
+    This class implements a view for a ``Voucher`` instance.  The voucher is
+    only loaded if the view is not already cached.
     """
 
-    def __init__(self, voucher):
+    def __init__(self, cache, store, controller, number):
         """
-        :param Voucher reference: The model object for which to provide a
+        :param _RenderCache cache: The cache for the rendered view.
+
+        :param bytes number: The number of the voucher for which to provide a
             view.
         """
-        self._voucher = voucher
+        self._cache = cache
+        self._store = store
+        self._controller = controller
+        self._number = number
         Resource.__init__(self)
 
     def render_GET(self, request):
+        return self._cache.render(request, self._render_voucher)
+
+    def _render_voucher(self, request):
+        try:
+            voucher = self._store.get(self._number)
+        except KeyError:
+            return NoResource().render(request)
         application_json(request)
-        return self._voucher.to_json()
+        return self._controller.incorporate_transient_state(voucher).to_json()
 
 
 def bad_request(reason="Bad Request"):
@@ -64,6 +64,24 @@ _INCREMENT_VERSION = """
     SET [version] = [version] + 1
     """
 
+# The tables holding state which is only useful to this node and which it can
+# rebuild if it is lost, such as the saved progress of a lease maintenance
+# crawl, the directory listings it remembers, or the lease expiration times it
+# has found.  The store asks for changes to their rows to be left out of the
+# event stream and for their rows to be left out of snapshots.  Changes to
+# their schema are not, so that a recovered database has the same schema as
+# the original.
+UNREPLICATED_TABLES = frozenset(
+    [
+        "lease-crawl",
+        "lease-crawl-frontier",
+        "lease-crawl-storage-indexes",
+        "lease-crawl-chunks",
+        "directory-listings",
+        "lease-expirations",
+    ]
+)
+
 # A mapping from old schema versions to lists of unicode strings of SQL to
 # execute against that version of the schema to create the successor schema.
 _UPGRADES = {
@@ -222,4 +240,175 @@ _UPGRADES = {
         )
         """,
     ],
+    7: [
+        """
+        -- Record statements executed many times (with many different sets of
+        -- arguments) compactly.  For such statements, this holds the
+        -- CBOR-encoded array of argument rows and [statement] holds the
+        -- statement with placeholders.  For other statements this is NULL and
+        -- the arguments are bound into [statement].
+        ALTER TABLE [event-stream] ADD COLUMN [arguments] BLOB DEFAULT NULL
+        """,
+    ],
+    8: [
+        # Sequence numbers name the event stream objects in the replica so
+        # they must never be reused, even after every row has been pruned.
+        # That requires AUTOINCREMENT which can only be given to a table when
+        # it is created.  Rebuild the table, holding the existing rows in a
+        # temporary table which is never replicated.
+        """
+        CREATE TEMPORARY TABLE [event-stream-upgrade] AS
+        SELECT [sequence-number], [statement], [arguments] FROM [event-stream]
+        """,
+        """
+        DROP TABLE [event-stream]
+        """,
+        """
+        CREATE TABLE [event-stream] (
+            [sequence-number] INTEGER PRIMARY KEY AUTOINCREMENT,
+            [statement] TEXT,
+            [arguments] BLOB DEFAULT NULL
+        )
+        """,
+        """
+        INSERT INTO [event-stream] ([sequence-number], [statement], [arguments])
+        SELECT [sequence-number], [statement], [arguments]
+        FROM temp.[event-stream-upgrade]
+        """,
+        """
+        DROP TABLE temp.[event-stream-upgrade]
+        """,
+    ],
+    9: [
+        """
+        -- Record which redemption counter each redemption group came from.
+        -- Groups of a voucher may be redeemed concurrently and so complete
+        -- out of order.  [vouchers].[counter] only advances past a counter
+        -- once every group before it is done so this is how we remember
+        -- the groups beyond it which are already done.  Groups which existed
+        -- before this upgrade were all redeemed in order and are all below
+        -- [vouchers].[counter] so they have no need of a value here.
+        ALTER TABLE [redemption-groups] ADD COLUMN [counter] integer DEFAULT NULL
+        """,
+    ],
+    10: [
+        """
+        -- A voucher which still needs to be redeemed and when redemption
+        -- should next be attempted.  [due] is a POSIX timestamp.  [attempts]
+        -- counts the attempts which have not succeeded since the last one
+        -- which did and determines how long to back off before the next.
+        CREATE TABLE [redemption-jobs] (
+            [voucher] text PRIMARY KEY,
+            [attempts] integer NOT NULL,
+            [due] real NOT NULL
+        )
+        """,
+        """
+        -- Every voucher which was being redeemed before this upgrade is due
+        -- to be tried again immediately.
+        INSERT INTO [redemption-jobs] ([voucher], [attempts], [due])
+        SELECT [number], 0, 0 FROM [vouchers] WHERE [state] = 'pending'
+        """,
+    ],
+    11: [
+        """
+        -- Serve listings of the vouchers in one state, in order by number,
+        -- without scanning all of them.
+        CREATE INDEX [vouchers-by-state] ON [vouchers] ([state], [number])
+        """,
+    ],
+    12: [
+        """
+        -- The lease maintenance crawl which is in progress, if any.  There is
+        -- at most one row.  [traversed] is true once every storage index
+        -- reachable from the roots has been found.
+        CREATE TABLE [lease-crawl] (
+            [id] integer PRIMARY KEY CHECK ([id] = 0),
+            [traversed] boolean NOT NULL
+        )
+        """,
+        """
+        -- Capabilities for the nodes the crawl's traversal has yet to visit.
+        CREATE TABLE [lease-crawl-frontier] (
+            [uri] blob NOT NULL
+        )
+        """,
+        """
+        -- The storage indexes the crawl's traversal has found so far, in the
+        -- order they were found.
+        CREATE TABLE [lease-crawl-storage-indexes] (
+            [position] integer PRIMARY KEY AUTOINCREMENT,
+            [storage-index] blob UNIQUE NOT NULL
+        )
+        """,
+        """
+        -- The chunks of storage indexes the crawl has finished checking (and
+        -- renewing leases for) on each storage server.
+        CREATE TABLE [lease-crawl-chunks] (
+            [server] blob NOT NULL,
+            [chunk] integer NOT NULL,
+            PRIMARY KEY ([server], [chunk])
+        )
+        """,
+    ],
+    13: [
+        """
+        -- The children of directories as found by lease maintenance crawls
+        -- so that a directory which has not changed need not be listed
+        -- again.  [directory] is the directory's storage index.  [version]
+        -- identifies the version of the directory (for example, its sequence
+        -- number and root hash) in which the children were found.
+        -- [children] is a CBOR-encoded list of the children's capability
+        -- strings.
+        CREATE TABLE [directory-listings] (
+            [directory] blob PRIMARY KEY,
+            [version] blob NOT NULL,
+            [children] blob NOT NULL
+        )
+        """,
+    ],
+    14: [
+        """
+        -- The most recently observed lease expiration time for the shares of
+        -- each storage index on each storage server so that leases can be
+        -- renewed shortly before they need it without asking the servers
+        -- about them first.  [expiration] is the POSIX time at which the
+        -- soonest-expiring lease on any of the shares expires.  [sizes] is a
+        -- CBOR-encoded list of the sizes of the shares.
+        CREATE TABLE [lease-expirations] (
+            [server] blob NOT NULL,
+            [storage-index] blob NOT NULL,
+            [expiration] real NOT NULL,
+            [sizes] blob NOT NULL,
+            PRIMARY KEY ([server], [storage-index])
+        )
+        """,
+        """
+        -- Find the leases which expire soonest without scanning all of them.
+        CREATE INDEX [lease-expirations-by-expiration]
+        ON [lease-expirations] ([expiration])
+        """,
+    ],
+    15: [
+        """
+        -- Find the redemption job which is due soonest without scanning all
+        -- of them.
+        CREATE INDEX [redemption-jobs-by-due]
+        ON [redemption-jobs] ([due], [voucher])
+        """,
+    ],
+    16: [
+        """
+        -- The number of times in a row renewing the lease has failed and the
+        -- POSIX time before which it should not be tried again.  A renewal
+        -- which keeps failing is tried less and less often so that it does
+        -- not hold up the renewals which come after it.
+        ALTER TABLE [lease-expirations]
+        ADD COLUMN [failures] integer NOT NULL DEFAULT 0
+        """,
+        """
+        ALTER TABLE [lease-expirations]
+        ADD COLUMN [retry-after] real NOT NULL DEFAULT 0
+        """,
+    ],
 }
@@ -24,7 +24,7 @@ import attr
 from zope.interface import Attribute, Interface, implementer
 
 from .eliot import GET_PASSES, INVALID_PASSES, RESET_PASSES, SPENT_PASSES
-from .model import Pass, UnblindedToken
+from .model import NotEnoughTokens, Pass, UnblindedToken
 
 
 class IPassGroup(Interface):
@@ -188,9 +188,16 @@ class SpendingController(object):
     tokens_to_passes: Callable[[bytes, list[UnblindedToken]], list[Pass]] = attr.ib()
 
     @classmethod
-    def for_store(cls, tokens_to_passes, store):
+    def for_store(cls, tokens_to_passes, store, reserve=None):
+        """
+        :param UnblindedTokenReserve reserve: If not ``None``, a reserve of
+            tokens taken from ``store`` to get tokens from instead of getting
+            them from ``store`` directly.
+        """
         return cls(
-            get_unblinded_tokens=store.get_unblinded_tokens,
+            get_unblinded_tokens=(
+                store.get_unblinded_tokens if reserve is None else reserve.get
+            ),
             discard_unblinded_tokens=store.discard_unblinded_tokens,
             invalidate_unblinded_tokens=store.invalidate_unblinded_tokens,
             reset_unblinded_tokens=store.reset_unblinded_tokens,
@@ -224,3 +231,46 @@ class SpendingController(object):
             count=len(unblinded_tokens),
         )
         self.reset_unblinded_tokens(unblinded_tokens)
+
+
+@attr.s
+class UnblindedTokenReserve(object):
+    """
+    Take unblinded tokens out of a store in batches and give them out a few
+    at a time so that many small spends share one database transaction.
+
+    Tokens in the reserve are only in use as far as this process is concerned
+    so they become available again if it stops.
+
+    :ivar get_unblinded_tokens: A function like
+        ``VoucherStore.get_unblinded_tokens`` to take tokens from the store.
+
+    :ivar batch_size: The smallest number of tokens to take from the store at
+        once.
+
+    :ivar _tokens: The tokens taken from the store and not yet given out.
+    """
+
+    get_unblinded_tokens: Callable[[int], list[UnblindedToken]] = attr.ib()
+    batch_size: int = attr.ib(default=1)
+    _tokens: list[UnblindedToken] = attr.ib(init=False, factory=list)
+
+    def get(self, count: int) -> list[UnblindedToken]:
+        """
+        Give out some unblinded tokens, taking more from the store if the
+        reserve does not have enough.
+
+        :raise NotEnoughTokens: If the reserve and the store together do not
+            have the requested number of tokens.  In this case the reserve
+            still has all of the tokens it had before.
+        """
+        shortfall = count - len(self._tokens)
+        if shortfall > 0:
+            try:
+                more = self.get_unblinded_tokens(max(shortfall, self.batch_size))
+            except NotEnoughTokens:
+                # There may still be enough for just this request.
+                more = self.get_unblinded_tokens(shortfall)
+            self._tokens.extend(more)
+        given, self._tokens = self._tokens[:count], self._tokens[count:]
+        return given
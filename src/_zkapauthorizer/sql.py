@@ -5,9 +5,12 @@ This is focused on SQLite3 and no doubt nevertheless incomplete.  The goal is
 to support testing the replication/recovery system.
 """
 
+import re
 from enum import Enum, auto
-from sqlite3 import Cursor
-from typing import Union
+from functools import lru_cache
+from math import inf
+from sqlite3 import PrepareProtocol, adapt
+from typing import Any, Callable, Iterable, Sequence, Union
 
 from attrs import define
 
@@ -75,15 +78,13 @@ class Insert:
             f"VALUES ({placeholders})"
         )
 
-    def bound_statement(self, cursor):
+    def bound_statement(self):
         """
         :returns: the statement with all values interpolated into it
             rather than as separate values
         """
         names = ", ".join((escape_identifier(name) for (name, _) in self.table.columns))
-        values = ", ".join(
-            (quote_sql_value(cursor, value) for value in self.arguments())
-        )
+        values = ", ".join(quote_sql_values(self.arguments()))
         return (
             f"INSERT INTO {escape_identifier(self.table_name)} "
             f"({names}) "
@@ -94,23 +95,169 @@ class Insert:
         return self.fields
 
 
-def quote_sql_value(cursor: Cursor, value: Union[int, float, str, bytes, None]) -> str:
+def _quote_float(value: float) -> str:
     """
-    Use the SQL `quote()` function to return the quoted version of
-    `value`. Supports `int`, `float`, `None`, `str` and `bytes`.
-
-    :returns: the quoted value
+    Quote a float the way SQLite3's ``quote()`` does where that is possible.
+
+    SQLite3 formats a float with 15 significant digits if that represents it
+    exactly.  Otherwise it uses 20 digits, generated by its own ``printf``
+    implementation with platform-dependent precision.  Those cannot be
+    reproduced here so the shortest exact representation is used instead.
+    Either way, the result is read back as exactly ``value`` by any SQLite3
+    which rounds decimal literals correctly.
+    """
+    if value != value:
+        # SQLite3 represents NaN as NULL.
+        return "NULL"
+    if value in (inf, -inf):
+        return "9.0e+999" if value > 0 else "-9.0e+999"
+    if value == 0.0:
+        # SQLite3 drops the sign of negative zero.
+        return "0.0"
+    quoted = format(value, ".15g")
+    if float(quoted) != value:
+        quoted = repr(value)
+    # Like the "!" printf flag SQLite3 uses, always include a decimal point.
+    mantissa, e, exponent = quoted.partition("e")
+    if "." not in mantissa:
+        mantissa += ".0"
+    return mantissa + e + exponent
+
+
+def _quote_text(value: str) -> str:
+    # SQLite3's quote() stops at the first NUL, silently losing the rest of
+    # the value.  A string literal cannot contain a NUL so splice them in
+    # with char() instead.
+    return " || char(0) || ".join(
+        "'" + part.replace("'", "''") + "'" for part in value.split("\0")
+    )
+
+
+def _quote_blob(value: bytes) -> str:
+    return "X'" + value.hex().upper() + "'"
+
+
+_QUOTERS: dict[type, Callable[[Any], str]] = {
+    int: str,
+    float: _quote_float,
+    str: _quote_text,
+    bytes: _quote_blob,
+    type(None): lambda value: "NULL",
+}
+
+
+def _to_base_type(value: Any) -> Any:
+    """
+    Convert an instance of a subclass of one of the types SQLite3 stores (such
+    as an ``IntEnum`` or a ``bool``) to that type, the way the ``sqlite3``
+    module binds it.  Other values are returned unchanged.
     """
     if isinstance(value, int):
-        return str(value)
+        return int(value)
     if isinstance(value, float):
-        return str(value)
-    if value is None:
-        return "NULL"
-    if isinstance(value, (str, bytes)):
-        cursor.execute("SELECT quote(?);", (value,))
-        return cursor.fetchall()[0][0]
-    raise ValueError("Do not know how to quote value of type f{type(value)}")
+        return float(value)
+    if isinstance(value, str):
+        return str.__str__(value)
+    if isinstance(value, bytes):
+        return bytes(value)
+    return value
+
+
+def quote_sql_value(value: SQLType) -> str:
+    """
+    Quote a value for inclusion in a SQL statement, matching SQLite3's
+    ``quote()`` function without a trip through the database.  Supports
+    ``int``, ``float``, ``None``, ``str`` and ``bytes`` and their subclasses.
+
+    :returns: the quoted value
+    """
+    quoter = _QUOTERS.get(type(value))
+    if quoter is None:
+        value = _to_base_type(value)
+        quoter = _QUOTERS.get(type(value))
+        if quoter is None:
+            raise ValueError(f"Do not know how to quote value of type {type(value)}")
+    return quoter(value)
+
+
+def quote_sql_values(values: Iterable[SQLType]) -> list[str]:
+    """
+    Quote many values as ``quote_sql_value`` does.
+
+    :param values: The values to quote.  These are iterated over only once.
+    """
+    quoters = _QUOTERS
+    quoted = []
+    for value in values:
+        quoter = quoters.get(type(value))
+        quoted.append(quoter(value) if quoter is not None else quote_sql_value(value))
+    return quoted
+
+
+def adapt_sql_value(value: Any) -> SQLType:
+    """
+    Convert a Python value to the SQLite3 value the ``sqlite3`` module would
+    bind in its place.
+
+    This respects the adapters registered with the ``sqlite3`` module (for
+    example, the default adapter for ``datetime``).  Without one, an instance
+    of a subclass of a type SQLite3 stores is converted to that type.
+    """
+    if value is None or type(value) in _QUOTERS:
+        return value
+    if isinstance(value, (int, float, str, bytes)):
+        return _to_base_type(adapt(value, PrepareProtocol, value))
+    return adapt(value)
+
+
+# Match the parts of a statement which might contain a "?" without it being a
+# parameter placeholder - string literals, quoted identifiers, and comments -
+# as well as the placeholders themselves.
+_PLACEHOLDER_OR_QUOTED = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/|\?""",
+    re.S,
+)
+
+
+@lru_cache(maxsize=256)
+def _split_on_placeholders(statement: str) -> tuple[str, ...]:
+    """
+    Split a statement into the text between its ``?`` parameter placeholders.
+    """
+    pieces = []
+    start = 0
+    for match in _PLACEHOLDER_OR_QUOTED.finditer(statement):
+        if match.group() == "?":
+            pieces.append(statement[start : match.start()])
+            start = match.end()
+    pieces.append(statement[start:])
+    return tuple(pieces)
+
+
+def bind_arguments(statement: str, row: Sequence[Any]) -> str:
+    """
+    Substitute quoted arguments into a statement in place of its ``?``
+    parameter placeholders.
+
+    :param statement: A statement using the "qmark" parameter style.
+
+    :param row: The values which would be bound to the placeholders.
+
+    :return: A statement which has the same effect as executing
+        ``statement`` with ``row`` but which needs no parameters.
+    """
+    pieces = _split_on_placeholders(statement)
+    if len(pieces) - 1 != len(row):
+        raise ValueError(
+            f"Statement has {len(pieces) - 1} placeholders but {len(row)} "
+            "arguments were supplied"
+        )
+    quoted = quote_sql_values(adapt_sql_value(value) for value in row)
+    result = [pieces[0]]
+    for value, piece in zip(quoted, pieces[1:]):
+        result.append(value)
+        result.append(piece)
+    return "".join(result)
 
 
 @define(frozen=True)
@@ -138,15 +285,15 @@ class Update:
         )
         return f"UPDATE {escape_identifier(self.table_name)} SET {assignments}"
 
-    def bound_statement(self, cursor):
+    def bound_statement(self):
         """
         :returns: the statement with all values interpolated into it
             rather than as separate values
         """
         field_names = list(name for (name, _) in self.table.columns)
         assignments = ", ".join(
-            f"{escape_identifier(name)} = {quote_sql_value(cursor, value)}"
-            for name, value in zip(field_names, self.fields)
+            f"{escape_identifier(name)} = {value}"
+            for name, value in zip(field_names, quote_sql_values(self.fields))
         )
         return f"UPDATE {escape_identifier(self.table_name)} SET {assignments}"
 
@@ -169,7 +316,7 @@ class Delete:
     def statement(self):
         return f"DELETE FROM {escape_identifier(self.table_name)}"
 
-    def bound_statement(self, cursor):
+    def bound_statement(self):
         """
         :returns: the statement with all values interpolated into it
             rather than as separate values
@@ -17,9 +17,9 @@ from hyperlink import DecodedURL
 from treq.client import HTTPClient
 from twisted.internet.error import ConnectionRefusedError
 from twisted.python.filepath import FilePath
-from twisted.web.client import Agent
 from zope.interface import Interface, implementer
 
+from ._http import get_http_client
 from ._types import CapStr
 from .config import Config, read_node_url
 
@@ -272,6 +272,33 @@ async def link(
     raise TahoeAPIError("put", uri, resp.code, content)
 
 
+@async_retry(_common_tahoe_errors)
+async def unlink(
+    client: HTTPClient,
+    api_root: DecodedURL,
+    dir_cap: str,
+    entry_name: str,
+) -> None:
+    """
+    Remove an object from a directory.
+
+    :param dir_cap: The capability string of the directory from which to
+        remove the link.
+
+    :param entry_name: The name of the link to remove.
+    """
+    uri = api_root.child("uri").child(dir_cap).child(entry_name)
+    resp = await client.delete(uri)
+    content = (await treq.content(resp)).decode("utf-8")
+    if resp.code == 200:
+        return None
+
+    if resp.code == 500 and "allmydata.mutable.common.NotWriteableError" in content:
+        raise NotWriteableError()
+
+    raise TahoeAPIError("delete", uri, resp.code, content)
+
+
 class ITahoeClient(Interface):
     """
     A simple Tahoe-LAFS client interface.
@@ -316,6 +343,14 @@ class ITahoeClient(Interface):
         List the entries linked into a directory.
         """
 
+    async def unlink(dir_cap: CapStr, entry_name: str) -> None:
+        """
+        Remove an object from a directory.
+
+        :param dir_cap: The capability of the directory to remove from.
+        :param entry_name: The name of the link to remove.
+        """
+
 
 @implementer(ITahoeClient)
 @define
@@ -360,6 +395,9 @@ class Tahoe(object):
     def link(self, dir_cap, entry_name, entry_cap):
         return link(self.client, self._api_root, dir_cap, entry_name, entry_cap)
 
+    def unlink(self, dir_cap, entry_name):
+        return unlink(self.client, self._api_root, dir_cap, entry_name)
+
 
 @define
 class _Directory:
@@ -438,6 +476,18 @@ class MemoryGrid:
                 f"Cannot link entry into non-directory capability ({dir_cap[:7]})"
             )
 
+    def unlink(self, dir_cap: CapStr, entry_name: str) -> None:
+        d = capability_from_string(dir_cap)
+        if d.is_readonly():
+            raise NotWriteableError()
+        dirobj = self._objects[dir_cap]
+        if isinstance(dirobj, _Directory):
+            del dirobj.children[entry_name]
+        else:
+            raise ValueError(
+                f"Cannot unlink entry from non-directory capability ({dir_cap[:7]})"
+            )
+
     def list_directory(self, dir_cap: CapStr) -> dict[CapStr, list[Any]]:
         def kind(entry):
             if isinstance(entry, _Directory):
@@ -526,6 +576,9 @@ class _MemoryTahoe:
     async def link(self, dir_cap, entry_name, entry_cap):
         return self._grid.link(dir_cap, entry_name, entry_cap)
 
+    async def unlink(self, dir_cap, entry_name):
+        return self._grid.unlink(dir_cap, entry_name)
+
     async def list_directory(self, dir_cap):
         return self._grid.list_directory(dir_cap)
 
@@ -547,6 +600,4 @@ def get_tahoe_client(reactor, node_config: Config) -> ITahoeClient:
     :param node_config: The Tahoe-LAFS client node configuration for the
         client (giving, for example, the root URI of the node's HTTP API).
     """
-    agent = Agent(reactor)
-    http_client = HTTPClient(agent)
-    return Tahoe(http_client, node_config)
+    return Tahoe(get_http_client(reactor, node_config), node_config)
@@ -0,0 +1,135 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the cost of recording changes in the replication event stream.
+
+Run it like::
+
+  python -m _zkapauthorizer.tests.benchmark_event_stream 1000 100000
+
+For each number of rows this reports how many rows per second are inserted
+with ``execute`` and with ``executemany``, with replication off and on, and
+the peak memory allocated by Python while inserting them with
+``executemany`` from an iterator.
+"""
+
+from argparse import ArgumentParser
+from sqlite3 import connect
+from sys import argv
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+
+from ..model import initialize_database
+from ..replicate import with_replication
+
+STATEMENT = "INSERT INTO [unblinded-tokens] ([token]) VALUES (?)"
+
+
+def database(replicating):
+    """
+    Create a new in-memory database with the application schema.
+    """
+    conn = with_replication(connect(":memory:"), False)
+    initialize_database(conn)
+    if replicating:
+        conn.enable_replication()
+    return conn
+
+
+def rows(count):
+    """
+    Generate rows of arguments for ``STATEMENT``.
+    """
+    return ((f"token-{n:040d}",) for n in range(count))
+
+
+def insert_each(conn, count):
+    with conn:
+        cursor = conn.cursor()
+        for row in rows(count):
+            cursor.execute(STATEMENT, row)
+
+
+def insert_many(conn, count):
+    with conn:
+        conn.cursor().executemany(STATEMENT, rows(count))
+
+
+def rate(insert, replicating, count):
+    """
+    :return: The number of rows per second inserted by ``insert``.
+    """
+    conn = database(replicating)
+    before = perf_counter()
+    insert(conn, count)
+    return count / (perf_counter() - before)
+
+
+def peak(insert, replicating, count):
+    """
+    :return: The peak bytes allocated while inserting the rows.
+    """
+    conn = database(replicating)
+    start()
+    try:
+        baseline = get_traced_memory()[0]
+        reset_peak()
+        insert(conn, count)
+        return get_traced_memory()[1] - baseline
+    finally:
+        stop()
+
+
+def main(*args):
+    parser = ArgumentParser(
+        prog="python -m _zkapauthorizer.tests.benchmark_event_stream",
+        description="Measure recording changes in the event stream.",
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=[10 ** n for n in range(3, 6)],
+        help="Numbers of rows to insert.",
+    )
+    options = parser.parse_args(args)
+
+    print(
+        "{:>8} {:>11} {:>11} {:>11} {:>11} {:>10} {:>10}".format(
+            "rows",
+            "each/s",
+            "each+rep/s",
+            "many/s",
+            "many+rep/s",
+            "many MiB",
+            "+rep MiB",
+        )
+    )
+    for count in options.sizes:
+        print(
+            "{:>8} {:>11.0f} {:>11.0f} {:>11.0f} {:>11.0f} {:>10.1f} {:>10.1f}".format(
+                count,
+                rate(insert_each, False, count),
+                rate(insert_each, True, count),
+                rate(insert_many, False, count),
+                rate(insert_many, True, count),
+                peak(insert_many, False, count) / 2 ** 20,
+                peak(insert_many, True, count) / 2 ** 20,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*argv[1:])
@@ -0,0 +1,234 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure a lease maintenance crawl against a grid of fake storage servers
+which each take some time to answer every request.
+
+Run it like::
+
+  python -m _zkapauthorizer.tests.benchmark_lease_maintenance --servers 40 1 8 40
+
+For each server concurrency this reports how long it took to check and
+renew the leases on every storage index on every server, how many leases
+were renewed per second, and the mean time to renew one lease.
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from os import urandom
+from random import Random
+from sys import argv
+from time import perf_counter
+
+import attr
+from allmydata.client import SecretHolder
+from allmydata.util.hashutil import CRYPTO_VAL_SIZE
+from twisted.internet.defer import inlineCallbacks, succeed
+from twisted.internet.task import deferLater, react
+from twisted.logger import globalLogPublisher
+
+from ..foolscap import ShareStat
+from ..lease_maintenance import NoopMaintenanceObserver, renew_leases
+
+
+@attr.s
+class LatentStorageServer(object):
+    """
+    A fake storage server holding one share for each of some storage indexes
+    which waits before answering each request.
+
+    :ivar float latency: The number of seconds to wait.
+    """
+
+    reactor = attr.ib()
+    latency = attr.ib()
+    leases = attr.ib()
+    lease_seed = attr.ib(default=attr.Factory(lambda: urandom(20)))
+
+    def get_storage_server(self):
+        return self
+
+    def get_serverid(self):
+        return b"v0-" + self.lease_seed.hex().encode("ascii")
+
+    def get_lease_seed(self):
+        return self.lease_seed
+
+    def stat_shares(self, storage_indexes):
+        return deferLater(
+            self.reactor,
+            self.latency,
+            lambda: list(
+                {0: ShareStat(size=123, lease_expiration=self.leases[idx])}
+                for idx in storage_indexes
+            ),
+        )
+
+    def add_lease(self, storage_index, renew_secret, cancel_secret):
+        def renewed():
+            self.leases[storage_index] = int(self.reactor.seconds()) + 31 * 24 * 60 * 60
+
+        return deferLater(self.reactor, self.latency, renewed)
+
+
+@attr.s
+class FakeStorageBroker(object):
+    """
+    A storage broker which is connected to some storage servers.
+    """
+
+    servers = attr.ib()
+
+    def get_connected_servers(self):
+        return self.servers
+
+
+@inlineCallbacks
+def crawl(reactor, options, server_concurrency):
+    """
+    Check and renew the leases on a new grid.
+
+    :return: A ``Deferred`` that fires with a three-tuple of the seconds the
+        crawl took, the number of leases renewed, and the mean seconds each
+        renewal took.
+    """
+    random = Random(0)
+    storage_indexes = list(urandom(16) for _ in range(options.storage_indexes))
+    now = int(reactor.seconds())
+    servers = list(
+        LatentStorageServer(
+            reactor,
+            options.latency,
+            {
+                # Leave some leases alone.
+                idx: now + random.choice([0, 60 * 60 * 24 * 30])
+                for idx in storage_indexes
+            },
+        )
+        for _ in range(options.servers)
+    )
+
+    def visit_assets(visit):
+        for idx in storage_indexes:
+            visit(idx)
+        return succeed(None)
+
+    # Pick up the summaries logged by ``renew_leases_on_server``.
+    summaries = []
+
+    def observe(event):
+        if "renewed" in event and "mean_latency" in event:
+            summaries.append(event)
+
+    globalLogPublisher.addObserver(observe)
+    try:
+        before = perf_counter()
+        yield renew_leases(
+            visit_assets,
+            FakeStorageBroker(servers),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            NoopMaintenanceObserver,
+            lambda: datetime.utcfromtimestamp(reactor.seconds()),
+            server_concurrency,
+            options.stat_chunk_size,
+            options.stat_chunks_in_flight,
+            options.renewals_in_flight,
+        )
+        elapsed = perf_counter() - before
+    finally:
+        globalLogPublisher.removeObserver(observe)
+
+    renewed = sum(summary["renewed"] for summary in summaries)
+    latency = (
+        sum(
+            summary["mean_latency"] * summary["renewed"]
+            for summary in summaries
+            if summary["renewed"]
+        )
+        / renewed
+        if renewed
+        else 0.0
+    )
+    return elapsed, renewed, latency
+
+
+@inlineCallbacks
+def main(reactor, *args):
+    parser = ArgumentParser(
+        prog="python -m _zkapauthorizer.tests.benchmark_lease_maintenance",
+        description="Measure a lease maintenance crawl against a fake grid.",
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=40,
+        help="The number of storage servers in the grid.",
+    )
+    parser.add_argument(
+        "--storage-indexes",
+        type=int,
+        default=100,
+        help="The number of storage indexes with shares on every server.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Seconds each storage server waits before each response.",
+    )
+    parser.add_argument(
+        "--stat-chunk-size",
+        type=int,
+        default=1000,
+        help="The number of storage indexes to check with each request.",
+    )
+    parser.add_argument(
+        "--stat-chunks-in-flight",
+        type=int,
+        default=2,
+        help="The number of chunks to work on at once on each server.",
+    )
+    parser.add_argument(
+        "--renewals-in-flight",
+        type=int,
+        default=4,
+        help="The number of leases to renew at once on each server.",
+    )
+    parser.add_argument(
+        "concurrency",
+        nargs="*",
+        type=int,
+        default=[1, 8, 40],
+        help="Server concurrency limits to measure.",
+    )
+    options = parser.parse_args(args)
+
+    print(
+        "{:>12} {:>9} {:>8} {:>10} {:>10}".format(
+            "concurrency", "seconds", "renewed", "renewed/s", "latency"
+        )
+    )
+    for server_concurrency in options.concurrency:
+        elapsed, renewed, latency = yield crawl(reactor, options, server_concurrency)
+        print(
+            "{:>12} {:>9.3f} {:>8} {:>10.1f} {:>10.3f}".format(
+                server_concurrency, elapsed, renewed, renewed / elapsed, latency
+            )
+        )
+
+
+if __name__ == "__main__":
+    react(main, argv[1:])
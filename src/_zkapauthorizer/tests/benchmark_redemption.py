@@ -0,0 +1,249 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure voucher redemption end to end against an in-process issuer which
+does real Ristretto signing over a real HTTP connection.
+
+Run it like::
+
+  python -m _zkapauthorizer.tests.benchmark_redemption --latency 0.05 512 131072
+
+For each voucher size this reports the throughput, the time spent in each
+phase of redemption summed over all of the voucher's redemption groups, and
+the peak memory allocated by Python while redeeming it.  It also reports the
+number of requests sent to the issuer, their mean and longest latency, and
+how many of them used a new connection or re-used an open one.
+"""
+
+from argparse import ArgumentParser
+from base64 import b64encode
+from collections import defaultdict
+from datetime import datetime
+from os import urandom
+from sys import argv
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start
+
+from challenge_bypass_ristretto import random_signing_key
+from twisted.internet.defer import Deferred, inlineCallbacks
+from twisted.internet.task import react
+from twisted.logger import globalLogPublisher
+from twisted.python.url import URL
+from twisted.web.server import Site
+
+from .._http import ConnectionStats, get_connection_pool, get_http_client
+from .._plugin import open_store
+from ..config import empty_config
+from ..controller import (
+    PaymentController,
+    RandomTokenPool,
+    RistrettoRedeemer,
+    _get_redemption_worker,
+)
+from ..model import memory_connect
+from .issuer import RistrettoRedemption, issuer_root
+
+# The phases in the order they happen.
+PHASES = ["generate", "blind", "issue", "decode", "unblind", "persist"]
+
+
+def timed(totals, phase, f):
+    """
+    Wrap a function so the time spent in it, or until the ``Deferred`` it
+    returns fires, is added to the total for a phase.
+    """
+
+    def timed_f(*args, **kwargs):
+        before = perf_counter()
+
+        def finished(result):
+            totals[phase] += perf_counter() - before
+            return result
+
+        try:
+            result = f(*args, **kwargs)
+        except BaseException:
+            finished(None)
+            raise
+        if isinstance(result, Deferred):
+            # Count the time until the result is ready, too.
+            return result.addBoth(finished)
+        return finished(result)
+
+    return timed_f
+
+
+class TimedStore:
+    """
+    Delegate to a ``VoucherStore``, adding the time spent persisting tokens
+    to the total for the *persist* phase.
+    """
+
+    def __init__(self, store, totals):
+        self._store = store
+        self.add = timed(totals, "persist", store.add)
+        self.insert_unblinded_tokens_for_voucher = timed(
+            totals, "persist", store.insert_unblinded_tokens_for_voucher
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+
+class TimedHTTPClient:
+    """
+    Delegate to an HTTP client, recording the seconds each POST request took
+    until its response arrived.
+    """
+
+    def __init__(self, client, latencies):
+        self._client = client
+        self._latencies = latencies
+
+    def post(self, *args, **kwargs):
+        before = perf_counter()
+
+        def finished(result):
+            self._latencies.append(perf_counter() - before)
+            return result
+
+        return self._client.post(*args, **kwargs).addBoth(finished)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+@inlineCallbacks
+def redeem_one(reactor, api_root, public_key, num_tokens):
+    """
+    Redeem one new voucher for some tokens.
+
+    :return: A ``Deferred`` that fires with a three-tuple of the seconds the
+        redemption took, a ``dict`` of the seconds spent in each phase, and a
+        ``list`` of the seconds each request to the issuer took.
+    """
+    totals = defaultdict(float)
+    latencies = []
+
+    def observe(event):
+        # Pick up the timings logged by ``RistrettoRedeemer``.
+        if "phase" in event and "elapsed" in event:
+            totals[event["phase"]] += event["elapsed"]
+
+    run_in_worker = _get_redemption_worker(reactor)
+    redeemer = RistrettoRedeemer(
+        TimedHTTPClient(get_http_client(reactor, empty_config), latencies),
+        api_root,
+        run_in_worker,
+        # Make new tokens on demand so their creation is measured.
+        random_tokens=RandomTokenPool(run_in_worker, 0),
+    )
+    redeemer.random_tokens_for_voucher = timed(
+        totals, "generate", redeemer.random_tokens_for_voucher
+    )
+    store = TimedStore(
+        open_store(datetime.now, memory_connect, empty_config),
+        totals,
+    )
+    controller = PaymentController(
+        store,
+        redeemer,
+        default_token_count=num_tokens,
+        allowed_public_keys={public_key},
+        clock=reactor,
+    )
+
+    voucher = b64encode(urandom(32), b"-_")
+    globalLogPublisher.addObserver(observe)
+    try:
+        before = perf_counter()
+        yield controller.redeem(voucher)
+        elapsed = perf_counter() - before
+    finally:
+        globalLogPublisher.removeObserver(observe)
+
+    if store.count_unblinded_tokens() != num_tokens:
+        raise Exception(f"Redemption of {num_tokens} tokens did not complete")
+    return elapsed, totals, latencies
+
+
+@inlineCallbacks
+def main(reactor, *args):
+    parser = ArgumentParser(
+        prog="python -m _zkapauthorizer.tests.benchmark_redemption",
+        description="Measure voucher redemption against a local issuer.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds the issuer waits before each response.",
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=[2 ** n for n in range(9, 18, 2)],
+        help="Voucher sizes, in tokens, to measure.",
+    )
+    options = parser.parse_args(args)
+
+    issuer = RistrettoRedemption(random_signing_key(), options.latency, reactor)
+    port = reactor.listenTCP(0, Site(issuer_root(issuer)), interface="127.0.0.1")
+    api_root = URL.from_text(f"http://127.0.0.1:{port.getHost().port}/")
+    public_key = issuer.public_key.encode_base64().decode("ascii")
+
+    pool = get_connection_pool(reactor, empty_config)
+
+    print(
+        "{:>8} {:>9} {:>11} {:>9} ".format("tokens", "seconds", "tokens/s", "peak MiB")
+        + " ".join("{:>9}".format(phase) for phase in PHASES)
+        + " {:>8} {:>8} {:>8} {:>8} {:>8}".format(
+            "requests", "mean ms", "max ms", "new", "reused"
+        )
+    )
+    start()
+    try:
+        for num_tokens in options.sizes:
+            reset_peak()
+            before = pool.stats()
+            elapsed, totals, latencies = yield redeem_one(
+                reactor, api_root, public_key, num_tokens
+            )
+            peak = get_traced_memory()[1]
+            after = pool.stats()
+            connections = ConnectionStats(
+                after.requests - before.requests,
+                after.new_connections - before.new_connections,
+            )
+            print(
+                "{:>8} {:>9.3f} {:>11.1f} {:>9.1f} ".format(
+                    num_tokens, elapsed, num_tokens / elapsed, peak / 2 ** 20
+                )
+                + " ".join("{:>9.3f}".format(totals[phase]) for phase in PHASES)
+                + " {:>8} {:>8.1f} {:>8.1f} {:>8} {:>8}".format(
+                    len(latencies),
+                    1000 * sum(latencies) / len(latencies),
+                    1000 * max(latencies),
+                    connections.new_connections,
+                    connections.reused_connections,
+                )
+            )
+    finally:
+        yield port.stopListening()
+
+
+if __name__ == "__main__":
+    react(main, argv[1:])
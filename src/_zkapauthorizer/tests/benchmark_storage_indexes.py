@@ -0,0 +1,124 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the memory and time it takes to collect the storage indexes at the
+start of a lease maintenance crawl.
+
+Run it like::
+
+  python -m _zkapauthorizer.tests.benchmark_storage_indexes 10000 100000 1000000
+
+For each number of storage indexes this reports the seconds and the peak
+memory allocated by Python to collect them with ``iter_storage_indexes``
+and, for comparison, with a ``set`` of ``bytes`` sorted into a ``list``.
+"""
+
+from argparse import ArgumentParser
+from os import urandom
+from sys import argv
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+
+from twisted.internet.defer import succeed
+
+from ..lease_maintenance import iter_storage_indexes
+
+
+def visit_assets_for(count):
+    """
+    Make a ``visit_assets`` function which visits some random storage
+    indexes.  Each visit gets a new ``bytes`` like it does when the storage
+    index comes from a node.
+    """
+    storage_indexes = urandom(16 * count)
+
+    def visit_assets(visit):
+        for offset in range(0, len(storage_indexes), 16):
+            visit(storage_indexes[offset : offset + 16])
+        return succeed(None)
+
+    return visit_assets
+
+
+def collect_list(visit_assets):
+    """
+    Collect storage indexes the way lease maintenance used to.
+    """
+    storage_indexes = set()
+    d = visit_assets(storage_indexes.add)
+    d.addCallback(lambda ignored: sorted(storage_indexes))
+    return d
+
+
+def measure(collect, visit_assets):
+    """
+    Collect storage indexes twice, once to time it and once to trace its
+    memory use.
+
+    :return: A two-tuple of the seconds it took and the peak bytes allocated
+        while doing it, including the collected storage indexes.
+    """
+    before = perf_counter()
+    collect(visit_assets)
+    elapsed = perf_counter() - before
+
+    result = []
+    start()
+    try:
+        baseline = get_traced_memory()[0]
+        reset_peak()
+        collect(visit_assets).addCallback(result.append)
+        peak = get_traced_memory()[1] - baseline
+    finally:
+        stop()
+    return elapsed, peak
+
+
+def main(*args):
+    parser = ArgumentParser(
+        prog="python -m _zkapauthorizer.tests.benchmark_storage_indexes",
+        description="Measure collecting storage indexes for lease maintenance.",
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=[10 ** n for n in range(3, 7)],
+        help="Numbers of storage indexes to measure.",
+    )
+    options = parser.parse_args(args)
+
+    print(
+        "{:>10} {:>13} {:>10} {:>15} {:>11}".format(
+            "indexes", "list seconds", "list MiB", "packed seconds", "packed MiB"
+        )
+    )
+    for size in options.sizes:
+        visit_assets = visit_assets_for(size)
+        list_elapsed, list_peak = measure(collect_list, visit_assets)
+        packed_elapsed, packed_peak = measure(iter_storage_indexes, visit_assets)
+        print(
+            "{:>10} {:>13.3f} {:>10.1f} {:>15.3f} {:>11.1f}".format(
+                size,
+                list_elapsed,
+                list_peak / 2 ** 20,
+                packed_elapsed,
+                packed_peak / 2 ** 20,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*argv[1:])
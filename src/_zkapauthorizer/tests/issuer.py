@@ -0,0 +1,240 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process stand-ins for the issuer's redemption HTTP API.
+"""
+
+from gzip import decompress
+from json import loads
+
+import attr
+from challenge_bypass_ristretto import BatchDLEQProof, BlindedToken, PublicKey
+from treq.testing import StubTreq
+from twisted.internet.task import deferLater
+from twisted.web.http import BAD_REQUEST, INTERNAL_SERVER_ERROR, UNSUPPORTED_MEDIA_TYPE
+from twisted.web.resource import EncodingResourceWrapper, ErrorPage, Resource
+from twisted.web.server import NOT_DONE_YET, GzipEncoderFactory
+
+from .._json import dumps_utf8
+
+
+def issuer_root(local_issuer, compressed=False):
+    """
+    Create the root resource of an issuer HTTP API which dispatches
+    redemption requests to a local issuer.
+
+    :param bool compressed: If ``True``, the issuer gzip-compresses its
+        responses for clients which accept that.
+    """
+    if compressed:
+        local_issuer = EncodingResourceWrapper(local_issuer, [GzipEncoderFactory()])
+    v1 = Resource()
+    v1.putChild(b"redeem", local_issuer)
+    root = Resource()
+    root.putChild(b"v1", v1)
+    return root
+
+
+def treq_for_loopback_ristretto(local_issuer, compressed=False):
+    """
+    Create a ``treq``-alike which can dispatch to a local issuer.
+
+    :param bool compressed: If ``True``, the issuer gzip-compresses its
+        responses for clients which accept that.
+    """
+    return StubTreq(issuer_root(local_issuer, compressed))
+
+
+class UnexpectedResponseRedemption(Resource):
+    """
+    An ``UnexpectedResponseRedemption`` simulates the Ristretto redemption
+    server but always returns a non-JSON error response.
+    """
+
+    def render_POST(self, request):
+        request.setResponseCode(INTERNAL_SERVER_ERROR)
+        return b"Sorry, this server does not behave well."
+
+
+@attr.s
+class UnsuccessfulRedemption(Resource, object):
+    """
+    A fake redemption server which always returns an unsuccessful response.
+
+    :ivar unicode reason: The value for the ``reason`` field of the result.
+    """
+
+    reason = attr.ib()
+
+    def __attrs_post_init__(self):
+        Resource.__init__(self)
+
+    def render_POST(self, request):
+        request_error = check_redemption_request(request)
+        if request_error is not None:
+            return request_error
+
+        return bad_request(request, {"success": False, "reason": self.reason})
+
+
+def unpaid_redemption():
+    """
+    Return a fake Ristretto redemption server which always refuses to allow
+    vouchers to be redeemed and reports an error that the voucher has not been
+    paid for.
+    """
+    return UnsuccessfulRedemption("unpaid")
+
+
+def already_spent_redemption():
+    """
+    Return a fake Ristretto redemption server which always refuses to allow
+    vouchers to be redeemed and reports an error that the voucher has already
+    been redeemed.
+    """
+    return UnsuccessfulRedemption("double-spend")
+
+
+class RistrettoRedemption(Resource):
+    """
+    A fake redemption server which signs blinded tokens with a real key, as
+    the PaymentServer does.
+
+    :ivar signing_key: The key to sign with.
+
+    :ivar float latency: The number of seconds to wait before responding, in
+        addition to the time spent signing.
+
+    :ivar IReactorTime clock: The clock to wait with.
+    """
+
+    def __init__(self, signing_key, latency=0, clock=None):
+        Resource.__init__(self)
+        self.signing_key = signing_key
+        self.public_key = PublicKey.from_signing_key(signing_key)
+        self.latency = latency
+        if clock is None and latency > 0:
+            from twisted.internet import reactor as clock
+        self.clock = clock
+
+    def render_POST(self, request):
+        request_error = check_redemption_request(request)
+        if request_error is not None:
+            return request_error
+
+        response_body = self._redeem(request)
+        if self.latency == 0:
+            return response_body
+
+        def respond():
+            request.write(response_body)
+            request.finish()
+
+        deferLater(self.clock, self.latency, respond)
+        return NOT_DONE_YET
+
+    def _redeem(self, request):
+        """
+        Sign the blinded tokens in a redemption request.
+
+        :return bytes: The response body.
+        """
+        request_body = loads(read_request_body(request))
+        marshaled_blinded_tokens = request_body["redeemTokens"]
+        servers_blinded_tokens = list(
+            BlindedToken.decode_base64(marshaled_blinded_token.encode("ascii"))
+            for marshaled_blinded_token in marshaled_blinded_tokens
+        )
+        servers_signed_tokens = list(
+            self.signing_key.sign(blinded_token)
+            for blinded_token in servers_blinded_tokens
+        )
+        marshaled_signed_tokens = list(
+            signed_token.encode_base64() for signed_token in servers_signed_tokens
+        )
+        servers_proof = BatchDLEQProof.create(
+            self.signing_key,
+            servers_blinded_tokens,
+            servers_signed_tokens,
+        )
+        try:
+            marshaled_proof = servers_proof.encode_base64()
+        finally:
+            servers_proof.destroy()
+
+        return dumps_utf8(
+            {
+                "success": True,
+                "public-key": self.public_key.encode_base64().decode("utf-8"),
+                "signatures": list(t.decode("utf-8") for t in marshaled_signed_tokens),
+                "proof": marshaled_proof.decode("utf-8"),
+            }
+        )
+
+
+def check_redemption_request(request):
+    """
+    Verify that the given request conforms to the redemption server's public
+    interface.
+    """
+    if request.requestHeaders.getRawHeaders(b"content-type") != [b"application/json"]:
+        return bad_content_type(request)
+
+    try:
+        request_body = loads(read_request_body(request))
+    except ValueError:
+        return bad_request(request, None)
+
+    expected_keys = {"redeemVoucher", "redeemCounter", "redeemTokens"}
+    actual_keys = set(request_body.keys())
+    if expected_keys != actual_keys:
+        return bad_request(
+            request,
+            {
+                "success": False,
+                "reason": "{} != {}".format(
+                    expected_keys,
+                    actual_keys,
+                ),
+            },
+        )
+    return None
+
+
+def read_request_body(request):
+    """
+    Read the body of a request, decompressing it if necessary.
+    """
+    p = request.content.tell()
+    content = request.content.read()
+    request.content.seek(p)
+    if request.requestHeaders.getRawHeaders(b"content-encoding") == [b"gzip"]:
+        content = decompress(content)
+    return content
+
+
+def bad_request(request, body_object):
+    request.setResponseCode(BAD_REQUEST)
+    request.setHeader(b"content-type", b"application/json")
+    request.write(dumps_utf8(body_object))
+    return b""
+
+
+def bad_content_type(request):
+    return ErrorPage(
+        UNSUPPORTED_MEDIA_TYPE,
+        b"Unsupported media type",
+        b"Unsupported media type",
+    ).render(request)
@@ -64,6 +64,8 @@ from ..model import (
     Unpaid,
     Voucher,
 )
+from ..replicate import EVENT_STREAM_TABLE
+from ..schema import UNREPLICATED_TABLES
 from ..sql import Column, Delete, Insert, StorageAffinity, Table, Update
 
 _POSIX_EPOCH = datetime.utcfromtimestamp(0)
@@ -467,6 +469,15 @@ def lease_maintenance_configurations():
         interval_means(),
         integer_seconds_timedeltas(),
         integer_seconds_timedeltas(),
+        integers(min_value=1, max_value=64),
+        integers(min_value=1, max_value=10000),
+        integers(min_value=1, max_value=64),
+        integers(min_value=1, max_value=64),
+        integer_seconds_timedeltas(),
+        integers(min_value=1, max_value=64),
+        integer_seconds_timedeltas(),
+        integers(min_value=0, max_value=1000),
+        integer_seconds_timedeltas(),
     )
 
 
@@ -971,6 +982,9 @@ class _LeafNode(object):
     def get_storage_index(self):
         return self._storage_index
 
+    def get_uri(self):
+        return b"URI:fake:" + urlsafe_b64encode(self._storage_index)
+
     # For testing
     def flatten(self):
         return [self]
@@ -992,6 +1006,9 @@ class _DirectoryNode(object):
     def get_storage_index(self):
         return self._storage_index
 
+    def get_uri(self):
+        return b"URI:fake-dir:" + urlsafe_b64encode(self._storage_index)
+
     # For testing
     def flatten(self):
         result = [self]
@@ -1200,6 +1217,19 @@ def sql_identifiers() -> SearchStrategy[str]:
     )
 
 
+def table_names() -> SearchStrategy[str]:
+    """
+    Build strings suitable for use as the names of SQLite3 tables created by
+    something other than the store itself.  Names SQLite3 or the store reserve
+    for their own tables are never built.
+    """
+    return sql_identifiers().filter(
+        lambda name: name != EVENT_STREAM_TABLE
+        and name not in UNREPLICATED_TABLES
+        and not name.startswith("sqlite_")
+    )
+
+
 def tables() -> SearchStrategy[Table]:
     """
     Build objects describing tables in a SQLite3 database.
@@ -35,6 +35,7 @@ from hypothesis.strategies import (
     datetimes,
     dictionaries,
     fixed_dictionaries,
+    floats,
     integers,
     just,
     lists,
@@ -50,6 +51,7 @@ from testtools import TestCase
 from testtools.content import text_content
 from testtools.matchers import (
     AfterPreprocessing,
+    AllMatch,
     Always,
     ContainsDict,
     Equals,
@@ -63,6 +65,7 @@ from testtools.matchers import (
     Not,
 )
 from testtools.twistedsupport import CaptureTwistedLogs, succeeded
+from testtools.twistedsupport._deferred import extract_result
 from treq.testing import RequestTraversalAgent
 from twisted.internet.task import Clock, Cooperator
 from twisted.python.filepath import FilePath
@@ -74,6 +77,7 @@ from twisted.web.http import (
     INTERNAL_SERVER_ERROR,
     NOT_FOUND,
     NOT_IMPLEMENTED,
+    NOT_MODIFIED,
     OK,
     UNAUTHORIZED,
 )
@@ -97,7 +101,7 @@ from ..model import (
 )
 from ..pricecalculator import PriceCalculator
 from ..recover import make_fail_downloader, noop_downloader
-from ..replicate import ReplicationAlreadySetup, fail_setup_replication
+from ..replicate import ReplicationAlreadySetup, ReplicationLag, fail_setup_replication
 from ..resource import NUM_TOKENS, from_configuration, get_token_count
 from ..storage_common import (
     get_configured_allowed_public_keys,
@@ -216,6 +220,7 @@ def root_from_config(
     now,
     get_downloader=get_fail_downloader,
     setup_replication=fail_setup_replication,
+    get_replication_lag=lambda: None,
 ):
     """
     Create a client root resource from a Tahoe-LAFS configuration.
@@ -237,6 +242,7 @@ def root_from_config(
         get_downloader=get_downloader,
         setup_replication=setup_replication,
         clock=Clock(),
+        get_replication_lag=get_replication_lag,
     )
 
 
@@ -641,6 +647,95 @@ class ReplicateTests(TestCase):
             ),
         )
 
+    @given(
+        tahoe_configs(),
+        api_auth_tokens(),
+    )
+    def test_not_replicating(self, get_config, api_auth_token):
+        """
+        If replication is not running then a **GET** returns a response with a
+        200 status code and an application/json-encoded body saying so.
+        """
+        config = get_config_with_api_token(
+            self.useFixture(TempDir()),
+            get_config,
+            api_auth_token,
+        )
+        root = root_from_config(config, datetime.now)
+        agent = RequestTraversalAgent(root)
+        requesting = authorized_request(
+            api_auth_token,
+            agent,
+            b"GET",
+            b"http://127.0.0.1/replicate",
+        )
+        self.assertThat(
+            requesting,
+            succeeded(
+                matches_response(
+                    code_matcher=Equals(OK),
+                    headers_matcher=application_json(),
+                    body_matcher=matches_json(Equals({"replicating": False})),
+                ),
+            ),
+        )
+
+    @given(
+        tahoe_configs(),
+        api_auth_tokens(),
+        integers(min_value=0),
+        integers(min_value=0),
+        one_of(none(), floats(min_value=0, allow_infinity=False)),
+    )
+    def test_lag(
+        self,
+        get_config,
+        api_auth_token,
+        statements,
+        size,
+        seconds_since_upload,
+    ):
+        """
+        If replication is running then a **GET** returns a response with a 200
+        status code and an application/json-encoded body describing how far
+        behind the local database the replica is.
+        """
+        config = get_config_with_api_token(
+            self.useFixture(TempDir()),
+            get_config,
+            api_auth_token,
+        )
+        lag = ReplicationLag(statements, size, seconds_since_upload)
+        root = root_from_config(config, datetime.now, get_replication_lag=lambda: lag)
+        agent = RequestTraversalAgent(root)
+        requesting = authorized_request(
+            api_auth_token,
+            agent,
+            b"GET",
+            b"http://127.0.0.1/replicate",
+        )
+        self.assertThat(
+            requesting,
+            succeeded(
+                matches_response(
+                    code_matcher=Equals(OK),
+                    headers_matcher=application_json(),
+                    body_matcher=matches_json(
+                        Equals(
+                            {
+                                "replicating": True,
+                                "lag": {
+                                    "unuploaded-statements": statements,
+                                    "unuploaded-bytes": size,
+                                    "seconds-since-upload": seconds_since_upload,
+                                },
+                            }
+                        ),
+                    ),
+                ),
+            ),
+        )
+
 
 class RecoverTests(TestCase):
     """
@@ -1115,6 +1210,105 @@ class VoucherTests(TestCase):
             ),
         )
 
+    @given(
+        direct_tahoe_configs(client_dummyredeemer_configurations()),
+        api_auth_tokens(),
+        datetimes(),
+        lists(vouchers(), min_size=1, unique=True),
+    )
+    def test_post_voucher_batch(self, config, api_auth_token, now, vouchers):
+        """
+        When a list of vouchers is ``POST``\ ed to ``VoucherCollection``'s
+        *batch* child an ``OK`` response is returned and all of them are
+        redeemed.
+        """
+        count = get_token_count(NAME, config)
+        add_api_token_to_config(
+            self.useFixture(TempDir()).join("tahoe"),
+            config,
+            api_auth_token,
+        )
+        root = root_from_config(config, lambda: now)
+        agent = RequestTraversalAgent(root)
+        posting = authorized_request(
+            api_auth_token,
+            agent,
+            b"POST",
+            b"http://127.0.0.1/voucher/batch",
+            data=BytesIO(
+                dumps_utf8({"vouchers": list(v.decode("ascii") for v in vouchers)})
+            ),
+        )
+        self.assertThat(posting, succeeded(ok_response()))
+
+        getting = authorized_request(
+            api_auth_token,
+            agent,
+            b"GET",
+            b"http://127.0.0.1/voucher",
+        )
+        self.assertThat(
+            getting,
+            succeeded(
+                AfterPreprocessing(
+                    json_content,
+                    succeeded(
+                        AfterPreprocessing(
+                            lambda body: sorted(
+                                body["vouchers"], key=lambda v: v["number"]
+                            ),
+                            Equals(
+                                list(
+                                    Voucher(
+                                        number=voucher,
+                                        expected_tokens=count,
+                                        created=now,
+                                        state=Redeemed(
+                                            finished=now,
+                                            token_count=count,
+                                        ),
+                                    ).marshal()
+                                    for voucher in sorted(vouchers)
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        )
+
+    @given(
+        tahoe_configs(),
+        api_auth_tokens(),
+        one_of(
+            invalid_bodies(),
+            lists(not_vouchers().map(lambda v: v.decode("utf-8")), min_size=1).map(
+                lambda vouchers: dumps_utf8({"vouchers": vouchers})
+            ),
+        ),
+    )
+    def test_post_voucher_batch_invalid_body(self, get_config, api_auth_token, body):
+        """
+        If the body of a ``POST`` to ``VoucherCollection``'s *batch* child does
+        not consist of an object with a single *vouchers* property holding a
+        list of vouchers then the response is *BAD REQUEST*.
+        """
+        config = get_config_with_api_token(
+            self.useFixture(TempDir()),
+            get_config,
+            api_auth_token,
+        )
+        root = root_from_config(config, datetime.now)
+        agent = RequestTraversalAgent(root)
+        requesting = authorized_request(
+            api_auth_token,
+            agent,
+            b"POST",
+            b"http://127.0.0.1/voucher/batch",
+            data=BytesIO(body),
+        )
+        self.assertThat(requesting, succeeded(bad_request_response()))
+
     @given(tahoe_configs(), api_auth_tokens(), not_vouchers())
     def test_get_invalid_voucher(self, get_config, api_auth_token, not_voucher):
         """
@@ -1404,7 +1598,7 @@ class VoucherTests(TestCase):
     def test_list_vouchers(self, config, api_auth_token, now, vouchers):
         """
         A ``GET`` to the ``VoucherCollection`` itself returns a list of existing
-        vouchers.
+        vouchers in order by number.
         """
         count = get_token_count(NAME, config)
         return self._test_list_vouchers(
@@ -1424,7 +1618,7 @@ class VoucherTests(TestCase):
                                 token_count=count,
                             ),
                         ).marshal()
-                        for voucher in vouchers
+                        for voucher in sorted(vouchers)
                     ),
                 }
             ),
@@ -1460,12 +1654,173 @@ class VoucherTests(TestCase):
                                 finished=now,
                             ),
                         ).marshal()
-                        for voucher in vouchers
+                        for voucher in sorted(vouchers)
                     ),
                 }
             ),
         )
 
+    @given(
+        direct_tahoe_configs(client_dummyredeemer_configurations()),
+        api_auth_tokens(),
+        datetimes(),
+        lists(vouchers(), unique=True),
+        integers(min_value=1, max_value=5),
+    )
+    def test_list_vouchers_pages(self, config, api_auth_token, now, vouchers, limit):
+        """
+        A ``GET`` to the ``VoucherCollection`` with a *limit* returns no more
+        than that many vouchers in the requested *state* and, if there are
+        more, a *next* value to pass as *after* to get the next page.
+        """
+        add_api_token_to_config(
+            self.useFixture(TempDir()).join("tahoe"),
+            config,
+            api_auth_token,
+        )
+        root = root_from_config(config, lambda: now)
+        agent = RequestTraversalAgent(root)
+        for voucher in vouchers:
+            putting = authorized_request(
+                api_auth_token,
+                agent,
+                b"PUT",
+                b"http://127.0.0.1/voucher",
+                data=BytesIO(dumps_utf8({"voucher": voucher.decode("ascii")})),
+            )
+            self.assertThat(putting, succeeded(ok_response()))
+
+        def get_pages(state):
+            pages = []
+
+            def get(after):
+                url = f"http://127.0.0.1/voucher?state={state}&limit={limit}"
+                if after is not None:
+                    url += "&after=" + quote(after, safe="")
+                d = authorized_request(api_auth_token, agent, b"GET", url.encode())
+                d.addCallback(json_content)
+                d.addCallback(got)
+                return d
+
+            def got(page):
+                pages.append(list(voucher["number"] for voucher in page["vouchers"]))
+                if "next" in page:
+                    return get(page["next"])
+                return pages
+
+            return get(None)
+
+        self.expectThat(
+            get_pages("redeemed"),
+            succeeded(
+                MatchesAll(
+                    AfterPreprocessing(
+                        lambda pages: sum(pages, []),
+                        Equals(sorted(v.decode("ascii") for v in vouchers)),
+                    ),
+                    AfterPreprocessing(
+                        lambda pages: pages[:-1],
+                        AllMatch(HasLength(limit)),
+                    ),
+                ),
+            ),
+        )
+        self.expectThat(get_pages("pending"), succeeded(Equals([[]])))
+
+    @given(
+        tahoe_configs(),
+        api_auth_tokens(),
+        sampled_from(
+            [b"state=bogus", b"limit=0", b"limit=x", b"after=not-a-voucher"],
+        ),
+    )
+    def test_list_vouchers_invalid_query(self, get_config, api_auth_token, query):
+        """
+        If the query arguments of a ``GET`` to the ``VoucherCollection`` are not
+        valid then the response is **BAD REQUEST**.
+        """
+        config = get_config_with_api_token(
+            self.useFixture(TempDir()),
+            get_config,
+            api_auth_token,
+        )
+        root = root_from_config(config, datetime.now)
+        agent = RequestTraversalAgent(root)
+        requesting = authorized_request(
+            api_auth_token,
+            agent,
+            b"GET",
+            b"http://127.0.0.1/voucher?" + query,
+        )
+        self.assertThat(requesting, succeeded(bad_request_response()))
+
+    @given(
+        direct_tahoe_configs(client_dummyredeemer_configurations()),
+        api_auth_tokens(),
+        datetimes(),
+        vouchers(),
+    )
+    def test_not_modified(self, config, api_auth_token, now, voucher):
+        """
+        A ``GET`` of the ``VoucherCollection`` or of a voucher includes an
+        **ETag** and a later ``GET`` with that tag in **If-None-Match** gets a
+        **NOT MODIFIED** response until the vouchers change.
+        """
+        add_api_token_to_config(
+            self.useFixture(TempDir()).join("tahoe"),
+            config,
+            api_auth_token,
+        )
+        root = root_from_config(config, lambda: now)
+        agent = RequestTraversalAgent(root)
+        voucher_url = b"http://127.0.0.1/voucher/" + voucher
+
+        def get(url, etag=None):
+            headers = None if etag is None else {"if-none-match": [etag]}
+            return extract_result(
+                authorized_request(api_auth_token, agent, b"GET", url, headers)
+            )
+
+        def etag_of(response):
+            return response.headers.getRawHeaders("etag", [None])[0]
+
+        listed = get(b"http://127.0.0.1/voucher")
+        self.expectThat(listed.code, Equals(OK))
+        etag = etag_of(listed)
+        self.expectThat(etag, Not(Is(None)))
+        self.expectThat(
+            get(b"http://127.0.0.1/voucher", etag).code, Equals(NOT_MODIFIED)
+        )
+
+        # An error response can't be revalidated.
+        self.expectThat(etag_of(get(voucher_url)), Is(None))
+
+        putting = authorized_request(
+            api_auth_token,
+            agent,
+            b"PUT",
+            b"http://127.0.0.1/voucher",
+            data=BytesIO(dumps_utf8({"voucher": voucher.decode("ascii")})),
+        )
+        self.assertThat(putting, succeeded(ok_response()))
+
+        listed = get(b"http://127.0.0.1/voucher", etag)
+        self.expectThat(listed.code, Equals(OK))
+        self.expectThat(etag_of(listed), Not(Equals(etag)))
+        self.expectThat(
+            json_content(listed),
+            succeeded(
+                AfterPreprocessing(
+                    lambda body: [v["number"] for v in body["vouchers"]],
+                    Equals([voucher.decode("ascii")]),
+                ),
+            ),
+        )
+
+        viewed = get(voucher_url)
+        self.expectThat(viewed.code, Equals(OK))
+        self.expectThat(get(voucher_url, etag_of(viewed)).code, Equals(NOT_MODIFIED))
+
     def _test_list_vouchers(
         self, config, api_auth_token, now, vouchers, match_response_object
     ):
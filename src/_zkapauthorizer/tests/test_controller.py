@@ -18,12 +18,8 @@ Tests for ``_zkapauthorizer.controller``.
 
 from datetime import datetime, timedelta
 from functools import partial
-from json import loads
 
-import attr
 from challenge_bypass_ristretto import (
-    BatchDLEQProof,
-    BlindedToken,
     PublicKey,
     SecurityException,
     TokenPreimage,
@@ -38,26 +34,31 @@ from testtools.matchers import (
     AfterPreprocessing,
     AllMatch,
     Always,
+    Contains,
     Equals,
     HasLength,
     Is,
     IsInstance,
     MatchesAll,
     MatchesStructure,
+    Not,
 )
 from testtools.twistedsupport import failed, has_no_result, succeeded
-from treq.testing import StubTreq
-from twisted.internet.defer import fail, succeed
+from testtools.twistedsupport._deferred import extract_result
+from twisted.internet.defer import Deferred, fail, succeed
 from twisted.internet.task import Clock
+from twisted.internet.testing import MemoryReactorClock
+from twisted.logger import Logger
 from twisted.python.url import URL
 from twisted.web.http import BAD_REQUEST, INTERNAL_SERVER_ERROR, UNSUPPORTED_MEDIA_TYPE
 from twisted.web.http_headers import Headers
 from twisted.web.iweb import IAgent
-from twisted.web.resource import ErrorPage, Resource
 from zope.interface import implementer
 
 from .._json import dumps_utf8
 from ..controller import (
+    MAX_RETRY_INTERVAL,
+    RETRY_INTERVAL,
     AlreadySpent,
     DoubleSpendRedeemer,
     DummyRedeemer,
@@ -66,12 +67,17 @@ from ..controller import (
     IRedeemer,
     NonRedeemer,
     PaymentController,
+    RandomTokenPool,
     RecordingRedeemer,
+    RedemptionResult,
     RistrettoRedeemer,
+    RoundRobinSemaphore,
     UnexpectedResponse,
     Unpaid,
     UnpaidRedeemer,
     UnrecognizedFailureReason,
+    _get_redemption_worker,
+    _redemption_pools,
     bracket,
     token_count_for_group,
 )
@@ -84,6 +90,14 @@ from ..model import Redeeming as model_Redeeming
 from ..model import UnblindedToken
 from ..model import Unpaid as model_Unpaid
 from .fixtures import ConfiglessMemoryVoucherStore, TemporaryVoucherStore
+from .issuer import (
+    RistrettoRedemption,
+    UnexpectedResponseRedemption,
+    UnsuccessfulRedemption,
+    already_spent_redemption,
+    treq_for_loopback_ristretto,
+    unpaid_redemption,
+)
 from .matchers import Provides, between, raises
 from .strategies import (
     clocks,
@@ -160,6 +174,176 @@ class TokenCountForGroupTests(TestCase):
         )
 
 
+class RandomTokenPoolTests(TestCase):
+    """
+    Tests for ``RandomTokenPool``.
+    """
+
+    @given(integers(min_value=0, max_value=100), integers(min_value=1, max_value=30))
+    def test_refill(self, capacity, batch_size):
+        """
+        ``RandomTokenPool.refill`` creates tokens until the pool holds
+        ``capacity`` of them.
+        """
+        pool = RandomTokenPool(capacity=capacity, batch_size=batch_size)
+        pool.refill()
+        self.assertThat(pool, HasLength(capacity))
+
+    @given(integers(min_value=1, max_value=100), integers(min_value=0, max_value=200))
+    def test_take(self, capacity, count):
+        """
+        ``RandomTokenPool.take`` returns the requested number of distinct
+        tokens, using tokens from the pool first, and refills the pool.
+        """
+        pool = RandomTokenPool(capacity=capacity)
+        pool.refill()
+        ready = list(pool._tokens)
+        taken = extract_result(pool.take(count))
+        self.expectThat(taken, HasLength(count))
+        self.expectThat(taken[:capacity], Equals(ready[:count]))
+        self.expectThat(len(set(taken) | set(pool._tokens)), Equals(count + capacity))
+        self.expectThat(pool, HasLength(capacity))
+
+    def test_one_refill_at_a_time(self):
+        """
+        While tokens are being created for the pool, ``RandomTokenPool.refill``
+        does not start creating more.
+        """
+        calls = []
+
+        def worker(f, *args):
+            d = Deferred()
+            calls.append((d, f, args))
+            return d
+
+        pool = RandomTokenPool(worker, capacity=10, batch_size=4)
+        pool.refill()
+        pool.refill()
+        self.assertThat(calls, HasLength(1))
+
+        d, f, args = calls.pop()
+        d.callback(f(*args))
+        # The first batch arrived and the next one was started.
+        self.expectThat(pool, HasLength(4))
+        self.expectThat(calls, HasLength(1))
+
+    def test_shortfall_in_worker(self):
+        """
+        ``RandomTokenPool.take`` creates any tokens the pool cannot supply with
+        its worker function, before it refills the pool.
+        """
+        calls = []
+
+        def worker(f, *args):
+            d = Deferred()
+            calls.append((d, f, args))
+            return d
+
+        pool = RandomTokenPool(worker, capacity=10, batch_size=4)
+        taking = pool.take(3)
+        self.assertThat(taking, has_no_result())
+        self.assertThat(calls, HasLength(2))
+
+        d, f, args = calls.pop(0)
+        self.expectThat(args, Equals((3,)))
+        d.callback(f(*args))
+        self.assertThat(taking, succeeded(HasLength(3)))
+
+    def test_failed_refill(self):
+        """
+        If creating tokens for the pool fails then the failure is logged and
+        a later ``RandomTokenPool.refill`` tries again.
+        """
+        logged = []
+        self.patch(RandomTokenPool, "_log", Logger(observer=logged.append))
+        results = [fail(Exception("nope")), None]
+
+        def worker(f, *args):
+            result = results.pop(0)
+            if result is None:
+                return succeed(f(*args))
+            return result
+
+        pool = RandomTokenPool(worker, capacity=3)
+        pool.refill()
+        self.expectThat(pool, HasLength(0))
+        self.expectThat(logged, HasLength(1))
+        pool.refill()
+        self.expectThat(pool, HasLength(3))
+
+
+class RedemptionWorkerTests(TestCase):
+    """
+    Tests for ``_get_redemption_worker``.
+    """
+
+    def test_shutdown(self):
+        """
+        The thread pool for a reactor is shared until the reactor shuts down.
+        Then it is stopped and forgotten.
+        """
+        reactor = MemoryReactorClock()
+        worker = _get_redemption_worker(reactor)
+        pool = _redemption_pools[reactor]
+        self.expectThat(_get_redemption_worker(reactor).args, Equals(worker.args))
+
+        [(stop, args, kwargs)] = reactor.triggers["during"]["shutdown"]
+        stop(*args, **kwargs)
+
+        self.expectThat(pool.joined, Equals(True))
+        self.expectThat(_redemption_pools, Not(Contains(reactor)))
+
+
+class RoundRobinSemaphoreTests(TestCase):
+    """
+    Tests for ``RoundRobinSemaphore``.
+    """
+
+    @given(integers(min_value=1, max_value=5), integers(min_value=0, max_value=20))
+    def test_limit(self, limit, count):
+        """
+        ``RoundRobinSemaphore.run`` runs no more than ``limit`` functions at
+        once and starts a waiting one whenever one finishes.
+        """
+        semaphore = RoundRobinSemaphore(limit)
+        running = []
+        for n in range(count):
+            semaphore.run(n % 3, lambda: running.append(Deferred()) or running[-1])
+        self.expectThat(running, HasLength(min(limit, count)))
+        finished = 0
+        while finished < len(running):
+            running[finished].callback(None)
+            finished += 1
+            self.expectThat(
+                len(running) - finished,
+                Equals(min(limit, count - finished)),
+            )
+
+    def test_round_robin(self):
+        """
+        ``RoundRobinSemaphore`` gives free slots to the owners of waiting
+        functions in turn.
+        """
+        semaphore = RoundRobinSemaphore(1)
+        started = []
+        running = []
+
+        def operation(owner, n):
+            started.append((owner, n))
+            running.append(Deferred())
+            return running[-1]
+
+        for owner, n in [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("c", 0)]:
+            semaphore.run(owner, operation, owner, n)
+        for d in running:
+            d.callback(None)
+
+        self.assertThat(
+            started,
+            Equals([("a", 0), ("a", 1), ("b", 0), ("c", 0), ("a", 2)]),
+        )
+
+
 class PaymentControllerTests(TestCase):
     """
     Tests for ``PaymentController``.
@@ -362,6 +546,160 @@ class PaymentControllerTests(TestCase):
             ),
         )
 
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        vouchers(),
+        integers(min_value=1, max_value=8),
+        integers(min_value=1, max_value=8),
+        dummy_ristretto_keys(),
+    )
+    def test_concurrent_redemption(
+        self, get_config, now, voucher, num_redemption_groups, concurrency, public_key
+    ):
+        """
+        If ``redemption_concurrency`` is greater than one then several
+        redemption groups may be redeemed at once and the voucher is marked
+        redeemed once all of them have succeeded.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        controller = PaymentController(
+            store,
+            DummyRedeemer(public_key),
+            default_token_count=num_redemption_groups,
+            num_redemption_groups=num_redemption_groups,
+            allowed_public_keys={public_key},
+            clock=Clock(),
+            redemption_concurrency=concurrency,
+        )
+        self.assertThat(
+            controller.redeem(voucher),
+            succeeded(Always()),
+        )
+        self.assertThat(
+            controller.get_voucher(voucher).state,
+            Equals(
+                model_Redeemed(
+                    finished=now,
+                    token_count=num_redemption_groups,
+                ),
+            ),
+        )
+        self.assertThat(
+            store.get_unblinded_tokens(num_redemption_groups),
+            HasLength(num_redemption_groups),
+        )
+
+    @given(tahoe_configs(), datetimes(), vouchers())
+    def test_started_groups_awaited_on_error(self, get_config, now, voucher):
+        """
+        If getting the random tokens for a redemption group fails after other
+        groups have started redeeming then the attempt fails only once those
+        groups have finished and their results have been recorded.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        redeeming = Deferred()
+
+        @implementer(IRedeemer)
+        class HeldRedeemer(object):
+            def redeemWithCounter(self, voucher, counter, random_tokens):
+                return redeeming
+
+        class TokenFailureRedeemer(IndexedRedeemer):
+            def random_tokens_for_voucher(self, voucher, counter, count):
+                if counter > 0:
+                    raise ValueError("Cannot make random tokens")
+                return IndexedRedeemer.random_tokens_for_voucher(
+                    self, voucher, counter, count
+                )
+
+        controller = PaymentController(
+            store,
+            TokenFailureRedeemer([HeldRedeemer()]),
+            default_token_count=2,
+            num_redemption_groups=2,
+            allowed_public_keys=set(),
+            clock=Clock(),
+            redemption_concurrency=2,
+        )
+        d = controller.redeem(voucher)
+        self.assertThat(d, has_no_result())
+
+        redeeming.errback(Exception("Issuer unavailable"))
+        self.assertThat(
+            d,
+            failed(AfterPreprocessing(lambda f: f.value, IsInstance(ValueError))),
+        )
+        self.assertThat(
+            controller.get_voucher(voucher).state,
+            IsInstance(model_Error),
+        )
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        vouchers(),
+        integers(min_value=2, max_value=8),
+        dummy_ristretto_keys(),
+    )
+    def test_restart_out_of_order(
+        self, get_config, now, voucher, num_redemption_groups, public_key
+    ):
+        """
+        If later redemption groups succeed while an earlier one is still
+        outstanding and the process is interrupted, only the incomplete
+        redemption group is redeemed when it resumes.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        # Every group but the first succeeds on the first try.
+        first = PaymentController(
+            store,
+            IndexedRedeemer(
+                [NonRedeemer()]
+                + [DummyRedeemer(public_key)] * (num_redemption_groups - 1),
+            ),
+            default_token_count=num_redemption_groups,
+            num_redemption_groups=num_redemption_groups,
+            allowed_public_keys={public_key},
+            clock=Clock(),
+            redemption_concurrency=num_redemption_groups,
+        )
+        self.assertThat(
+            first.redeem(voucher),
+            has_no_result(),
+        )
+        self.assertThat(
+            store.get(voucher).state,
+            Equals(model_Pending(counter=0)),
+        )
+        self.assertThat(
+            store.get_redeemed_counters(voucher),
+            Equals(frozenset(range(1, num_redemption_groups))),
+        )
+
+        # Only the first group can succeed on the second try.  The controller
+        # finds the voucher in the store and resumes redemption on its own.
+        second = PaymentController(
+            store,
+            IndexedRedeemer(
+                [DummyRedeemer(public_key)]
+                + [NonRedeemer()] * (num_redemption_groups - 1),
+            ),
+            default_token_count=0,
+            num_redemption_groups=num_redemption_groups,
+            allowed_public_keys={public_key},
+            clock=Clock(),
+        )
+        self.assertThat(
+            second.get_voucher(voucher).state,
+            Equals(
+                model_Redeemed(
+                    finished=now,
+                    token_count=num_redemption_groups,
+                ),
+            ),
+        )
+
     @given(
         tahoe_configs(),
         datetimes(),
@@ -503,7 +841,7 @@ class PaymentControllerTests(TestCase):
     def test_redeem_pending_on_startup(self, get_config, now, voucher, public_key):
         """
         When ``PaymentController`` is created, any vouchers in the store in the
-        pending state are redeemed.
+        pending state are redeemed once their retry delay has passed.
         """
         store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
         # Create the voucher state in the store with a redemption that will
@@ -527,21 +865,164 @@ class PaymentControllerTests(TestCase):
         )
 
         # Create another controller with the same store.  It will see the
-        # voucher state and attempt a redemption on its own.  It has I/O as an
-        # `__init__` side-effect. :/
+        # voucher state and attempt a redemption on its own once the retry
+        # delay from the failure has passed.  It has I/O as an `__init__`
+        # side-effect. :/
+        clock = Clock()
         success_controller = PaymentController(
             store,
             DummyRedeemer(public_key),
             default_token_count=100,
             allowed_public_keys={public_key},
-            clock=Clock(),
+            clock=clock,
         )
+        clock.advance(RETRY_INTERVAL.total_seconds())
 
         self.assertThat(
             success_controller.get_voucher(voucher).state,
             IsInstance(model_Redeemed),
         )
 
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(vouchers(), min_size=1, unique=True),
+        dummy_ristretto_keys(),
+    )
+    def test_redeem_batch(self, get_config, now, vouchers, public_key):
+        """
+        ``PaymentController.redeem_batch`` persists all of the given vouchers
+        and redeems them.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        controller = PaymentController(
+            store,
+            DummyRedeemer(public_key),
+            default_token_count=100,
+            allowed_public_keys={public_key},
+            clock=Clock(),
+        )
+        controller.redeem_batch(vouchers)
+        for voucher in vouchers:
+            self.expectThat(
+                controller.get_voucher(voucher).state,
+                IsInstance(model_Redeemed),
+            )
+        self.expectThat(store.get_redemption_jobs(), Equals([]))
+
+    @given(tahoe_configs(), datetimes())
+    def test_idle_without_jobs(self, get_config, now):
+        """
+        If there are no vouchers which need redemption then
+        ``PaymentController`` does not schedule any calls.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        clock = Clock()
+        PaymentController(
+            store,
+            NonRedeemer(),
+            default_token_count=100,
+            allowed_public_keys=set(),
+            clock=clock,
+        )
+        self.assertThat(clock.getDelayedCalls(), Equals([]))
+
+    @given(
+        tahoe_configs(),
+        clocks(),
+        vouchers(),
+        integers(min_value=1, max_value=20),
+    )
+    def test_retry_backoff(self, get_config, clock, voucher, failures):
+        """
+        Each consecutive unsuccessful redemption attempt for a voucher at least
+        doubles the delay before the next, up to a limit, and the next
+        attempt is remembered in the store.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(
+                get_config,
+                lambda: datetime.utcfromtimestamp(clock.seconds()),
+            ),
+        ).store
+        redeemer = RecordingRedeemer(UnpaidRedeemer())
+        controller = PaymentController(
+            store,
+            redeemer,
+            default_token_count=100,
+            allowed_public_keys=set(),
+            clock=clock,
+        )
+        controller.redeem(voucher)
+        for attempts in range(1, failures + 1):
+            delay = min(
+                RETRY_INTERVAL.total_seconds() * 2 ** (attempts - 1),
+                MAX_RETRY_INTERVAL.total_seconds(),
+            )
+            job = store.get_redemption_job(voucher)
+            self.assertThat(
+                job,
+                MatchesStructure(
+                    attempts=Equals(attempts),
+                    due=between(
+                        clock.seconds() + delay / 2,
+                        clock.seconds() + delay,
+                    ),
+                ),
+            )
+            # Nothing happens before the job is due.
+            clock.advance(job.due - clock.seconds() - 0.01)
+            self.assertThat(redeemer.redemptions, HasLength(attempts))
+            # Advance to exactly the due time.  Advancing by the remaining
+            # difference could land a rounding error short of it.
+            clock.rightNow = job.due
+            clock.advance(0)
+            self.assertThat(redeemer.redemptions, HasLength(attempts + 1))
+
+    @given(tahoe_configs(), datetimes(), vouchers(), dummy_ristretto_keys())
+    def test_job_removed(self, get_config, now, voucher, public_key):
+        """
+        Once a voucher is redeemed, it no longer has a redemption job.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        clock = Clock()
+        controller = PaymentController(
+            store,
+            DummyRedeemer(public_key),
+            default_token_count=100,
+            allowed_public_keys={public_key},
+            clock=clock,
+        )
+        self.assertThat(controller.redeem(voucher), succeeded(Always()))
+        self.expectThat(store.get_redemption_jobs(), Equals([]))
+        self.expectThat(clock.getDelayedCalls(), Equals([]))
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(vouchers(), min_size=2, max_size=5, unique=True),
+        integers(min_value=1, max_value=4),
+    )
+    def test_issuer_concurrency(self, get_config, now, vouchers, limit):
+        """
+        No more than ``issuer_concurrency`` redemption groups are outstanding
+        with the issuer at once, across all vouchers.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        redeemer = RecordingRedeemer(NonRedeemer())
+        controller = PaymentController(
+            store,
+            redeemer,
+            default_token_count=100,
+            allowed_public_keys=set(),
+            clock=Clock(),
+            redemption_concurrency=4,
+            issuer_concurrency=limit,
+        )
+        for voucher in vouchers:
+            controller.redeem(voucher)
+        self.assertThat(redeemer.redemptions, HasLength(limit))
+
     @given(
         tahoe_configs(),
         clocks(),
@@ -776,7 +1257,9 @@ class RistrettoRedeemerTests(TestCase):
         issuer = RistrettoRedemption(signing_key)
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -801,6 +1284,49 @@ class RistrettoRedeemerTests(TestCase):
             ),
         )
 
+    @given(voucher_objects(), voucher_counters(), integers(min_value=1, max_value=100))
+    def test_compressed_redemption(self, voucher, counter, num_tokens):
+        """
+        If ``RistrettoRedeemer`` is configured to compress requests and the
+        issuer compresses responses then the request and response bodies are
+        gzip-compressed and redemption succeeds.
+        """
+        message = b"hello world"
+        signing_key = random_signing_key()
+        issuer = RistrettoRedemption(signing_key)
+        encodings = []
+        render_POST = issuer.render_POST
+
+        def recording_render_POST(request):
+            encodings.append(
+                (
+                    request.requestHeaders.getRawHeaders(b"content-encoding"),
+                    request.requestHeaders.getRawHeaders(b"accept-encoding"),
+                )
+            )
+            return render_POST(request)
+
+        issuer.render_POST = recording_render_POST
+        treq = treq_for_loopback_ristretto(issuer, compressed=True)
+        redeemer = RistrettoRedeemer(treq, NOWHERE, compress_requests=True)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
+        d = redeemer.redeemWithCounter(voucher, counter, random_tokens)
+        d.addCallback(
+            lambda result: redeemer.tokens_to_passes(message, result.unblinded_tokens)
+        )
+        self.assertThat(
+            d,
+            succeeded(
+                AfterPreprocessing(
+                    partial(ristretto_verify, signing_key, message),
+                    Equals(True),
+                ),
+            ),
+        )
+        self.assertThat(encodings, Equals([([b"gzip"], [b"gzip"])]))
+
     @given(voucher_objects(), voucher_counters(), integers(min_value=0, max_value=100))
     def test_non_json_response(self, voucher, counter, num_tokens):
         """
@@ -811,7 +1337,9 @@ class RistrettoRedeemerTests(TestCase):
         issuer = UnexpectedResponseRedemption()
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
 
         d = redeemer.redeemWithCounter(
             voucher,
@@ -846,7 +1374,9 @@ class RistrettoRedeemerTests(TestCase):
         issuer = already_spent_redemption()
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -874,7 +1404,9 @@ class RistrettoRedeemerTests(TestCase):
         issuer = unpaid_redemption()
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -902,7 +1434,9 @@ class RistrettoRedeemerTests(TestCase):
         issuer = UnsuccessfulRedemption(details)
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -943,7 +1477,9 @@ class RistrettoRedeemerTests(TestCase):
 
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -973,7 +1509,9 @@ class RistrettoRedeemerTests(TestCase):
         treq = treq_for_loopback_ristretto(issuer)
         redeemer = RistrettoRedeemer(treq, NOWHERE)
 
-        random_tokens = redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
         d = redeemer.redeemWithCounter(
             voucher,
             counter,
@@ -996,6 +1534,59 @@ class RistrettoRedeemerTests(TestCase):
             ),
         )
 
+    @given(
+        voucher_objects(),
+        voucher_counters(),
+        integers(min_value=1, max_value=100),
+        integers(min_value=1, max_value=10),
+    )
+    def test_chunked_work(self, voucher, counter, num_tokens, chunk_size):
+        """
+        ``RistrettoRedeemer`` hands blinding and decoding to its worker in
+        chunks of no more than its chunk size and the proof verification in a
+        single piece, and the result is the same as if the work were not
+        divided.
+        """
+        message = b"hello world"
+        signing_key = random_signing_key()
+        issuer = RistrettoRedemption(signing_key)
+        treq = treq_for_loopback_ristretto(issuer)
+        sizes = []
+
+        def worker(f, *args):
+            sizes.append((f.__name__, len(args[-1])))
+            return succeed(f(*args))
+
+        redeemer = RistrettoRedeemer(treq, NOWHERE, worker, chunk_size)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, num_tokens)
+        )
+        d = redeemer.redeemWithCounter(voucher, counter, random_tokens)
+        d.addCallback(
+            lambda result: redeemer.tokens_to_passes(message, result.unblinded_tokens)
+        )
+        self.assertThat(
+            d,
+            succeeded(
+                AfterPreprocessing(
+                    partial(ristretto_verify, signing_key, message),
+                    Equals(True),
+                ),
+            ),
+        )
+        chunks = [
+            (n, min(chunk_size, num_tokens - n))
+            for n in range(0, num_tokens, chunk_size)
+        ]
+        self.assertThat(
+            sizes,
+            Equals(
+                [("_blind_tokens", size) for (_, size) in chunks]
+                + [("_decode_signed_tokens", size) for (_, size) in chunks]
+                + [("_unblind_tokens", num_tokens)],
+            ),
+        )
+
 
 def ristretto_verify(signing_key, message, marshaled_passes):
     """
@@ -1049,17 +1640,6 @@ def ristretto_verify(signing_key, message, marshaled_passes):
     return not any(invalid_passes)
 
 
-def treq_for_loopback_ristretto(local_issuer):
-    """
-    Create a ``treq``-alike which can dispatch to a local issuer.
-    """
-    v1 = Resource()
-    v1.putChild(b"redeem", local_issuer)
-    root = Resource()
-    root.putChild(b"v1", v1)
-    return StubTreq(root)
-
-
 @implementer(IAgent)
 class _StubAgent(object):
     def request(self, method, uri, headers=None, bodyProducer=None):
@@ -1070,100 +1650,6 @@ def stub_agent():
     return _StubAgent()
 
 
-class UnexpectedResponseRedemption(Resource):
-    """
-    An ``UnexpectedResponseRedemption`` simulates the Ristretto redemption
-    server but always returns a non-JSON error response.
-    """
-
-    def render_POST(self, request):
-        request.setResponseCode(INTERNAL_SERVER_ERROR)
-        return b"Sorry, this server does not behave well."
-
-
-@attr.s
-class UnsuccessfulRedemption(Resource, object):
-    """
-    A fake redemption server which always returns an unsuccessful response.
-
-    :ivar unicode reason: The value for the ``reason`` field of the result.
-    """
-
-    reason = attr.ib()
-
-    def __attrs_post_init__(self):
-        Resource.__init__(self)
-
-    def render_POST(self, request):
-        request_error = check_redemption_request(request)
-        if request_error is not None:
-            return request_error
-
-        return bad_request(request, {"success": False, "reason": self.reason})
-
-
-def unpaid_redemption():
-    """
-    Return a fake Ristretto redemption server which always refuses to allow
-    vouchers to be redeemed and reports an error that the voucher has not been
-    paid for.
-    """
-    return UnsuccessfulRedemption("unpaid")
-
-
-def already_spent_redemption():
-    """
-    Return a fake Ristretto redemption server which always refuses to allow
-    vouchers to be redeemed and reports an error that the voucher has already
-    been redeemed.
-    """
-    return UnsuccessfulRedemption("double-spend")
-
-
-class RistrettoRedemption(Resource):
-    def __init__(self, signing_key):
-        Resource.__init__(self)
-        self.signing_key = signing_key
-        self.public_key = PublicKey.from_signing_key(signing_key)
-
-    def render_POST(self, request):
-        request_error = check_redemption_request(request)
-        if request_error is not None:
-            return request_error
-
-        request_body = loads(request.content.read())
-        marshaled_blinded_tokens = request_body["redeemTokens"]
-        servers_blinded_tokens = list(
-            BlindedToken.decode_base64(marshaled_blinded_token.encode("ascii"))
-            for marshaled_blinded_token in marshaled_blinded_tokens
-        )
-        servers_signed_tokens = list(
-            self.signing_key.sign(blinded_token)
-            for blinded_token in servers_blinded_tokens
-        )
-        marshaled_signed_tokens = list(
-            signed_token.encode_base64() for signed_token in servers_signed_tokens
-        )
-        servers_proof = BatchDLEQProof.create(
-            self.signing_key,
-            servers_blinded_tokens,
-            servers_signed_tokens,
-        )
-        try:
-            marshaled_proof = servers_proof.encode_base64()
-        finally:
-            servers_proof.destroy()
-
-        return dumps_utf8(
-            {
-                "success": True,
-                "public-key": self.public_key.encode_base64().decode("utf-8"),
-                "signatures": list(t.decode("utf-8") for t in marshaled_signed_tokens),
-                "proof": marshaled_proof.decode("utf-8"),
-            }
-        )
-
-
 class CheckRedemptionRequestTests(TestCase):
     """
     Tests for ``check_redemption_request``.
@@ -1246,52 +1732,33 @@ class CheckRedemptionRequestTests(TestCase):
         )
 
 
-def check_redemption_request(request):
+class RistrettoRedemptionTests(TestCase):
     """
-    Verify that the given request conforms to the redemption server's public
-    interface.
+    Tests for the ``RistrettoRedemption`` fake issuer.
     """
-    if request.requestHeaders.getRawHeaders(b"content-type") != [b"application/json"]:
-        return bad_content_type(request)
-
-    p = request.content.tell()
-    content = request.content.read()
-    request.content.seek(p)
-
-    try:
-        request_body = loads(content)
-    except ValueError:
-        return bad_request(request, None)
-
-    expected_keys = {"redeemVoucher", "redeemCounter", "redeemTokens"}
-    actual_keys = set(request_body.keys())
-    if expected_keys != actual_keys:
-        return bad_request(
-            request,
-            {
-                "success": False,
-                "reason": "{} != {}".format(
-                    expected_keys,
-                    actual_keys,
-                ),
-            },
-        )
-    return None
-
 
-def bad_request(request, body_object):
-    request.setResponseCode(BAD_REQUEST)
-    request.setHeader(b"content-type", b"application/json")
-    request.write(dumps_utf8(body_object))
-    return b""
+    @given(voucher_objects(), voucher_counters(), integers(min_value=1, max_value=10))
+    def test_latency(self, voucher, counter, latency):
+        """
+        ``RistrettoRedemption`` responds once its latency has passed and not
+        before.
+        """
+        clock = Clock()
+        issuer = RistrettoRedemption(random_signing_key(), latency, clock)
+        treq = treq_for_loopback_ristretto(issuer)
+        redeemer = RistrettoRedeemer(treq, NOWHERE)
+        random_tokens = extract_result(
+            redeemer.random_tokens_for_voucher(voucher, counter, 1)
+        )
+        d = redeemer.redeemWithCounter(voucher, counter, random_tokens)
 
+        clock.advance(latency - 0.5)
+        treq.flush()
+        self.assertThat(d, has_no_result())
 
-def bad_content_type(request):
-    return ErrorPage(
-        UNSUPPORTED_MEDIA_TYPE,
-        b"Unsupported media type",
-        b"Unsupported media type",
-    ).render(request)
+        clock.advance(0.5)
+        treq.flush()
+        self.assertThat(d, succeeded(IsInstance(RedemptionResult)))
 
 
 class _BracketTestMixin:
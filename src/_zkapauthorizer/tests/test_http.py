@@ -0,0 +1,156 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests for ``_zkapauthorizer._http``.
+"""
+
+from allmydata.client import config_from_string
+from fixtures import TempDir
+from prometheus_client import CollectorRegistry
+from testtools import TestCase
+from testtools.matchers import Contains, Equals, Is, MatchesStructure, Not
+from twisted.internet.defer import Deferred
+from twisted.internet.testing import MemoryReactorClock
+
+from .. import NAME
+from .._http import ConnectionStats, MeasuredConnectionPool, _pools, get_connection_pool
+from ..config import empty_config
+
+
+class _Endpoint:
+    """
+    An endpoint which never finishes connecting.
+    """
+
+    def connect(self, factory):
+        return Deferred()
+
+
+class _Connection:
+    """
+    An idle HTTP connection, as far as ``HTTPConnectionPool`` can tell.
+    """
+
+    state = "QUIESCENT"
+
+
+class MeasuredConnectionPoolTests(TestCase):
+    """
+    Tests for ``MeasuredConnectionPool``.
+    """
+
+    def test_stats(self):
+        """
+        ``MeasuredConnectionPool.stats`` reports how many connections were
+        requested from the pool and how many of those were satisfied by new
+        or by re-used connections.
+        """
+        pool = MeasuredConnectionPool(MemoryReactorClock())
+        self.assertThat(pool.stats(), Equals(ConnectionStats(0, 0)))
+
+        pool.getConnection("key", _Endpoint())
+        pool._putConnection("key", _Connection())
+        pool.getConnection("key", _Endpoint())
+        pool.getConnection("key", _Endpoint())
+
+        self.assertThat(
+            pool.stats(),
+            MatchesStructure(
+                requests=Equals(3),
+                new_connections=Equals(2),
+                reused_connections=Equals(1),
+            ),
+        )
+
+    def test_metrics(self):
+        """
+        ``MeasuredConnectionPool.register_metrics`` reports the counts from
+        ``MeasuredConnectionPool.stats`` as Prometheus counters whenever the
+        metrics are collected.
+        """
+        pool = MeasuredConnectionPool(MemoryReactorClock())
+        registry = CollectorRegistry()
+        pool.register_metrics(registry)
+
+        def counts():
+            return list(
+                registry.get_sample_value(
+                    f"zkapauthorizer_client_http_connections_{name}_total"
+                )
+                for name in ["requests", "new", "reused"]
+            )
+
+        self.expectThat(counts(), Equals([0, 0, 0]))
+        pool.getConnection("key", _Endpoint())
+        pool._putConnection("key", _Connection())
+        pool.getConnection("key", _Endpoint())
+        self.expectThat(counts(), Equals([2, 1, 1]))
+
+
+class GetConnectionPoolTests(TestCase):
+    """
+    Tests for ``get_connection_pool``.
+    """
+
+    def test_shared(self):
+        """
+        ``get_connection_pool`` returns the same pool for the same reactor.
+        """
+        reactor = MemoryReactorClock()
+        pool = get_connection_pool(reactor, empty_config)
+        self.expectThat(get_connection_pool(reactor, empty_config), Is(pool))
+        self.expectThat(
+            get_connection_pool(MemoryReactorClock(), empty_config),
+            MatchesStructure(persistent=Equals(True)),
+        )
+
+    def test_shutdown(self):
+        """
+        When the reactor shuts down ``get_connection_pool`` closes the pool's
+        cached connections and forgets the pool.
+        """
+        reactor = MemoryReactorClock()
+        pool = get_connection_pool(reactor, empty_config)
+        closed = []
+        self.patch(pool, "closeCachedConnections", lambda: closed.append(True))
+
+        [(close, args, kwargs)] = reactor.triggers["before"]["shutdown"]
+        close(*args, **kwargs)
+
+        self.expectThat(closed, Equals([True]))
+        self.expectThat(_pools, Not(Contains(reactor)))
+        self.expectThat(get_connection_pool(reactor, empty_config), Not(Is(pool)))
+
+    def test_configured(self):
+        """
+        ``get_connection_pool`` uses the connection limits from the node
+        configuration.
+        """
+        config = config_from_string(
+            self.useFixture(TempDir()).join("tahoe"),
+            "tub.port",
+            (
+                f"[storageclient.plugins.{NAME}]\n"
+                "http.max-persistent-per-host = 7\n"
+                "http.cached-connection-timeout = 30\n"
+            ).encode("utf-8"),
+        )
+        self.assertThat(
+            get_connection_pool(MemoryReactorClock(), config),
+            MatchesStructure(
+                maxPersistentPerHost=Equals(7),
+                cachedConnectionTimeout=Equals(30),
+            ),
+        )
@@ -0,0 +1,135 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests for ``_zkapauthorizer._json``.
+"""
+
+from json import dumps
+
+from hypothesis import given
+from hypothesis.strategies import (
+    booleans,
+    dictionaries,
+    floats,
+    integers,
+    lists,
+    none,
+    one_of,
+    recursive,
+    sampled_from,
+    text,
+)
+from testtools import TestCase
+from testtools.matchers import AllMatch, Equals, LessThan, raises
+
+from .._json import StreamingObjectDecoder
+
+# Arbitrary JSON values.
+json_values = recursive(
+    one_of(
+        none(),
+        booleans(),
+        integers(),
+        floats(allow_nan=False, allow_infinity=False),
+        text(),
+    ),
+    lambda children: one_of(
+        lists(children),
+        dictionaries(text(), children),
+    ),
+    max_leaves=10,
+)
+
+
+def split(data, points):
+    """
+    Split some bytes into pieces at the given offsets.
+    """
+    points = sorted({0, len(data)} | {p % (len(data) + 1) for p in points})
+    return [data[start:end] for (start, end) in zip(points, points[1:])]
+
+
+class StreamingObjectDecoderTests(TestCase):
+    """
+    Tests for ``StreamingObjectDecoder``.
+    """
+
+    @given(
+        dictionaries(text(), json_values),
+        lists(json_values),
+        integers(min_value=1, max_value=5),
+        lists(integers(min_value=0)),
+        sampled_from([None, 0, 2]),
+    )
+    def test_decode(self, others, streamed, batch_size, points, indent):
+        """
+        However the encoding of an object is divided up, the elements of its
+        streamed array are passed to the callback in order in batches no
+        larger than the batch size and ``close`` returns its other properties.
+        """
+        obj = dict(others)
+        obj["streamed"] = streamed
+        batches = []
+        decoder = StreamingObjectDecoder({"streamed": batches.append}, batch_size)
+        for piece in split(dumps(obj, indent=indent).encode("utf-8"), points):
+            decoder.feed(piece)
+        others.pop("streamed", None)
+
+        self.expectThat(decoder.close(), Equals(others))
+        self.expectThat(sum(batches, []), Equals(streamed))
+        self.expectThat(
+            list(map(len, batches)),
+            AllMatch(LessThan(batch_size + 1)),
+        )
+
+    @given(dictionaries(text(), json_values), lists(integers(min_value=0)))
+    def test_not_streamed(self, obj, points):
+        """
+        A property which is named for streaming but is not an array is
+        returned by ``close`` like any other.
+        """
+        obj["streamed"] = None
+        decoder = StreamingObjectDecoder({"streamed": lambda batch: None}, 1)
+        for piece in split(dumps(obj).encode("utf-8"), points):
+            decoder.feed(piece)
+        self.assertThat(decoder.close(), Equals(obj))
+
+    @given(
+        sampled_from(
+            [
+                b"",
+                b"[]",
+                b'{"a": 1',
+                b'{"a": 1}}',
+                b'{"a" 1}',
+                b'{"a": [1,]}',
+                b'{"s": [1 2]}',
+                b'{"s": [1,',
+                b"Sorry, this server does not behave well.",
+            ]
+        ),
+    )
+    def test_malformed(self, data):
+        """
+        If the data is not a single JSON object then ``feed`` or ``close``
+        raises ``ValueError``.
+        """
+        decoder = StreamingObjectDecoder({"s": lambda batch: None}, 1)
+
+        def decode():
+            decoder.feed(data)
+            decoder.close()
+
+        self.assertThat(decode, raises(ValueError))
@@ -20,7 +20,7 @@ from datetime import datetime, timedelta
 
 import attr
 from allmydata.client import SecretHolder
-from allmydata.interfaces import IServer, IStorageBroker
+from allmydata.interfaces import IDirectoryNode, IServer, IStorageBroker
 from allmydata.util.hashutil import CRYPTO_VAL_SIZE
 from fixtures import TempDir
 from hypothesis import given, note
@@ -35,38 +35,59 @@ from hypothesis.strategies import (
     randoms,
     sets,
 )
+from prometheus_client import CollectorRegistry
 from testtools import TestCase
 from testtools.matchers import (
     AfterPreprocessing,
     AllMatch,
     Always,
+    ContainsDict,
     Equals,
     HasLength,
     Is,
+    LessThan,
     MatchesAll,
+    MatchesListwise,
 )
-from testtools.twistedsupport import succeeded
+from testtools.twistedsupport import failed, has_no_result, succeeded
 from twisted.application.service import IService
-from twisted.internet.defer import Deferred, maybeDeferred, succeed
-from twisted.internet.task import Clock
+from twisted.internet.defer import Deferred, fail, maybeDeferred, succeed
+from twisted.internet.task import Clock, deferLater
+from twisted.logger import Logger
 from twisted.python.filepath import FilePath
 from zope.interface import implementer
 
+from .. import lease_maintenance
 from ..config import empty_config
 from ..foolscap import ShareStat
 from ..lease_maintenance import (
+    LEASE_PERIOD,
+    CrawlCheckpointer,
     LeaseMaintenanceConfig,
+    ListingCache,
     MemoryMaintenanceObserver,
     NoopMaintenanceObserver,
+    RenewalMetrics,
+    RequestPacing,
+    StorageIndexSet,
+    TokenBucket,
     lease_maintenance_config_from_dict,
     lease_maintenance_config_to_dict,
     lease_maintenance_service,
+    lease_renewal_service,
     maintain_leases_from_root,
+    probe_directory_version,
     renew_leases,
+    renew_leases_on_server,
+    request_pacing,
+    visit_storage_indexes,
     visit_storage_indexes_from_root,
 )
+from ..model import LeaseExpiration
+from .fixtures import ConfiglessMemoryVoucherStore
 from .matchers import Provides, between, leases_current
 from .strategies import (
+    _LeafNode,
     clocks,
     interval_means,
     lease_maintenance_configurations,
@@ -111,6 +132,116 @@ class DummyStorageServer(object):
             )
 
 
+@attr.s
+class SlowStorageServer(DummyStorageServer):
+    """
+    A ``DummyStorageServer`` which takes one second of ``clock`` time to
+    answer ``stat_shares`` and which reports how many of those are
+    outstanding to ``concurrency``.
+
+    :ivar requested: The number of storage indexes in each ``stat_shares``
+        call.
+    """
+
+    concurrency = attr.ib()
+    requested = attr.ib(default=attr.Factory(list))
+
+    def stat_shares(self, storage_indexes):
+        self.requested.append(len(storage_indexes))
+        self.concurrency.start()
+        d = deferLater(
+            self.clock,
+            1,
+            DummyStorageServer.stat_shares,
+            self,
+            storage_indexes,
+        )
+
+        def stop(result):
+            self.concurrency.stop()
+            return result
+
+        d.addBoth(stop)
+        return d
+
+
+@attr.s
+class Concurrency(object):
+    """
+    Keep track of how many of some operation are outstanding at once.
+
+    :ivar current: The number outstanding now.
+    :ivar highest: The largest number ever outstanding at once.
+    """
+
+    current = attr.ib(default=0)
+    highest = attr.ib(default=0)
+
+    def start(self):
+        self.current += 1
+        self.highest = max(self.highest, self.current)
+
+    def stop(self):
+        self.current -= 1
+
+
+@attr.s
+class SlowLeaseStorageServer(DummyStorageServer):
+    """
+    A ``DummyStorageServer`` which takes one second of ``clock`` time to
+    renew a lease and which reports how many renewals are outstanding to
+    ``concurrency``.
+    """
+
+    concurrency = attr.ib()
+
+    def add_lease(self, storage_index, renew_secret, cancel_secret):
+        self.concurrency.start()
+        d = deferLater(
+            self.clock,
+            1,
+            DummyStorageServer.add_lease,
+            self,
+            storage_index,
+            renew_secret,
+            cancel_secret,
+        )
+        d.addCallback(lambda ignored: self.concurrency.stop())
+        return d
+
+
+@attr.s
+class RecordingStorageServer(DummyStorageServer):
+    """
+    A ``DummyStorageServer`` which remembers the storage indexes in each
+    ``stat_shares`` call.
+    """
+
+    requested = attr.ib(default=attr.Factory(list))
+
+    def stat_shares(self, storage_indexes):
+        self.requested.append(storage_indexes)
+        return DummyStorageServer.stat_shares(self, storage_indexes)
+
+
+class BrokenLeaseStorageServer(DummyStorageServer):
+    """
+    A ``DummyStorageServer`` which fails every ``add_lease`` call.
+    """
+
+    def add_lease(self, storage_index, renew_secret, cancel_secret):
+        return fail(Exception("Broken storage server"))
+
+
+class BrokenStorageServer(DummyStorageServer):
+    """
+    A ``DummyStorageServer`` which fails every ``stat_shares`` call.
+    """
+
+    def stat_shares(self, storage_indexes):
+        return fail(Exception("Broken storage server"))
+
+
 class SharesAlreadyExist(Exception):
     pass
 
@@ -186,6 +317,18 @@ class DummyServer(object):
     def get_storage_server(self):
         return self._storage_server
 
+    def get_serverid(self):
+        return b"v0-" + self._storage_server.lease_seed.hex().encode("ascii")
+
+
+class BrokenIdServer(DummyServer):
+    """
+    A ``DummyServer`` which fails to say what its identifier is.
+    """
+
+    def get_serverid(self):
+        raise ValueError("No identifier for this server")
+
 
 @implementer(IStorageBroker)
 @attr.s
@@ -452,6 +595,280 @@ class VisitStorageIndexesFromRootTests(TestCase):
         )
 
 
+class VisitStorageIndexesTests(TestCase):
+    """
+    Tests for ``visit_storage_indexes``.
+    """
+
+    def test_breadth_first(self):
+        """
+        Nodes are visited in order by depth, then by the order of their parents,
+        then by name.
+        """
+        listed = []
+        root = RecordingDirectoryNode(
+            b"\0" * 16,
+            {
+                "a": RecordingDirectoryNode(
+                    b"\1" * 16, {"c": _LeafNode(b"\3" * 16)}, listed
+                ),
+                "b": _LeafNode(b"\2" * 16),
+            },
+            listed,
+        )
+        visited = []
+        self.assertThat(
+            visit_storage_indexes([root], visited.append),
+            succeeded(Always()),
+        )
+        self.assertThat(
+            visited,
+            Equals(list(bytes([n]) * 16 for n in range(4))),
+        )
+
+    def test_listed_once(self):
+        """
+        A directory linked from more than one parent, including by a cycle, is
+        visited and listed only once.
+        """
+        listed = []
+        root = RecordingDirectoryNode(b"\0" * 16, {}, listed)
+        shared = RecordingDirectoryNode(b"\1" * 16, {"loop": root}, listed)
+        root.children.update({"x": shared, "y": shared})
+        visited = []
+        self.assertThat(
+            visit_storage_indexes([root], visited.append),
+            succeeded(Always()),
+        )
+        self.expectThat(visited, Equals([b"\0" * 16, b"\1" * 16]))
+        self.expectThat(listed, Equals([b"\0" * 16, b"\1" * 16]))
+
+    def test_files_visited_per_link(self):
+        """
+        A file linked from more than one directory is visited once for each
+        link rather than being remembered.
+        """
+        listed = []
+        leaf = _LeafNode(b"\2" * 16)
+        root = RecordingDirectoryNode(
+            b"\0" * 16,
+            {
+                "a": leaf,
+                "b": RecordingDirectoryNode(b"\1" * 16, {"c": leaf}, listed),
+            },
+            listed,
+        )
+        visited = []
+        self.assertThat(
+            visit_storage_indexes([root], visited.append),
+            succeeded(Always()),
+        )
+        self.expectThat(
+            visited,
+            Equals([b"\0" * 16, b"\2" * 16, b"\1" * 16, b"\2" * 16]),
+        )
+
+    @given(integers(min_value=1, max_value=8), integers(min_value=0, max_value=10))
+    def test_concurrency(self, concurrency, num_directories):
+        """
+        No more than ``concurrency`` directories are listed at once.
+        """
+        clock = Clock()
+        listing = Concurrency()
+        listed = []
+        root = RecordingDirectoryNode(
+            b"\xff" * 16,
+            {
+                str(n): SlowDirectoryNode(
+                    bytes([n]) * 16, {}, listed, clock=clock, concurrency=listing
+                )
+                for n in range(num_directories)
+            },
+            listed,
+        )
+        d = visit_storage_indexes([root], lambda storage_index: None, None, concurrency)
+        for _ in range(num_directories):
+            clock.advance(1)
+        self.expectThat(d, succeeded(Always()))
+        self.expectThat(listed, HasLength(num_directories + 1))
+        self.expectThat(listing.highest, Equals(min(concurrency, num_directories)))
+
+    def test_progress_logged(self):
+        """
+        After each depth the number of directories listed there and the number
+        of nodes found below them are logged.
+        """
+        logged = []
+        self.patch(lease_maintenance, "_log", Logger(observer=logged.append))
+        listed = []
+        root = RecordingDirectoryNode(
+            b"\0" * 16,
+            {
+                "a": RecordingDirectoryNode(
+                    b"\1" * 16, {"c": _LeafNode(b"\3" * 16)}, listed
+                ),
+                "b": _LeafNode(b"\2" * 16),
+            },
+            listed,
+        )
+        self.assertThat(
+            visit_storage_indexes([root], lambda storage_index: None),
+            succeeded(Always()),
+        )
+        self.assertThat(
+            logged,
+            MatchesListwise(
+                list(
+                    ContainsDict(
+                        {
+                            "depth": Equals(depth),
+                            "directories": Equals(directories),
+                            "frontier": Equals(frontier),
+                        }
+                    )
+                    for (depth, directories, frontier) in [
+                        (0, 1, 2),
+                        (1, 1, 1),
+                        (2, 0, 0),
+                    ]
+                )
+            ),
+        )
+
+
+class ListingCacheTests(TestCase):
+    """
+    Tests for ``ListingCache`` used with ``visit_storage_indexes_from_root``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.useFixture(
+            ConfiglessMemoryVoucherStore(datetime.now),
+        ).store
+        self.listed = []
+        self.versions = {}
+        self.root = RecordingDirectoryNode(
+            b"\0" * 16,
+            {
+                "a": RecordingDirectoryNode(
+                    b"\1" * 16, {"c": _LeafNode(b"\3" * 16)}, self.listed
+                ),
+                "b": _LeafNode(b"\2" * 16),
+            },
+            self.listed,
+        )
+        self.nodes = {node.get_uri(): node for node in self.root.flatten()}
+        for node in self.nodes.values():
+            self.versions[node.get_storage_index()] = b"1"
+
+    def crawl(self):
+        """
+        Visit everything beneath the root using a new ``ListingCache``.
+
+        :return: A two-tuple of the cache and the storage indexes visited.
+        """
+        cache = ListingCache(
+            self.store.get_directory_listings(),
+            self.nodes.__getitem__,
+            lambda directory: succeed(self.versions[directory.get_storage_index()]),
+        )
+        visited = []
+        operation = visit_storage_indexes_from_root(
+            lambda visit_assets: visit_assets(visited.append),
+            lambda: [self.root],
+            listing_cache=cache,
+        )
+        self.assertThat(operation(), succeeded(Always()))
+        return cache, visited
+
+    def test_unchanged_not_listed(self):
+        """
+        A directory whose version has not changed since it was listed is not
+        listed again but its remembered children are still visited.
+        """
+        cache, first_visited = self.crawl()
+        self.expectThat(self.listed, Equals([b"\0" * 16, b"\1" * 16]))
+        self.expectThat((cache.hits, cache.misses), Equals((0, 2)))
+
+        del self.listed[:]
+        cache, visited = self.crawl()
+        self.expectThat(self.listed, Equals([]))
+        self.expectThat((cache.hits, cache.misses), Equals((2, 0)))
+        self.expectThat(visited, Equals(first_visited))
+
+    def test_changed_listed(self):
+        """
+        A directory whose version has changed since it was listed is listed
+        again.
+        """
+        self.crawl()
+        del self.listed[:]
+        self.versions[b"\1" * 16] = b"2"
+        cache, visited = self.crawl()
+        self.expectThat(self.listed, Equals([b"\1" * 16]))
+        self.expectThat((cache.hits, cache.misses), Equals((1, 1)))
+
+    def test_probe_mutable(self):
+        """
+        ``probe_directory_version`` finds the version of a mutable directory
+        from the server map of the mutable file it makes from the directory's
+        capability.
+        """
+        made = []
+
+        @attr.s
+        class FakeServerMap(object):
+            def best_recoverable_version(self):
+                return (3, b"\0" * 32)
+
+        @attr.s
+        class FakeFileNode(object):
+            def get_servermap(self, mode):
+                return succeed(FakeServerMap())
+
+        @attr.s
+        class FakeCap(object):
+            def get_filenode_cap(self):
+                return self
+
+            def to_string(self):
+                return b"URI:SSK:filenode"
+
+        @attr.s
+        class FakeDirectory(object):
+            def is_mutable(self):
+                return True
+
+            def get_cap(self):
+                return FakeCap()
+
+        def create_node(uri):
+            made.append(uri)
+            return FakeFileNode()
+
+        self.expectThat(
+            probe_directory_version(create_node, FakeDirectory()),
+            succeeded(Equals(b"3:" + b"a" * 52)),
+        )
+        self.expectThat(made, Equals([b"URI:SSK:filenode"]))
+
+    def test_statistics_logged(self):
+        """
+        After each crawl the number of hits and misses is logged.
+        """
+        logged = []
+        self.patch(lease_maintenance, "_log", Logger(observer=logged.append))
+        self.crawl()
+        self.crawl()
+        self.assertThat(
+            list(
+                (event["hits"], event["misses"]) for event in logged if "hits" in event
+            ),
+            Equals([(0, 2), (2, 0)]),
+        )
+
+
 def lists_of_buckets():
     """
     Build lists of bucket descriptions.
@@ -489,6 +906,60 @@ def lists_of_buckets():
     return bucket_count_strategy.flatmap(buckets_strategy)
 
 
+class StorageIndexSetTests(TestCase):
+    """
+    Tests for ``StorageIndexSet``.
+    """
+
+    @given(lists(storage_indexes()), integers(min_value=1, max_value=10))
+    def test_sorted(self, added, chunk_size):
+        """
+        After ``StorageIndexSet.sort`` the storage indexes which were added can
+        be counted, iterated over in order without duplicates, and sliced.
+        """
+        expected = sorted(set(added))
+        collected = StorageIndexSet()
+        for storage_index in added + added:
+            collected.add(storage_index)
+        collected.sort()
+
+        self.expectThat(collected, HasLength(len(expected)))
+        self.expectThat(list(collected), Equals(expected))
+        self.expectThat(
+            list(
+                collected[start : start + chunk_size]
+                for start in range(0, len(collected), chunk_size)
+            ),
+            Equals(
+                list(
+                    expected[start : start + chunk_size]
+                    for start in range(0, len(expected), chunk_size)
+                )
+            ),
+        )
+        if expected:
+            self.expectThat(collected[-1], Equals(expected[-1]))
+
+    def test_wrong_width(self):
+        """
+        ``StorageIndexSet.add`` raises ``ValueError`` for a storage index which
+        is not 16 bytes long.
+        """
+        collected = StorageIndexSet()
+        self.assertRaises(ValueError, collected.add, b"\0" * 15)
+
+    def test_add_after_sort(self):
+        """
+        ``StorageIndexSet.add`` raises ``ValueError`` after the set has been
+        sorted and ``len`` raises it before.
+        """
+        collected = StorageIndexSet()
+        collected.add(b"\0" * 16)
+        self.assertRaises(ValueError, len, collected)
+        collected.sort()
+        self.assertRaises(ValueError, collected.add, b"\1" * 16)
+
+
 class RenewLeasesTests(TestCase):
     """
     Tests for ``renew_leases``.
@@ -561,6 +1032,566 @@ class RenewLeasesTests(TestCase):
             ),
         )
 
+    @given(integers(min_value=1, max_value=5), integers(min_value=1, max_value=10))
+    def test_server_concurrency(self, server_concurrency, num_servers):
+        """
+        ``renew_leases`` checks leases on as many as ``server_concurrency``
+        storage servers at once.
+        """
+        clock = Clock()
+        concurrency = Concurrency()
+        storage_index = b"\0" * 16
+        storage_broker = DummyStorageBroker(
+            clock,
+            list(
+                DummyServer(SlowStorageServer(clock, {}, b"\0" * 20, concurrency))
+                for _ in range(num_servers)
+            ),
+        )
+        for server in storage_broker.get_connected_servers():
+            create_share(
+                server.get_storage_server(),
+                storage_index,
+                0,
+                size=123,
+                lease_expiration=0,
+            )
+
+        def get_now():
+            return datetime.utcfromtimestamp(clock.seconds())
+
+        d = renew_leases(
+            lambda visit: succeed(visit(storage_index)),
+            storage_broker,
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            NoopMaintenanceObserver,
+            get_now,
+            server_concurrency,
+        )
+        self.assertThat(d, has_no_result())
+        clock.pump([1] * num_servers)
+        self.assertThat(d, succeeded(Always()))
+
+        self.expectThat(
+            concurrency.highest,
+            Equals(min(server_concurrency, num_servers)),
+        )
+        self.expectThat(
+            list(
+                server.get_storage_server()
+                for server in storage_broker.get_connected_servers()
+            ),
+            AllMatch(leases_current([storage_index], get_now(), timedelta(days=3))),
+        )
+
+    def test_server_failure(self):
+        """
+        If checking leases on one storage server fails then ``renew_leases``
+        still checks them on the other storage servers and finishes the
+        activity.  The failure is logged.
+        """
+        logged = []
+        self.patch(lease_maintenance, "_log", Logger(observer=logged.append))
+        clock = Clock()
+        storage_index = b"\0" * 16
+        storage_servers = [
+            DummyStorageServer(clock, {}, b"\0" * 20),
+            BrokenStorageServer(clock, {}, b"\1" * 20),
+            DummyStorageServer(clock, {}, b"\2" * 20),
+        ]
+        for storage_server in storage_servers:
+            create_share(storage_server, storage_index, 0, size=123, lease_expiration=0)
+
+        def get_now():
+            return datetime.utcfromtimestamp(clock.seconds())
+
+        observer = MemoryMaintenanceObserver()
+        d = renew_leases(
+            lambda visit: succeed(visit(storage_index)),
+            DummyStorageBroker(clock, list(map(DummyServer, storage_servers))),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            lambda: observer,
+            get_now,
+            len(storage_servers),
+        )
+        self.assertThat(d, succeeded(Always()))
+        self.expectThat(observer.observed, Equals([[123], [123]]))
+        self.expectThat(observer.finished, Equals(True))
+        self.expectThat(
+            list(event for event in logged if "log_failure" in event),
+            HasLength(1),
+        )
+        self.expectThat(
+            [storage_servers[0], storage_servers[2]],
+            AllMatch(leases_current([storage_index], get_now(), timedelta(days=3))),
+        )
+
+    def test_flushed_on_failure(self):
+        """
+        If ``renew_leases`` fails after observations have been made then it
+        flushes the activity observer rather than finishing it.
+        """
+        clock = Clock()
+        storage_index = b"\0" * 16
+        storage_servers = [
+            DummyStorageServer(clock, {}, b"\0" * 20),
+            DummyStorageServer(clock, {}, b"\1" * 20),
+        ]
+        for storage_server in storage_servers:
+            create_share(storage_server, storage_index, 0, size=123, lease_expiration=0)
+
+        observer = MemoryMaintenanceObserver()
+        d = renew_leases(
+            lambda visit: succeed(visit(storage_index)),
+            DummyStorageBroker(
+                clock,
+                [DummyServer(storage_servers[0]), BrokenIdServer(storage_servers[1])],
+            ),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            lambda: observer,
+            lambda: datetime.utcfromtimestamp(clock.seconds()),
+        )
+        self.assertThat(d, failed(Always()))
+        self.expectThat(observer.observed, Equals([[123]]))
+        self.expectThat(observer.flushed, Equals(True))
+        self.expectThat(observer.finished, Equals(False))
+
+    def test_metrics(self):
+        """
+        ``renew_leases`` records the latency of each lease it renews in
+        ``metrics`` labelled with the storage server it was renewed on.
+        """
+        clock = Clock()
+        clock.advance(3600)
+        expired = b"\0" * 16
+        current = b"\1" * 16
+        servers = list(
+            DummyServer(DummyStorageServer(clock, {}, bytes([n]) * 20))
+            for n in range(2)
+        )
+        for n, server in enumerate(servers):
+            storage_server = server.get_storage_server()
+            create_share(storage_server, expired, 0, size=123, lease_expiration=0)
+            create_share(
+                storage_server,
+                current,
+                0,
+                size=123,
+                lease_expiration=int(clock.seconds() + LEASE_PERIOD.total_seconds()),
+            )
+            if n:
+                create_share(storage_server, current, 1, size=123, lease_expiration=0)
+
+        def visit_assets(visit):
+            visit(expired)
+            visit(current)
+            return succeed(None)
+
+        registry = CollectorRegistry()
+        d = renew_leases(
+            visit_assets,
+            DummyStorageBroker(clock, servers),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            NoopMaintenanceObserver,
+            lambda: datetime.utcfromtimestamp(clock.seconds()),
+            metrics=RenewalMetrics.create(registry),
+        )
+        self.assertThat(d, succeeded(Always()))
+        self.assertThat(
+            list(
+                registry.get_sample_value(
+                    "zkapauthorizer_client_lease_renewal_seconds_count",
+                    {"server": server.get_serverid().decode("ascii")},
+                )
+                for server in servers
+            ),
+            Equals([1, 2]),
+        )
+
+    def test_paced_within_min_lease_remaining(self):
+        """
+        A crawl paced by ``request_pacing`` renews every lease which needs it
+        within half of the minimum lease time remaining, even if that means
+        sending requests faster than the configured rate.
+        """
+        clock = Clock()
+        clock.advance(3600)
+        start = clock.seconds()
+        config = attr.evolve(
+            default_lease_maint_config,
+            min_lease_remaining=timedelta(minutes=1),
+            request_rate=1,
+            pacing_window=timedelta(days=1),
+        )
+        margin = config.min_lease_remaining.total_seconds()
+        storage_indexes = list(bytes([n]) * 16 for n in range(50))
+        renewed_at = []
+
+        class RecordingStorageServer(DummyStorageServer):
+            def add_lease(self, storage_index, renew_secret, cancel_secret):
+                renewed_at.append(self.clock.seconds())
+                return DummyStorageServer.add_lease(
+                    self, storage_index, renew_secret, cancel_secret
+                )
+
+        servers = list(
+            DummyServer(RecordingStorageServer(clock, {}, bytes([n]) * 20))
+            for n in range(3)
+        )
+        for server in servers:
+            for storage_index in storage_indexes:
+                # Every lease has less than the minimum time remaining.
+                create_share(
+                    server.get_storage_server(),
+                    storage_index,
+                    0,
+                    size=123,
+                    lease_expiration=int(start + margin - 1),
+                )
+
+        def visit_assets(visit):
+            for storage_index in storage_indexes:
+                visit(storage_index)
+            return succeed(None)
+
+        d = renew_leases(
+            visit_assets,
+            DummyStorageBroker(clock, servers),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            config.min_lease_remaining,
+            NoopMaintenanceObserver,
+            lambda: datetime.utcfromtimestamp(clock.seconds()),
+            pacing=request_pacing(clock, config),
+        )
+        clock.pump([0.1] * int(margin * 10))
+        self.expectThat(d, succeeded(Always()))
+        self.expectThat(renewed_at, HasLength(len(servers) * len(storage_indexes)))
+        self.expectThat(max(renewed_at), LessThan(start + margin / 2 + 1))
+        for server in servers:
+            self.expectThat(
+                server.get_storage_server(),
+                leases_current(
+                    storage_indexes,
+                    datetime.utcfromtimestamp(clock.seconds()),
+                    config.min_lease_remaining,
+                ),
+            )
+
+
+class RenewLeasesOnServerTests(TestCase):
+    """
+    Tests for ``renew_leases_on_server``.
+    """
+
+    @given(
+        sets(storage_indexes(), max_size=50),
+        integers(min_value=1, max_value=10),
+        integers(min_value=1, max_value=5),
+    )
+    def test_chunked(self, storage_indexes, chunk_size, chunks_in_flight):
+        """
+        ``renew_leases_on_server`` checks storage indexes no more than
+        ``chunk_size`` at a time with no more than ``chunks_in_flight`` checks
+        outstanding at once and renews the leases which need it.
+        """
+        storage_indexes = sorted(storage_indexes)
+        clock = Clock()
+        concurrency = Concurrency()
+        server = SlowStorageServer(clock, {}, b"\0" * 20, concurrency)
+        for storage_index in storage_indexes:
+            create_share(server, storage_index, 0, size=123, lease_expiration=0)
+        observer = MemoryMaintenanceObserver()
+
+        d = renew_leases_on_server(
+            timedelta(days=3),
+            b"\0" * CRYPTO_VAL_SIZE,
+            b"\1" * CRYPTO_VAL_SIZE,
+            storage_indexes,
+            server,
+            observer,
+            datetime.utcfromtimestamp(clock.seconds()),
+            chunk_size,
+            chunks_in_flight,
+        )
+        num_chunks = -(-len(storage_indexes) // chunk_size)
+        clock.pump([1] * num_chunks)
+        self.assertThat(d, succeeded(Always()))
+
+        self.expectThat(sum(server.requested), Equals(len(storage_indexes)))
+        self.expectThat(server.requested, AllMatch(between(1, chunk_size)))
+        self.expectThat(
+            concurrency.highest,
+            Equals(min(chunks_in_flight, num_chunks)),
+        )
+        self.expectThat(observer.observed, HasLength(len(storage_indexes)))
+        self.expectThat(
+            server,
+            leases_current(
+                storage_indexes,
+                datetime.utcfromtimestamp(clock.seconds()),
+                timedelta(days=3),
+            ),
+        )
+
+    @given(
+        sets(storage_indexes(), max_size=20),
+        integers(min_value=1, max_value=10),
+        integers(min_value=1, max_value=5),
+    )
+    def test_renewals_in_flight(self, storage_indexes, chunk_size, renewals_in_flight):
+        """
+        ``renew_leases_on_server`` renews as many as ``renewals_in_flight``
+        leases at once, across all of the chunks it is working on, and logs
+        how many it renewed.
+        """
+        logged = []
+        self.patch(lease_maintenance, "_log", Logger(observer=logged.append))
+        storage_indexes = sorted(storage_indexes)
+        clock = Clock()
+        concurrency = Concurrency()
+        server = SlowLeaseStorageServer(clock, {}, b"\0" * 20, concurrency)
+        for storage_index in storage_indexes:
+            create_share(server, storage_index, 0, size=123, lease_expiration=0)
+
+        d = renew_leases_on_server(
+            timedelta(days=3),
+            b"\0" * CRYPTO_VAL_SIZE,
+            b"\1" * CRYPTO_VAL_SIZE,
+            storage_indexes,
+            server,
+            NoopMaintenanceObserver(),
+            datetime.utcfromtimestamp(clock.seconds()),
+            chunk_size,
+            2,
+            renewals_in_flight,
+        )
+        clock.pump([1] * len(storage_indexes))
+        self.assertThat(d, succeeded(Always()))
+
+        self.expectThat(
+            concurrency.highest,
+            Equals(min(renewals_in_flight, len(storage_indexes), 2 * chunk_size)),
+        )
+        self.expectThat(
+            server,
+            leases_current(
+                storage_indexes,
+                datetime.utcfromtimestamp(clock.seconds()),
+                timedelta(days=3),
+            ),
+        )
+        self.expectThat(
+            logged,
+            MatchesListwise(
+                [
+                    ContainsDict(
+                        {
+                            "server": Is(server),
+                            "renewed": Equals(len(storage_indexes)),
+                        }
+                    ),
+                ]
+            ),
+        )
+
+    def test_recorded_per_chunk(self):
+        """
+        ``renew_leases_on_server`` asks ``known`` about each chunk of storage
+        indexes and does not check those it returns.  It calls ``record`` once
+        for each chunk with the expiration times of the leases it found and
+        of those it renewed.
+        """
+        storage_indexes = list(bytes([n]) * 16 for n in range(5))
+        clock = Clock()
+        server = RecordingStorageServer(clock, {}, b"\0" * 20)
+        later = timedelta(days=10).total_seconds()
+        for n, storage_index in enumerate(storage_indexes):
+            create_share(
+                server,
+                storage_index,
+                0,
+                size=n,
+                lease_expiration=int(later) if n % 2 else 0,
+            )
+        asked = []
+        recorded = []
+
+        def known(chunk):
+            asked.append(chunk)
+            return frozenset(chunk[-1:])
+
+        renewing = renew_leases_on_server(
+            timedelta(days=3),
+            b"\0" * CRYPTO_VAL_SIZE,
+            b"\1" * CRYPTO_VAL_SIZE,
+            storage_indexes,
+            server,
+            NoopMaintenanceObserver(),
+            datetime.utcfromtimestamp(clock.seconds()),
+            chunk_size=3,
+            known=known,
+            record=recorded.append,
+        )
+        self.assertThat(renewing, succeeded(Always()))
+        renewed_until = LEASE_PERIOD.total_seconds()
+        [a, b, c, d, e] = storage_indexes
+        self.expectThat(asked, Equals([[a, b, c], [d, e]]))
+        self.expectThat(server.requested, Equals([[a, b], [d]]))
+        self.expectThat(
+            list(sorted(observations) for observations in recorded),
+            Equals(
+                [
+                    [(a, renewed_until, [0]), (b, later, [1])],
+                    [(d, later, [3])],
+                ]
+            ),
+        )
+
+    def test_paced(self):
+        """
+        ``renew_leases_on_server`` waits for ``pace`` before each request it
+        sends to the server.  The time each renewal took is given to
+        ``observe_latency``.
+        """
+        latencies = []
+        storage_indexes = list(bytes([n]) * 16 for n in range(4))
+        clock = Clock()
+        server = DummyStorageServer(clock, {}, b"\0" * 20)
+        for storage_index in storage_indexes:
+            create_share(server, storage_index, 0, size=123, lease_expiration=0)
+
+        d = renew_leases_on_server(
+            timedelta(days=3),
+            b"\0" * CRYPTO_VAL_SIZE,
+            b"\1" * CRYPTO_VAL_SIZE,
+            storage_indexes,
+            server,
+            NoopMaintenanceObserver(),
+            datetime.utcfromtimestamp(clock.seconds()),
+            chunk_size=2,
+            pace=TokenBucket(clock, 1.0, 1.0).take,
+            observe_latency=latencies.append,
+        )
+        # Two checks and four renewals, one per second after the first.
+        clock.pump([1] * 4)
+        self.expectThat(d, has_no_result())
+        clock.advance(1)
+        self.expectThat(d, succeeded(Always()))
+        self.expectThat(latencies, HasLength(len(storage_indexes)))
+        self.expectThat(
+            server,
+            leases_current(
+                storage_indexes,
+                datetime.utcfromtimestamp(clock.seconds()),
+                timedelta(days=3),
+            ),
+        )
+
+
+class TokenBucketTests(TestCase):
+    """
+    Tests for ``TokenBucket``.
+    """
+
+    def test_rate(self):
+        """
+        ``TokenBucket.take`` gives out up to ``capacity`` tokens right away and
+        then one each ``1 / rate`` seconds, in the order they were asked for.
+        """
+        clock = Clock()
+        bucket = TokenBucket(clock, 2.0, 2.0)
+        taken = list(bucket.take() for _ in range(5))
+        self.expectThat(taken[:2], AllMatch(succeeded(Is(None))))
+        self.expectThat(taken[2:], AllMatch(has_no_result()))
+
+        clock.advance(0.5)
+        self.expectThat(taken[2], succeeded(Is(None)))
+        self.expectThat(taken[3:], AllMatch(has_no_result()))
+
+        clock.advance(1.0)
+        self.expectThat(taken, AllMatch(succeeded(Is(None))))
+        self.expectThat(clock.getDelayedCalls(), Equals([]))
+
+
+class RequestPacingTests(TestCase):
+    """
+    Tests for ``RequestPacing`` and ``request_pacing``.
+    """
+
+    def test_target_rate(self):
+        """
+        ``RequestPacing.bucket`` uses the target rate when the requests fit in
+        the window at that rate.
+        """
+        pacing = RequestPacing(Clock(), 2, timedelta(seconds=100))
+        self.assertThat(pacing.bucket(100, 1).rate, Equals(2))
+
+    def test_faster_to_fit_window(self):
+        """
+        ``RequestPacing.bucket`` uses a rate fast enough to send all of the
+        requests within each round's share of the window.
+        """
+        pacing = RequestPacing(Clock(), 2, timedelta(seconds=100))
+        self.assertThat(pacing.bucket(1000, 2).rate, Equals(20))
+
+    def test_window_within_min_lease_remaining(self):
+        """
+        ``request_pacing`` limits the pacing window to half of the minimum
+        lease time remaining.
+        """
+        config = attr.evolve(
+            default_lease_maint_config,
+            min_lease_remaining=timedelta(hours=4),
+            pacing_window=timedelta(days=1),
+        )
+        self.assertThat(
+            request_pacing(Clock(), config).window,
+            Equals(timedelta(hours=2)),
+        )
+
+    def test_unpaced(self):
+        """
+        ``request_pacing`` returns ``None`` if the request rate is 0, the
+        pacing window is empty, or there is no minimum lease time remaining.
+        """
+        self.expectThat(
+            request_pacing(
+                Clock(),
+                attr.evolve(
+                    default_lease_maint_config,
+                    min_lease_remaining=timedelta(days=3),
+                    pacing_window=timedelta(0),
+                ),
+            ),
+            Is(None),
+        )
+        self.expectThat(
+            request_pacing(
+                Clock(),
+                attr.evolve(
+                    default_lease_maint_config,
+                    min_lease_remaining=timedelta(0),
+                    pacing_window=timedelta(days=1),
+                ),
+            ),
+            Is(None),
+        )
+        self.expectThat(
+            request_pacing(
+                Clock(),
+                attr.evolve(
+                    default_lease_maint_config,
+                    min_lease_remaining=timedelta(days=3),
+                    request_rate=0,
+                ),
+            ),
+            Is(None),
+        )
+
 
 class MaintainLeasesFromRootTests(TestCase):
     """
@@ -673,3 +1704,470 @@ class MaintainLeasesFromRootTests(TestCase):
                 Equals(expected),
             ),
         )
+
+
+@implementer(IDirectoryNode)
+@attr.s
+class RecordingDirectoryNode(object):
+    """
+    A directory node which records each time it is listed and which can be
+    made to fail to list.
+
+    :ivar listed: A list to which to append the storage index of this node
+        each time it is listed.
+    """
+
+    _storage_index = attr.ib()
+    children = attr.ib()
+    listed = attr.ib()
+    broken = attr.ib(default=False)
+
+    def list(self):
+        if self.broken:
+            return fail(Exception("Directory unavailable"))
+        self.listed.append(self._storage_index)
+        return succeed({name: (child, {}) for (name, child) in self.children.items()})
+
+    def get_storage_index(self):
+        return self._storage_index
+
+    def get_uri(self):
+        return b"URI:recording-dir:" + self._storage_index
+
+    def flatten(self):
+        result = [self]
+        for child in self.children.values():
+            result.extend(child.flatten())
+        return result
+
+
+@attr.s
+class SlowDirectoryNode(RecordingDirectoryNode):
+    """
+    A ``RecordingDirectoryNode`` which takes one second of ``clock`` time to
+    list and which reports how many listings are outstanding to
+    ``concurrency``.
+    """
+
+    clock = attr.ib(default=None)
+    concurrency = attr.ib(default=None)
+
+    def list(self):
+        self.concurrency.start()
+        d = deferLater(self.clock, 1, RecordingDirectoryNode.list, self)
+
+        def stop(result):
+            self.concurrency.stop()
+            return result
+
+        d.addBoth(stop)
+        return d
+
+
+class CrawlCheckpointerTests(TestCase):
+    """
+    Tests for ``CrawlCheckpointer`` used with ``maintain_leases_from_root``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        self.store = self.useFixture(
+            ConfiglessMemoryVoucherStore(
+                lambda: datetime.utcfromtimestamp(self.clock.seconds()),
+            ),
+        ).store
+
+    def maintain(self, root_nodes, storage_broker, crawl, stat_chunk_size=1000):
+        """
+        Run one lease maintenance crawl.
+        """
+        return maintain_leases_from_root(
+            lambda: root_nodes,
+            storage_broker,
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            timedelta(days=3),
+            NoopMaintenanceObserver,
+            lambda: datetime.utcfromtimestamp(self.clock.seconds()),
+            stat_chunk_size=stat_chunk_size,
+            crawl=crawl,
+        )()
+
+    def test_traversal_resumed(self):
+        """
+        If the traversal of a crawl is interrupted then the next crawl continues
+        it from the saved frontier without listing any directory again.
+        """
+        listed = []
+        broken = RecordingDirectoryNode(
+            b"\1" * 16,
+            {"x": _LeafNode(b"\3" * 16), "y": _LeafNode(b"\4" * 16)},
+            listed,
+            broken=True,
+        )
+        root = RecordingDirectoryNode(
+            b"\0" * 16,
+            {
+                "a": broken,
+                "b": RecordingDirectoryNode(
+                    b"\2" * 16, {"z": _LeafNode(b"\5" * 16)}, listed
+                ),
+            },
+            listed,
+        )
+        nodes = {node.get_uri(): node for node in root.flatten()}
+        storage_server = DummyStorageServer(
+            self.clock,
+            {
+                node.get_storage_index(): {
+                    0: ShareStat(size=123, lease_expiration=0),
+                }
+                for node in nodes.values()
+            },
+            b"\0" * 20,
+        )
+        storage_broker = DummyStorageBroker(self.clock, [DummyServer(storage_server)])
+
+        # Save progress after every node.
+        crawl = CrawlCheckpointer(
+            self.store.get_lease_crawl_checkpoint(),
+            nodes.__getitem__,
+            self.clock,
+            timedelta(0),
+        )
+        self.expectThat(
+            self.maintain([root], storage_broker, crawl),
+            failed(Always()),
+        )
+        self.expectThat(listed, Equals([b"\0" * 16, b"\2" * 16]))
+        self.expectThat(
+            self.store.get_lease_crawl_checkpoint().in_progress(),
+            Equals(True),
+        )
+
+        # A new process continues the crawl.
+        del listed[:]
+        broken.broken = False
+        crawl = CrawlCheckpointer(
+            self.store.get_lease_crawl_checkpoint(),
+            nodes.__getitem__,
+            self.clock,
+        )
+        self.expectThat(
+            self.maintain([root], storage_broker, crawl),
+            succeeded(Always()),
+        )
+        self.expectThat(listed, Equals([b"\1" * 16]))
+        self.expectThat(
+            storage_server,
+            leases_current(
+                set(node.get_storage_index() for node in nodes.values()),
+                datetime.utcfromtimestamp(self.clock.seconds()),
+                timedelta(days=3),
+            ),
+        )
+        self.expectThat(
+            self.store.get_lease_crawl_checkpoint().in_progress(),
+            Equals(False),
+        )
+
+    def test_chunks_resumed(self):
+        """
+        If a crawl is interrupted after its traversal is complete then the next
+        crawl checks only the chunks of storage indexes which were not already
+        finished on each storage server.
+        """
+        found = list(bytes([n]) * 16 for n in range(5))
+        servers = list(
+            RecordingStorageServer(
+                self.clock,
+                {idx: {0: ShareStat(size=123, lease_expiration=0)} for idx in found},
+                bytes([n]) * 20,
+            )
+            for n in range(2)
+        )
+        storage_broker = DummyStorageBroker(
+            self.clock,
+            list(DummyServer(server) for server in servers),
+        )
+
+        checkpoint = self.store.get_lease_crawl_checkpoint()
+        checkpoint.save_traversal([], found, True)
+        # The first server finished the first and last chunks.
+        first_server_id = DummyServer(servers[0]).get_serverid()
+        checkpoint.chunk_done(first_server_id, 0)
+        checkpoint.chunk_done(first_server_id, 2)
+
+        crawl = CrawlCheckpointer(
+            checkpoint,
+            lambda uri: self.fail("No node should be created"),
+            self.clock,
+        )
+        # The roots are ignored in favor of the saved storage indexes.
+        self.expectThat(
+            self.maintain([], storage_broker, crawl, stat_chunk_size=2),
+            succeeded(Always()),
+        )
+        self.expectThat(servers[0].requested, Equals([found[2:4]]))
+        self.expectThat(
+            servers[1].requested,
+            Equals([found[0:2], found[2:4], found[4:]]),
+        )
+        self.expectThat(checkpoint.in_progress(), Equals(False))
+
+
+class LeaseExpirationsCrawlTests(TestCase):
+    """
+    Tests for ``renew_leases`` with a catalog of lease expiration times.
+    """
+
+    def test_known_not_checked(self):
+        """
+        ``renew_leases`` records the lease expiration times it finds and those of
+        the leases it renews.  It does not check storage indexes which are in
+        the catalog again.  It forgets storage indexes which it does not
+        visit.
+        """
+        clock = Clock()
+        store = self.useFixture(ConfiglessMemoryVoucherStore(datetime.now)).store
+        expirations = store.get_lease_expirations()
+        a, b = b"\0" * 16, b"\1" * 16
+        later = timedelta(days=10).total_seconds()
+        servers = list(
+            RecordingStorageServer(
+                clock,
+                {
+                    a: {0: ShareStat(size=123, lease_expiration=0)},
+                    b: {0: ShareStat(size=456, lease_expiration=later)},
+                },
+                bytes([n]) * 20,
+            )
+            for n in range(2)
+        )
+        storage_broker = DummyStorageBroker(
+            clock, list(DummyServer(server) for server in servers)
+        )
+
+        def crawl(storage_indexes):
+            def visit_assets(visit):
+                for storage_index in storage_indexes:
+                    visit(storage_index)
+                return succeed(None)
+
+            return renew_leases(
+                visit_assets,
+                storage_broker,
+                SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+                timedelta(days=3),
+                NoopMaintenanceObserver,
+                lambda: datetime.utcfromtimestamp(clock.seconds()),
+                expirations=expirations,
+            )
+
+        self.assertThat(crawl([a, b]), succeeded(Always()))
+        renewed_until = LEASE_PERIOD.total_seconds()
+        for server in servers:
+            server_id = DummyServer(server).get_serverid()
+            self.expectThat(server.requested, Equals([[a, b]]))
+            self.expectThat(
+                expirations.due(float("inf"), [server_id], 10),
+                Equals(
+                    [
+                        LeaseExpiration(server_id, b, later, [456]),
+                        LeaseExpiration(server_id, a, renewed_until, [123]),
+                    ]
+                ),
+            )
+
+        self.assertThat(crawl([a, b]), succeeded(Always()))
+        for server in servers:
+            self.expectThat(server.requested, Equals([[a, b]]))
+
+        self.assertThat(crawl([b]), succeeded(Always()))
+        for server in servers:
+            self.expectThat(
+                expirations.known(DummyServer(server).get_serverid(), [a, b]),
+                Equals(frozenset({b})),
+            )
+
+
+class LeaseRenewalServiceTests(TestCase):
+    """
+    Tests for the service returned by ``lease_renewal_service``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        store = self.useFixture(ConfiglessMemoryVoucherStore(datetime.now)).store
+        self.expirations = store.get_lease_expirations()
+        self.storage_index = b"\0" * 16
+        self.expiration = timedelta(days=5).total_seconds()
+        self.observer = MemoryMaintenanceObserver()
+
+    def service(self, storage_server):
+        """
+        Create a started lease renewal service for one storage server which has
+        a share with a lease that expires at ``self.expiration``.
+        """
+        server = DummyServer(storage_server)
+        self.expirations.observe(
+            server.get_serverid(),
+            [(self.storage_index, self.expiration, [123])],
+        )
+        service = lease_renewal_service(
+            self.expirations,
+            DummyStorageBroker(self.clock, [server]),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            lambda: self.observer,
+            self.clock,
+            LeaseMaintenanceConfig(
+                crawl_interval_mean=timedelta(days=26),
+                crawl_interval_range=timedelta(days=4),
+                min_lease_remaining=timedelta(days=1),
+                renewal_lead_time=timedelta(days=1),
+            ),
+        )
+        service.startService()
+        self.addCleanup(service.stopService)
+        self.clock.advance(0)
+        return server
+
+    def test_renewed_when_due(self):
+        """
+        The service renews a lease in the catalog when it would have only the
+        minimum time remaining plus the lead time left and records the new
+        expiration time.
+        """
+        storage_server = DummyStorageServer(
+            self.clock,
+            {
+                self.storage_index: {
+                    0: ShareStat(size=123, lease_expiration=self.expiration),
+                },
+            },
+            b"\0" * 20,
+        )
+        server = self.service(storage_server)
+        share = storage_server.buckets[self.storage_index][0]
+
+        # Five days less one day minimum and one day lead is three days.
+        for _ in range(3 * 24 - 1):
+            self.clock.advance(60 * 60)
+        self.expectThat(share.lease_expiration, Equals(self.expiration))
+
+        self.clock.advance(60 * 60)
+        renewed_until = self.clock.seconds() + LEASE_PERIOD.total_seconds()
+        self.expectThat(share.lease_expiration, Equals(renewed_until))
+        self.expectThat(
+            self.expirations.due(float("inf"), [server.get_serverid()], 10),
+            Equals(
+                [
+                    LeaseExpiration(
+                        server.get_serverid(),
+                        self.storage_index,
+                        renewed_until,
+                        [123],
+                    ),
+                ]
+            ),
+        )
+        self.expectThat(self.observer.observed, Equals([[123]]))
+
+    def test_failure_retried_later(self):
+        """
+        If renewing a lease fails the failure is logged and the service tries
+        again after the poll interval.
+        """
+        logged = []
+        self.patch(lease_maintenance, "_log", Logger(observer=logged.append))
+        self.expiration = 0.0
+        self.service(BrokenLeaseStorageServer(self.clock, {}, b"\0" * 20))
+
+        self.expectThat(
+            list(event for event in logged if "log_failure" in event),
+            HasLength(1),
+        )
+        [call] = self.clock.getDelayedCalls()
+        self.expectThat(call.getTime(), Equals(60 * 60))
+        self.clock.advance(60 * 60)
+        self.expectThat(
+            list(event for event in logged if "log_failure" in event),
+            HasLength(2),
+        )
+
+    def test_failure_backs_off(self):
+        """
+        A lease which keeps failing to be renewed is tried again less and less
+        often and does not hold up the renewal of leases which expire after it.
+        """
+        self.patch(lease_maintenance, "_log", Logger(observer=lambda event: None))
+        broken = self.storage_index
+        working = b"\1" * 16
+
+        class PartlyBrokenLeaseStorageServer(DummyStorageServer):
+            def add_lease(self, storage_index, renew_secret, cancel_secret):
+                if storage_index == broken:
+                    return fail(Exception("Broken storage server"))
+                return DummyStorageServer.add_lease(
+                    self, storage_index, renew_secret, cancel_secret
+                )
+
+        storage_server = PartlyBrokenLeaseStorageServer(
+            self.clock,
+            {working: {0: ShareStat(size=456, lease_expiration=10)}},
+            b"\0" * 20,
+        )
+        server = DummyServer(storage_server)
+        server_id = server.get_serverid()
+        self.expirations.observe(
+            server_id, [(broken, 0.0, [123]), (working, 10.0, [456])]
+        )
+        service = lease_renewal_service(
+            self.expirations,
+            DummyStorageBroker(self.clock, [server]),
+            SecretHolder(b"\0" * CRYPTO_VAL_SIZE, b"\1" * CRYPTO_VAL_SIZE),
+            lambda: self.observer,
+            self.clock,
+            LeaseMaintenanceConfig(
+                crawl_interval_mean=timedelta(days=26),
+                crawl_interval_range=timedelta(days=4),
+                min_lease_remaining=timedelta(days=1),
+                renewal_lead_time=timedelta(days=1),
+            ),
+        )
+        # Renew one lease at a time so the broken one is always first.
+        service.batch_size = 1
+        service.startService()
+        self.addCleanup(service.stopService)
+        self.clock.advance(0)
+        self.clock.advance(0)
+
+        self.expectThat(
+            storage_server.buckets[working][0].lease_expiration,
+            Equals(LEASE_PERIOD.total_seconds()),
+        )
+        self.expectThat(self.observer.observed, Equals([[456]]))
+
+        def failures():
+            [lease] = (
+                lease
+                for lease in self.expirations.due(float("inf"), [server_id], 10)
+                if lease.storage_index == broken
+            )
+            return lease.failures
+
+        # The retries come after one, two, and four poll intervals.
+        hour = 60 * 60
+        self.expectThat(failures(), Equals(1))
+        self.clock.advance(hour)
+        self.expectThat(failures(), Equals(2))
+        self.clock.advance(hour)
+        self.expectThat(failures(), Equals(2))
+        self.clock.advance(hour)
+        self.expectThat(failures(), Equals(3))
+        for _ in range(3):
+            self.clock.advance(hour)
+            self.expectThat(failures(), Equals(3))
+        self.clock.advance(hour)
+        self.expectThat(failures(), Equals(4))
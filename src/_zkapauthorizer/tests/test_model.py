@@ -33,11 +33,16 @@ from hypothesis.stateful import (
     run_state_machine_as_test,
 )
 from hypothesis.strategies import (
+    binary,
     booleans,
     data,
     datetimes,
+    floats,
+    frozensets,
     integers,
+    just,
     lists,
+    permutations,
     randoms,
     sampled_from,
     timedeltas,
@@ -46,6 +51,7 @@ from hypothesis.strategies import (
 from testtools import TestCase
 from testtools.matchers import (
     AfterPreprocessing,
+    AllMatch,
     Always,
     Equals,
     HasLength,
@@ -53,18 +59,24 @@ from testtools.matchers import (
     IsInstance,
     MatchesAll,
     MatchesStructure,
+    Not,
+    Raises,
 )
 from testtools.twistedsupport import failed, succeeded
 from twisted.internet.defer import Deferred, succeed
+from twisted.internet.task import Clock
 
 from ..model import (
     DoubleSpend,
+    LeaseCrawlProgress,
+    LeaseExpiration,
     LeaseMaintenanceActivity,
     NotEmpty,
     NotEnoughTokens,
     Pass,
     Pending,
     Redeemed,
+    RedemptionJob,
     Voucher,
     VoucherStore,
     with_cursor_async,
@@ -76,7 +88,7 @@ from ..recover import (
     make_canned_downloader,
     recover,
 )
-from ..replicate import Change, EventStream
+from ..replicate import Change, EventStream, EventStreamSummary
 from .fixtures import ConfiglessMemoryVoucherStore, TemporaryVoucherStore
 from .matchers import raises
 from .strategies import (
@@ -87,6 +99,7 @@ from .strategies import (
     posix_safe_datetimes,
     random_tokens,
     sql_identifiers,
+    storage_indexes,
     tables,
     tahoe_configs,
     unblinded_tokens,
@@ -364,6 +377,157 @@ class VoucherStoreTests(TestCase):
             ),
         )
 
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(vouchers(), min_size=1, unique=True),
+        lists(
+            tuples(
+                integers(min_value=0, max_value=100),
+                floats(min_value=0, max_value=2 ** 32, allow_nan=False),
+            ),
+            min_size=1,
+        ),
+    )
+    def test_redemption_jobs(self, get_config, now, vouchers, schedule):
+        """
+        ``VoucherStore.get_redemption_jobs`` returns the redemption jobs added
+        with ``VoucherStore.add_redemption_job`` and most recently changed
+        with ``VoucherStore.reschedule_redemption_job`` in the order they are
+        due and without those removed with
+        ``VoucherStore.remove_redemption_job``.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        expected = {}
+        for n, voucher in enumerate(vouchers):
+            store.add_redemption_job(voucher, float(n))
+            expected[voucher] = RedemptionJob(voucher, 0, float(n))
+        # Adding again changes nothing.
+        store.add_redemption_job(vouchers[0], 1234.0)
+
+        for voucher, (attempts, due) in zip(vouchers, schedule):
+            store.reschedule_redemption_job(voucher, attempts, due)
+            expected[voucher] = RedemptionJob(voucher, attempts, due)
+
+        removed = vouchers[-1]
+        store.remove_redemption_job(removed)
+        del expected[removed]
+
+        self.expectThat(
+            store.get_redemption_jobs(),
+            Equals(sorted(expected.values(), key=lambda job: (job.due, job.voucher))),
+        )
+        self.expectThat(store.get_redemption_job(removed), Equals(None))
+        for job in expected.values():
+            self.expectThat(store.get_redemption_job(job.voucher), Equals(job))
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(
+            tuples(vouchers(), floats(min_value=0, max_value=2 ** 32)),
+            unique_by=lambda job: job[0],
+        ),
+        floats(min_value=0, max_value=2 ** 32),
+        data(),
+    )
+    def test_next_redemption_job(self, get_config, now, jobs, due_by, data):
+        """
+        ``VoucherStore.get_next_redemption_job`` returns the job due soonest
+        other than those excluded and ``VoucherStore.get_redemption_jobs``
+        returns only the jobs due by the given time.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        for voucher, due in jobs:
+            store.add_redemption_job(voucher, due)
+        ordered = sorted(
+            (RedemptionJob(voucher, 0, due) for (voucher, due) in jobs),
+            key=lambda job: (job.due, job.voucher),
+        )
+        excluding = data.draw(
+            frozensets(sampled_from([voucher for (voucher, due) in jobs]))
+            if jobs
+            else just(frozenset())
+        )
+
+        self.expectThat(
+            store.get_next_redemption_job(excluding=excluding),
+            Equals(
+                next(
+                    (job for job in ordered if job.voucher not in excluding),
+                    None,
+                )
+            ),
+        )
+        self.expectThat(
+            store.get_redemption_jobs(due_by=due_by),
+            Equals([job for job in ordered if job.due <= due_by]),
+        )
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(vouchers(), min_size=2, unique=True),
+        integers(min_value=1, max_value=2 ** 32),
+        floats(min_value=0, max_value=2 ** 32, allow_nan=False),
+    )
+    def test_add_vouchers(self, get_config, now, vouchers, expected_tokens, due):
+        """
+        ``VoucherStore.add_vouchers`` adds pending vouchers, each with a
+        redemption job due at the given time, and leaves vouchers which are
+        already present alone.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        existing = vouchers[0]
+        store.add_vouchers([existing], expected_tokens + 1, due + 1)
+        store.add_vouchers(vouchers, expected_tokens, due)
+
+        self.expectThat(
+            store.get(existing),
+            Equals(Voucher(existing, expected_tokens + 1, now, Pending(counter=0))),
+        )
+        self.expectThat(
+            store.get_redemption_job(existing),
+            Equals(RedemptionJob(existing, 0, due + 1)),
+        )
+        for voucher in vouchers[1:]:
+            self.expectThat(
+                store.get(voucher),
+                Equals(Voucher(voucher, expected_tokens, now, Pending(counter=0))),
+            )
+            self.expectThat(
+                store.get_redemption_job(voucher),
+                Equals(RedemptionJob(voucher, 0, due)),
+            )
+
+    @given(
+        tahoe_configs(),
+        vouchers(),
+        voucher_counters(),
+        lists(random_tokens(), min_size=1, unique=True),
+        datetimes(),
+    )
+    def test_get_random_tokens(self, get_config, voucher, counter, tokens, now):
+        """
+        ``VoucherStore.get_random_tokens`` returns the tokens added for a
+        redemption group with ``VoucherStore.add`` or an empty list if none
+        have been added.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        self.expectThat(
+            store.get_random_tokens(voucher, counter),
+            Equals([]),
+        )
+        store.add(voucher, len(tokens), counter, lambda: tokens)
+        self.expectThat(
+            store.get_random_tokens(voucher, counter),
+            Equals(tokens),
+        )
+        self.expectThat(
+            store.get_random_tokens(voucher, counter + 1),
+            Equals([]),
+        )
+
     @given(
         tahoe_configs(),
         vouchers(),
@@ -449,11 +613,38 @@ class VoucherStoreTests(TestCase):
             Equals(tokens),
         )
 
+    @given(tahoe_configs(), datetimes(), vouchers(), random_tokens())
+    def test_generation(self, get_config, now, voucher, token):
+        """
+        ``VoucherStore.generation`` changes when a transaction which changes the
+        database commits and not otherwise.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        before = store.generation()
+        store.list()
+        self.expectThat(store.generation(), Equals(before))
+
+        store.add(voucher, expected_tokens=1, counter=0, get_tokens=lambda: [token])
+        after = store.generation()
+        self.expectThat(after, Not(Equals(before)))
+
+        def get_tokens():
+            raise Exception("Failed to get tokens")
+
+        # This transaction fails.
+        self.expectThat(
+            lambda: store.add(
+                voucher, expected_tokens=1, counter=1, get_tokens=get_tokens
+            ),
+            Raises(),
+        )
+        self.expectThat(store.generation(), Equals(after))
+
     @given(tahoe_configs(), datetimes(), lists(vouchers(), unique=True), data())
     def test_list(self, get_config, now, vouchers, data):
         """
         ``VoucherStore.list`` returns a ``list`` containing a ``Voucher`` object
-        for each voucher previously added.
+        for each voucher previously added, in order by number.
         """
         tokens = iter(
             data.draw(
@@ -479,11 +670,52 @@ class VoucherStoreTests(TestCase):
             Equals(
                 list(
                     Voucher(number, expected_tokens=1, created=now)
-                    for number in vouchers
+                    for number in sorted(vouchers)
                 )
             ),
         )
 
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(tuples(vouchers(), booleans()), unique_by=lambda v: v[0]),
+        integers(min_value=1, max_value=5),
+        sampled_from([None, "pending", "double-spend", "redeemed"]),
+    )
+    def test_list_pages(self, get_config, now, vouchers, limit, state):
+        """
+        ``VoucherStore.list`` returns the vouchers in the given state, or all of
+        them, a page at a time when given a limit and the last voucher of the
+        previous page.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        store.add_vouchers(list(voucher for (voucher, _) in vouchers), 1, 0.0)
+        for voucher, double_spent in vouchers:
+            if double_spent:
+                store.mark_voucher_double_spent(voucher)
+
+        pages = [store.list(state=state, limit=limit)]
+        while len(pages[-1]) == limit:
+            pages.append(
+                store.list(state=state, after=pages[-1][-1].number, limit=limit)
+            )
+
+        self.expectThat(
+            list(voucher.number for page in pages for voucher in page),
+            Equals(
+                sorted(
+                    voucher
+                    for (voucher, double_spent) in vouchers
+                    if state is None
+                    or state == ("double-spend" if double_spent else "pending")
+                ),
+            ),
+        )
+        self.expectThat(
+            list(len(page) for page in pages[:-1]),
+            AllMatch(Equals(limit)),
+        )
+
 
 class VoucherStoreSnapshotTests(TestCase):
     """
@@ -830,6 +1062,238 @@ class LeaseMaintenanceTests(TestCase):
             Equals(expected),
         )
 
+    @given(tahoe_configs(), datetimes())
+    def test_lease_maintenance_observations_batched(self, get_config, now):
+        """
+        ``LeaseMaintenance.observe`` keeps observations in memory until the
+        flush interval has passed and ``LeaseMaintenance.finish`` writes any
+        that are left.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+
+        def in_progress_count():
+            cursor = store._connection.cursor()
+            cursor.execute(
+                """
+                SELECT [count] FROM [lease-maintenance-spending]
+                WHERE [finished] IS NULL
+                """,
+            )
+            return cursor.fetchall()
+
+        x = store.start_lease_maintenance()
+        x.observe([store.pass_value])
+        now += timedelta(seconds=5)
+        x.observe([store.pass_value])
+        self.expectThat(in_progress_count(), Equals([(0,)]))
+
+        now += timedelta(seconds=5)
+        x.observe([store.pass_value])
+        self.expectThat(in_progress_count(), Equals([(3,)]))
+
+        x.observe([store.pass_value])
+        x.finish()
+        self.expectThat(in_progress_count(), Equals([]))
+        self.expectThat(
+            store.get_latest_lease_maintenance_activity().passes_required,
+            Equals(4),
+        )
+
+    @given(tahoe_configs(), datetimes())
+    def test_lease_maintenance_observations_flushed_later(self, get_config, now):
+        """
+        ``LeaseMaintenance`` with a clock writes the observations it holds in
+        memory once the flush interval has passed even if no more are made.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        clock = Clock()
+
+        def in_progress_count():
+            cursor = store._connection.cursor()
+            cursor.execute(
+                """
+                SELECT [count] FROM [lease-maintenance-spending]
+                WHERE [finished] IS NULL
+                """,
+            )
+            return cursor.fetchall()
+
+        x = store.start_lease_maintenance(clock)
+        x.observe([store.pass_value])
+        x.observe([store.pass_value])
+        clock.advance(9)
+        self.expectThat(in_progress_count(), Equals([(0,)]))
+
+        clock.advance(1)
+        self.expectThat(in_progress_count(), Equals([(2,)]))
+
+        x.observe([store.pass_value])
+        x.finish()
+        self.expectThat(clock.getDelayedCalls(), Equals([]))
+        self.expectThat(
+            store.get_latest_lease_maintenance_activity().passes_required,
+            Equals(3),
+        )
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(storage_indexes(), min_size=2, unique=True),
+        lists(binary(min_size=1), min_size=1, max_size=4, unique=True),
+    )
+    def test_lease_crawl_checkpoint(self, get_config, now, found, servers):
+        """
+        ``LeaseCrawlCheckpoint`` loads the progress most recently saved with it
+        until it is cleared.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        checkpoint = store.get_lease_crawl_checkpoint()
+        self.expectThat(checkpoint.in_progress(), Equals(False))
+        self.expectThat(checkpoint.load(), Is(None))
+
+        def saved_storage_indexes():
+            visited = []
+            checkpoint.visit_storage_indexes(visited.append)
+            return visited
+
+        half = len(found) // 2
+        checkpoint.save_traversal([b"URI:a", b"URI:b"], found[:half], False)
+        self.expectThat(checkpoint.in_progress(), Equals(True))
+        self.expectThat(
+            checkpoint.load(),
+            Equals(LeaseCrawlProgress((b"URI:a", b"URI:b"), False, {})),
+        )
+        self.expectThat(saved_storage_indexes(), Equals(found[:half]))
+
+        # Storage indexes accumulate, the frontier is replaced, and a
+        # storage index saved again is not duplicated.
+        checkpoint.save_traversal([], found[half - 1 :], True)
+        for n, server in enumerate(servers):
+            for chunk in range(n + 1):
+                checkpoint.chunk_done(server, chunk)
+        self.expectThat(
+            checkpoint.load(),
+            Equals(
+                LeaseCrawlProgress(
+                    (),
+                    True,
+                    {
+                        server: frozenset(range(n + 1))
+                        for n, server in enumerate(servers)
+                    },
+                )
+            ),
+        )
+
+        self.expectThat(saved_storage_indexes(), Equals(found))
+
+        checkpoint.clear()
+        self.expectThat(checkpoint.in_progress(), Equals(False))
+        self.expectThat(checkpoint.load(), Is(None))
+        self.expectThat(saved_storage_indexes(), Equals([]))
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        lists(storage_indexes(), min_size=3, max_size=3, unique=True),
+    )
+    def test_lease_expirations(self, get_config, now, storage_indexes):
+        """
+        ``LeaseExpirations`` remembers the most recently observed lease
+        expiration time of each storage index on each server until it is
+        told to retain only other storage indexes.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        expirations = store.get_lease_expirations()
+        [a, b, c] = storage_indexes
+        self.expectThat(expirations.earliest([b"x", b"y"]), Is(None))
+
+        expirations.observe(b"x", [(a, 30.0, [1]), (b, 10.0, [2, 3])])
+        expirations.observe(b"y", [(a, 20.0, [1]), (c, 40.0, [4])])
+        # A renewal replaces the old expiration time.
+        expirations.observe(b"x", [(b, 50.0, [2, 3])])
+
+        self.expectThat(expirations.known(b"x", [a, b, c]), Equals(frozenset({a, b})))
+        self.expectThat(expirations.known(b"x", [b, c]), Equals(frozenset({b})))
+        self.expectThat(expirations.earliest([b"x", b"y"]), Equals(20.0))
+        self.expectThat(expirations.earliest([b"x"]), Equals(30.0))
+        self.expectThat(
+            expirations.due(45.0, [b"x", b"y"], 10),
+            Equals(
+                [
+                    LeaseExpiration(b"y", a, 20.0, [1]),
+                    LeaseExpiration(b"x", a, 30.0, [1]),
+                    LeaseExpiration(b"y", c, 40.0, [4]),
+                ]
+            ),
+        )
+        self.expectThat(
+            expirations.due(45.0, [b"x", b"y"], 1),
+            Equals([LeaseExpiration(b"y", a, 20.0, [1])]),
+        )
+        self.expectThat(
+            expirations.due(45.0, [b"x"], 10),
+            Equals([LeaseExpiration(b"x", a, 30.0, [1])]),
+        )
+
+        # A failed renewal is not found again until it may be retried.
+        expirations.postpone(b"y", [(a, 100.0)])
+        self.expectThat(
+            expirations.due(45.0, [b"x", b"y"], 10, now=99.0),
+            Equals(
+                [
+                    LeaseExpiration(b"x", a, 30.0, [1]),
+                    LeaseExpiration(b"y", c, 40.0, [4]),
+                ]
+            ),
+        )
+        self.expectThat(
+            expirations.due(45.0, [b"y"], 10, now=100.0),
+            Equals(
+                [
+                    LeaseExpiration(b"y", a, 20.0, [1], failures=1),
+                    LeaseExpiration(b"y", c, 40.0, [4]),
+                ]
+            ),
+        )
+        self.expectThat(expirations.earliest([b"y"], lead=5.0), Equals(35.0))
+        self.expectThat(expirations.earliest([b"y"], lead=-70.0), Equals(100.0))
+
+        # The storage indexes to retain may be given as any iterable.
+        expirations.retain(iter([b, c]))
+        self.expectThat(expirations.known(b"x", [a, b, c]), Equals(frozenset({b})))
+        self.expectThat(expirations.known(b"y", [a, b, c]), Equals(frozenset({c})))
+        expirations.retain(iter([c]))
+        self.expectThat(expirations.known(b"x", [a, b, c]), Equals(frozenset()))
+        self.expectThat(expirations.known(b"y", [a, b, c]), Equals(frozenset({c})))
+
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        storage_indexes(),
+        lists(binary(min_size=1), unique=True),
+    )
+    def test_directory_listings(self, get_config, now, directory, children):
+        """
+        ``DirectoryListings.get`` returns the children most recently put for the
+        given version of a directory and ``None`` for any other version.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        listings = store.get_directory_listings()
+        self.expectThat(listings.get(directory, b"1"), Is(None))
+
+        listings.put(directory, b"1", children)
+        self.expectThat(listings.get(directory, b"1"), Equals(children))
+        self.expectThat(listings.get(directory, b"2"), Is(None))
+
+        listings.put(directory, b"2", children[1:])
+        self.expectThat(listings.get(directory, b"1"), Is(None))
+        self.expectThat(listings.get(directory, b"2"), Equals(children[1:]))
+
 
 class EventStreamTests(TestCase):
     """
@@ -864,10 +1328,10 @@ class EventStreamTests(TestCase):
                 sql_statements.append(
                     Change(
                         next(sequence),
-                        change.bound_statement(store._connection.cursor()),
+                        change.bound_statement(),
                     )
                 )
-                store.add_event(change.bound_statement(store._connection.cursor()))
+                store.add_event(change.bound_statement())
 
         events = store.get_events()
         self.assertThat(
@@ -884,6 +1348,155 @@ class EventStreamTests(TestCase):
             Equals(len(sql_statements)),
         )
 
+    @given(
+        tahoe_configs(),
+        posix_safe_datetimes(),
+        lists(storage_indexes(), min_size=1, max_size=3, unique=True),
+    )
+    def test_lease_crawl_checkpoint_not_recorded(self, get_config, now, found):
+        """
+        Saving and clearing the progress of a lease maintenance crawl adds
+        nothing to the event-stream.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        store._connection.enable_replication()
+        checkpoint = store.get_lease_crawl_checkpoint()
+        checkpoint.save_traversal([b"URI:a"], found, False)
+        checkpoint.chunk_done(b"v0-server", 0)
+        self.expectThat(store.get_events().changes, Equals(()))
+        checkpoint.clear()
+        self.expectThat(store.get_events().changes, Equals(()))
+
+    @given(
+        tahoe_configs(),
+        posix_safe_datetimes(),
+        storage_indexes(),
+        lists(binary(min_size=1), unique=True),
+    )
+    def test_directory_listings_not_recorded(
+        self, get_config, now, directory, children
+    ):
+        """
+        Remembering the children of a directory adds nothing to the
+        event-stream.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        store._connection.enable_replication()
+        store.get_directory_listings().put(directory, b"1", children)
+        self.expectThat(store.get_events().changes, Equals(()))
+
+    @given(tahoe_configs(), posix_safe_datetimes(), vouchers(), random_tokens())
+    def test_changes_recorded(self, get_config, now, voucher, token):
+        """
+        When replication is enabled, changes made by ``VoucherStore`` methods are
+        recorded in the event-stream.  Statements executed for many rows are
+        recorded once, along with the rows.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        store._connection.enable_replication()
+        store.add(voucher, 1, 0, lambda: [token])
+
+        changes = store.get_events().changes
+        self.assertThat(
+            [change.arguments for change in changes],
+            Equals(
+                [
+                    (),
+                    ((voucher.decode("ascii"), 0, token.token_value.decode("ascii")),),
+                ]
+            ),
+        )
+        self.assertThat(
+            changes[0].statement,
+            Equals(
+                "\n                INSERT OR IGNORE INTO [vouchers] "
+                "([number], [expected-tokens], [created]) "
+                f"VALUES ('{voucher.decode('ascii')}', 1, '{now.isoformat(' ')}')\n"
+                "                ",
+            ),
+        )
+
+    @given(
+        tahoe_configs(),
+        posix_safe_datetimes(),
+        integers(min_value=0, max_value=20),
+        integers(min_value=0, max_value=25),
+        integers(min_value=1, max_value=30),
+        integers(min_value=1, max_value=7),
+    )
+    def test_paged_events(
+        self, get_config, now, num_events, since_sequence, limit, page_size
+    ):
+        """
+        ``VoucherStore.get_events`` returns at most ``limit`` events with
+        sequence numbers greater than ``since_sequence`` and
+        ``VoucherStore.iter_events`` visits every event in order, one page at a
+        time.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        for n in range(num_events):
+            store.add_event(f"INSERT INTO [foo] VALUES ({n})")
+        everything = store.get_events().changes
+
+        self.assertThat(
+            store.get_events(since_sequence, limit).changes,
+            Equals(tuple(c for c in everything if c.sequence > since_sequence)[:limit]),
+        )
+        self.assertThat(
+            tuple(store.iter_events(page_size=page_size)),
+            Equals(everything),
+        )
+        self.assertThat(
+            tuple(
+                store.iter_events(
+                    since_sequence=since_sequence // 2,
+                    up_to_sequence=since_sequence,
+                    page_size=page_size,
+                )
+            ),
+            Equals(
+                tuple(
+                    c
+                    for c in everything
+                    if since_sequence // 2 < c.sequence <= since_sequence
+                )
+            ),
+        )
+
+    @given(tahoe_configs(), posix_safe_datetimes(), vouchers(), random_tokens())
+    def test_summary(self, get_config, now, voucher, token):
+        """
+        ``VoucherStore.get_event_stream_summary`` describes the event stream
+        ``VoucherStore.get_events`` returns.
+        """
+        store = self.useFixture(
+            TemporaryVoucherStore(get_config, lambda: now),
+        ).store
+        self.assertThat(
+            store.get_event_stream_summary(),
+            Equals(EventStreamSummary(0, 0, None)),
+        )
+        store._connection.enable_replication()
+        store.add(voucher, 1, 0, lambda: [token])
+
+        events = store.get_events()
+        self.assertThat(
+            store.get_event_stream_summary(),
+            Equals(
+                EventStreamSummary(
+                    len(events.changes), events.size(), events.highest_sequence()
+                )
+            ),
+        )
+
 
 class VoucherTests(TestCase):
     """
@@ -1033,6 +1646,49 @@ class UnblindedTokenStoreTests(TestCase):
             ),
         )
 
+    @given(
+        tahoe_configs(),
+        datetimes(),
+        vouchers(),
+        dummy_ristretto_keys(),
+        permutations(range(6)),
+    )
+    def test_out_of_order_groups(
+        self, get_config, now, voucher_value, public_key, order
+    ):
+        """
+        Redemption groups may be inserted in any order.  The voucher's counter
+        advances past a group only once every earlier group has also been
+        inserted and ``get_redeemed_counters`` reports every inserted group.
+        """
+        store = self.useFixture(TemporaryVoucherStore(get_config, lambda: now)).store
+        store.add(voucher_value, len(order), 0, lambda: [])
+        self.assertThat(
+            store.get_redeemed_counters(voucher_value),
+            Equals(frozenset()),
+        )
+
+        done = set()
+        for counter in order[:-1]:
+            store.insert_unblinded_tokens_for_voucher(
+                voucher_value,
+                public_key,
+                [],
+                completed=False,
+                spendable=True,
+                counter=counter,
+            )
+            done.add(counter)
+            low = min(set(range(len(order))) - done)
+            self.expectThat(
+                store.get(voucher_value).state,
+                Equals(Pending(counter=low)),
+            )
+            self.expectThat(
+                store.get_redeemed_counters(voucher_value),
+                Equals(frozenset(done)),
+            )
+
     @given(
         tahoe_configs(),
         datetimes(),
@@ -479,7 +479,7 @@ class ServiceTests(TestCase):
         tahoe = grid.client(FilePath(node_config._basedir))
 
         reactor = MemoryReactorClock()
-        plugin = ZKAPAuthorizer(NAME, reactor, no_tahoe_client)
+        plugin = ZKAPAuthorizer(NAME, reactor, lambda reactor, config: tahoe)
 
         if replicating:
             # Place it into replication mode.
@@ -55,7 +55,7 @@ from .strategies import (
     api_auth_tokens,
     deletes,
     inserts,
-    sql_identifiers,
+    table_names,
     tables,
     tahoe_configs,
     updates,
@@ -119,7 +119,7 @@ class SnapshotMachine(RuleBasedStateMachine):
         )
 
     @rule(
-        name=sql_identifiers(),
+        name=table_names(),
         table=tables(),
     )
     def create_table(self, name, table):
@@ -2,17 +2,45 @@
 Tests for the replication system in ``_zkapauthorizer.replicate``.
 """
 
+from datetime import datetime, timedelta
 from functools import partial
 from io import BytesIO
+from itertools import count
 from sqlite3 import OperationalError, ProgrammingError, connect
 
+from allmydata.client import config_from_string
+from attrs import define, field
+from cbor2 import loads
 from fixtures import TempDir
+from hyperlink import DecodedURL
+from hypothesis import given
+from hypothesis.strategies import integers, lists, text, tuples
 from testtools import TestCase
-from testtools.matchers import Equals, raises
+from testtools.matchers import Always, Equals, HasLength, IsInstance, LessThan, raises
+from testtools.twistedsupport import succeeded
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+from twisted.logger import Logger
+from zope.interface import implementer
 
-from ..model import memory_connect
-from ..recover import recover
-from ..replicate import replication_service, with_replication
+from .. import NAME, replicate
+from ..model import VoucherStore, initialize_database
+from ..recover import recover, statements_from_snapshot
+from ..replicate import (
+    Change,
+    ChunkedReader,
+    EventStream,
+    IReplica,
+    ReplicationConfig,
+    ReplicationLag,
+    _ReplicationService,
+    event_stream_chunks,
+    replication_service,
+    statement_mutates,
+    with_replication,
+)
+from ..storage_common import BYTES_PER_PASS
+from ..tahoe import TahoeAPIError
 from .matchers import equals_database
 
 # Helper to construct the replication wrapper without immediately enabling
@@ -193,18 +221,742 @@ class ReplicationConnectionTests(TestCase):
             equals_database(conn_b),
         )
 
+    def test_snapshot_unreplicated(self):
+        """
+        The snapshot has the schema of the tables the connection was told not
+        to replicate but not their rows.  Rows of other tables with similar
+        names are included.
+        """
+        conn = with_replication(connect(":memory:"), False, frozenset(["lease-crawl"]))
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('CREATE TABLE "foo" ("a" INT)')
+            cursor.execute('INSERT INTO "foo" VALUES (?)', (1,))
+            cursor.execute('CREATE TABLE "lease-crawl" ("a" INT)')
+            cursor.execute('INSERT INTO "lease-crawl" VALUES (?)', (2,))
+            cursor.execute('CREATE TABLE "lease-crawl-chunks" ("a" INT)')
+            cursor.execute('INSERT INTO "lease-crawl-chunks" VALUES (?)', (3,))
+
+        snapshot_statements = list(statements_from_snapshot(BytesIO(conn.snapshot())))
+        self.assertThat(
+            snapshot_statements,
+            Equals(
+                [
+                    "BEGIN TRANSACTION;",
+                    'CREATE TABLE "foo" ("a" INT);',
+                    'INSERT INTO "foo" VALUES(1);',
+                    'CREATE TABLE "lease-crawl" ("a" INT);',
+                    'CREATE TABLE "lease-crawl-chunks" ("a" INT);',
+                    'INSERT INTO "lease-crawl-chunks" VALUES(3);',
+                    "COMMIT;",
+                ]
+            ),
+        )
+
+
+def get_events(conn) -> EventStream:
+    """
+    Read the event stream directly from the underlying database of a
+    replication-capable connection.
+    """
+    cursor = conn._conn.cursor()
+    cursor.execute(
+        "SELECT [sequence-number], [statement], [arguments] FROM [event-stream]"
+    )
+    return EventStream(
+        changes=tuple(
+            Change(seq, stmt, () if args is None else tuple(map(tuple, loads(args))))
+            for (seq, stmt, args) in cursor.fetchall()
+        )
+    )
+
+
+def replicating_database():
+    """
+    Create a replication-enabled connection to a new in-memory database
+    initialized with the application schema.
+    """
+    conn = with_replication(connect(":memory:"), enable_replication=True)
+    initialize_database(conn)
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM [event-stream]")
+        cursor.execute("DELETE FROM [sqlite_sequence]")
+    return conn
+
+
+class EventStreamEncodingTests(TestCase):
+    """
+    Tests for the lazy encoding of event streams.
+    """
+
+    @given(
+        lists(
+            tuples(text(), lists(tuples(integers(), text()), max_size=3)),
+            max_size=20,
+        ),
+        integers(min_value=1, max_value=50),
+    )
+    def test_roundtrip(self, statements, read_size):
+        """
+        The changes given to ``event_stream_chunks`` and read back from a
+        ``ChunkedReader`` in pieces of any size are decoded by
+        ``EventStream.from_bytes``.
+        """
+        changes = tuple(
+            Change(sequence, statement, tuple(map(tuple, arguments)))
+            for (sequence, (statement, arguments)) in enumerate(statements, 1)
+        )
+        reader = ChunkedReader(event_stream_chunks(iter(changes)))
+        pieces = list(iter(partial(reader.read, read_size), b""))
+        self.assertThat(
+            EventStream.from_bytes(BytesIO(b"".join(pieces))),
+            Equals(EventStream(changes)),
+        )
+        self.assertThat(reader.position, Equals(sum(map(len, pieces))))
+
+    def test_lazy(self):
+        """
+        ``event_stream_chunks`` and ``ChunkedReader`` consume the changes only as
+        the bytes they produce are read.
+        """
+        consumed = []
+
+        def changes():
+            for sequence in count(1):
+                consumed.append(sequence)
+                yield Change(sequence, "x")
+
+        reader = ChunkedReader(event_stream_chunks(changes()))
+        reader.read(4)
+        self.assertThat(consumed, Equals([]))
+        reader.read(20)
+        self.assertThat(len(consumed), LessThan(10))
+
+
+class StatementCaptureTests(TestCase):
+    """
+    Tests for the recording of changes into the event stream by the
+    replication-capable connection and cursor.
+    """
+
+    def test_mutates(self):
+        """
+        ``statement_mutates`` is ``True`` for DDL and DML statements except those
+        which apply to temporary schema, to the event stream itself, or to
+        SQLite3's internal tables.  It is also ``False`` for DML statements
+        which apply to the tables it is told not to replicate.
+        """
+        self.assertThat(
+            list(
+                map(
+                    partial(
+                        statement_mutates,
+                        unreplicated_tables=frozenset(["lease-crawl-chunks"]),
+                    ),
+                    [
+                        "SELECT * FROM [foo]",
+                        "BEGIN IMMEDIATE TRANSACTION",
+                        "PRAGMA foreign_keys = ON",
+                        "INSERT INTO [foo] VALUES (?)",
+                        "\n  -- a comment\n  INSERT OR IGNORE INTO foo VALUES (1)",
+                        'UPDATE "foo" SET [a] = 1',
+                        "DELETE FROM [foo]",
+                        "CREATE TABLE [foo] ([a] int)",
+                        "CREATE TEMPORARY TABLE [foo] ([a] int)",
+                        "INSERT INTO temp.[foo] VALUES (1)",
+                        "INSERT INTO [event-stream] ([statement]) VALUES ('x')",
+                        "DELETE FROM [sqlite_sequence]",
+                        "INSERT INTO [lease-crawl-chunks] VALUES (?, ?)",
+                        "CREATE TABLE [lease-crawl-chunks] ([a] int)",
+                        "INSERT INTO [lease-crawl] VALUES (?, ?)",
+                    ],
+                )
+            ),
+            Equals(
+                [False, False, False, True, True, True, True, True]
+                + [False, False, False, False, False, True, True]
+            ),
+        )
+        self.assertThat(
+            statement_mutates("INSERT INTO [lease-crawl-chunks] VALUES (?, ?)"),
+            Equals(True),
+        )
+
+    def test_execute_recorded(self):
+        """
+        Statements executed with ``execute`` which change the database are
+        recorded in the event stream with their arguments bound when the
+        transaction commits.
+        """
+        conn = replicating_database()
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE TRANSACTION")
+            cursor.execute(
+                "INSERT INTO [vouchers] ([number], [created]) VALUES (?, ?)",
+                ("abc", "it's now"),
+            )
+            cursor.execute("SELECT * FROM [vouchers]")
+            cursor.execute("UPDATE [vouchers] SET [counter] = ?", (3,))
+
+        self.assertThat(
+            get_events(conn).changes,
+            Equals(
+                (
+                    Change(
+                        1,
+                        "INSERT INTO [vouchers] ([number], [created]) "
+                        "VALUES ('abc', 'it''s now')",
+                    ),
+                    Change(2, "UPDATE [vouchers] SET [counter] = 3"),
+                )
+            ),
+        )
+
+    def test_executemany_recorded(self):
+        """
+        A statement executed with ``executemany`` is recorded once along with all
+        of the rows of arguments it was executed with.
+        """
+        conn = replicating_database()
+        statement = "INSERT INTO [unblinded-tokens] ([token]) VALUES (?)"
+        with conn:
+            cursor = conn.cursor()
+            cursor.executemany(statement, (("a",), ("b",), ("c",)))
+
+        self.assertThat(
+            get_events(conn).changes,
+            Equals((Change(1, statement, (("a",), ("b",), ("c",))),)),
+        )
+
+    def test_executemany_batched(self):
+        """
+        A statement executed with ``executemany`` with many rows is executed
+        and recorded a batch of rows at a time, consuming an iterator of rows
+        only as each batch is needed.  Observers are told about all of the
+        batches once the transaction commits.
+        """
+        self.patch(replicate, "_EXECUTEMANY_BATCH", 2)
+        conn = replicating_database()
+        observed = []
+        conn.add_mutation_observer(lambda n, size: observed.append(n))
+        statement = "INSERT INTO [unblinded-tokens] ([token]) VALUES (?)"
+        with conn:
+            cursor = conn.cursor()
+            cursor.executemany(statement, ((token,) for token in "abcde"))
+            self.expectThat(observed, Equals([]))
+
+        self.expectThat(
+            get_events(conn).changes,
+            Equals(
+                (
+                    Change(1, statement, (("a",), ("b",))),
+                    Change(2, statement, (("c",), ("d",))),
+                    Change(3, statement, (("e",),)),
+                )
+            ),
+        )
+        self.expectThat(observed, Equals([3]))
+
+    def test_rollback_discarded(self):
+        """
+        Changes made in a transaction which is rolled back are not recorded.
+        """
+
+        class ApplicationError(Exception):
+            pass
+
+        conn = replicating_database()
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO [unblinded-tokens] ([token]) VALUES ('a')")
+                # These are written to the event stream before the
+                # transaction ends.
+                cursor.executemany(
+                    "INSERT INTO [unblinded-tokens] ([token]) VALUES (?)",
+                    [("b",), ("c",)],
+                )
+                raise ApplicationError()
+        except ApplicationError:
+            pass
+
+        self.assertThat(get_events(conn).changes, Equals(()))
+
+    def test_temporary_not_recorded(self):
+        """
+        Changes to temporary tables are not recorded.
+        """
+        conn = replicating_database()
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO [in-use] VALUES ('a')")
+            cursor.executemany(
+                "DELETE FROM [in-use] WHERE [unblinded-token] = ?", [("a",)]
+            )
+
+        self.assertThat(get_events(conn).changes, Equals(()))
+
+    def test_not_replicating(self):
+        """
+        Nothing is recorded while the connection is not in replication mode.
+        """
+        conn = with_postponed_replication(connect(":memory:"))
+        initialize_database(conn)
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO [unblinded-tokens] ([token]) VALUES ('a')")
+
+        self.assertThat(get_events(conn).changes, Equals(()))
+
+    def test_replay(self):
+        """
+        Executing the recorded statements against a copy of the database from
+        before they were recorded produces the same database.
+        """
+        conn = replicating_database()
+        copy = connect(":memory:")
+        with copy:
+            recover(BytesIO(conn.snapshot()), copy.cursor())
+
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO [vouchers] ([number], [created]) VALUES (?, ?)",
+                ("abc", "now"),
+            )
+            cursor.executemany(
+                "INSERT INTO [tokens] ([voucher], [counter], [text]) VALUES (?, ?, ?)",
+                [("abc", 0, "x"), ("abc", 0, "y")],
+            )
+            cursor.execute("DELETE FROM [tokens] WHERE [text] = ?", ("x",))
+
+        events = get_events(conn)
+        with copy:
+            cursor = copy.cursor()
+            for change in events.changes:
+                if change.arguments:
+                    cursor.executemany(change.statement, change.arguments)
+                else:
+                    cursor.execute(change.statement)
+
+        # The event stream is not part of the replicated state.
+        for db in (conn, copy):
+            with db:
+                db.cursor().execute("DELETE FROM [event-stream]")
+                db.cursor().execute("DELETE FROM [sqlite_sequence]")
+
+        self.assertThat(conn, equals_database(copy))
+
+
+def upload_one(connection, token):
+    """
+    Change the database in a way which is recorded in the event stream.
+    """
+    with connection:
+        connection.cursor().execute(
+            "INSERT INTO [unblinded-tokens] ([token]) VALUES (?)", (token,)
+        )
+
+
+def not_enough_servers():
+    """
+    Make the error the Tahoe-LAFS node reports when it cannot upload because
+    not enough storage servers are connected.
+    """
+    return TahoeAPIError(
+        "put",
+        DecodedURL.from_text("http://127.0.0.1/uri"),
+        500,
+        "allmydata.interfaces.NoServersError",
+    )
+
+
+@implementer(IReplica)
+@define
+class FakeReplica:
+    """
+    A replica which records what it is asked to upload and lets the test
+    decide when (and whether) each upload completes.
+
+    :ivar entries: The data of each object in the replica, by name.
+    :ivar uploads: The name and data of each completed upload.
+    :ivar pending: The ``Deferred`` for each upload not yet completed.
+    """
+
+    entries: dict[str, bytes] = field(factory=dict)
+    uploads: list[tuple[str, bytes]] = field(factory=list)
+    pending: list[Deferred] = field(factory=list)
+
+    async def upload(self, entry_name, get_data):
+        d = Deferred()
+        self.pending.append(d)
+        await d
+        data = get_data().read()
+        self.entries[entry_name] = data
+        self.uploads.append((entry_name, data))
+
+    async def list_entries(self):
+        return {name: len(data) for (name, data) in self.entries.items()}
+
+    async def unlink(self, entry_name):
+        del self.entries[entry_name]
+
 
 class ReplicationServiceTests(TestCase):
     """
     Tests for ``_ReplicationService``.
     """
 
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        # A snapshot large enough that none of these tests need a new one.
+        self.replica = FakeReplica({"snapshot.sql": b"x" * 2 ** 20})
+        self.store = VoucherStore.from_connection(
+            BYTES_PER_PASS, datetime.now, connect(":memory:"), False
+        )
+        self.service = replication_service(
+            self.store,
+            self.replica,
+            self.clock,
+            ReplicationConfig(
+                upload_bytes=2 ** 30,
+                upload_statements=3,
+                max_age=timedelta(minutes=10),
+                backoff_initial=timedelta(seconds=10),
+                backoff_max=timedelta(seconds=15),
+            ),
+        )
+
+    def complete(self):
+        """
+        Complete the oldest pending upload successfully.
+        """
+        self.replica.pending.pop(0).callback(None)
+
     def test_enable_replication_on_connection(self):
         """
         When the service starts it enables replication on its database connection.
         """
-        conn = memory_connect("/foo/bar")
-        replicating_conn = with_postponed_replication(conn)
-        service = replication_service(replicating_conn)
+        self.service.startService()
+        self.assertThat(self.store._connection._replicating, Equals(True))
+
+    def test_statement_threshold(self):
+        """
+        The event stream is uploaded once it contains the configured number of
+        statements and the uploaded statements are then removed from the local
+        event stream.
+        """
+        self.service.startService()
+        upload_one(self.store._connection, "a")
+        upload_one(self.store._connection, "b")
+        self.assertThat(self.replica.pending, HasLength(0))
+        upload_one(self.store._connection, "c")
+        self.assertThat(self.replica.pending, HasLength(1))
+        self.complete()
+
+        [(name, data)] = self.replica.uploads
+        uploaded = EventStream.from_bytes(BytesIO(data))
+        self.assertThat(
+            (name, [c.statement for c in uploaded.changes]),
+            Equals(
+                (
+                    f"event-stream-{uploaded.highest_sequence()}",
+                    [
+                        f"INSERT INTO [unblinded-tokens] ([token]) VALUES ('{token}')"
+                        for token in "abc"
+                    ],
+                )
+            ),
+        )
+        self.assertThat(self.store.get_events().changes, Equals(()))
+        self.assertThat(self.service.get_lag().unuploaded_statements, Equals(0))
+
+    def test_coalesce(self):
+        """
+        Changes made while an upload is in progress do not start another upload
+        until the first completes.
+        """
+        self.service.startService()
+        for token in "abcdef":
+            upload_one(self.store._connection, token)
+        self.assertThat(self.replica.pending, HasLength(1))
+        self.complete()
+        # The second batch is uploaded once the first is done.
+        self.assertThat(self.replica.pending, HasLength(1))
+        self.complete()
+        self.assertThat(self.replica.uploads, HasLength(2))
+        self.assertThat(self.store.get_events().changes, Equals(()))
+
+    def test_max_age(self):
+        """
+        A statement is uploaded once it has waited the configured maximum age
+        even if no threshold has been reached.
+        """
+        self.service.startService()
+        upload_one(self.store._connection, "a")
+        self.clock.advance(timedelta(minutes=9).total_seconds())
+        self.assertThat(self.replica.pending, HasLength(0))
+        self.assertThat(
+            self.service.get_lag(),
+            Equals(ReplicationLag(1, self.service.get_lag().unuploaded_bytes, None)),
+        )
+        self.clock.advance(timedelta(minutes=1).total_seconds())
+        self.assertThat(self.replica.pending, HasLength(1))
+        self.complete()
+        self.clock.advance(5)
+        self.assertThat(self.service.get_lag(), Equals(ReplicationLag(0, 0, 5.0)))
+
+    def test_existing_events(self):
+        """
+        Events left in the local event stream from a previous run are counted
+        when the service starts.
+        """
+        self.store._connection.enable_replication()
+        for token in "abc":
+            upload_one(self.store._connection, token)
+        self.service.startService()
+        self.assertThat(self.replica.pending, HasLength(1))
+
+    def test_backoff(self):
+        """
+        A failed upload is retried after a delay which grows with each
+        consecutive failure up to a maximum.
+        """
+        logged = []
+        self.patch(_ReplicationService, "_log", Logger(observer=logged.append))
+        self.service.startService()
+        for token in "abc":
+            upload_one(self.store._connection, token)
+        self.replica.pending.pop(0).errback(not_enough_servers())
+        self.clock.advance(9)
+        self.assertThat(self.replica.pending, HasLength(0))
+        self.clock.advance(1)
+        self.replica.pending.pop(0).errback(not_enough_servers())
+        self.assertThat(logged, HasLength(2))
+        # Capped at 15 seconds rather than doubled to 20.
+        self.clock.advance(15)
+        self.assertThat(self.replica.pending, HasLength(1))
+        self.complete()
+        self.assertThat(self.replica.uploads, HasLength(1))
+        self.assertThat(self.store.get_events().changes, Equals(()))
+
+    def test_unexpected_error(self):
+        """
+        An error other than an upload failure is logged and not retried.  The
+        next change to the database starts another upload.
+        """
+        logged = []
+        self.patch(_ReplicationService, "_log", Logger(observer=logged.append))
+        self.service.startService()
+        for token in "abc":
+            upload_one(self.store._connection, token)
+        self.replica.pending.pop(0).errback(ValueError("surprise"))
+        self.assertThat(logged, HasLength(1))
+        self.assertThat(logged[0]["log_failure"].value, IsInstance(ValueError))
+        self.clock.advance(60)
+        self.assertThat(self.replica.pending, HasLength(0))
+        self.assertThat(self.store.get_events().changes, HasLength(3))
+
+        upload_one(self.store._connection, "d")
+        self.assertThat(self.replica.pending, HasLength(1))
+
+    def test_stop_cancels(self):
+        """
+        Stopping the service cancels an upload in progress and leaves the
+        events in the local event stream.
+        """
+        self.service.startService()
+        for token in "abc":
+            upload_one(self.store._connection, token)
+        self.assertThat(self.service.stopService(), succeeded(Always()))
+        self.assertThat(self.store.get_events().changes, HasLength(3))
+
+
+class CompactionTests(TestCase):
+    """
+    Tests for the snapshot compaction policy of ``_ReplicationService``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        self.store = VoucherStore.from_connection(
+            BYTES_PER_PASS, datetime.now, connect(":memory:"), False
+        )
+
+    def service(self, replica):
+        """
+        Create a service which uploads every statement immediately.
+        """
+        service = replication_service(
+            self.store,
+            replica,
+            self.clock,
+            ReplicationConfig(upload_statements=1),
+        )
         service.startService()
-        self.assertThat(replicating_conn._replicating, Equals(True))
+        return service
+
+    def complete_all(self, replica):
+        """
+        Complete uploads until there are no more.
+        """
+        while replica.pending:
+            replica.pending.pop(0).callback(None)
+
+    def test_no_snapshot(self):
+        """
+        If the replica has no snapshot then a snapshot is uploaded instead of the
+        first event stream object.
+        """
+        replica = FakeReplica()
+        self.service(replica)
+        upload_one(self.store._connection, "a")
+        self.complete_all(replica)
+
+        self.assertThat(
+            [name for (name, data) in replica.uploads],
+            Equals(["snapshot.sql"]),
+        )
+        self.assertThat(list(replica.entries), Equals(["snapshot.sql"]))
+        self.assertThat(self.store.get_events().changes, Equals(()))
+
+        recovered = connect(":memory:")
+        with recovered:
+            recover(BytesIO(replica.entries["snapshot.sql"]), recovered.cursor())
+        self.assertThat(
+            recovered.execute("SELECT [token] FROM [unblinded-tokens]").fetchall(),
+            Equals([("a",)]),
+        )
+
+    def test_snapshot_consistent(self):
+        """
+        A snapshot reflects the database as it was when the upload began even
+        though it is read as it is uploaded.  Changes made during the upload
+        are uploaded afterwards in an event stream object.
+        """
+        replica = FakeReplica()
+        self.service(replica)
+        upload_one(self.store._connection, "a")
+        upload_one(self.store._connection, "b")
+        self.complete_all(replica)
+
+        self.assertThat(
+            [name for (name, data) in replica.uploads],
+            Equals(["snapshot.sql", "event-stream-2"]),
+        )
+        recovered = connect(":memory:")
+        with recovered:
+            recover(BytesIO(replica.entries["snapshot.sql"]), recovered.cursor())
+        self.assertThat(
+            recovered.execute("SELECT [token] FROM [unblinded-tokens]").fetchall(),
+            Equals([("a",)]),
+        )
+
+    def test_snapshot_up_to_date(self):
+        """
+        While the event stream objects in the replica are smaller than the
+        snapshot, no new snapshot is uploaded.
+        """
+        replica = FakeReplica({"snapshot.sql": b"x" * 2 ** 20})
+        self.service(replica)
+        upload_one(self.store._connection, "a")
+        upload_one(self.store._connection, "b")
+        self.complete_all(replica)
+
+        self.assertThat(
+            sorted(replica.entries),
+            Equals(["event-stream-1", "event-stream-2", "snapshot.sql"]),
+        )
+
+    def test_superseded_streams_removed(self):
+        """
+        Once the event stream objects in the replica are larger than the
+        snapshot, a new snapshot is uploaded and all of the event stream
+        objects it contains are removed from the replica.
+        """
+        replica = FakeReplica({"snapshot.sql": b"x" * 2 ** 20})
+        service = self.service(replica)
+        upload_one(self.store._connection, "a")
+        self.complete_all(replica)
+        self.assertThat(sorted(replica.entries), HasLength(2))
+        service.stopService()
+
+        # Make the existing event stream large compared to the snapshot.
+        replica.entries["snapshot.sql"] = b"x"
+        service = self.service(replica)
+        upload_one(self.store._connection, "b")
+        self.complete_all(replica)
+
+        self.assertThat(list(replica.entries), Equals(["snapshot.sql"]))
+        self.assertThat(self.store.get_events().changes, Equals(()))
+        service.stopService()
+
+        # Sequence numbers continue past those which were pruned so names of
+        # later event stream objects are not reused.
+        replica.entries["snapshot.sql"] = b"x" * 2 ** 20
+        self.service(replica)
+        upload_one(self.store._connection, "c")
+        self.complete_all(replica)
+        self.assertThat(
+            sorted(replica.entries), Equals(["event-stream-3", "snapshot.sql"])
+        )
+
+
+class ReplicationConfigTests(TestCase):
+    """
+    Tests for ``ReplicationConfig``.
+    """
+
+    def test_from_node_config(self):
+        """
+        ``ReplicationConfig.from_node_config`` reads the replication options
+        from the plugin's section of the node configuration.
+        """
+        config = config_from_string(
+            "/tmp",
+            "tub.port",
+            f"""\
+[storageclient.plugins.{NAME}]
+replication.upload-bytes = 100
+replication.upload-statements = 10
+replication.max-age = 60
+replication.snapshot-ratio = 4
+""",
+        )
+        self.assertThat(
+            ReplicationConfig.from_node_config(config),
+            Equals(
+                ReplicationConfig(
+                    upload_bytes=100,
+                    upload_statements=10,
+                    max_age=timedelta(seconds=60),
+                    snapshot_ratio=4,
+                )
+            ),
+        )
+
+    def test_default_upload_bytes(self):
+        """
+        By default the size threshold is a little less than the amount of
+        storage paid for by one pass once erasure encoding is accounted for.
+        """
+        config = config_from_string(
+            "/tmp",
+            "tub.port",
+            f"""\
+[client]
+shares.needed = 2
+shares.total = 4
+
+[storageclient.plugins.{NAME}]
+pass-value = 1000
+""",
+        )
+        self.assertThat(
+            ReplicationConfig.from_node_config(config).upload_bytes,
+            Equals(475),
+        )
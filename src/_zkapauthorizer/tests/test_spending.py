@@ -17,21 +17,24 @@ Tests for ``_zkapauthorizer.spending``.
 """
 
 from hypothesis import given
-from hypothesis.strategies import data, integers, randoms
+from hypothesis.strategies import data, integers, lists, randoms
 from testtools import TestCase
 from testtools.matchers import (
     AfterPreprocessing,
+    AllMatch,
     Always,
     Equals,
     HasLength,
     MatchesAll,
     MatchesStructure,
+    raises,
 )
 from testtools.twistedsupport import succeeded
 
-from ..spending import IPassGroup, SpendingController
+from ..model import NotEnoughTokens
+from ..spending import IPassGroup, SpendingController, UnblindedTokenReserve
 from .fixtures import ConfiglessMemoryVoucherStore
-from .matchers import Provides
+from .matchers import Provides, greater_or_equal
 from .strategies import pass_counts, posix_safe_datetimes, vouchers
 
 
@@ -198,3 +201,58 @@ class PassGroupTests(TestCase):
             random,
             data,
         )
+
+
+def token_store(tokens, requested):
+    """
+    Make a function like ``VoucherStore.get_unblinded_tokens`` which takes
+    tokens from a list.
+
+    :param list requested: A list to which to append the number of tokens
+        asked for by each call.
+    """
+
+    def get_unblinded_tokens(count):
+        requested.append(count)
+        if count > len(tokens):
+            raise NotEnoughTokens()
+        taken = tokens[:count]
+        del tokens[:count]
+        return taken
+
+    return get_unblinded_tokens
+
+
+class UnblindedTokenReserveTests(TestCase):
+    """
+    Tests for ``UnblindedTokenReserve``.
+    """
+
+    @given(integers(min_value=1, max_value=16), lists(integers(0, 4), max_size=16))
+    def test_batched(self, batch_size, counts):
+        """
+        ``UnblindedTokenReserve.get`` gives out the requested number of tokens,
+        in order, taking them from the store at least ``batch_size`` at a
+        time.
+        """
+        tokens = list(range(sum(counts) + batch_size))
+        requested = []
+        reserve = UnblindedTokenReserve(token_store(tokens[:], requested), batch_size)
+
+        given = list(reserve.get(count) for count in counts)
+        self.expectThat(list(map(len, given)), Equals(counts))
+        self.expectThat(sum(given, []), Equals(tokens[: sum(counts)]))
+        self.expectThat(requested, AllMatch(greater_or_equal(batch_size)))
+
+    def test_not_enough_for_batch(self):
+        """
+        If the store does not have a whole batch of tokens
+        ``UnblindedTokenReserve.get`` still gives out as many as are requested
+        if the store has that many.
+        """
+        requested = []
+        reserve = UnblindedTokenReserve(token_store([1, 2, 3], requested), 16)
+        self.expectThat(reserve.get(2), Equals([1, 2]))
+        self.expectThat(requested, Equals([16, 2]))
+        self.expectThat(lambda: reserve.get(2), raises(NotEnoughTokens))
+        self.expectThat(reserve.get(1), Equals([3]))
@@ -0,0 +1,230 @@
+# Copyright 2022 PrivateStorage.io, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests for ``_zkapauthorizer.sql``.
+"""
+
+from enum import IntEnum
+from math import isfinite
+from sqlite3 import connect
+
+from hypothesis import assume, given
+from hypothesis.strategies import (
+    binary,
+    characters,
+    floats,
+    integers,
+    lists,
+    none,
+    one_of,
+    text,
+)
+from testtools import TestCase
+from testtools.matchers import Equals
+
+from ..sql import adapt_sql_value, bind_arguments, quote_sql_value, quote_sql_values
+from .matchers import raises
+
+# Values which SQLite3 can store without any loss or coercion, except floats.
+_exact_values = one_of(
+    integers(min_value=-(2 ** 63), max_value=2 ** 63 - 1),
+    text(alphabet=characters(blacklist_categories=["Cs"])),
+    binary(),
+    none(),
+)
+
+_floats = floats(allow_nan=False, allow_infinity=False, width=64)
+
+
+def _sqlite_reads_exactly(value):
+    """
+    Determine whether SQLite3 reads the shortest decimal representation of a
+    float back as exactly that float.  Some versions of SQLite3 do not round
+    every decimal literal correctly and no literal would help with those.
+    """
+    return connect(":memory:").execute(f"SELECT {value!r}").fetchone() == (value,)
+
+
+# Floats which SQLite3 can be given as a literal without any loss.
+_readable_floats = _floats.filter(_sqlite_reads_exactly)
+
+# Floats which survive being formatted with 15 significant digits.  SQLite3
+# only uses that format for floats it reads back exactly.
+_short_floats = (
+    _floats.map(lambda value: float(format(value, ".15g")))
+    .filter(isfinite)
+    .filter(_sqlite_reads_exactly)
+)
+
+
+class Color(IntEnum):
+    RED = 1
+    GREEN = 2
+
+
+class Name(str):
+    pass
+
+
+def sqlite_quote(value):
+    """
+    Quote a value using SQLite3's own ``quote()`` function.
+    """
+    return connect(":memory:").execute("SELECT quote(?)", (value,)).fetchone()[0]
+
+
+class QuoteTests(TestCase):
+    """
+    Tests for ``quote_sql_value`` and ``quote_sql_values``.
+    """
+
+    @given(_exact_values)
+    def test_matches_sqlite(self, value):
+        """
+        For integers, text without NULs, binary, and ``None``,
+        ``quote_sql_value`` returns exactly what SQLite3's ``quote()``
+        returns.
+        """
+        assume(not (isinstance(value, str) and "\0" in value))
+        self.assertThat(quote_sql_value(value), Equals(sqlite_quote(value)))
+
+    @given(_short_floats)
+    def test_float_matches_sqlite(self, value):
+        """
+        For floats which SQLite3 can represent with 15 significant digits,
+        ``quote_sql_value`` returns exactly what SQLite3's ``quote()``
+        returns.
+        """
+        self.assertThat(quote_sql_value(value), Equals(sqlite_quote(value)))
+
+    @given(_readable_floats)
+    def test_float_roundtrip(self, value):
+        """
+        For any float which SQLite3 can read back exactly, SQLite3 evaluates
+        the result of ``quote_sql_value`` to the original value.
+        """
+        quoted = quote_sql_value(value)
+        (result,) = connect(":memory:").execute(f"SELECT {quoted}").fetchone()
+        self.assertThat(result, Equals(value))
+
+    @given(lists(one_of(_exact_values, _floats)))
+    def test_many(self, values):
+        """
+        ``quote_sql_values`` quotes each of the values it is given like
+        ``quote_sql_value`` does.
+        """
+        self.assertThat(
+            quote_sql_values(values),
+            Equals(list(map(quote_sql_value, values))),
+        )
+
+    @given(text(alphabet=characters(blacklist_categories=["Cs"])))
+    def test_text_roundtrip(self, value):
+        """
+        For any text, including text with NULs, SQLite3 evaluates the result of
+        ``quote_sql_value`` to the original value.
+        """
+        quoted = quote_sql_value(value)
+        (result,) = connect(":memory:").execute(f"SELECT {quoted}").fetchone()
+        self.assertThat(result, Equals(value))
+
+    def test_unsupported(self):
+        """
+        ``quote_sql_value`` and ``quote_sql_values`` raise ``ValueError`` for
+        values of unsupported types.
+        """
+        self.assertThat(lambda: quote_sql_value(object()), raises(ValueError))
+        self.assertThat(lambda: quote_sql_values([1, object()]), raises(ValueError))
+        self.assertThat(
+            lambda: quote_sql_values(value for value in [1, object()]),
+            raises(ValueError),
+        )
+
+    def test_subclasses(self):
+        """
+        ``quote_sql_value`` and ``quote_sql_values`` quote instances of
+        subclasses of the supported types as SQLite3 does, including when
+        they are given a generator.
+        """
+        values = [Color.GREEN, Name("it's"), True]
+        expected = list(map(sqlite_quote, values))
+        self.expectThat(list(map(quote_sql_value, values)), Equals(expected))
+        self.expectThat(
+            quote_sql_values(value for value in values),
+            Equals(expected),
+        )
+
+
+class BindArgumentsTests(TestCase):
+    """
+    Tests for ``bind_arguments``.
+    """
+
+    @given(lists(one_of(_exact_values, _readable_floats), min_size=1))
+    def test_same_values(self, values):
+        """
+        A statement with arguments bound by ``bind_arguments`` evaluates to the
+        same values as the statement executed with those arguments.
+        """
+        statement = "SELECT " + ", ".join("?" * len(values))
+        db = connect(":memory:")
+        self.assertThat(
+            db.execute(bind_arguments(statement, values)).fetchall(),
+            Equals(db.execute(statement, values).fetchall()),
+        )
+
+    def test_quoted_question_marks(self):
+        """
+        Question marks inside string literals, quoted identifiers, and comments
+        are not treated as placeholders.
+        """
+        self.assertThat(
+            bind_arguments(
+                "UPDATE [a?] SET \"b?\" = '?' -- ?\n WHERE [c] = ? /* ? */",
+                ["d"],
+            ),
+            Equals("UPDATE [a?] SET \"b?\" = '?' -- ?\n WHERE [c] = 'd' /* ? */"),
+        )
+
+    def test_subclasses(self):
+        """
+        ``bind_arguments`` binds instances of subclasses of the supported types
+        the way SQLite3 does.
+        """
+        statement = "SELECT ?, ?, ?"
+        values = [Color.RED, Name("x"), False]
+        db = connect(":memory:")
+        self.expectThat(
+            db.execute(bind_arguments(statement, values)).fetchall(),
+            Equals(db.execute(statement, values).fetchall()),
+        )
+        self.expectThat(
+            list(map(adapt_sql_value, values)),
+            Equals([1, "x", 0]),
+        )
+        self.expectThat(
+            list(map(type, map(adapt_sql_value, values))),
+            Equals([int, str, int]),
+        )
+
+    def test_wrong_number(self):
+        """
+        ``bind_arguments`` raises ``ValueError`` if the number of arguments does
+        not match the number of placeholders.
+        """
+        self.assertThat(
+            lambda: bind_arguments("SELECT ?, ?", [1]),
+            raises(ValueError),
+        )
@@ -332,6 +332,46 @@ class DirectoryTestsMixin:
                 f"Expected link to fail with NotWriteableError, got {result!r} instead"
             )
 
+    @inlineCallbacks
+    def test_unlink(self):
+        """
+        ``unlink`` removes an entry from a directory.
+        """
+        tahoe = self.get_client()
+
+        dir_cap = yield Deferred.fromCoroutine(tahoe.make_directory())
+        entry_cap = yield Deferred.fromCoroutine(
+            tahoe.upload(lambda: BytesIO(b"some content"))
+        )
+        for entry_name in ["foo", "bar"]:
+            yield Deferred.fromCoroutine(tahoe.link(dir_cap, entry_name, entry_cap))
+
+        yield Deferred.fromCoroutine(tahoe.unlink(dir_cap, "foo"))
+
+        children = yield Deferred.fromCoroutine(tahoe.list_directory(dir_cap))
+        self.assertThat(set(children), Equals({"bar"}))
+
+    @inlineCallbacks
+    def test_unlink_readonly(self):
+        """
+        If ``unlink`` is passed a read-only directory capability then it returns
+        a coroutine that raises ``NotWriteableError``.
+        """
+        tahoe = self.get_client()
+        dir_cap = yield Deferred.fromCoroutine(tahoe.make_directory())
+        yield Deferred.fromCoroutine(tahoe.link(dir_cap, "self", dir_cap))
+        ro_dir_cap = attenuate_writecap(dir_cap)
+
+        d = Deferred.fromCoroutine(tahoe.unlink(ro_dir_cap, "self"))
+        try:
+            result = yield d
+        except NotWriteableError:
+            pass
+        else:
+            self.fail(
+                f"Expected unlink to fail with NotWriteableError, got {result!r} instead"
+            )
+
 
 class DirectoryIntegrationTests(IntegrationMixin, DirectoryTestsMixin, TestCase):
     """